@@ -0,0 +1,6 @@
+"""Benchmarks do backend (executar a partir de backend/ com python -m benchmarks.<nome>)"""
+
+import os
+
+# Os benchmarks nunca falam com o Gemini real
+os.environ.setdefault("GEMINI_API_KEY", "fake-benchmark-key")
@@ -0,0 +1,130 @@
+"""
+Admissão por prioridade e prazo contra um backend lento simulado
+
+Um backfill (bulk) e usuários da interface (interactive) chegam ao mesmo
+tempo, em ritmo fixo, a um backend com capacidade para --capacity
+chamadas simultâneas e latência sorteada (mesmo formato do Gemini falso).
+Compara a fila FIFO de hoje (um semáforo do tamanho da capacidade) com o
+AdmissionController: latência p50/p99 por classe e quantas requisições
+foram atendidas, degradadas (fallback, por motivo) ou descartadas (429).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_admission --duration 20 --bulk-rps 60 --interactive-rps 5 --latency lognormal:0.5:0.4
+    python -m benchmarks.bench_admission --capacity 8 --interactive-deadline-ms 3000 --bulk-queue 50
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter, defaultdict
+
+from services.admission import PRIORITY_CLASSES, AdmissionController, AdmissionRejected
+from benchmarks.fake_gemini import LatencyModel
+from benchmarks.results import latency_summary, save_results
+
+
+def arrivals(args):
+    """(instante, classe) de cada requisição, em ordem"""
+    events = []
+    for priority, rps in (("bulk", args.bulk_rps), ("interactive", args.interactive_rps)):
+        if rps > 0:
+            events.extend((i / rps, priority) for i in range(int(args.duration * rps)))
+    return sorted(events)
+
+
+async def drive(args, handle) -> dict:
+    """Dispara as chegadas no ritmo certo e junta latência e desfecho por classe"""
+    latencies, outcomes = defaultdict(list), defaultdict(Counter)
+
+    async def one(priority):
+        started = time.perf_counter()
+        outcome = await handle(priority)
+        outcomes[priority][outcome] += 1
+        if outcome != "shed":
+            latencies[priority].append(time.perf_counter() - started)
+
+    start = time.perf_counter()
+    tasks = []
+    for at, priority in arrivals(args):
+        delay = start + at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(priority)))
+    await asyncio.gather(*tasks)
+
+    return {
+        priority: {"outcomes": dict(outcomes[priority]), **latency_summary(latencies[priority])}
+        for priority in PRIORITY_CLASSES if outcomes[priority]
+    }
+
+
+async def run_fifo(args) -> dict:
+    latency = LatencyModel.parse(args.latency, seed=args.seed)
+    backend = asyncio.Semaphore(args.capacity)
+
+    async def handle(priority):
+        async with backend:
+            await asyncio.sleep(latency.sample())
+        return "ok"
+
+    return await drive(args, handle)
+
+
+async def run_admission(args) -> dict:
+    latency = LatencyModel.parse(args.latency, seed=args.seed)
+    controller = AdmissionController(
+        max_concurrency=args.capacity,
+        bulk_share=args.bulk_share,
+        queue_limits={"interactive": args.interactive_queue, "bulk": args.bulk_queue},
+        service_estimate=latency.sample(),
+    )
+    deadlines_ms = {"interactive": args.interactive_deadline_ms, "bulk": args.bulk_deadline_ms}
+
+    async def backend():
+        await asyncio.sleep(latency.sample())
+        return "ok"
+
+    async def handle(priority):
+        try:
+            return await controller.run(
+                priority,
+                controller.deadline_for(priority, deadlines_ms[priority]),
+                backend,
+                lambda reason: f"degraded_{reason}",
+            )
+        except AdmissionRejected:
+            return "shed"
+
+    return await drive(args, handle)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20.0, help="segundos de carga")
+    parser.add_argument("--bulk-rps", type=float, default=60.0)
+    parser.add_argument("--interactive-rps", type=float, default=5.0)
+    parser.add_argument("--capacity", type=int, default=16, help="chamadas simultâneas que o backend aguenta")
+    parser.add_argument("--latency", default="lognormal:0.5:0.4", help="latência do backend (ver fake_gemini)")
+    parser.add_argument("--bulk-share", type=float, default=0.5)
+    parser.add_argument("--interactive-queue", type=int, default=64)
+    parser.add_argument("--bulk-queue", type=int, default=256)
+    parser.add_argument("--interactive-deadline-ms", type=float, default=5000)
+    parser.add_argument("--bulk-deadline-ms", type=float, default=60000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="", help="arquivo JSON dos resultados")
+    args = parser.parse_args()
+
+    results = {}
+    for name, runner in (("fifo", run_fifo), ("admission", run_admission)):
+        results[name] = asyncio.run(runner(args))
+        for priority, r in results[name].items():
+            outcomes = ", ".join(f"{k}={v}" for k, v in sorted(r["outcomes"].items()))
+            print(
+                f"{name:9s} {priority:11s} p50 {r.get('p50_ms', 0):9.1f} ms  p99 {r.get('p99_ms', 0):9.1f} ms  "
+                f"{outcomes}"
+            )
+    print(f"resultados em {save_results('admission', args, results, args.output or None)}")
+
+
+if __name__ == "__main__":
+    main()
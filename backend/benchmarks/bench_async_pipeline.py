@@ -0,0 +1,115 @@
+"""
+Benchmark de carga do /classify: caminho síncrono antigo vs caminho assíncrono
+
+O caminho "antes" reproduz o handler original (async def chamando o
+classify_and_respond bloqueante); o "depois" é o /classify atual.
+O Gemini é substituído por um modelo falso com latência fixa.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_async_pipeline --requests 200 --concurrency 100 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import logging
+import socket
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from main import app
+from services.classifier_service import classifier_service
+from services.gemini_service import gemini_service
+from benchmarks.fake_gemini import install_fake_gemini
+
+PAYLOAD = {
+    "sender": "cliente@empresa.com",
+    "subject": "Reunião de alinhamento do projeto",
+    "body": "Olá, podemos agendar uma reunião para discutir o prazo de entrega do relatório?",
+    # Todas as requisições precisam chegar ao Gemini (falso)
+    "cache": "bypass",
+}
+
+
+@app.post("/classify-legacy")
+async def classify_legacy(data: dict):
+    # Handler original: chamada bloqueante dentro de async def
+    return classifier_service.classify_and_respond(
+        data["sender"], data["subject"], data["body"], cache_mode=data["cache"]
+    )
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def start_server() -> str:
+    """Sobe o app num uvicorn em thread própria (o event loop do servidor
+    fica separado do loop do cliente de carga)"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+async def run_load(base_url: str, path: str, total: int, concurrency: int) -> dict:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=None) as client:
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(path, json=PAYLOAD)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "requests_per_sec": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.2, help="latência do Gemini falso (s)")
+    args = parser.parse_args()
+
+    install_fake_gemini(gemini_service, args.latency)
+
+    results = {}
+    # Logs de requisição ficam fora da medição (ver bench_logging)
+    logging.getLogger("email_classifier").setLevel(logging.WARNING)
+    base_url = start_server()
+    results["antes (sync)"] = asyncio.run(run_load(base_url, "/classify-legacy", args.requests, args.concurrency))
+    results["depois (async)"] = asyncio.run(run_load(base_url, "/classify", args.requests, args.concurrency))
+
+    for name, r in results.items():
+        print(
+            f"{name:16s} {r['requests_per_sec']:8.1f} req/s  "
+            f"p50 {r['p50_ms']:8.1f} ms  p99 {r['p99_ms']:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Rajadas de emails idênticos no /classify, com e sem o single-flight
+
+Simula um disparo em massa: cada rajada manda --burst-size cópias do mesmo
+email ao mesmo tempo, antes que o cache possa ser preenchido. Compara
+chamadas ao Gemini falso, requisições agrupadas, latência e erros com
+COALESCE_ENABLED ligado e desligado. Com --errors as falhas do Gemini
+falso mostram que o erro (e o fallback) chega a todas as cópias.
+
+O app sobe num uvicorn em thread própria (como no bench_load) com o
+modelo local desligado; cada modo usa emails diferentes, então um não
+aproveita o cache do outro.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_coalescing --bursts 20 --burst-size 50 --latency 0.3
+    python -m benchmarks.bench_coalescing --errors 503=0.2 --reply none
+"""
+
+import argparse
+import asyncio
+import logging
+
+from config import settings
+from services.classifier_service import classifier_service
+from services.gemini_service import gemini_service
+from services.metrics import COALESCED_REQUESTS
+from benchmarks.bench_load import run_load, start_server
+from benchmarks.corpus import synthetic_emails
+from benchmarks.fake_gemini import FaultInjector, LatencyModel, install_fake_gemini, parse_errors
+from benchmarks.results import save_results
+
+OPERATIONS = ("classify", "reply", "combined")
+
+
+def burst_requests(seed: int, args) -> list:
+    """Uma lista por rajada, cada uma com --burst-size cópias do mesmo email"""
+    bursts = []
+    for email in synthetic_emails(args.bursts, seed=seed):
+        payload = {
+            "sender": email["sender"],
+            "subject": email["subject"],
+            "body": email["body"],
+            "cache": "use",
+            "reply": args.reply,
+        }
+        bursts.append([{"url": "/classify", "json": payload}] * args.burst_size)
+    return bursts
+
+
+async def run_mode(base_url: str, enabled: bool, seed: int, faults: FaultInjector, args) -> dict:
+    settings.COALESCE_ENABLED = enabled
+    calls_before = faults.calls
+    coalesced_before = sum(COALESCED_REQUESTS.value(operation=op) for op in OPERATIONS)
+    summaries = []
+    for burst in burst_requests(seed, args):
+        summaries.append(await run_load(base_url, burst, args.burst_size, args.timeout))
+
+    total = args.bursts * args.burst_size
+    latencies = sorted(s["p50_ms"] for s in summaries if "p50_ms" in s)
+    return {
+        "requests": total,
+        "errors": sum(s["errors"] for s in summaries),
+        "llm_calls": faults.calls - calls_before,
+        "coalesced": int(sum(COALESCED_REQUESTS.value(operation=op) for op in OPERATIONS) - coalesced_before),
+        "burst_p50_ms": latencies[len(latencies) // 2] if latencies else 0.0,
+        "burst_max_ms": max((s.get("max_ms", 0.0) for s in summaries), default=0.0),
+        "requests_per_sec": round(total / sum(s["elapsed_seconds"] for s in summaries), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--burst-size", type=int, default=50, help="cópias simultâneas de cada email")
+    parser.add_argument("--reply", default="generate", choices=("generate", "none"))
+    parser.add_argument("--latency", default="0.3", help="latência do Gemini falso (ver bench_load)")
+    parser.add_argument("--errors", default="", help="erros do Gemini falso, ex.: 503=0.2")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", default="", help="arquivo JSON dos resultados")
+    args = parser.parse_args()
+
+    logging.getLogger("email_classifier").setLevel(logging.WARNING)
+    faults = FaultInjector(seed=args.seed, error_rates=parse_errors(args.errors))
+    install_fake_gemini(gemini_service, LatencyModel.parse(args.latency, seed=args.seed), faults)
+    classifier_service.local_model = None
+    base_url = start_server()
+
+    results = {}
+    for offset, (name, enabled) in enumerate((("sem_coalescing", False), ("com_coalescing", True))):
+        r = asyncio.run(run_mode(base_url, enabled, args.seed + offset * 1000, faults, args))
+        results[name] = r
+        print(
+            f"{name:15s} {r['requests']:6d} req  chamadas ao Gemini {r['llm_calls']:6d}  "
+            f"agrupadas {r['coalesced']:6d}  erros {r['errors']:4d}  "
+            f"p50 da rajada {r['burst_p50_ms']:8.1f} ms  máx {r['burst_max_ms']:8.1f} ms"
+        )
+    print(f"resultados em {save_results('coalescing', args, results, args.output or None)}")
+
+
+if __name__ == "__main__":
+    main()
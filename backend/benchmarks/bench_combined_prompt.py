@@ -0,0 +1,109 @@
+"""
+Comparação entre as duas chamadas (classificação + resposta) e o prompt
+combinado (COMBINED_PROMPT): latência, tokens, chamadas e concordância
+
+Por padrão reproduz respostas gravadas do Gemini real (--recordings), com
+a latência medida na gravação; prompts sem gravação usam o Gemini falso
+com custo por token. Para gravar, rode uma vez com --record e a
+GEMINI_API_KEY real (as chamadas saem para a API).
+
+O modelo local e o cache ficam desligados para que todo email chegue ao
+Gemini nos dois modos.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_combined_prompt --emails 50 --record
+    python -m benchmarks.bench_combined_prompt --emails 50
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+from config import settings
+from services.classifier_service import classifier_service
+from services.gemini_service import gemini_service
+from benchmarks.corpus import synthetic_emails
+from benchmarks.fake_gemini import (
+    ResponseRecorder, install_recorded_gemini, install_recorder, load_recordings
+)
+
+DEFAULT_RECORDINGS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings", "gemini_responses.jsonl")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run_mode(emails, combined: bool) -> dict:
+    settings.COMBINED_PROMPT = combined
+    latencies, categories = [], []
+    totals = {"llm_calls": 0, "prompt_tokens": 0, "output_tokens": 0}
+    for email in emails:
+        started = time.perf_counter()
+        result = await classifier_service.classify_and_respond_async(
+            email["sender"], email["subject"], email["body"], cache_mode="bypass"
+        )
+        latencies.append(time.perf_counter() - started)
+        categories.append(result["category"])
+        for field in totals:
+            totals[field] += result["usage"][field]
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "categories": categories,
+        **{field: value / len(emails) for field, value in totals.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=50)
+    parser.add_argument("--recordings", default=DEFAULT_RECORDINGS)
+    parser.add_argument("--record", action="store_true", help="chama o Gemini real e grava as respostas")
+    parser.add_argument("--latency", type=float, default=0.15, help="latência base do falso (s)")
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0002, help="custo do falso por token de entrada (s)")
+    parser.add_argument("--output-token-latency", type=float, default=0.004, help="custo do falso por token gerado (s)")
+    args = parser.parse_args()
+
+    logging.getLogger("email_classifier").setLevel(logging.WARNING)
+    emails = list(synthetic_emails(args.emails))
+    classifier_service.local_model = None
+
+    if args.record:
+        os.makedirs(os.path.dirname(args.recordings), exist_ok=True)
+        install_recorder(gemini_service, ResponseRecorder(args.recordings))
+        print(f"gravando respostas do Gemini real em {args.recordings}")
+    else:
+        recordings = load_recordings(args.recordings)
+        install_recorded_gemini(
+            gemini_service,
+            recordings,
+            latency=args.latency,
+            prompt_token_latency=args.prompt_token_latency,
+            output_token_latency=args.output_token_latency,
+        )
+        print(f"{len(recordings)} respostas gravadas; prompts sem gravação usam o Gemini falso")
+
+    results = {
+        "duas chamadas": asyncio.run(run_mode(emails, combined=False)),
+        "combinado": asyncio.run(run_mode(emails, combined=True)),
+    }
+    for name, r in results.items():
+        expected = sum(c == e["category"] for c, e in zip(r["categories"], emails)) / len(emails)
+        print(
+            f"{name:14s} p50 {r['p50_ms']:8.1f} ms  p95 {r['p95_ms']:8.1f} ms  "
+            f"chamadas {r['llm_calls']:.2f}  tokens in {r['prompt_tokens']:7.1f}  out {r['output_tokens']:6.1f}  "
+            f"acerto vs rótulo {expected:.1%}"
+        )
+
+    two, one = results["duas chamadas"], results["combinado"]
+    agreement = sum(a == b for a, b in zip(two["categories"], one["categories"])) / len(emails)
+    print(f"concordância de categoria entre os modos: {agreement:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Aprendizado com o /feedback: quanto tráfego sai do LLM e quanto custa
+
+O modelo base é treinado em emails comuns do corpus sintético; depois
+chega um fluxo com emails de template que ele nunca viu. Cada email que
+o modelo local não resolve certo (iria ao LLM ou sairia errado) recebe a
+correção do "operador" pelo FeedbackService, que publica um snapshot e
+troca o modelo servido. Mede:
+
+- fração do fluxo resolvida localmente e certa, por janela (--window);
+- latência de uma correção (log + SGD + snapshot + troca);
+- carga de um snapshot (np.load com mmap) contra o .npz comprimido;
+- latência da predição numa thread leitora durante as trocas, para
+  mostrar que o caminho quente não espera nenhuma trava.
+
+Tudo roda num diretório temporário; nada toca os modelos configurados.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_feedback --train 2000 --stream 3000 --window 500
+    python -m benchmarks.bench_feedback --features 1048576 --lr 0.5 --max-steps 10
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from config import settings
+from services.feedback_service import FeedbackService
+from services.local_model import LABELS, LiveLocalModel, LocalModel, SnapshotStore, decide
+from services.nlp_service import nlp_service
+from benchmarks.corpus import synthetic_emails, synthetic_templated
+from benchmarks.results import latency_summary, save_results
+
+
+def load_times(npz_path: str, store: SnapshotStore, repeat: int) -> dict:
+    """Mediana do tempo de carga do .npz e de um snapshot mapeado"""
+    version = store.current_version()
+    runs = {"npz_load_ms": [], "snapshot_load_ms": []}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        LocalModel.load(npz_path)
+        runs["npz_load_ms"].append(time.perf_counter() - started)
+        started = time.perf_counter()
+        store.load(version)
+        runs["snapshot_load_ms"].append(time.perf_counter() - started)
+    return {name: round(statistics.median(values) * 1000, 3) for name, values in runs.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--train", type=int, default=2000, help="emails comuns do modelo base")
+    parser.add_argument("--stream", type=int, default=3000, help="emails do fluxo com templates")
+    parser.add_argument("--window", type=int, default=500, help="emails por janela do relatório")
+    parser.add_argument("--features", type=int, default=2 ** 18)
+    parser.add_argument("--lr", type=float, default=settings.FEEDBACK_LEARNING_RATE)
+    parser.add_argument("--max-steps", type=int, default=settings.FEEDBACK_MAX_STEPS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="", help="arquivo JSON dos resultados")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_feedback_")
+    settings.LOCAL_MODEL_PATH = os.path.join(workdir, "base.npz")
+    settings.FEEDBACK_LEARNING_RATE = args.lr
+    settings.FEEDBACK_MAX_STEPS = args.max_steps
+    settings.LOCAL_MODEL_RELOAD_SECONDS = 0.05
+
+    base = LocalModel.empty(args.features)
+    base.fit(
+        (nlp_service.tokenize(f"{e['subject']}. {e['body']}"), LABELS.index(e["category"]))
+        for e in synthetic_emails(args.train, seed=args.seed)
+    )
+    base.save(settings.LOCAL_MODEL_PATH)
+
+    store = SnapshotStore(os.path.join(workdir, "snapshots"))
+    live = LiveLocalModel(store)
+    feedback = FeedbackService(os.path.join(workdir, "feedback.jsonl"), store, live)
+    stream = list(synthetic_templated(args.stream, seed=args.seed + 1))
+    tokens = [nlp_service.tokenize(f"{e['subject']}. {e['body']}") for e in stream]
+
+    # Leitora concorrente: outro "worker" servindo com o mesmo diretório de snapshots
+    reader = LiveLocalModel(store)
+    stop = threading.Event()
+    predict_latencies = []
+
+    def read():
+        i = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            model = reader.current()
+            if model is not None:
+                model.predict_proba(tokens[i % len(tokens)])
+            predict_latencies.append(time.perf_counter() - started)
+            i += 1
+
+    thread = threading.Thread(target=read, daemon=True)
+    thread.start()
+
+    windows, correction_latencies = [], []
+    local_right = 0
+    for i, (email, email_tokens) in enumerate(zip(stream, tokens), start=1):
+        model = live.current()
+        local = decide(model.predict_proba(email_tokens), settings.LOCAL_MODEL_LOW, settings.LOCAL_MODEL_HIGH)
+        if local is not None and local[0] == email["category"]:
+            local_right += 1
+        else:
+            started = time.perf_counter()
+            feedback.record(email["sender"], email["subject"], email["body"], email["category"], local and local[0])
+            correction_latencies.append(time.perf_counter() - started)
+        if i % args.window == 0 or i == len(stream):
+            windows.append(round(local_right / (i - args.window * len(windows)), 4))
+            local_right = 0
+    stop.set()
+    thread.join()
+
+    results = {
+        "local_right_share_by_window": windows,
+        "corrections": len(correction_latencies),
+        "snapshot_version": store.current_version(),
+        "reader_swaps": reader.swaps,
+        "correction": latency_summary(correction_latencies),
+        "predict_during_swaps": latency_summary(predict_latencies),
+        "load": load_times(settings.LOCAL_MODEL_PATH, store, args.repeat),
+    }
+    shutil.rmtree(workdir, ignore_errors=True)
+    print(f"resolvidos localmente e certos, por janela de {args.window}: {windows}")
+    print(
+        f"correções {results['corrections']}  snapshots {results['snapshot_version']}  "
+        f"trocas na leitora {reader.swaps}"
+    )
+    print(
+        f"correção     p50 {results['correction'].get('p50_ms', 0):8.3f} ms  "
+        f"p99 {results['correction'].get('p99_ms', 0):8.3f} ms"
+    )
+    print(
+        f"predição     p50 {results['predict_during_swaps']['p50_ms']:8.3f} ms  "
+        f"p99 {results['predict_during_swaps']['p99_ms']:8.3f} ms  (durante as trocas)"
+    )
+    print(f"carga        .npz {results['load']['npz_load_ms']:8.3f} ms  snapshot {results['load']['snapshot_load_ms']:8.3f} ms")
+    print(f"resultados em {save_results('feedback', args, results, args.output or None)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark da extração de texto de PDFs gerados com 1, 50 e 500 páginas
+
+Compara a extração antiga (arquivo inteiro em memória, todas as páginas
+em série) com a extração em streaming com orçamento de caracteres e com
+a extração completa em process pool.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_file_extraction
+"""
+
+import argparse
+import tempfile
+import time
+from io import BytesIO
+
+import PyPDF2
+
+from config import settings
+from services.file_service import FileService
+from benchmarks.corpus import synthetic_pdf
+
+
+def legacy_extract(content: bytes) -> str:
+    reader = PyPDF2.PdfReader(BytesIO(content))
+    return "\n".join(page.extract_text() for page in reader.pages)
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="1,50,500")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    service = FileService()
+    print(f"orçamento: {settings.EXTRACTION_CHAR_BUDGET} caracteres, workers: {settings.PDF_WORKERS}\n")
+    print(f"{'páginas':>7} {'tamanho':>9} {'antigo':>10} {'streaming':>10} {'lidas':>6} {'completo/pool':>14}")
+
+    for pages in (int(p) for p in args.pages.split(",")):
+        content = synthetic_pdf(pages)
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spooled:
+            spooled.write(content)
+
+            legacy_ms, _ = timed(lambda: legacy_extract(content), args.repeat)
+            stream_ms, stream_result = timed(
+                lambda: service.extract_text_from_stream(spooled, "bench.pdf"), args.repeat
+            )
+            full_ms, _ = timed(
+                lambda: service.extract_text_from_stream(spooled, "bench.pdf", char_budget=0), args.repeat
+            )
+
+        print(
+            f"{pages:7d} {len(content) / 1024:7.0f}KB {legacy_ms:8.1f}ms {stream_ms:8.1f}ms "
+            f"{stream_result['pages_read']:6d} {full_ms:12.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark dos jobs de classificação em massa: vazão em emails/s e retomada
+
+Gera um JSONL sintético, roda um JobService com base SQLite temporária
+contra o Gemini falso e mede a vazão. Com --interrupt-at o primeiro
+processamento é interrompido nesse ponto e um novo JobService (como após
+um restart) retoma o job a partir do último bloco gravado.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_jobs --emails 5000 --workers 4 --rps 50 --latency 0.2
+    python -m benchmarks.bench_jobs --emails 5000 --interrupt-at 2000
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+
+from config import settings
+from services.gemini_service import gemini_service
+from services.job_service import JobService
+from benchmarks.corpus import synthetic_emails
+from benchmarks.fake_gemini import install_fake_gemini
+
+
+def build_jsonl(count: int) -> io.BytesIO:
+    lines = []
+    for i, email in enumerate(synthetic_emails(count)):
+        lines.append(json.dumps({"id": i, "sender": email["sender"], "subject": email["subject"], "body": email["body"]}))
+    return io.BytesIO(("\n".join(lines) + "\n").encode("utf-8"))
+
+
+def new_service(db_path: str, args) -> JobService:
+    return JobService(db_path=db_path, workers=args.workers, chunk_size=settings.BATCH_MAX_SIZE, max_rps=args.rps)
+
+
+async def run_until(service: JobService, job_id: str, stop_at: int) -> dict:
+    service.start()
+    while True:
+        job = service.get(job_id)
+        if job["status"] not in ("queued", "running") or job["done"] >= stop_at:
+            break
+        await asyncio.sleep(0.05)
+    await service.stop()
+    return service.get(job_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rps", type=float, default=50.0, help="limite de chamadas ao Gemini por segundo")
+    parser.add_argument("--latency", type=float, default=0.2, help="latência do Gemini falso (s)")
+    parser.add_argument("--interrupt-at", type=int, default=0, help="interrompe após N emails e retoma")
+    args = parser.parse_args()
+
+    install_fake_gemini(gemini_service, args.latency)
+    logging.getLogger("email_classifier").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "jobs.db")
+        service = new_service(db_path, args)
+
+        started = time.perf_counter()
+        job = service.submit(build_jsonl(args.emails), "bench.jsonl")
+        print(f"carga do arquivo: {job['total']} emails em {time.perf_counter() - started:.2f}s")
+
+        if args.interrupt_at:
+            job = asyncio.run(run_until(service, job["id"], args.interrupt_at))
+            print(f"interrompido    {job['done']:7d}/{job['total']}  {job['emails_per_sec']:8.1f} emails/s")
+            service = new_service(db_path, args)
+
+        job = asyncio.run(run_until(service, job["id"], args.emails))
+        print(
+            f"{job['status']:15s} {job['done']:7d}/{job['total']}  {job['emails_per_sec']:8.1f} emails/s  "
+            f"chamadas ao Gemini {job['llm_calls']}  devolvidos à fila {job['retries']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
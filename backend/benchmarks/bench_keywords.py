@@ -0,0 +1,143 @@
+"""
+Fallback e detecção de noreply: varredura antiga (um `in` por termo,
+listas recriadas a cada chamada) vs autômato de Aho-Corasick dos léxicos
+
+Mede µs por email e compara as decisões (Produtivo, Improdutivo ou
+empate, antes do desempate por sentimento). As divergências vêm sobretudo
+dos limites de palavra: "ação" não casa mais dentro de "informação".
+
+Com poucas dezenas de termos a varredura antiga (um `in` em C por termo)
+ainda é mais rápida que o laço do autômato em Python; o custo dela cresce
+com o número de termos e o do autômato só com o tamanho do texto. A
+seção de escala repete a medição com léxicos de --scale termos.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_keywords --emails 5000
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+
+from config import settings
+from services.keyword_automaton import KeywordAutomaton, Lexicon
+from benchmarks.corpus import synthetic_emails, synthetic_templated
+from benchmarks.results import save_results
+
+_LEGACY_NOREPLY = ("noreply", "no-reply", "donotreply", "do-not-reply", "automat", "auto-mail")
+
+
+def legacy_scores(text: str):
+    """Contagem do _fallback_scores original"""
+    t = text.lower()
+    produtivo = [
+        "reunião","projeto","prazo","entrega","urgente","aprovação","orçamento",
+        "contrato","proposta","documento","relatório","vaga","entrevista",
+        "solicitação","pendência","ação","tarefa","cliente","processo","suporte",
+        "solicito","confirmação","agendar","discussão","imediato","urgência"
+    ]
+    improdutivo = [
+        "parabéns","feliz","aniversário","natal","ano novo","obrigado",
+        "bom dia","nada","férias","feriado","festa","casamento","abraço","não responder",
+        "email automático","noreply","no-reply","teste"
+    ]
+    return len([k for k in produtivo if k in t]), len([k for k in improdutivo if k in t])
+
+
+def legacy_scan(terms, text: str):
+    lowered = text.lower()
+    return [k for k in terms if k in lowered]
+
+
+def legacy_noreply(sender: str) -> bool:
+    sender_lower = sender.lower()
+    return any(p in sender_lower for p in _LEGACY_NOREPLY)
+
+
+def lexicon_terms(path: str):
+    """Termos do léxico sem o marcador de prefixo, para a varredura antiga"""
+    with open(path, encoding="utf-8") as handle:
+        labels = json.load(handle)["labels"]
+    return [term.rstrip("*") for terms in labels.values() for term in terms]
+
+
+def decision(p: float, i: float) -> str:
+    return "Produtivo" if p > i else "Improdutivo" if i > p else "empate"
+
+
+def synthetic_terms(count: int, seed: int):
+    """Pseudo-palavras para léxicos grandes (a maioria nunca aparece no texto, como num léxico real)"""
+    rng = random.Random(seed)
+    return [
+        "".join(rng.choice("abcdefghijlmnoprstuvçãéí") for _ in range(rng.randint(4, 10)))
+        for _ in range(count)
+    ]
+
+
+def per_item_us(fn, items, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - started)
+    return best / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scale", default="100,1000,10000", help="tamanhos de léxico da seção de escala")
+    parser.add_argument("--output", default="", help="arquivo JSON dos resultados")
+    args = parser.parse_args()
+
+    emails = list(synthetic_emails(args.emails // 2, seed=args.seed))
+    emails += list(synthetic_templated(args.emails - len(emails), seed=args.seed))
+    texts = [f"{e['subject']}. {e['body']}" for e in emails]
+    senders = [e["sender"] for e in emails] + ["no-reply@banco.com.br", "Notificacoes.Automaticas@loja.com"]
+
+    fallback = Lexicon(os.path.join(settings.LEXICON_DIR, "fallback.json"))
+    noreply = Lexicon(os.path.join(settings.LEXICON_DIR, "noreply.json"))
+
+    def automaton_scores(text):
+        scores = fallback.scores(text)
+        return scores.get("Produtivo", (0.0,))[0], scores.get("Improdutivo", (0.0,))[0]
+
+    results = {
+        "fallback_legacy_us": round(per_item_us(legacy_scores, texts, args.repeat), 3),
+        "fallback_automaton_us": round(per_item_us(automaton_scores, texts, args.repeat), 3),
+        "noreply_legacy_us": round(per_item_us(legacy_noreply, senders, args.repeat), 3),
+        "noreply_automaton_us": round(per_item_us(noreply.matches_any, senders, args.repeat), 3),
+    }
+    divergent = [
+        t for t in texts if decision(*legacy_scores(t)) != decision(*automaton_scores(t))
+    ]
+    results["fallback_divergent"] = len(divergent)
+    results["noreply_divergent"] = sum(legacy_noreply(s) != noreply.matches_any(s) for s in senders)
+
+    print(f"{len(texts)} emails")
+    print(f"fallback  antigo {results['fallback_legacy_us']:8.1f} µs/email  autômato {results['fallback_automaton_us']:8.1f} µs/email")
+    print(f"noreply   antigo {results['noreply_legacy_us']:8.2f} µs/email  autômato {results['noreply_automaton_us']:8.2f} µs/email")
+    print(f"decisões divergentes: fallback {results['fallback_divergent']}, noreply {results['noreply_divergent']}")
+    for text in divergent[:3]:
+        legacy, new = legacy_scores(text), automaton_scores(text)
+        print(f"  antigo {legacy} autômato {new}: {text[:90]!r}")
+    print(f"\n{'termos':>8} {'antigo µs':>10} {'autômato µs':>12}")
+    base_terms = lexicon_terms(fallback.path)
+    for size in (int(n) for n in args.scale.split(",") if n):
+        terms = base_terms + synthetic_terms(max(0, size - len(base_terms)), args.seed)
+        automaton = KeywordAutomaton({term: ("x", 1.0) for term in terms})
+        legacy_us = per_item_us(lambda t: legacy_scan(terms, t), texts, 1)
+        automaton_us = per_item_us(automaton.search, texts, 1)
+        results[f"scale_{len(terms)}"] = {"legacy_us": round(legacy_us, 3), "automaton_us": round(automaton_us, 3)}
+        print(f"{len(terms):8d} {legacy_us:10.1f} {automaton_us:12.1f}")
+
+    print(f"resultados em {save_results('keywords', args, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
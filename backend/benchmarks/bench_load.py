@@ -0,0 +1,161 @@
+"""
+Teste de carga de ponta a ponta do /classify e do /classify/upload
+
+Envia emails sintéticos (JSON, arquivos .txt e PDFs gerados) com
+concorrência fixa e mede vazão, p50/p95/p99 e erros por endpoint. Sem
+--url o app sobe num uvicorn em thread própria com o Gemini falso
+(latência e erros sorteados com semente fixa, então duas execuções com os
+mesmos argumentos enviam a mesma carga); com --url a carga vai para um
+servidor já rodando (ex.: python -m benchmarks.serve_fake).
+
+Os resultados vão para um JSON (ver benchmarks.results) para comparar
+versões.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_load --requests 500 --concurrency 50 --latency lognormal:0.2:0.5 --errors 503=0.02
+    python -m benchmarks.bench_load --endpoints classify --url http://127.0.0.1:8000
+    python -m benchmarks.results benchmarks/results/load-A.json benchmarks/results/load-B.json
+"""
+
+import argparse
+import asyncio
+import logging
+import socket
+import threading
+import time
+from collections import Counter
+from itertools import cycle
+
+import httpx
+import uvicorn
+
+from benchmarks.corpus import synthetic_emails, synthetic_pdf
+from benchmarks.fake_gemini import FaultInjector, LatencyModel, install_fake_gemini, parse_errors
+from benchmarks.results import latency_summary, save_results
+
+ENDPOINTS = ("classify", "upload-txt", "upload-pdf")
+
+
+def start_server() -> str:
+    """Sobe o app num uvicorn em thread própria (loop do servidor separado do loop da carga)"""
+    from main import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def build_requests(endpoint: str, args) -> list:
+    """Argumentos de client.post para cada requisição (a mesma lista a cada execução)"""
+    emails = list(synthetic_emails(min(args.requests, args.distinct), seed=args.seed))
+    pdfs = {}
+    requests = []
+    for index, email in zip(range(args.requests), cycle(emails)):
+        form = {"sender": email["sender"], "subject": email["subject"], "cache": args.cache, "reply": args.reply}
+        if endpoint == "classify":
+            requests.append({"url": "/classify", "json": {**form, "body": email["body"]}})
+        elif endpoint == "upload-txt":
+            files = {"file": (f"email-{index}.txt", email["body"].encode("utf-8"), "text/plain")}
+            requests.append({"url": "/classify/upload", "data": form, "files": files})
+        else:
+            # Poucos PDFs distintos: gerar um por requisição pesaria mais que a carga
+            seed = index % 8
+            if seed not in pdfs:
+                pdfs[seed] = synthetic_pdf(args.pdf_pages, seed=seed)
+            files = {"file": (f"email-{index}.pdf", pdfs[seed], "application/pdf")}
+            requests.append({"url": "/classify/upload", "data": form, "files": files})
+    return requests
+
+
+async def run_load(base_url: str, requests: list, concurrency: int, timeout: float) -> dict:
+    latencies, statuses = [], Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        async def one(request):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(**request)
+                    statuses[str(response.status_code)] += 1
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                    return
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(request) for request in requests))
+        elapsed = time.perf_counter() - started
+
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "requests": len(requests),
+        "errors": len(requests) - ok,
+        "statuses": dict(statuses),
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_sec": round(len(requests) / elapsed, 2),
+        **latency_summary(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"lista entre: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--requests", type=int, default=500, help="requisições por endpoint")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--distinct", type=int, default=10 ** 6, help="emails distintos (repetições acertam o cache)")
+    parser.add_argument("--cache", default="bypass", choices=("use", "bypass", "refresh"))
+    parser.add_argument("--reply", default="generate", choices=("generate", "none", "deferred"))
+    parser.add_argument("--pdf-pages", type=int, default=5)
+    parser.add_argument("--latency", default="0.2", help="latência do Gemini falso: 0.2, uniform:a:b, lognormal:mediana:sigma, exp:média")
+    parser.add_argument("--errors", default="", help="erros do Gemini falso, ex.: 503=0.02,429=0.01,timeout=0.005")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--url", default="", help="servidor já rodando (o Gemini falso local não se aplica)")
+    parser.add_argument("--output", default="", help="arquivo JSON dos resultados")
+    args = parser.parse_args()
+
+    endpoints = [e for e in args.endpoints.split(",") if e]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"endpoints desconhecidos: {', '.join(sorted(unknown))}")
+
+    faults = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        from services.classifier_service import classifier_service
+        from services.gemini_service import gemini_service
+
+        faults = FaultInjector(seed=args.seed, error_rates=parse_errors(args.errors))
+        install_fake_gemini(gemini_service, LatencyModel.parse(args.latency, seed=args.seed), faults)
+        # Com o modelo local treinado, boa parte da carga nem chegaria ao Gemini
+        classifier_service.local_model = None
+        logging.getLogger("email_classifier").setLevel(logging.WARNING)
+        base_url = start_server()
+
+    results = {}
+    for endpoint in endpoints:
+        requests = build_requests(endpoint, args)
+        r = asyncio.run(run_load(base_url, requests, args.concurrency, args.timeout))
+        results[endpoint] = r
+        print(
+            f"{endpoint:11s} {r['requests_per_sec']:8.1f} req/s  p50 {r.get('p50_ms', 0):8.1f} ms  "
+            f"p95 {r.get('p95_ms', 0):8.1f} ms  p99 {r.get('p99_ms', 0):8.1f} ms  erros {r['errors']}"
+        )
+    if faults is not None:
+        results["fake_gemini"] = {"calls": faults.calls, "failures": faults.failures, **faults.failures_by_error}
+        print(f"Gemini falso: {faults.calls} chamadas, {faults.failures} falhas injetadas")
+
+    print(f"resultados em {save_results('load', args, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
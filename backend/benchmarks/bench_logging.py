@@ -0,0 +1,119 @@
+"""
+Benchmark de custo dos logs: prints por requisição (antigo) vs logging estruturado
+
+Roda classify_and_respond com o Gemini falso (latência zero, cache
+desligado) em várias threads e compara:
+
+    print (antigo)   ~20 linhas com emojis e prévia do corpo por email
+    json INFO        1 linha estruturada por email
+    json INFO 10%    idem, com LOG_SAMPLE_RATE=0.1
+    json WARNING     logs de requisição desligados (só métricas)
+
+A saída vai para --sink (padrão /dev/null; use um arquivo ou pipe para
+incluir o custo de I/O real), com buffer de linha como num terminal ou
+com PYTHONUNBUFFERED=1 (o StreamHandler já faz flush a cada registro).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_logging --emails 2000 --threads 8
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import settings
+from services.classifier_service import classifier_service
+from services.gemini_service import gemini_service
+from services.logging_setup import configure_logging
+from benchmarks.corpus import synthetic_emails
+from benchmarks.fake_gemini import install_fake_gemini
+
+
+def legacy_prints(sender: str, subject: str, body: str, result: dict):
+    """As mesmas linhas que o caminho antigo imprimia para um email classificado pelo Gemini"""
+    print(f"\n{'='*60}")
+    print(f"📧 PROCESSANDO EMAIL")
+    print(f"De: {sender}")
+    print(f"Assunto: {subject}")
+    print(f"Corpo: {body[:100]}...")
+    print(f"{'='*60}")
+    print("🔄 PROCESSANDO TEXTO...")
+    print(f"🔑 Keywords: {result['keywords']}")
+    print("🤖 === TENTANDO CLASSIFICAR COM GEMINI ===")
+    print(f"Chamando Gemini para classificação...")
+    print(f"Resposta do Gemini: '{result['category'].lower()}'")
+    print(f"✅ GEMINI SUCESSO: {result['category']} (conf: {result['confidence']})")
+    print(f"👤 Sender name: {sender.split('@')[0].title()}")
+    print("💬 === TENTANDO GERAR RESPOSTA COM GEMINI ===")
+    print(f"Gerando resposta com Gemini...")
+    print(f"Gemini retornou: '{result['suggested_reply']}'")
+    print(f"✅ GEMINI RESPOSTA SUCESSO: {len(result['suggested_reply'])} chars")
+    print(f"🎯 PROCESSAMENTO CONCLUÍDO em 0.00s")
+    print(f"📊 Resultado: {result['category']} | Confiança: {result['confidence']}")
+    print(f"{'='*60}\n")
+
+
+def run(emails, threads: int, legacy: bool) -> float:
+    def one(email):
+        result = classifier_service.classify_and_respond(
+            email["sender"], email["subject"], email["body"], cache_mode="bypass"
+        )
+        if legacy:
+            legacy_prints(email["sender"], email["subject"], email["body"], result)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, emails))
+    return time.perf_counter() - started
+
+
+def configure(level: str, sample_rate: float, sink):
+    settings.LOG_LEVEL = level
+    settings.LOG_FORMAT = "json"
+    settings.LOG_SAMPLE_RATE = sample_rate
+    root = configure_logging()
+    root.handlers[0].setStream(sink)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--sink", default=os.devnull, help="destino dos logs/prints")
+    parser.add_argument("--repeat", type=int, default=3, help="execuções por cenário (vale a melhor)")
+    args = parser.parse_args()
+
+    install_fake_gemini(gemini_service, 0.0)
+    emails = list(synthetic_emails(args.emails, seed=7))
+    scenarios = [
+        ("print (antigo)", "WARNING", 1.0, True),
+        ("json INFO", "INFO", 1.0, False),
+        ("json INFO 10%", "INFO", 0.1, False),
+        ("json WARNING", "WARNING", 1.0, False),
+    ]
+
+    with open(args.sink, "w", encoding="utf-8", buffering=1) as sink:
+        configure("WARNING", 1.0, sink)
+        run(emails[:100], args.threads, legacy=False)  # aquecimento
+
+        results = []
+        for name, level, rate, legacy in scenarios:
+            configure(level, rate, sink)
+            with contextlib.redirect_stdout(sink):
+                elapsed = min(run(emails, args.threads, legacy) for _ in range(args.repeat))
+            results.append((name, elapsed))
+    logging.getLogger("email_classifier").handlers.clear()
+
+    baseline = results[-1][1]
+    print(f"\n{args.emails} emails, {args.threads} threads, saída em {args.sink}")
+    print(f"{'cenário':>16} {'emails/s':>10} {'µs/email':>10} {'vs sem logs':>12}")
+    for name, elapsed in results:
+        per_email = elapsed / args.emails * 1e6
+        print(f"{name:>16} {args.emails / elapsed:10.0f} {per_email:10.1f} {elapsed / baseline:11.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Benchmark da ingestão de caixas: mensagens/s e memória em mbox, Maildir e IMAP
+
+Gera um mbox sintético (texto, HTML e uma fração com PDF anexo) direto em
+disco e mede:
+  - leitura e parsing MIME do mbox em streaming, contra o mailbox.mbox da
+    biblioteca padrão, com o crescimento de RSS durante a leitura (deve
+    ficar constante ao aumentar --messages);
+  - a rodada incremental: mensagens novas acrescentadas depois da marca
+    d'água são as únicas lidas;
+  - o pipeline completo (MailboxService.ingest) com o Gemini falso;
+  - Maildir e IMAP (servidor local de benchmarks/fake_imap.py).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_mailbox --messages 20000 --pdf-share 0.05
+    python -m benchmarks.bench_mailbox --messages 200000 --skip maildir,imap,pipeline
+"""
+
+import argparse
+import logging
+import mailbox
+import os
+import random
+import tempfile
+import time
+from email.message import EmailMessage
+
+from services.gemini_service import gemini_service
+from services.mailbox_service import IMAPSource, MaildirSource, MailboxService, MboxSource, message_record
+from benchmarks.corpus import synthetic_email, synthetic_pdf
+from benchmarks.fake_gemini import install_fake_gemini
+from benchmarks.fake_imap import FakeIMAPServer
+from benchmarks.results import save_results
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as handle:
+        return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def build_message(rng: random.Random, index: int, html_share: float, pdf_share: float, pdf: bytes) -> bytes:
+    email = synthetic_email(rng)
+    message = EmailMessage()
+    message["From"] = email["sender"]
+    message["To"] = "suporte@exemplo.com"
+    message["Subject"] = email["subject"]
+    message["Message-ID"] = f"<bench-{index}@exemplo.com>"
+    message.set_content(email["body"])
+    if rng.random() < html_share:
+        paragraphs = "".join(f"<p>{line}</p>" for line in email["body"].split("\n") if line)
+        message.add_alternative(f"<html><body>{paragraphs}</body></html>", subtype="html")
+    if rng.random() < pdf_share:
+        message.add_attachment(pdf, maintype="application", subtype="pdf", filename=f"anexo-{index}.pdf")
+    return message.as_bytes()
+
+
+def iter_messages(start: int, count: int, args):
+    rng = random.Random(args.seed + start)
+    pdf = synthetic_pdf(args.pdf_pages, seed=args.seed)
+    for index in range(start, start + count):
+        yield build_message(rng, index, args.html_share, args.pdf_share, pdf)
+
+
+def write_mbox(path: str, start: int, count: int, args):
+    with open(path, "ab") as handle:
+        for raw in iter_messages(start, count, args):
+            handle.write(b"From bench@exemplo.com Thu Jan  1 00:00:00 2026\n")
+            for line in raw.splitlines(keepends=True):
+                handle.write(b">" + line if line.lstrip(b">").startswith(b"From ") else line)
+            handle.write(b"\n")
+
+
+def write_maildir(path: str, count: int, args):
+    for folder in ("tmp", "new", "cur"):
+        os.makedirs(os.path.join(path, folder), exist_ok=True)
+    for index, raw in enumerate(iter_messages(0, count, args)):
+        with open(os.path.join(path, "new", f"{index:08d}.bench"), "wb") as handle:
+            handle.write(raw)
+
+
+def measure(records) -> dict:
+    """Consome o gerador medindo vazão e o maior crescimento de RSS"""
+    base = peak = rss_mb()
+    count = 0
+    started = time.perf_counter()
+    for _ in records:
+        count += 1
+        if count % 500 == 0:
+            peak = max(peak, rss_mb())
+    elapsed = time.perf_counter() - started
+    return {
+        "messages": count,
+        "messages_per_sec": round(count / elapsed, 1) if elapsed else 0.0,
+        "rss_growth_mb": round(max(peak, rss_mb()) - base, 1),
+    }
+
+
+def stdlib_records(path: str):
+    box = mailbox.mbox(path, create=False)
+    try:
+        for message in box:
+            yield message_record(message)
+    finally:
+        box.close()
+
+
+def source_records(source, position=None):
+    for _, message in source.iter_messages(position):
+        yield message_record(message)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--new-messages", type=int, default=200, help="acrescentadas antes da rodada incremental")
+    parser.add_argument("--html-share", type=float, default=0.5)
+    parser.add_argument("--pdf-share", type=float, default=0.05)
+    parser.add_argument("--pdf-pages", type=int, default=2)
+    parser.add_argument("--pipeline-messages", type=int, default=2000, help="mensagens no pipeline com classificação")
+    parser.add_argument("--other-messages", type=int, default=5000, help="mensagens no Maildir e no IMAP")
+    parser.add_argument("--latency", type=float, default=0.0, help="latência do Gemini falso (s)")
+    parser.add_argument("--skip", default="", help="fases a pular: stdlib,maildir,imap,pipeline")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="arquivo JSON de resultados (padrão: benchmarks/results/)")
+    args = parser.parse_args()
+
+    logging.getLogger("email_classifier").setLevel(logging.WARNING)
+    skip = set(filter(None, args.skip.split(",")))
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.mbox")
+        write_mbox(path, 0, args.messages, args)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"mbox: {args.messages} mensagens, {size_mb:.1f} MB")
+
+        results["mbox_stream"] = measure(source_records(MboxSource(path)))
+        if "stdlib" not in skip:
+            results["mbox_stdlib"] = measure(stdlib_records(path))
+
+        # Rodada incremental: só as mensagens acrescentadas depois do fim anterior
+        watermark = str(os.path.getsize(path))
+        write_mbox(path, args.messages, args.new_messages, args)
+        results["mbox_incremental"] = measure(source_records(MboxSource(path), watermark))
+
+        if "pipeline" not in skip:
+            install_fake_gemini(gemini_service, args.latency)
+            pipeline_path = os.path.join(tmp, "pipeline.mbox")
+            write_mbox(pipeline_path, 0, args.pipeline_messages, args)
+            service = MailboxService(os.path.join(tmp, "mailboxes.db"), batch_size=20)
+            results["pipeline"] = measure(service.ingest(MboxSource(pipeline_path)))
+
+        if "maildir" not in skip:
+            maildir = os.path.join(tmp, "Maildir")
+            write_maildir(maildir, args.other_messages, args)
+            results["maildir"] = measure(source_records(MaildirSource(maildir)))
+
+        if "imap" not in skip:
+            server = FakeIMAPServer(iter_messages(0, args.other_messages, args))
+            with server.running():
+                source = IMAPSource("127.0.0.1", "bench", "bench", port=server.port, ssl=False)
+                results["imap"] = measure(source_records(source))
+
+    results["mbox_size_mb"] = round(size_mb, 1)
+    for name, r in results.items():
+        if isinstance(r, dict):
+            print(
+                f"{name:17s} {r['messages']:7d} mensagens  {r['messages_per_sec']:9.1f} msg/s  "
+                f"RSS +{r['rss_growth_mb']:.1f} MB"
+            )
+    print(f"resultados em {save_results('mailbox', args, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Microbenchmarks das etapas locais do processamento de um email
+
+Mede, sem Gemini nem HTTP: pré-processamento (tokenize), extração de
+palavras-chave, classificação de fallback, orçamento do prompt, assinatura
+do índice de quase duplicados e extração de texto de PDFs. Cada etapa
+roda --repeat vezes sobre o mesmo corpus (semente fixa) e vale a mediana.
+
+Os resultados vão para um JSON (ver benchmarks.results) para comparar
+versões.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_micro --emails 2000 --repeat 5
+"""
+
+import argparse
+import io
+import statistics
+import time
+
+from config import settings
+from services.classifier_service import ClassifierService
+from services.file_service import FileService
+from services.near_duplicate import NearDuplicateIndex
+from services.nlp_service import NLPService
+from services.prompt_budget import PromptBudget
+from benchmarks.corpus import synthetic_emails, synthetic_pdf, synthetic_threads
+from benchmarks.results import save_results
+
+
+def measure(fn, items, repeat: int) -> dict:
+    """Mediana de --repeat passadas de fn sobre todos os itens"""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            fn(item)
+        runs.append(time.perf_counter() - started)
+    elapsed = statistics.median(runs)
+    return {
+        "ops": len(items),
+        "per_op_us": round(elapsed / len(items) * 1e6, 3),
+        "ops_per_sec": round(len(items) / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=100, help="threads longas para o orçamento do prompt")
+    parser.add_argument("--pdf-pages", default="1,50", help="tamanhos dos PDFs (páginas)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="", help="arquivo JSON dos resultados")
+    args = parser.parse_args()
+
+    emails = list(synthetic_emails(args.emails, seed=args.seed))
+    texts = [f"{e['subject']}. {e['body']}" for e in emails]
+    threads = [t["body"] for t in synthetic_threads(args.threads, seed=args.seed)]
+
+    nlp = NLPService()
+    tokens = [nlp.tokenize(text) for text in texts]
+    processed = [" ".join(t) for t in tokens]
+    classifier = ClassifierService()
+    budget = PromptBudget()
+    index = NearDuplicateIndex(
+        settings.NEAR_DUP_MAX_ENTRIES, settings.NEAR_DUP_THRESHOLD, settings.NEAR_DUP_NUM_PERM,
+        settings.NEAR_DUP_BANDS, settings.NEAR_DUP_SHINGLE_SIZE, settings.NEAR_DUP_MIN_TOKENS
+    )
+    files = FileService()
+
+    results = {
+        "preprocess": measure(nlp.tokenize, texts, args.repeat),
+        "keywords": measure(lambda t: nlp.top_keywords(t, settings.TOP_KEYWORDS), tokens, args.repeat),
+        "fallback_classify": measure(classifier._fallback_scores, texts, args.repeat),
+        # Sem o cache de limpeza, para medir o trabalho de verdade
+        "prompt_budget": measure(lambda body: budget._select(budget._clean(body), settings.CLASSIFY_TOKEN_BUDGET), threads, args.repeat),
+        "near_dup_signature": measure(index.signature, processed, args.repeat),
+    }
+    for pages in (int(p) for p in args.pdf_pages.split(",")):
+        content = synthetic_pdf(pages, seed=args.seed)
+        results[f"pdf_extract_{pages}p"] = measure(
+            lambda c: files.extract_text_from_stream(io.BytesIO(c), "bench.pdf"), [content], args.repeat
+        )
+
+    print(f"{'etapa':22s} {'µs/op':>12} {'ops/s':>12}")
+    for name, r in results.items():
+        print(f"{name:22s} {r['per_op_us']:12.1f} {r['ops_per_sec']:12.1f}")
+    print(f"resultados em {save_results('micro', args, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
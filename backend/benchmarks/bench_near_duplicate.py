@@ -0,0 +1,87 @@
+"""
+Reaproveitamento entre emails quase iguais (templates de fatura, troca de
+senha, convite de reunião): chamadas ao Gemini, taxa de acerto do índice,
+latência e concordância com o rótulo, com NEAR_DUP_ENABLED ligado e
+desligado. Também mede o custo da consulta ao índice por email.
+
+Usa o Gemini falso; o modelo local fica desligado e o cache exato
+continua ligado (os templates nunca se repetem byte a byte).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_near_duplicate --emails 500 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from config import settings
+from services.classifier_service import classifier_service
+from services.gemini_service import gemini_service
+from services.near_duplicate import NearDuplicateIndex
+from benchmarks.corpus import synthetic_templated
+from benchmarks.fake_gemini import FaultInjector, install_fake_gemini
+
+
+async def run_mode(emails, enabled: bool, reply_mode: str) -> dict:
+    settings.NEAR_DUP_ENABLED = enabled
+    classifier_service.cache.clear()
+    classifier_service.near_duplicates = NearDuplicateIndex(
+        settings.NEAR_DUP_MAX_ENTRIES, settings.NEAR_DUP_THRESHOLD,
+        settings.NEAR_DUP_NUM_PERM, settings.NEAR_DUP_BANDS,
+        settings.NEAR_DUP_SHINGLE_SIZE, settings.NEAR_DUP_MIN_TOKENS
+    )
+    latencies, correct, calls = [], 0, 0
+    for email in emails:
+        started = time.perf_counter()
+        result = await classifier_service.classify_and_respond_async(
+            email["sender"], email["subject"], email["body"], reply_mode=reply_mode
+        )
+        latencies.append(time.perf_counter() - started)
+        correct += result["category"] == email["category"]
+        calls += result["usage"]["llm_calls"]
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "accuracy": correct / len(emails),
+        "llm_calls": calls,
+        "index": classifier_service.near_duplicates.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.2, help="latência do Gemini falso (s)")
+    parser.add_argument("--template-share", type=float, default=0.7, help="fração de emails de template")
+    parser.add_argument("--reply", default="none", choices=("none", "generate"))
+    args = parser.parse_args()
+
+    logging.getLogger("email_classifier").setLevel(logging.WARNING)
+    install_fake_gemini(gemini_service, args.latency, FaultInjector())
+    classifier_service.local_model = None
+    settings.NEAR_DUP_REUSE_REPLY = args.reply == "generate"
+    emails = list(synthetic_templated(args.emails, template_share=args.template_share))
+
+    for name, enabled in (("sem índice", False), ("com índice", True)):
+        r = asyncio.run(run_mode(emails, enabled, args.reply))
+        index = r["index"]
+        print(
+            f"{name:11s} chamadas ao Gemini {r['llm_calls']:5d}  p50 {r['p50_ms']:8.1f} ms  "
+            f"média {r['mean_ms']:8.1f} ms  acerto vs rótulo {r['accuracy']:.1%}  "
+            f"índice: hit rate {index['hit_rate']:.1%}, respostas reaproveitadas {index['reply_hits']}, "
+            f"entradas {index['entries']}"
+        )
+
+    texts = [classifier_service.nlp.preprocess_text(f"{e['subject']}. {e['body']}") for e in emails]
+    index = classifier_service.near_duplicates
+    started = time.perf_counter()
+    for text in texts:
+        index.lookup(text)
+    print(f"consulta ao índice: {(time.perf_counter() - started) / len(texts) * 1e6:.1f} µs/email")
+
+
+if __name__ == "__main__":
+    main()
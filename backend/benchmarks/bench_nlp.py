@@ -0,0 +1,75 @@
+"""
+Microbenchmark do pré-processamento do NLPService
+
+Compara o pipeline antigo (cinco re.sub + stem sem memoização, chamado duas
+vezes por email como no classify_and_respond original) com a tokenização
+em uma passada e o analyze() atual.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_nlp --emails 3000
+"""
+
+import argparse
+import re
+import time
+from collections import Counter
+
+from services.nlp_service import NLPService
+from benchmarks.corpus import synthetic_emails
+
+
+def legacy_preprocess(nlp: NLPService, text: str) -> str:
+    text = text.lower()
+    text = re.sub(r'\S+@\S+', '', text)
+    text = re.sub(r'http\S+|www\S+', '', text)
+    text = re.sub(r'\d+', '', text)
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    tokens = [word for word in text.split() if word not in nlp.stop_words]
+    return ' '.join(nlp.stemmer.stem(word) for word in tokens)
+
+
+def legacy_analyze(nlp: NLPService, text: str, top_n: int = 5):
+    processed = legacy_preprocess(nlp, text)
+    keywords = [w for w, _ in Counter(legacy_preprocess(nlp, text).split()).most_common(top_n)]
+    return processed, keywords
+
+
+def measure(name: str, fn, texts, n_tokens: int):
+    started = time.perf_counter()
+    for text in texts:
+        fn(text)
+    elapsed = time.perf_counter() - started
+    print(f"{name:28s} {elapsed * 1000:9.1f} ms  {n_tokens / elapsed:12,.0f} tokens/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=3000)
+    args = parser.parse_args()
+
+    texts = [f"{e['subject']}. {e['body']}" for e in synthetic_emails(args.emails)]
+    nlp = NLPService()
+    n_tokens = sum(len(text.split()) for text in texts)
+    print(f"{len(texts)} emails, {n_tokens:,} tokens de entrada\n")
+
+    divergent = sum(legacy_preprocess(nlp, t) != nlp.preprocess_text(t) for t in texts)
+    print(f"saídas divergentes do pipeline antigo: {divergent}\n")
+
+    measure("antigo preprocess_text", lambda t: legacy_preprocess(nlp, t), texts, n_tokens)
+    measure("antigo preprocess+keywords", lambda t: legacy_analyze(nlp, t), texts, n_tokens)
+
+    nlp = NLPService()  # cache de stems vazio
+    measure("novo preprocess_text (frio)", nlp.preprocess_text, texts, n_tokens)
+    measure("novo preprocess_text", nlp.preprocess_text, texts, n_tokens)
+    measure("novo analyze", nlp.analyze, texts, n_tokens)
+
+    started = time.perf_counter()
+    nlp.preprocess_many(texts)
+    elapsed = time.perf_counter() - started
+    print(f"{'novo preprocess_many':28s} {elapsed * 1000:9.1f} ms  {n_tokens / elapsed:12,.0f} tokens/s")
+    print(f"\ncache de stems: {nlp.stem_cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
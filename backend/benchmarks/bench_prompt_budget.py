@@ -0,0 +1,80 @@
+"""
+Benchmark do orçamento de prompt em threads longas: tokens do corpo antes
+e depois, custo da etapa e latência/concordância da classificação
+
+A etapa de orçamento é medida isolada (limpeza + seleção de frases) e
+dentro do /classify (modo reply=none) contra o Gemini falso com custo por
+token. "sem orçamento" desliga a limpeza e usa orçamento 0.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_prompt_budget --emails 50 --replies 12
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from config import settings
+from services.classifier_service import classifier_service
+from services.gemini_service import gemini_service
+from services.prompt_budget import prompt_budget
+from benchmarks.corpus import synthetic_threads
+from benchmarks.fake_gemini import install_fake_gemini
+
+
+async def classify_all(emails) -> dict:
+    latencies, categories, tokens = [], [], []
+    for email in emails:
+        started = time.perf_counter()
+        result = await classifier_service.classify_and_respond_async(
+            email["sender"], email["subject"], email["body"], cache_mode="bypass", reply_mode="none"
+        )
+        latencies.append(time.perf_counter() - started)
+        categories.append(result["category"])
+        tokens.append(result["usage"]["prompt_tokens"])
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "prompt_tokens": statistics.mean(tokens),
+        "categories": categories,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=50)
+    parser.add_argument("--replies", type=int, default=12, help="mensagens citadas por thread")
+    parser.add_argument("--latency", type=float, default=0.1, help="latência base do Gemini falso (s)")
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0002, help="custo por token de entrada (s)")
+    args = parser.parse_args()
+
+    logging.getLogger("email_classifier").setLevel(logging.WARNING)
+    install_fake_gemini(gemini_service, args.latency, prompt_token_latency=args.prompt_token_latency)
+    classifier_service.local_model = None
+    emails = list(synthetic_threads(args.emails, replies=args.replies))
+
+    before = [gemini_service.estimate_tokens(e["body"]) for e in emails]
+    started = time.perf_counter()
+    after = [gemini_service.estimate_tokens(prompt_budget.fit(e["body"], "classify")) for e in emails]
+    stage_ms = (time.perf_counter() - started) * 1000 / len(emails)
+    print(
+        f"corpo: {statistics.mean(before):8.1f} → {statistics.mean(after):6.1f} tokens em média "
+        f"(máx {max(before)} → {max(after)}), etapa {stage_ms:.2f} ms/email"
+    )
+
+    budget, cleanup = settings.CLASSIFY_TOKEN_BUDGET, settings.PROMPT_CLEANUP
+    settings.CLASSIFY_TOKEN_BUDGET, settings.PROMPT_CLEANUP = 0, False
+    full = asyncio.run(classify_all(emails))
+    settings.CLASSIFY_TOKEN_BUDGET, settings.PROMPT_CLEANUP = budget, cleanup
+    budgeted = asyncio.run(classify_all(emails))
+
+    for name, r in (("sem orçamento", full), ("com orçamento", budgeted)):
+        print(f"{name:14s} p50 {r['p50_ms']:8.1f} ms  tokens de prompt {r['prompt_tokens']:8.1f}")
+    agreement = sum(a == b for a, b in zip(full["categories"], budgeted["categories"])) / len(emails)
+    expected = sum(c == e["category"] for c, e in zip(budgeted["categories"], emails)) / len(emails)
+    print(f"concordância com o prompt completo: {agreement:.1%}  acerto vs rótulo: {expected:.1%}")
+
+
+if __name__ == "__main__":
+    main()
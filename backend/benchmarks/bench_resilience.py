@@ -0,0 +1,81 @@
+"""
+Benchmark de resiliência: latência do /classify durante uma queda do Gemini
+
+Roda três fases contra o Gemini falso com falhas injetadas: saudável,
+queda (toda chamada falha depois da latência) e recuperação. Compara o
+circuito desligado (cada requisição espera a chamada falhar antes do
+fallback) com o circuito ligado (depois de GEMINI_BREAKER_FAILURES falhas
+as requisições vão direto ao fallback e a sonda detecta a volta).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_resilience --requests 100 --concurrency 10 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from config import settings
+from services.classifier_service import classifier_service
+from services.gemini_service import gemini_service
+from services.resilience import CircuitBreaker, RetryBudget
+from benchmarks.corpus import synthetic_emails
+from benchmarks.fake_gemini import FaultInjector, install_fake_gemini
+
+
+async def run_phase(emails, concurrency: int) -> dict:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(email):
+        async with semaphore:
+            started = time.perf_counter()
+            await classifier_service.classify_and_respond_async(
+                email["sender"], email["subject"], email["body"], cache_mode="bypass"
+            )
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(email) for email in emails))
+    return {"p50_ms": statistics.median(latencies) * 1000, "max_ms": max(latencies) * 1000}
+
+
+async def run_scenario(name: str, breaker_failures: int, args) -> None:
+    faults = FaultInjector()
+    install_fake_gemini(gemini_service, args.latency, faults)
+    gemini_service._retry_budget = RetryBudget(settings.GEMINI_RETRY_BUDGET_TOKENS, settings.GEMINI_RETRY_BUDGET_RATIO)
+    gemini_service._breaker = CircuitBreaker(breaker_failures, args.reset, probe=gemini_service._probe)
+    emails = list(synthetic_emails(args.requests))
+
+    print(name)
+    for phase, down in (("saudável", False), ("queda", True), ("recuperação", False)):
+        faults.down = down
+        calls_before = faults.calls
+        if phase == "recuperação":
+            # Dá tempo para a sonda rodar antes da fase
+            await asyncio.sleep(args.reset)
+            gemini_service.available()
+            await asyncio.sleep(args.latency * 2)
+        r = await run_phase(emails, args.concurrency)
+        print(
+            f"  {phase:12s} p50 {r['p50_ms']:8.1f} ms  max {r['max_ms']:8.1f} ms  "
+            f"chamadas ao Gemini {faults.calls - calls_before:5d}  circuito {gemini_service._breaker.state}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2, help="latência do Gemini falso (s)")
+    parser.add_argument("--reset", type=float, default=1.0, help="tempo até a sonda do circuito (s)")
+    args = parser.parse_args()
+
+    logging.getLogger("email_classifier").setLevel(logging.ERROR)
+    asyncio.run(run_scenario("sem circuito", 10 ** 9, args))
+    asyncio.run(run_scenario("com circuito", settings.GEMINI_BREAKER_FAILURES, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Tamanho e CPU das respostas de /classify e /classify/batch por formato
+
+Monta respostas realistas (palavras-chave e texto processado do
+NLPService, resposta sugerida de fallback) e serializa cada uma como o
+endpoint faz: schema -> dict -> ?fields= -> JSON ou MessagePack ->
+gzip/zstd. Mede bytes por resposta e CPU do processo (time.process_time)
+por resposta, sem HTTP nem Gemini. Formatos sem o pacote instalado
+(msgpack, zstandard) são pulados.
+
+--min-bytes 0 força a compressão mesmo nas respostas pequenas, para ver
+quanto ela custaria abaixo de RESPONSE_COMPRESSION_MIN_BYTES.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_response_format --emails 2000 --batch-size 50 --repeat 5
+    python -m benchmarks.bench_response_format --fields category,confidence --min-bytes 0
+"""
+
+import argparse
+import statistics
+import time
+
+from config import settings
+from schemas import BatchClassifyResponse, BatchItemResult, MessageResponse
+from services import response_format
+from services.classifier_service import ClassifierService
+from services.nlp_service import NLPService
+from benchmarks.corpus import synthetic_emails
+from benchmarks.results import save_results
+
+# (nome, Accept, Accept-Encoding, usa ?fields=)
+VARIANTS = (
+    ("json", "application/json", "", False),
+    ("json_fields", "application/json", "", True),
+    ("json_gzip", "application/json", "gzip", False),
+    ("json_zstd", "application/json", "zstd", False),
+    ("msgpack", "application/msgpack", "", False),
+    ("msgpack_fields", "application/msgpack", "", True),
+    ("msgpack_zstd", "application/msgpack", "zstd", False),
+)
+
+
+def available(accept: str, accept_encoding: str) -> bool:
+    if accept == response_format.MSGPACK_MEDIA_TYPE and response_format.msgpack is None:
+        return False
+    return not accept_encoding or accept_encoding in response_format.encodings()
+
+
+def build_results(emails) -> list:
+    """Dicionários no formato de classify_and_respond (sem chamar o LLM)"""
+    nlp = NLPService()
+    classifier = ClassifierService()
+    results = []
+    for email in emails:
+        processed, keywords = nlp.analyze(f"{email['subject']}. {email['body']}", settings.TOP_KEYWORDS)
+        results.append({
+            "category": email["category"],
+            "confidence": 0.93,
+            "suggested_reply": classifier._fallback_text(email["category"], email["subject"]),
+            "keywords": keywords,
+            "processed_text": processed[:200],
+        })
+    return results
+
+
+def single_response(result: dict, fields):
+    return response_format.select_fields(MessageResponse(**result).dict(), fields)
+
+
+def batch_response(results: list, fields):
+    payload = BatchClassifyResponse(
+        results=[
+            {**r, "source": "gemini", "local_ms": 1.2, "llm_ms": 40.0, "latency_ms": 41.2}
+            for r in results
+        ],
+        llm_calls=1,
+        total_time_ms=250.0,
+    ).dict()
+    payload["results"] = [response_format.select_fields(item, fields) for item in payload["results"]]
+    return payload
+
+
+def measure(build, items, accept: str, accept_encoding: str, repeat: int) -> dict:
+    """Bytes médios e mediana de CPU por resposta em --repeat passadas"""
+    sizes, runs = [], []
+    for _ in range(repeat):
+        sizes.clear()
+        started = time.process_time()
+        for item in items:
+            body, _ = response_format.render(build(item), accept, accept_encoding)
+            sizes.append(len(body))
+        runs.append(time.process_time() - started)
+    return {
+        "responses": len(items),
+        "bytes_per_response": round(sum(sizes) / len(sizes), 1),
+        "cpu_us_per_response": round(statistics.median(runs) / len(items) * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=50, help="emails por resposta do /classify/batch")
+    parser.add_argument("--fields", default="category,confidence", help="?fields= das variantes *_fields")
+    parser.add_argument("--min-bytes", type=int, default=None, help="sobrepõe RESPONSE_COMPRESSION_MIN_BYTES")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="", help="arquivo JSON dos resultados")
+    args = parser.parse_args()
+
+    if args.min_bytes is not None:
+        settings.RESPONSE_COMPRESSION_MIN_BYTES = args.min_bytes
+    single_fields = response_format.parse_fields(args.fields, list(MessageResponse.__fields__))
+    batch_fields = response_format.parse_fields(args.fields, list(BatchItemResult.__fields__))
+
+    results_by_email = build_results(synthetic_emails(args.emails, seed=args.seed))
+    batches = [
+        results_by_email[i:i + args.batch_size]
+        for i in range(0, len(results_by_email), args.batch_size)
+    ]
+
+    results = {}
+    for path, items, fields, build in (
+        ("single", results_by_email, single_fields, single_response),
+        ("batch", batches, batch_fields, batch_response),
+    ):
+        results[path] = {}
+        for name, accept, accept_encoding, use_fields in VARIANTS:
+            if not available(accept, accept_encoding):
+                print(f"{path:6s} {name:15s} (pulado: pacote não instalado)")
+                continue
+            selected = fields if use_fields else None
+            r = measure(lambda item: build(item, selected), items, accept, accept_encoding, args.repeat)
+            results[path][name] = r
+            print(
+                f"{path:6s} {name:15s} {r['bytes_per_response']:10.1f} bytes  "
+                f"{r['cpu_us_per_response']:9.2f} µs de CPU por resposta"
+            )
+    print(f"resultados em {save_results('response_format', args, results, args.output or None)}")
+
+
+if __name__ == "__main__":
+    main()
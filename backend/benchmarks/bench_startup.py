@@ -0,0 +1,81 @@
+"""
+Benchmark de inicialização: tempo até o processo aceitar conexões (/health)
+e até estar pronto para atender (/ready)
+
+Sobe o uvicorn como subprocesso, como em produção, para medir o custo
+real de import + inicialização. Com EAGER_INIT=true o /health só responde
+depois do aquecimento completo.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --runs 5 --eager
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(client: httpx.Client, path: str, started: float, deadline: float) -> float:
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{path} não respondeu 200 a tempo")
+
+
+def one_run(eager: bool, timeout: float) -> dict:
+    port = free_port()
+    env = dict(os.environ, EAGER_INIT="true" if eager else "false")
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            deadline = started + timeout
+            health = wait_for(client, "/health", started, deadline)
+            ready = wait_for(client, "/ready", started, deadline)
+        return {"health": health * 1000, "ready": ready * 1000}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--eager", action="store_true", help="liga EAGER_INIT no servidor")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    runs = [one_run(args.eager, args.timeout) for _ in range(args.runs)]
+    mode = "eager" if args.eager else "lazy"
+    print(f"\nInicialização ({mode}, {args.runs} execuções)")
+    print(f"{'':>10} {'mediana':>10} {'mín':>10} {'máx':>10}")
+    for key in ("health", "ready"):
+        values = [run[key] for run in runs]
+        print(
+            f"{'/' + key:>10} {statistics.median(values):9.0f}ms "
+            f"{min(values):9.0f}ms {max(values):9.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Memória e vazão do perfil com vários processos (gunicorn.conf.py) com 1,
+2, 4 e 8 workers
+
+Sobe o gunicorn com o Gemini falso (benchmarks.serve_fake:fake_app()),
+aplica carga no /classify e lê a memória de cada processo em
+/proc/<pid>/smaps_rollup (só Linux): RSS por worker, USS (páginas
+privadas, o que cada worker custa de fato) e PSS total (mestre + workers,
+com as páginas compartilhadas divididas entre quem as usa). Com
+--compare-preload também roda com PRELOAD_SHARED_ASSETS=false, em que
+cada worker carrega a sua cópia dos recursos do NLP.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_workers --workers 1,2,4,8 --requests 2000 --compare-preload
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_load import run_load
+from benchmarks.corpus import synthetic_emails
+from benchmarks.results import save_results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_healthy(base_url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(base_url + "/health", timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError("o gunicorn não respondeu ao /health a tempo")
+
+
+def memory_kb(pid: int) -> dict:
+    """Rss, Pss e USS (Private_Clean + Private_Dirty) de um processo, em kB"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as handle:
+        for line in handle:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def children(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as handle:
+        return [int(child) for child in handle.read().split()]
+
+
+def run_profile(workers: int, preload: bool, args) -> dict:
+    port = free_port()
+    env = dict(
+        os.environ,
+        WEB_CONCURRENCY=str(workers),
+        PRELOAD_SHARED_ASSETS="true" if preload else "false",
+        FAKE_GEMINI_LATENCY=args.latency,
+        LOG_LEVEL="WARNING",
+        PORT=str(port),
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "benchmarks.serve_fake:fake_app()"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_healthy(base_url, args.timeout)
+        emails = list(synthetic_emails(args.requests, seed=args.seed))
+        requests = [
+            {"url": "/classify", "json": {
+                "sender": e["sender"], "subject": e["subject"], "body": e["body"],
+                "cache": "bypass", "reply": args.reply,
+            }}
+            for e in emails
+        ]
+        # Aquecimento: todos os workers recebem requisições antes da medição
+        asyncio.run(run_load(base_url, requests[:workers * 20], args.concurrency, args.timeout))
+        load = asyncio.run(run_load(base_url, requests, args.concurrency, args.timeout))
+
+        master = memory_kb(process.pid)
+        per_worker = [memory_kb(pid) for pid in children(process.pid)]
+        total_pss = master["pss"] + sum(m["pss"] for m in per_worker)
+        return {
+            "workers": len(per_worker),
+            "worker_rss_mb": round(sum(m["rss"] for m in per_worker) / len(per_worker) / 1024, 1),
+            "worker_uss_mb": round(sum(m["uss"] for m in per_worker) / len(per_worker) / 1024, 1),
+            "total_pss_mb": round(total_pss / 1024, 1),
+            "requests_per_sec": load["requests_per_sec"],
+            "p50_ms": load.get("p50_ms"),
+            "p99_ms": load.get("p99_ms"),
+            "errors": load["errors"],
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency", default="0.05", help="latência do Gemini falso (ver fake_gemini.LatencyModel)")
+    parser.add_argument("--reply", default="generate", choices=("generate", "none", "deferred"))
+    parser.add_argument("--compare-preload", action="store_true", help="também roda sem o preload dos recursos")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", default="", help="arquivo JSON dos resultados")
+    args = parser.parse_args()
+
+    modes = (True, False) if args.compare_preload else (True,)
+    results = {}
+    print(f"{'preload':>8} {'workers':>8} {'RSS/worker':>11} {'USS/worker':>11} {'PSS total':>10} {'req/s':>8} {'p99':>9}")
+    for preload in modes:
+        for workers in (int(n) for n in args.workers.split(",")):
+            r = run_profile(workers, preload, args)
+            results[f"{'preload' if preload else 'no_preload'}_{workers}"] = r
+            print(
+                f"{'sim' if preload else 'não':>8} {r['workers']:8d} {r['worker_rss_mb']:9.1f}MB "
+                f"{r['worker_uss_mb']:9.1f}MB {r['total_pss_mb']:8.1f}MB {r['requests_per_sec']:8.1f} "
+                f"{r['p99_ms'] or 0:7.1f}ms"
+            )
+    print(f"resultados em {save_results('workers', args, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
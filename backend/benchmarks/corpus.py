@@ -0,0 +1,189 @@
+"""Geradores de emails sintéticos em pt-BR para os benchmarks"""
+
+import random
+from typing import Dict, Iterator
+
+_SAUDACOES = ["Olá", "Bom dia", "Boa tarde", "Prezados", "Oi pessoal", "Caro {nome}"]
+_NOMES = ["Ana", "Bruno", "Carla", "Diego", "Eduarda", "Felipe", "Gabriela", "Henrique"]
+_EMPRESAS = ["acme.com.br", "financeira.com", "logistica.net", "consultoria.com.br", "gmail.com"]
+
+_PRODUTIVO = [
+    "Precisamos agendar uma reunião para discutir o prazo de entrega do projeto {n}.",
+    "Segue em anexo o relatório mensal com os indicadores do cliente {nome}.",
+    "Poderia enviar a proposta comercial revisada até {dia}/{mes}?",
+    "A aprovação do orçamento depende da assinatura do contrato nº {n}.",
+    "Gostaria de confirmar a entrevista para a vaga de analista na próxima semana.",
+    "Há uma pendência no processo de faturamento referente ao pedido {n}.",
+    "Favor verificar o documento e retornar com as alterações solicitadas.",
+    "O suporte abriu o chamado {n} e precisa de uma ação urgente da equipe.",
+]
+_IMPRODUTIVO = [
+    "Feliz aniversário! Que seu dia seja repleto de alegrias.",
+    "Desejo a todos um feliz natal e um próspero ano novo.",
+    "Muito obrigado pelo carinho de sempre, um grande abraço.",
+    "Parabéns pelo casamento, desejo muitas felicidades ao casal!",
+    "Boas férias! Aproveitem o feriado com a família.",
+    "Só passando para dar um bom dia e desejar uma ótima semana.",
+    "Este é um email automático, por favor não responda.",
+    "Confirmamos o pagamento da sua fatura de {mes}/{ano}.",
+]
+_ASSUNTOS_P = ["Reunião de alinhamento", "Prazo do projeto", "Proposta comercial", "Contrato {n}", "Relatório mensal"]
+_ASSUNTOS_I = ["Feliz aniversário!", "Boas festas", "Obrigado!", "Parabéns", "Aviso de pagamento"]
+_ASSINATURAS = ["Atenciosamente,\n{nome}", "Abraços,\n{nome}", "Cordialmente,\n{nome}\nTel: (11) 9{n}-0000"]
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    return template.format(
+        nome=rng.choice(_NOMES),
+        n=rng.randint(1000, 9999),
+        dia=rng.randint(1, 28),
+        mes=rng.randint(1, 12),
+        ano=rng.randint(2023, 2026),
+    )
+
+
+def synthetic_email(rng: random.Random, sentences: int = 4) -> Dict[str, str]:
+    """Um email sintético com sender, subject, body e category (rótulo esperado)"""
+    produtivo = rng.random() < 0.6
+    frases = _PRODUTIVO if produtivo else _IMPRODUTIVO
+    nome = rng.choice(_NOMES)
+    body = "\n\n".join([
+        _fill(rng.choice(_SAUDACOES), rng) + ",",
+        " ".join(_fill(rng.choice(frases), rng) for _ in range(sentences)),
+        _fill(rng.choice(_ASSINATURAS), rng),
+    ])
+    return {
+        "sender": f"{nome.lower()}.{rng.randint(1, 99)}@{rng.choice(_EMPRESAS)}",
+        "subject": _fill(rng.choice(_ASSUNTOS_P if produtivo else _ASSUNTOS_I), rng),
+        "body": body,
+        "category": "Produtivo" if produtivo else "Improdutivo",
+    }
+
+
+def synthetic_emails(count: int, seed: int = 42, sentences: int = 4) -> Iterator[Dict[str, str]]:
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield synthetic_email(rng, sentences)
+
+
+_DISCLAIMER = (
+    "Esta mensagem pode conter informações confidenciais e é destinada exclusivamente ao "
+    "destinatário indicado. Se você a recebeu por engano, apague-a e avise o remetente."
+)
+
+
+def synthetic_thread(rng: random.Random, replies: int = 8, sentences: int = 6) -> Dict[str, str]:
+    """
+    Uma thread longa: a mensagem nova no topo e o histórico citado abaixo
+    (cabeçalhos "Em ... escreveu:", linhas com ">", assinaturas, avisos
+    legais e um encaminhamento), como num PDF exportado do cliente de email
+    """
+    email = synthetic_email(rng, sentences)
+    parts = [email["body"], "Enviado do meu iPhone", _DISCLAIMER]
+    depth = ""
+    for _ in range(replies):
+        older = synthetic_email(rng, sentences)
+        nome = rng.choice(_NOMES)
+        depth += "> "
+        parts.append(f"Em {rng.randint(1, 28)}/{rng.randint(1, 12)}/2024, {nome} <{older['sender']}> escreveu:")
+        parts.append("\n".join(depth + line for line in older["body"].splitlines()))
+        if rng.random() < 0.2:
+            parts.append(
+                "---------- Forwarded message ---------\n"
+                f"De: {nome} <{older['sender']}>\nDate: {rng.randint(1, 28)}/{rng.randint(1, 12)}/2024\n"
+                f"Subject: {older['subject']}\nTo: equipe@empresa.com.br\n\n"
+                + _fill(rng.choice(_PRODUTIVO), rng)
+            )
+    return {**email, "body": "\n\n".join(parts)}
+
+
+def synthetic_threads(count: int, seed: int = 42, replies: int = 8) -> Iterator[Dict[str, str]]:
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield synthetic_thread(rng, replies)
+
+
+_TEMPLATES = [
+    (
+        "Improdutivo", "faturas@financeira.com", "Sua fatura de {mes}/{ano} está disponível",
+        "Olá {nome},\n\nA fatura do seu cartão final {n} com vencimento em {dia}/{mes}/{ano} já está "
+        "disponível no aplicativo. O valor total é de R$ {n},{dia}. Para evitar juros, pague até a data de "
+        "vencimento. Em caso de dúvidas, acesse a central de atendimento pelo aplicativo ou pelo site.",
+    ),
+    (
+        "Improdutivo", "seguranca@acme.com.br", "Sua senha foi alterada",
+        "Olá {nome},\n\nA senha da sua conta foi alterada em {dia}/{mes}/{ano} às {dia}h{mes}. Se foi você, "
+        "nenhuma ação é necessária e você pode ignorar esta mensagem. Se você não reconhece esta alteração, "
+        "entre em contato com a equipe de segurança pelo canal oficial.",
+    ),
+    (
+        "Produtivo", "agenda@consultoria.com.br", "Convite: Reunião de alinhamento do projeto {n}",
+        "Olá {nome},\n\nVocê foi convidado para a reunião de alinhamento do projeto {n} no dia {dia}/{mes} "
+        "às {dia}h. A pauta inclui o prazo de entrega, a aprovação do orçamento e os próximos passos com o "
+        "cliente. Confirme sua presença respondendo a este convite até o dia anterior à reunião.",
+    ),
+]
+
+
+def synthetic_templated(count: int, seed: int = 42, template_share: float = 0.7) -> Iterator[Dict[str, str]]:
+    """
+    Emails de template (fatura, troca de senha, convite de reunião) que só
+    mudam nomes, números e datas, misturados com emails comuns
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        if rng.random() >= template_share:
+            yield synthetic_email(rng)
+            continue
+        category, sender, subject, body = rng.choice(_TEMPLATES)
+        yield {
+            "sender": sender,
+            "subject": _fill(subject, rng),
+            "body": _fill(body, rng),
+            "category": category,
+        }
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def synthetic_pdf(pages: int, seed: int = 42, lines_per_page: int = 40) -> bytes:
+    """
+    Gera um PDF válido com `pages` páginas de texto (fonte Helvetica,
+    WinAnsi), montado à mão para não depender de bibliotecas de escrita
+    """
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages, preenchido depois de conhecer os filhos
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    kids = []
+    for _ in range(pages):
+        lines = [_fill(rng.choice(_PRODUTIVO + _IMPRODUTIVO), rng) for _ in range(lines_per_page)]
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 790 Td"]
+        ops += [f"({_pdf_escape(line)}) '" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("cp1252", errors="replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), pages
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
@@ -0,0 +1,322 @@
+"""Substituto local do Gemini para benchmarks"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from typing import Dict, Optional, Union
+
+from google.api_core import exceptions as google_exceptions
+
+
+class FakeChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeResponse:
+    """Resposta com .text que também pode ser iterada como stream (um chunk por palavra)"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def _chunks(self):
+        words = self.text.split(" ")
+        return [FakeChunk(w + (" " if i < len(words) - 1 else "")) for i, w in enumerate(words)]
+
+    def __iter__(self):
+        return iter(self._chunks())
+
+    async def __aiter__(self):
+        for chunk in self._chunks():
+            await asyncio.sleep(0)
+            yield chunk
+
+
+class LatencyModel:
+    """
+    Distribuição de latência do Gemini falso, com semente fixa
+
+    Especificação em texto (para a linha de comando): "0.2" (fixa),
+    "uniform:0.1:0.3", "lognormal:0.2:0.5" (mediana e sigma) ou "exp:0.2"
+    (média).
+    """
+
+    KINDS = ("fixed", "uniform", "lognormal", "exp")
+
+    def __init__(self, kind: str = "fixed", a: float = 0.2, b: float = 0.0, seed: int = 42):
+        if kind not in self.KINDS:
+            raise ValueError(f"Distribuição desconhecida '{kind}'. Use: {', '.join(self.KINDS)}")
+        self.kind = kind
+        self.a = a
+        self.b = b
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def parse(cls, spec: str, seed: int = 42) -> "LatencyModel":
+        kind, *params = spec.split(":")
+        try:
+            return cls("fixed", float(kind), seed=seed)
+        except ValueError:
+            pass
+        values = [float(p) for p in params] + [0.0, 0.0]
+        return cls(kind, values[0], values[1], seed)
+
+    def sample(self) -> float:
+        if self.kind == "uniform":
+            return self._rng.uniform(self.a, self.b)
+        if self.kind == "lognormal":
+            return self._rng.lognormvariate(math.log(self.a), self.b)
+        if self.kind == "exp":
+            return self._rng.expovariate(1 / self.a)
+        return self.a
+
+    def describe(self) -> str:
+        return f"{self.a}" if self.kind == "fixed" else f"{self.kind}:{self.a}:{self.b}"
+
+
+# Erros que o Gemini devolve na prática, pelo nome usado em --errors
+ERRORS = {
+    "503": google_exceptions.ServiceUnavailable,
+    "429": google_exceptions.ResourceExhausted,
+    "500": google_exceptions.InternalServerError,
+    "timeout": google_exceptions.DeadlineExceeded,
+}
+
+
+def parse_errors(spec: str) -> Dict[type, float]:
+    """"503=0.02,429=0.01,timeout=0.005" → {exceção: fração das chamadas}"""
+    rates = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, rate = part.split("=")
+        if name not in ERRORS:
+            raise ValueError(f"Erro desconhecido '{name}'. Use: {', '.join(ERRORS)}")
+        rates[ERRORS[name]] = float(rate)
+    return rates
+
+
+class FaultInjector:
+    """
+    Falhas programáveis para o Gemini falso
+
+    `down=True` simula uma queda (toda chamada falha depois da latência);
+    `error_rate` falha uma fração aleatória das chamadas com `error` (503
+    do SDK por padrão) e `error_rates` sorteia vários tipos de erro, cada
+    um com a sua fração. `calls` e `failures` contam as chamadas que
+    chegaram; `failures_by_error` separa por tipo.
+    """
+
+    def __init__(
+        self,
+        error_rate: float = 0.0,
+        down: bool = False,
+        error: type = None,
+        seed: int = 42,
+        error_rates: Optional[Dict[type, float]] = None
+    ):
+        self.error_rate = error_rate
+        self.down = down
+        self.error = error or google_exceptions.ServiceUnavailable
+        self.error_rates = error_rates or {}
+        self.calls = 0
+        self.failures = 0
+        self.failures_by_error: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+
+    def check(self):
+        self.calls += 1
+        if self.down:
+            self._fail(self.error)
+        draw = self._rng.random()
+        for error, rate in ((self.error, self.error_rate), *self.error_rates.items()):
+            if draw < rate:
+                self._fail(error)
+            draw -= rate
+
+    def _fail(self, error: type):
+        self.failures += 1
+        self.failures_by_error[error.__name__] = self.failures_by_error.get(error.__name__, 0) + 1
+        raise error("Falha injetada no Gemini falso")
+
+
+_SOCIAL_WORDS = ("aniversário", "natal", "obrigado", "parabéns", "férias", "bom dia", "automático", "fatura")
+_REPLY_TEXT = "Recebemos sua mensagem e retornaremos em breve."
+
+
+def _label(text: str) -> str:
+    """Categoria heurística do falso, para que os modos possam discordar"""
+    lowered = text.lower()
+    return "Improdutivo" if any(word in lowered for word in _SOCIAL_WORDS) else "Produtivo"
+
+
+def _tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def recording_key(system_instruction: str, prompt: str) -> str:
+    return hashlib.sha256(f"{system_instruction}\x1f{prompt}".encode("utf-8")).hexdigest()
+
+
+class FakeGenerativeModel:
+    """
+    Imita genai.GenerativeModel: responde após `latency` segundos (fixa ou
+    sorteada de um LatencyModel), mais um custo opcional por token de
+    entrada e de saída.
+    A versão síncrona dorme a thread (como a chamada real bloqueante),
+    a assíncrona apenas cede o event loop.
+    """
+
+    def __init__(
+        self,
+        system_instruction: str,
+        latency: Union[float, LatencyModel] = 0.2,
+        generation_config=None,
+        faults: Optional[FaultInjector] = None,
+        prompt_token_latency: float = 0.0,
+        output_token_latency: float = 0.0
+    ):
+        self.system_instruction = system_instruction or ""
+        self.latency = latency
+        self.generation_config = generation_config
+        self.faults = faults
+        self.prompt_token_latency = prompt_token_latency
+        self.output_token_latency = output_token_latency
+
+    def _answer(self, prompt: str) -> str:
+        if "objeto JSON" in self.system_instruction:
+            return json.dumps({"category": _label(prompt), "confidence": 0.9, "reply": _REPLY_TEXT}, ensure_ascii=False)
+        if "array JSON" in self.system_instruction:
+            return json.dumps([_label(part) for part in prompt.split("### Email ")[1:]])
+        if "classificador" in self.system_instruction:
+            return _label(prompt)
+        return _REPLY_TEXT + "\n\nAtenciosamente,\nEquipe"
+
+    def _delay(self, prompt: str, answer: str) -> float:
+        base = self.latency.sample() if isinstance(self.latency, LatencyModel) else self.latency
+        return (
+            base
+            + _tokens(self.system_instruction + prompt) * self.prompt_token_latency
+            + _tokens(answer) * self.output_token_latency
+        )
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        answer, delay = self._respond(prompt)
+        time.sleep(delay)
+        if self.faults:
+            self.faults.check()
+        return FakeResponse(answer)
+
+    async def generate_content_async(self, prompt, generation_config=None, **kwargs):
+        answer, delay = self._respond(prompt)
+        await asyncio.sleep(delay)
+        if self.faults:
+            self.faults.check()
+        return FakeResponse(answer)
+
+    def _respond(self, prompt: str):
+        answer = self._answer(prompt)
+        return answer, self._delay(prompt, answer)
+
+
+class RecordedGenerativeModel(FakeGenerativeModel):
+    """
+    Reproduz respostas gravadas do Gemini real (ver ResponseRecorder),
+    com a latência medida na gravação. Prompts sem gravação caem nas
+    respostas sintéticas do FakeGenerativeModel.
+    """
+
+    def __init__(self, system_instruction: str, recordings: Dict[str, dict], **kwargs):
+        super().__init__(system_instruction, **kwargs)
+        self.recordings = recordings
+        self.misses = 0
+
+    def _respond(self, prompt: str):
+        recorded = self.recordings.get(recording_key(self.system_instruction, prompt))
+        if recorded is None:
+            self.misses += 1
+            return super()._respond(prompt)
+        return recorded["text"], recorded["latency"]
+
+
+class ResponseRecorder:
+    """
+    Envolve modelos reais do Gemini e grava (instrução, prompt) → texto e
+    latência num arquivo JSONL, para reproduzir depois com RecordedGenerativeModel
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.recordings = load_recordings(path)
+
+    def wrap(self, model, system_instruction: str):
+        recorder = self
+
+        class RecordingModel:
+            def generate_content(self, prompt, generation_config=None, **kwargs):
+                started = time.perf_counter()
+                response = model.generate_content(prompt, generation_config=generation_config, **kwargs)
+                for _ in response:
+                    pass
+                recorder._save(system_instruction, prompt, response.text, time.perf_counter() - started)
+                return FakeResponse(response.text)
+
+            async def generate_content_async(self, prompt, generation_config=None, **kwargs):
+                started = time.perf_counter()
+                response = await model.generate_content_async(prompt, generation_config=generation_config, **kwargs)
+                async for _ in response:
+                    pass
+                recorder._save(system_instruction, prompt, response.text, time.perf_counter() - started)
+                return FakeResponse(response.text)
+
+        return RecordingModel()
+
+    def _save(self, system_instruction: str, prompt: str, text: str, latency: float):
+        key = recording_key(system_instruction, prompt)
+        self.recordings[key] = {"text": text, "latency": latency}
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps({"key": key, "text": text, "latency": round(latency, 4)}, ensure_ascii=False) + "\n")
+
+
+def load_recordings(path: str) -> Dict[str, dict]:
+    recordings = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    entry = json.loads(line)
+                    recordings[entry["key"]] = {"text": entry["text"], "latency": entry["latency"]}
+    return recordings
+
+
+def install_fake_gemini(
+    gemini_service,
+    latency: Union[float, LatencyModel] = 0.2,
+    faults: Optional[FaultInjector] = None,
+    prompt_token_latency: float = 0.0,
+    output_token_latency: float = 0.0
+):
+    """Faz o GeminiService construir modelos falsos em vez de chamar a API"""
+    gemini_service._models.clear()
+    gemini_service._create_model = lambda system_instruction, generation_config: FakeGenerativeModel(
+        system_instruction, latency, generation_config, faults, prompt_token_latency, output_token_latency
+    )
+
+
+def install_recorded_gemini(gemini_service, recordings: Dict[str, dict], **kwargs):
+    """Como install_fake_gemini, mas reproduzindo respostas gravadas"""
+    gemini_service._models.clear()
+    gemini_service._create_model = lambda system_instruction, generation_config: RecordedGenerativeModel(
+        system_instruction, recordings, generation_config=generation_config, **kwargs
+    )
+
+
+def install_recorder(gemini_service, recorder: ResponseRecorder):
+    """Mantém o Gemini real, gravando cada resposta no arquivo do recorder"""
+    create = gemini_service._create_model
+    gemini_service._models.clear()
+    gemini_service._create_model = lambda system_instruction, generation_config: recorder.wrap(
+        create(system_instruction, generation_config), system_instruction
+    )
@@ -0,0 +1,125 @@
+"""
+Servidor IMAP mínimo para testar a ingestão sem um servidor de verdade
+
+Atende só o que o IMAPSource usa (CAPABILITY, LOGIN, SELECT/EXAMINE,
+UID SEARCH, UID FETCH, NOOP, LOGOUT), sem TLS, sobre uma lista de
+mensagens em memória com UIDs 1..N. Mensagens podem ser acrescentadas
+com o servidor rodando, para simular entregas entre duas sincronizações.
+
+Uso (a partir de backend/), por exemplo num benchmark:
+    server = FakeIMAPServer(messages)
+    with server.running():
+        IMAPSource("127.0.0.1", "user", "senha", port=server.port, ssl=False)
+"""
+
+import re
+import socketserver
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List
+
+_COMMAND = re.compile(rb"^(\S+) (\S+)(?: (.*))?$")
+
+
+def parse_uid_set(spec: str, last_uid: int) -> List[int]:
+    """UIDs existentes de um conjunto como 1,3:5,7:* (N:* inclui sempre a última mensagem)"""
+    uids = set()
+    for part in spec.split(","):
+        if ":" in part:
+            low, high = part.split(":")
+            low = last_uid if low == "*" else int(low)
+            high = last_uid if high == "*" else int(high)
+            low, high = min(low, high), max(low, high)
+            uids.update(range(max(low, 1), min(high, last_uid) + 1))
+        else:
+            uid = last_uid if part == "*" else int(part)
+            if 1 <= uid <= last_uid:
+                uids.add(uid)
+    return sorted(uids)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _send(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server.imap
+        self._send("* OK fake IMAP4rev1 pronto")
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            match = _COMMAND.match(raw.rstrip(b"\r\n"))
+            if not match:
+                self._send("* BAD comando inválido")
+                continue
+            tag, command = match.group(1).decode(), match.group(2).decode().upper()
+            args = (match.group(3) or b"").decode()
+
+            if command == "CAPABILITY":
+                self._send("* CAPABILITY IMAP4rev1")
+                self._send(f"{tag} OK CAPABILITY completed")
+            elif command == "LOGIN":
+                self._send(f"{tag} OK LOGIN completed")
+            elif command in ("SELECT", "EXAMINE"):
+                self._send(f"* {len(server.messages)} EXISTS")
+                self._send(f"* OK [UIDVALIDITY {server.uidvalidity}] UIDs valid")
+                self._send(f"{tag} OK [READ-ONLY] {command} completed")
+            elif command == "NOOP":
+                self._send(f"{tag} OK NOOP completed")
+            elif command == "LOGOUT":
+                self._send("* BYE até logo")
+                self._send(f"{tag} OK LOGOUT completed")
+                return
+            elif command == "UID":
+                self._uid(tag, args, server)
+            else:
+                self._send(f"{tag} BAD comando não suportado")
+            self.wfile.flush()
+
+    def _uid(self, tag: str, args: str, server: "FakeIMAPServer"):
+        subcommand, _, rest = args.partition(" ")
+        last_uid = len(server.messages)
+        if subcommand.upper() == "SEARCH":
+            spec = rest.split()[-1]
+            self._send("* SEARCH " + " ".join(map(str, parse_uid_set(spec, last_uid))))
+            self._send(f"{tag} OK SEARCH completed")
+        elif subcommand.upper() == "FETCH":
+            spec = rest.split(" ", 1)[0]
+            for uid in parse_uid_set(spec, last_uid):
+                raw = server.messages[uid - 1]
+                self.wfile.write(f"* {uid} FETCH (UID {uid} BODY[] {{{len(raw)}}}\r\n".encode())
+                self.wfile.write(raw)
+                self.wfile.write(b")\r\n")
+            self._send(f"{tag} OK FETCH completed")
+        else:
+            self._send(f"{tag} BAD UID {subcommand} não suportado")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeIMAPServer:
+    def __init__(self, messages: Iterable[bytes] = (), uidvalidity: int = 1):
+        self.messages: List[bytes] = list(messages)
+        self.uidvalidity = uidvalidity
+        self._server = None
+        self.port = 0
+
+    def append(self, raw: bytes):
+        self.messages.append(raw)
+
+    @contextmanager
+    def running(self, host: str = "127.0.0.1"):
+        self._server = _Server((host, 0), _Handler)
+        self._server.imap = self
+        self.port = self._server.server_address[1]
+        thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            self._server.shutdown()
+            self._server.server_close()
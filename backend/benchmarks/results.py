@@ -0,0 +1,146 @@
+"""
+Resultados dos benchmarks em JSON, para comparar versões
+
+Cada arquivo guarda o nome do benchmark, os argumentos (sementes
+incluídas), o commit, a versão do Python e as métricas. O comparador
+lê dois arquivos e aponta as métricas que pioraram além da tolerância:
+nomes terminados em _ms/_us/_ns/_seconds/_mb são "menor é melhor", os com
+per_sec/throughput/hit_rate são "maior é melhor"; as demais são só
+exibidas.
+
+Uso (a partir de backend/):
+    python -m benchmarks.results base.json novo.json --tolerance 0.1
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+_LOWER_IS_BETTER = ("_ms", "_us", "_ns", "_seconds", "_mb")
+_HIGHER_IS_BETTER = ("per_sec", "throughput", "hit_rate")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def latency_summary(latencies: Iterable[float]) -> Dict[str, float]:
+    """p50/p95/p99/média/máximo em ms a partir de latências em segundos"""
+    values = [latency * 1000 for latency in latencies]
+    if not values:
+        return {}
+    return {
+        "p50_ms": round(statistics.median(values), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "mean_ms": round(statistics.mean(values), 3),
+        "max_ms": round(max(values), 3),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def save_results(name: str, args: argparse.Namespace, results: Dict, output: Optional[str] = None) -> str:
+    """Grava os resultados e retorna o caminho (padrão: benchmarks/results/<nome>-<data>.json)"""
+    if not output:
+        os.makedirs(DEFAULT_DIR, exist_ok=True)
+        output = os.path.join(DEFAULT_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    document = {
+        "benchmark": name,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(document, handle, ensure_ascii=False, indent=2)
+    return output
+
+
+def _flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def _direction(metric: str) -> int:
+    """-1: menor é melhor, 1: maior é melhor, 0: só informativa"""
+    leaf = metric.rsplit(".", 1)[-1]
+    if leaf.endswith(_LOWER_IS_BETTER):
+        return -1
+    if any(marker in leaf for marker in _HIGHER_IS_BETTER):
+        return 1
+    return 0
+
+
+def compare(base: Dict, new: Dict, tolerance: float) -> List[Dict]:
+    """Métricas em comum com a variação relativa e se passou da tolerância"""
+    old_values, new_values = _flatten(base["results"]), _flatten(new["results"])
+    rows = []
+    for metric in sorted(old_values.keys() & new_values.keys()):
+        old, current = old_values[metric], new_values[metric]
+        change = (current - old) / old if old else 0.0
+        direction = _direction(metric)
+        rows.append({
+            "metric": metric,
+            "base": old,
+            "new": current,
+            "change": change,
+            "regression": direction != 0 and -direction * change > tolerance,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="piora relativa aceita (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as handle:
+        base = json.load(handle)
+    with open(args.new, encoding="utf-8") as handle:
+        new = json.load(handle)
+    if base["benchmark"] != new["benchmark"]:
+        sys.exit(f"benchmarks diferentes: {base['benchmark']} e {new['benchmark']}")
+
+    print(f"{base['benchmark']}: {base['commit']} → {new['commit']} (tolerância {args.tolerance:.0%})")
+    if base["args"] != new["args"]:
+        print("atenção: argumentos diferentes entre as execuções")
+    rows = compare(base, new, args.tolerance)
+    for row in rows:
+        flag = "  PIOROU" if row["regression"] else ""
+        print(f"{row['metric']:48s} {row['base']:12.3f} {row['new']:12.3f} {row['change']:+8.1%}{flag}")
+
+    regressions = sum(row["regression"] for row in rows)
+    print(f"\n{regressions} métrica(s) pioraram além da tolerância")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
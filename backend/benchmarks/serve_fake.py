@@ -0,0 +1,57 @@
+"""
+Sobe o backend com o Gemini falso, para testes de carga vindos de fora
+do processo (bench_load --url, wrk, k6, locust)
+
+Com o uvicorn roda um único worker; com vários processos use o gunicorn
+com a fábrica fake_app(), que lê a configuração do Gemini falso do
+ambiente (FAKE_GEMINI_LATENCY, FAKE_GEMINI_ERRORS, FAKE_GEMINI_SEED).
+
+Uso (a partir de backend/):
+    python -m benchmarks.serve_fake --port 8000 --latency lognormal:0.2:0.5 --errors 503=0.02
+    WEB_CONCURRENCY=4 FAKE_GEMINI_LATENCY=0.2 gunicorn "benchmarks.serve_fake:fake_app()"
+"""
+
+import argparse
+import os
+
+import uvicorn
+
+from main import app
+from services.classifier_service import classifier_service
+from services.gemini_service import gemini_service
+from benchmarks.fake_gemini import FaultInjector, LatencyModel, install_fake_gemini, parse_errors
+
+
+def install(latency: str, errors: str, seed: int, keep_local_model: bool = False):
+    faults = FaultInjector(seed=seed, error_rates=parse_errors(errors))
+    install_fake_gemini(gemini_service, LatencyModel.parse(latency, seed=seed), faults)
+    if not keep_local_model:
+        classifier_service.local_model = None
+
+
+def fake_app():
+    """Fábrica para o gunicorn: o app com o Gemini falso configurado pelo ambiente"""
+    install(
+        os.getenv("FAKE_GEMINI_LATENCY", "0.2"),
+        os.getenv("FAKE_GEMINI_ERRORS", ""),
+        int(os.getenv("FAKE_GEMINI_SEED", "42")),
+    )
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", default="0.2", help="0.2, uniform:a:b, lognormal:mediana:sigma ou exp:média")
+    parser.add_argument("--errors", default="", help="ex.: 503=0.02,429=0.01,timeout=0.005")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep-local-model", action="store_true", help="mantém o modelo local ligado")
+    args = parser.parse_args()
+
+    install(args.latency, args.errors, args.seed, args.keep_local_model)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Gera o pacote offline de recursos do NLTK (stopwords, RSLP e léxico do VADER)
+
+Rode durante o build da imagem para que o servidor nunca precise de rede
+na inicialização:
+
+    python bundle_nltk_data.py --dir nltk_data
+    # e no runtime: NLTK_BUNDLE_DIR=/app/nltk_data NLTK_ALLOW_DOWNLOAD=false
+"""
+
+import argparse
+import os
+import sys
+
+import nltk
+
+from services.nltk_resources import RESOURCES
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nltk_data")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=DEFAULT_DIR, help="diretório de destino")
+    args = parser.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    failed = [name for name in RESOURCES if not nltk.download(name, download_dir=args.dir, quiet=True)]
+    if failed:
+        print(f"❌ Falha ao baixar: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"✅ Recursos NLTK salvos em {args.dir}: {', '.join(RESOURCES)}")
+
+
+if __name__ == "__main__":
+    main()
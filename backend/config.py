@@ -5,19 +5,195 @@ load_dotenv()
 
 class Settings:
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY")
+
+    # Provedores de LLM (services/llm_router.py): gemini e offline (modelo
+    # local ou regras + respostas de template, sem rede). LLM_PROVIDERS é a
+    # ordem da cadeia; sem GEMINI_API_KEY o padrão é só o offline.
+    # LLM_ROUTING: fallback, cheapest ou hedged (ver ROUTING_POLICIES)
+    LLM_PROVIDERS: str = os.getenv("LLM_PROVIDERS", "gemini" if os.getenv("GEMINI_API_KEY") else "offline")
+    LLM_ROUTING: str = os.getenv("LLM_ROUTING", "fallback")
+    LLM_CASCADE_MIN_CONFIDENCE: float = float(os.getenv("LLM_CASCADE_MIN_CONFIDENCE", "0.75"))
+    LLM_HEDGE_DELAY_SECONDS: float = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "1.0"))  # até haver p95 observado
+    LLM_MIN_SUCCESS_RATE: float = 0.5  # abaixo disso o provedor vai para o fim da cadeia
+    LLM_STATS_WINDOW_SECONDS: float = 60.0
+
     GEMINI_MODEL: str = "gemini-2.0-flash-exp"
     TEMPERATURE: float = 0.7
     CLASSIFICATION_TEMPERATURE: float = 0.0
     RESPONSE_TEMPERATURE: float = 0.1
     MAX_OUTPUT_TOKENS: int = 256
+    # Uma só chamada para categoria + resposta (JSON com schema); se a
+    # resposta vier inválida o classificador volta às duas chamadas
+    COMBINED_PROMPT: bool = os.getenv("COMBINED_PROMPT", "false").lower() == "true"
+    COMBINED_TEMPERATURE: float = 0.2
+
+    # Orçamento do corpo do email nos prompts (tokens estimados, 0 = sem limite):
+    # histórico citado, assinaturas e avisos legais saem antes de cortar frases
+    CLASSIFY_TOKEN_BUDGET: int = int(os.getenv("CLASSIFY_TOKEN_BUDGET", "800"))
+    REPLY_TOKEN_BUDGET: int = int(os.getenv("REPLY_TOKEN_BUDGET", "500"))
+    PROMPT_CLEANUP: bool = os.getenv("PROMPT_CLEANUP", "true").lower() == "true"
     MIN_RESPONSE_WORDS: int = 8
     TOP_KEYWORDS: int = 5
+    STEM_CACHE_SIZE: int = 20000
+
+    # Concorrência e timeouts das chamadas ao Gemini
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "64"))
+    GEMINI_TIMEOUT_SECONDS: float = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "20"))
+    DISCONNECT_POLL_SECONDS: float = 0.5
+
+    # Transporte do SDK: "grpc" (padrão, canal HTTP/2 persistente) ou "rest"
+    GEMINI_TRANSPORT: str = os.getenv("GEMINI_TRANSPORT", "")
+    GEMINI_API_ENDPOINT: str = os.getenv("GEMINI_API_ENDPOINT", "")
+    GEMINI_MODEL_REGISTRY_SIZE: int = 32
+    GEMINI_TIMINGS_WINDOW: int = 1000
+
+    # Proteções em volta do Gemini: limite de taxa (0 = sem limite) casado
+    # com a cota, retentativas com jitter dentro de um orçamento global e
+    # circuit breaker que manda direto para o fallback durante uma queda
+    GEMINI_RATE_LIMIT_RPS: float = float(os.getenv("GEMINI_RATE_LIMIT_RPS", "0"))
+    GEMINI_RATE_LIMIT_BURST: float = float(os.getenv("GEMINI_RATE_LIMIT_BURST", "10"))
+    GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS: float = float(os.getenv("GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS", "2"))
+    GEMINI_MAX_RETRIES: int = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+    GEMINI_RETRY_BASE_SECONDS: float = 0.2
+    GEMINI_RETRY_MAX_SECONDS: float = 2.0
+    GEMINI_RETRY_BUDGET_TOKENS: float = 10.0
+    GEMINI_RETRY_BUDGET_RATIO: float = 0.1
+    GEMINI_BREAKER_FAILURES: int = int(os.getenv("GEMINI_BREAKER_FAILURES", "5"))
+    GEMINI_BREAKER_RESET_SECONDS: float = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "15"))
+
+    # Classificação em lote (/classify/batch)
+    BATCH_MAX_SIZE: int = int(os.getenv("BATCH_MAX_SIZE", "20"))
+    BATCH_MAX_PROMPT_TOKENS: int = int(os.getenv("BATCH_MAX_PROMPT_TOKENS", "8000"))
+    BATCH_MAX_EMAILS: int = 500
+
+    # Admissão nos endpoints de classificação (services/admission.py): classe
+    # de prioridade pelo cabeçalho X-Priority (interactive ou bulk) e prazo
+    # por X-Deadline-Ms. Bulk usa no máximo ADMISSION_BULK_SHARE dos slots e
+    # só começa sem interactive na fila. Fila cheia: bulk recebe 429 e
+    # interactive cai no fallback; prazo impossível também cai no fallback.
+    # Sem ADMISSION_MAX_CONCURRENCY vale o limite do Gemini, para a admissão
+    # não cortar a folga que o semáforo dele já dá
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_MAX_CONCURRENCY: int = int(os.getenv("ADMISSION_MAX_CONCURRENCY", str(GEMINI_MAX_CONCURRENCY)))
+    ADMISSION_BULK_SHARE: float = float(os.getenv("ADMISSION_BULK_SHARE", "0.5"))
+    ADMISSION_INTERACTIVE_QUEUE: int = int(os.getenv("ADMISSION_INTERACTIVE_QUEUE", "64"))
+    ADMISSION_BULK_QUEUE: int = int(os.getenv("ADMISSION_BULK_QUEUE", "256"))
+    ADMISSION_INTERACTIVE_DEADLINE_SECONDS: float = float(os.getenv("ADMISSION_INTERACTIVE_DEADLINE_SECONDS", "10"))
+    ADMISSION_BULK_DEADLINE_SECONDS: float = float(os.getenv("ADMISSION_BULK_DEADLINE_SECONDS", "120"))
+
+    # Respostas de /classify e /classify/batch: gzip/zstd negociados pelo
+    # Accept-Encoding, só a partir deste tamanho (bytes)
+    RESPONSE_COMPRESSION_MIN_BYTES: int = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+    RESPONSE_GZIP_LEVEL: int = int(os.getenv("RESPONSE_GZIP_LEVEL", "5"))
+    RESPONSE_ZSTD_LEVEL: int = int(os.getenv("RESPONSE_ZSTD_LEVEL", "3"))
+
+    # Jobs de classificação em massa (/jobs): progresso gravado em SQLite
+    JOBS_DB_PATH: str = os.getenv("JOBS_DB_PATH", "jobs.db")
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_MAX_RPS: float = float(os.getenv("JOB_MAX_RPS", "5"))  # chamadas ao Gemini por segundo
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_FULL_CHUNK_SIZE: int = 8  # emails por bloco no modo "full" (um por chamada)
+    JOB_POLL_SECONDS: float = 5.0
+
+    # Ingestão incremental de caixas (ingest_mailbox.py): mbox, Maildir ou IMAP;
+    # a marca d'água de cada caixa fica em SQLite e só mensagens novas são lidas
+    MAILBOX_STATE_DB_PATH: str = os.getenv("MAILBOX_STATE_DB_PATH", "mailboxes.db")
+    MAILBOX_BATCH_SIZE: int = int(os.getenv("MAILBOX_BATCH_SIZE", "20"))
+    IMAP_FETCH_SIZE: int = 50  # mensagens por UID FETCH
+    IMAP_TIMEOUT_SECONDS: float = 30.0
+
+    # Cache de resultados (categoria e resposta sugerida)
+    # Incrementar PROMPT_VERSION sempre que os prompts mudarem
+    PROMPT_VERSION: str = "1"
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+    CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", str(24 * 3600)))
+    CACHE_DB_PATH: str = os.getenv("CACHE_DB_PATH", "")  # vazio = só memória
+    CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    # Requisições idênticas simultâneas (ex: disparo em massa) esperam a
+    # chamada já em voo em vez de repeti-la; COALESCE_WAIT_SECONDS é o
+    # máximo que quem espera aguarda antes de cair no fallback
+    COALESCE_ENABLED: bool = os.getenv("COALESCE_ENABLED", "true").lower() == "true"
+    COALESCE_WAIT_SECONDS: float = float(os.getenv("COALESCE_WAIT_SECONDS", "30"))
+
+    # Emails quase iguais (templates): reaproveita a categoria de um email já
+    # classificado quando a similaridade (MinHash) passa de NEAR_DUP_THRESHOLD.
+    # Reaproveitar a resposta é opcional: ela pode citar dados do outro email
+    NEAR_DUP_ENABLED: bool = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+    NEAR_DUP_REUSE_REPLY: bool = os.getenv("NEAR_DUP_REUSE_REPLY", "false").lower() == "true"
+    NEAR_DUP_THRESHOLD: float = float(os.getenv("NEAR_DUP_THRESHOLD", "0.85"))
+    NEAR_DUP_MAX_ENTRIES: int = int(os.getenv("NEAR_DUP_MAX_ENTRIES", "20000"))
+    NEAR_DUP_DB_PATH: str = os.getenv("NEAR_DUP_DB_PATH", "")  # vazio = só memória
+    NEAR_DUP_NUM_PERM: int = 64
+    NEAR_DUP_BANDS: int = 16
+    NEAR_DUP_SHINGLE_SIZE: int = 2
+    NEAR_DUP_MIN_TOKENS: int = 8  # textos menores ficam só com o cache exato
+
+    # Respostas adiadas (reply=deferred): o pedido fica guardado até o GET /reply/{id}
+    # REPLY_HANDLE_DB_PATH precisa ser um arquivo diferente de CACHE_DB_PATH
+    REPLY_HANDLE_MAX_ENTRIES: int = int(os.getenv("REPLY_HANDLE_MAX_ENTRIES", "10000"))
+    REPLY_HANDLE_TTL_SECONDS: int = int(os.getenv("REPLY_HANDLE_TTL_SECONDS", str(7 * 24 * 3600)))
+    REPLY_HANDLE_DB_PATH: str = os.getenv("REPLY_HANDLE_DB_PATH", "")  # vazio = só memória
+
+    # Extração de texto de arquivos: o classificador só precisa do começo
+    EXTRACTION_CHAR_BUDGET: int = int(os.getenv("EXTRACTION_CHAR_BUDGET", "20000"))
+    PDF_WORKERS: int = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PDF_PARALLEL_MIN_PAGES: int = 40
+    PDF_PAGES_PER_TASK: int = 16
+
+    # Recursos do NLTK: lidos primeiro do pacote offline (bundle_nltk_data.py)
+    NLTK_DATA_DIR: str = os.getenv("NLTK_DATA", "/tmp/nltk_data")
+    NLTK_BUNDLE_DIR: str = os.getenv(
+        "NLTK_BUNDLE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "nltk_data")
+    )
+    NLTK_ALLOW_DOWNLOAD: bool = os.getenv("NLTK_ALLOW_DOWNLOAD", "true").lower() == "true"
+    # Inicializa os serviços no startup em vez de na primeira requisição
+    EAGER_INIT: bool = os.getenv("EAGER_INIT", "false").lower() == "true"
+
+    # Servidor com vários processos (gunicorn.conf.py): WEB_CONCURRENCY workers
+    # forkados de um mestre que já carregou os recursos só de leitura do NLP
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    PRELOAD_SHARED_ASSETS: bool = os.getenv("PRELOAD_SHARED_ASSETS", "true").lower() == "true"
+
+    # Logs estruturados: LOG_FORMAT json ou text; LOG_SAMPLE_RATE é a fração
+    # de requisições com logs INFO/DEBUG (WARNING e acima sempre saem)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    LOG_SAMPLE_RATE: float = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
+    # Léxicos com pesos do fallback e da detecção de noreply (lexicons/*.json),
+    # relidos quando o arquivo muda (checagem no máximo a cada N segundos; 0 = nunca)
+    LEXICON_DIR: str = os.getenv(
+        "LEXICON_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicons")
+    )
+    LEXICON_RELOAD_SECONDS: float = float(os.getenv("LEXICON_RELOAD_SECONDS", "5"))
+
+    # Modelo local (train_local_model.py): o Gemini só é chamado quando
+    # P(Produtivo) cai dentro da faixa de incerteza [LOW, HIGH]
+    LOCAL_MODEL_PATH: str = os.getenv("LOCAL_MODEL_PATH", "models/local_classifier.npz")
+    LOCAL_MODEL_LOW: float = float(os.getenv("LOCAL_MODEL_LOW", "0.15"))
+    LOCAL_MODEL_HIGH: float = float(os.getenv("LOCAL_MODEL_HIGH", "0.85"))
+
+    # Aprendizado com as correções do /feedback: log só de acréscimo (JSONL) e
+    # snapshots versionados do modelo local, que cada processo passa a servir
+    # sem reiniciar (CURRENT checado no máximo a cada N segundos; 0 = nunca)
+    FEEDBACK_LOG_PATH: str = os.getenv("FEEDBACK_LOG_PATH", "models/feedback.jsonl")
+    LOCAL_MODEL_SNAPSHOT_DIR: str = os.getenv("LOCAL_MODEL_SNAPSHOT_DIR", "models/snapshots")
+    LOCAL_MODEL_SNAPSHOTS_KEEP: int = int(os.getenv("LOCAL_MODEL_SNAPSHOTS_KEEP", "5"))
+    LOCAL_MODEL_RELOAD_SECONDS: float = float(os.getenv("LOCAL_MODEL_RELOAD_SECONDS", "2"))
+    FEEDBACK_LEARNING_RATE: float = float(os.getenv("FEEDBACK_LEARNING_RATE", "1.0"))
+    FEEDBACK_MAX_STEPS: int = int(os.getenv("FEEDBACK_MAX_STEPS", "25"))
 
     @property
     def is_gemini_configured(self) -> bool:
         return bool(self.GEMINI_API_KEY)
 
+    @property
+    def llm_providers(self) -> list:
+        return [name.strip() for name in self.LLM_PROVIDERS.split(",") if name.strip()]
+
 settings = Settings()
 
-if not settings.is_gemini_configured:
-    raise ValueError("GEMINI_API_KEY não definida.")
\ No newline at end of file
+if "gemini" in settings.llm_providers and not settings.is_gemini_configured:
+    raise ValueError("GEMINI_API_KEY não definida (para rodar sem o Gemini use LLM_PROVIDERS=offline).")
\ No newline at end of file
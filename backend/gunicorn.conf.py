@@ -0,0 +1,34 @@
+"""
+Perfil de produção com vários processos
+
+    gunicorn main:app            (lê este arquivo a partir de backend/)
+
+O app é importado no mestre (preload_app) e os recursos só de leitura do
+NLP são carregados antes do fork, então os WEB_CONCURRENCY workers
+compartilham essas páginas por cópia-na-escrita em vez de cada um
+carregar a sua cópia. Com PRELOAD_SHARED_ASSETS=false cada worker carrega
+tudo sozinho (útil para comparar a memória, ver benchmarks/bench_workers).
+"""
+
+import os
+
+from config import settings
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = settings.WEB_CONCURRENCY
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = settings.PRELOAD_SHARED_ASSETS
+# Com workers uvicorn o timeout é o heartbeat: só derruba um worker com o event loop travado
+timeout = 120
+graceful_timeout = 30
+
+
+def when_ready(server):
+    if settings.PRELOAD_SHARED_ASSETS:
+        from services.prefork import preload_shared_assets
+        preload_shared_assets()
+
+
+def post_fork(server, worker):
+    from services.prefork import after_fork
+    after_fork(settings.WEB_CONCURRENCY)
@@ -0,0 +1,89 @@
+"""
+Classifica as mensagens novas de uma caixa de email (mbox, Maildir ou IMAP)
+
+Cada execução lê só o que chegou depois da última (a marca d'água fica em
+MAILBOX_STATE_DB_PATH) e escreve um resultado JSON por linha. Serve para
+rodar no cron ou em loop com --watch.
+
+Uso:
+    python ingest_mailbox.py mbox /var/mail/suporte --output resultados.jsonl
+    python ingest_mailbox.py maildir ~/Maildir --mode full
+    IMAP_PASSWORD=... python ingest_mailbox.py imap imap.exemplo.com --user suporte@exemplo.com --folder INBOX
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from services.mailbox_service import MAILBOX_KINDS, MAILBOX_MODES, mailbox_service
+
+
+def open_source(args):
+    if args.kind != "imap":
+        return mailbox_service.open_source(args.kind, args.location)
+    if not args.user:
+        sys.exit("--user é obrigatório para IMAP")
+    return mailbox_service.open_source(
+        "imap",
+        args.location,
+        user=args.user,
+        password=os.getenv("IMAP_PASSWORD", ""),
+        folder=args.folder,
+        port=args.port,
+        ssl=not args.no_ssl,
+    )
+
+
+def run_once(source, args, output) -> int:
+    started = time.perf_counter()
+    count = 0
+    for result in mailbox_service.ingest(
+        source, mode=args.mode, limit=args.limit, provider=args.provider, routing=args.routing
+    ):
+        output.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+        count += 1
+    output.flush()
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"{count} mensagens novas em {elapsed:.1f} s ({rate:.1f} msg/s)", file=sys.stderr)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=MAILBOX_KINDS)
+    parser.add_argument("location", help="caminho do mbox/Maildir ou host IMAP")
+    parser.add_argument("--user", help="usuário IMAP (a senha vem de IMAP_PASSWORD)")
+    parser.add_argument("--folder", default="INBOX")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--no-ssl", action="store_true", help="IMAP sem TLS (ex: servidor local)")
+    parser.add_argument("--mode", choices=MAILBOX_MODES, default="classify")
+    parser.add_argument("--provider", help="provedor de LLM (padrão: LLM_PROVIDERS)")
+    parser.add_argument("--routing", help="política de roteamento (padrão: LLM_ROUTING)")
+    parser.add_argument("--limit", type=int, help="máximo de mensagens por execução")
+    parser.add_argument("--output", help="arquivo JSONL de saída (acrescenta; padrão: stdout)")
+    parser.add_argument("--reset", action="store_true", help="esquece a marca d'água e relê a caixa inteira")
+    parser.add_argument("--watch", type=float, metavar="SEGUNDOS", help="repete a cada N segundos")
+    args = parser.parse_args()
+
+    source = open_source(args)
+    if args.reset:
+        mailbox_service.reset(source)
+
+    output = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        run_once(source, args, output)
+        while args.watch:
+            time.sleep(args.watch)
+            run_once(source, args, output)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,38 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+import asyncio
+import json
+import math
+import os
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import ValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from schemas import MessageRequest, MessageResponse, FileUploadResponse
-from services.classifier_service import classifier_service
+from config import settings
+from schemas import (
+    MessageRequest, MessageResponse, FileUploadResponse,
+    BatchClassifyRequest, BatchClassifyResponse, BatchItemResult, JobStatus, ReplyResponse,
+    FeedbackRequest, FeedbackResponse
+)
+from services import response_format
+from services.admission import admission_controller, AdmissionRejected, PRIORITY_CLASSES
+from services.classifier_service import classifier_service, REPLY_MODES
 from services.file_service import file_service
-import nltk
+from services.gemini_service import gemini_service
+from services.cache_service import cache_service, CACHE_MODES
+from services.feedback_service import feedback_service
+from services.near_duplicate import near_duplicate_index
+from services.job_service import job_service, JOB_MODES
+from services.llm_router import llm_router, ROUTING_POLICIES
+from services.local_model import live_local_model
+from services.lazy import is_initialized
+from services.nltk_resources import missing_resources
+from services.logging_setup import configure_logging, get_logger
+from services.metrics import registry as metrics_registry
+
+configure_logging()
+logger = get_logger("api")
 
 app = FastAPI(
     title="Email Classifier AI",
@@ -28,45 +57,255 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def startup_event():
-    import os, pathlib, nltk
-    nltk_dir = os.getenv("NLTK_DATA", "/tmp/nltk_data")
-    pathlib.Path(nltk_dir).mkdir(parents=True, exist_ok=True)
-    if nltk_dir not in nltk.data.path:
-        nltk.data.path.append(nltk_dir)
-    resources = [
-        ("sentiment/vader_lexicon", "vader_lexicon"),
-        ("tokenizers/punkt", "punkt"),
-        ("corpora/stopwords", "stopwords"),
-    ]
-    for path, pkg in resources:
-        try:
-            nltk.data.find(path)
-        except LookupError:
-            nltk.download(pkg, download_dir=nltk_dir)
+    # Por padrão os serviços sobem no primeiro uso; EAGER_INIT aquece tudo antes
+    if settings.EAGER_INIT:
+        await run_in_threadpool(classifier_service.warm_up)
+    # Retoma jobs interrompidos por um restart
+    if os.path.exists(settings.JOBS_DB_PATH) and await run_in_threadpool(job_service.has_unfinished):
+        job_service.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if is_initialized(job_service):
+        await job_service.stop()
+
+async def run_until_disconnect(request: Request, coro):
+    """
+    Executa a corrotina como tarefa e a cancela se o cliente desconectar
+    antes do fim, liberando a chamada ao Gemini que estiver em voo.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info("Cliente desconectou, cancelando processamento")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Cliente desconectou")
+    finally:
+        if not task.done():
+            task.cancel()
+
+async def admitted(request: Request, priority: Optional[str], deadline_ms: Optional[float], default_priority: str, work, degrade):
+    """
+    Passa a classificação pela admissão (X-Priority e X-Deadline-Ms).
+    work() cria a corrotina da classificação; degrade(motivo) monta o
+    resultado sem LLM quando o prazo não dá. Bulk descartado vira 429.
+    """
+    priority = priority or default_priority
+    if priority not in PRIORITY_CLASSES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Prioridade inválida. Use: {', '.join(PRIORITY_CLASSES)}"
+        )
+    if deadline_ms is not None and deadline_ms <= 0:
+        raise HTTPException(status_code=400, detail="X-Deadline-Ms precisa ser positivo")
+    try:
+        return await admission_controller.run(
+            priority,
+            admission_controller.deadline_for(priority, deadline_ms),
+            lambda: run_until_disconnect(request, work()),
+            degrade
+        )
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
+
+def response_fields(request: Request, fields: Optional[str], model) -> Optional[List[str]]:
+    """
+    Valida ?fields= contra o schema e o Accept antes de classificar, para
+    que um pedido inválido (400/406) não gaste uma chamada ao LLM
+    """
+    try:
+        response_format.negotiate_media_type(request.headers.get("accept", ""))
+    except response_format.NotAcceptableError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    try:
+        return response_format.parse_fields(fields, list(model.__fields__))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def encoded_response(request: Request, payload: dict) -> Response:
+    """Resposta em JSON ou MessagePack, comprimida conforme o Accept-Encoding"""
+    body, headers = response_format.render(
+        payload,
+        request.headers.get("accept", ""),
+        request.headers.get("accept-encoding", "")
+    )
+    return Response(content=body, headers=headers)
 
 @app.post("/classify", response_model=MessageResponse)
-async def classify_email(data: MessageRequest):
+async def classify_email(
+    data: MessageRequest,
+    request: Request,
+    x_priority: Optional[str] = Header(default=None, description="interactive (padrão) ou bulk"),
+    x_deadline_ms: Optional[float] = Header(default=None, description="Prazo da requisição em ms"),
+    fields: Optional[str] = Query(default=None, description="Campos da resposta, ex.: category,confidence")
+):
     
     try:
-        resultado = classifier_service.classify_and_respond(
+        selected = response_fields(request, fields, MessageResponse)
+        # Sem suggested_reply/reply_id na resposta, não há por que gerar a resposta
+        reply_mode = data.reply
+        if selected is not None and not {"suggested_reply", "reply_id"} & set(selected):
+            reply_mode = "none"
+        options = dict(
             sender=data.sender,
             subject=data.subject,
-            body=data.body
+            body=data.body,
+            cache_mode=data.cache,
+            reply_mode=reply_mode,
+            provider=data.provider,
+            routing=data.routing
         )
-        return MessageResponse(**resultado)
+        resultado = await admitted(
+            request, x_priority, x_deadline_ms, "interactive",
+            lambda: classifier_service.classify_and_respond_async(**options),
+            lambda reason: classifier_service.classify_degraded(**options, reason=reason)
+        )
+        return encoded_response(
+            request, response_format.select_fields(MessageResponse(**resultado).dict(), selected)
+        )
+    
+    except HTTPException:
+        raise
     
     except Exception as e:
-        print(f"Erro no processamento: {e}")
+        logger.exception("Erro no processamento")
         raise HTTPException(
             status_code=500,
             detail=f"Erro ao processar email: {str(e)}"
         )
 
+def sse_event(event: str, data: dict) -> str:
+    """Formata um evento Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def degraded_events(result: dict, reason: str):
+    """Eventos SSE de uma classificação degradada pela admissão (sem LLM)"""
+    yield "classification", {
+        "category": result["category"],
+        "confidence": result["confidence"],
+        "keywords": result["keywords"],
+        "processed_text": result["processed_text"],
+    }
+    if result["suggested_reply"]:
+        yield "reply", {"text": result["suggested_reply"]}
+    yield "done", {
+        "suggested_reply": result["suggested_reply"],
+        "stopped_early": False,
+        "reply_id": result["reply_id"],
+        "usage": result["usage"],
+        "degraded": reason,
+    }
+
+def stream_classification(data: MessageRequest) -> StreamingResponse:
+    options = dict(
+        sender=data.sender,
+        subject=data.subject,
+        body=data.body,
+        cache_mode=data.cache,
+        reply_mode=data.reply,
+        provider=data.provider,
+        routing=data.routing
+    )
+
+    async def events():
+        try:
+            # Interactive na admissão; o slot fica preso até o stream terminar ou o cliente sair
+            deadline = admission_controller.deadline_for("interactive")
+            async with admission_controller.admit("interactive", deadline) as reason:
+                if reason is not None:
+                    result = await asyncio.to_thread(
+                        lambda: classifier_service.classify_degraded(**options, reason=reason)
+                    )
+                    for event, payload in degraded_events(result, reason):
+                        yield sse_event(event, payload)
+                    return
+                async for event, payload in classifier_service.classify_and_stream(**options):
+                    yield sse_event(event, payload)
+        except Exception as e:
+            logger.exception("Erro no processamento (stream)")
+            yield sse_event("error", {"detail": f"Erro ao processar email: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/classify/stream")
+async def classify_email_stream(data: MessageRequest):
+    """Classificação + resposta sugerida em streaming (Server-Sent Events)"""
+    return stream_classification(data)
+
+@app.get("/classify/stream")
+async def classify_email_stream_get(
+    sender: str,
+    subject: str,
+    body: str,
+    cache: str = "use",
+    reply: str = "generate",
+    provider: Optional[str] = None,
+    routing: Optional[str] = None
+):
+    """Mesmo que o POST, por query string, para uso com EventSource"""
+    try:
+        data = MessageRequest(
+            sender=sender, subject=subject, body=body, cache=cache, reply=reply, provider=provider, routing=routing
+        )
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    return stream_classification(data)
+
+@app.post("/classify/batch", response_model=BatchClassifyResponse)
+async def classify_email_batch(
+    data: BatchClassifyRequest,
+    request: Request,
+    x_priority: Optional[str] = Header(default=None, description="bulk (padrão) ou interactive"),
+    x_deadline_ms: Optional[float] = Header(default=None, description="Prazo da requisição em ms"),
+    fields: Optional[str] = Query(default=None, description="Campos de cada item, ex.: id,category,confidence")
+):
+    
+    try:
+        selected = response_fields(request, fields, BatchItemResult)
+        emails = [email.dict() for email in data.emails]
+        resultado = await admitted(
+            request, x_priority, x_deadline_ms, "bulk",
+            lambda: classifier_service.classify_batch_async(emails, provider=data.provider, routing=data.routing),
+            lambda reason: classifier_service.classify_batch_degraded(emails, reason=reason)
+        )
+        payload = BatchClassifyResponse(**resultado).dict()
+        payload["results"] = [response_format.select_fields(item, selected) for item in payload["results"]]
+        return encoded_response(request, payload)
+    
+    except HTTPException:
+        raise
+    
+    except Exception as e:
+        logger.exception("Erro no processamento do lote")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao processar lote: {str(e)}"
+        )
+
 @app.post("/classify/upload", response_model=FileUploadResponse)
 async def classify_email_from_file(
+    request: Request,
     file: UploadFile = File(..., description="Arquivo TXT ou PDF com o email"),
     sender: str = Form(..., description="Email do remetente"),
-    subject: str = Form(default="Email importado", description="Assunto do email (opcional)")
+    subject: str = Form(default="Email importado", description="Assunto do email (opcional)"),
+    cache: str = Form(default="use", description="Uso do cache: use, bypass ou refresh"),
+    reply: str = Form(default="generate", description="Resposta sugerida: generate, none ou deferred"),
+    provider: Optional[str] = Form(default=None, description="Força um provedor de LLM (ex: gemini, offline)"),
+    routing: Optional[str] = Form(default=None, description="Política de roteamento: fallback, cheapest ou hedged"),
+    x_priority: Optional[str] = Header(default=None, description="interactive (padrão) ou bulk"),
+    x_deadline_ms: Optional[float] = Header(default=None, description="Prazo da requisição em ms")
 ):
     
     try:
@@ -76,20 +315,46 @@ async def classify_email_from_file(
                 status_code=400,
                 detail="Email do remetente inválido"
             )
+        if cache not in CACHE_MODES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Modo de cache inválido. Use: {', '.join(CACHE_MODES)}"
+            )
+        if reply not in REPLY_MODES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Modo de resposta inválido. Use: {', '.join(REPLY_MODES)}"
+            )
+        if provider is not None and provider not in settings.llm_providers:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Provedor de LLM inválido. Use: {', '.join(settings.llm_providers)}"
+            )
+        if routing is not None and routing not in ROUTING_POLICIES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Política de roteamento inválida. Use: {', '.join(ROUTING_POLICIES)}"
+            )
         
-        # Lê conteúdo do arquivo
-        file_content = await file.read()
-        
-        print(f"📁 Arquivo recebido: {file.filename} ({len(file_content)} bytes)")
-        
-        # Extrai texto do arquivo
+        # Extrai texto direto do arquivo temporário do upload (sem carregar tudo em memória)
         try:
-            extracted_text = file_service.extract_text_from_file(
-                file_content=file_content,
+            extraction = await run_in_threadpool(
+                file_service.extract_text_from_stream,
+                stream=file.file,
                 filename=file.filename
             )
+            extracted_text = extraction["text"]
             
-            print(f"✅ Texto extraído: {len(extracted_text)} caracteres")
+            logger.info(
+                "Arquivo extraído",
+                extra={
+                    "file_type": file_service._get_file_extension(file.filename),
+                    "chars": len(extracted_text),
+                    "extraction_ms": extraction["extraction_time_ms"],
+                    "pages_read": extraction["pages_read"],
+                    "total_pages": extraction["total_pages"],
+                }
+            )
             
         except ValueError as e:
             raise HTTPException(
@@ -98,10 +363,19 @@ async def classify_email_from_file(
             )
         
         # Classifica o email extraído
-        resultado = classifier_service.classify_and_respond(
+        options = dict(
             sender=sender,
             subject=subject,
-            body=extracted_text
+            body=extracted_text,
+            cache_mode=cache,
+            reply_mode=reply,
+            provider=provider,
+            routing=routing
+        )
+        resultado = await admitted(
+            request, x_priority, x_deadline_ms, "interactive",
+            lambda: classifier_service.classify_and_respond_async(**options),
+            lambda reason: classifier_service.classify_degraded(**options, reason=reason)
         )
         
         # Prepara resposta com informações do arquivo
@@ -109,31 +383,152 @@ async def classify_email_from_file(
             filename=file.filename,
             file_type=file_service._get_file_extension(file.filename),
             extracted_text_preview=extracted_text[:500] + "..." if len(extracted_text) > 500 else extracted_text,
+            extraction_time_ms=extraction["extraction_time_ms"],
+            pages_read=extraction["pages_read"],
+            total_pages=extraction["total_pages"],
+            truncated=extraction["truncated"],
             category=resultado["category"],
             confidence=resultado["confidence"],
             suggested_reply=resultado["suggested_reply"],
-            keywords=resultado["keywords"]
+            reply_id=resultado["reply_id"],
+            keywords=resultado["keywords"],
+            usage=resultado["usage"],
+            degraded=resultado.get("degraded")
         )
     
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Erro no processamento do arquivo: {e}")
+        logger.exception("Erro no processamento do arquivo")
         raise HTTPException(
             status_code=500,
             detail=f"Erro ao processar arquivo: {str(e)}"
         )
 
+@app.get("/reply/{reply_id}", response_model=ReplyResponse)
+async def get_deferred_reply(reply_id: str, request: Request):
+    """Gera (na primeira vez) e devolve a resposta de um email classificado com reply=deferred"""
+    try:
+        resultado = await run_until_disconnect(request, classifier_service.redeem_reply(reply_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Erro ao gerar resposta adiada")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao gerar resposta: {str(e)}"
+        )
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="reply_id não encontrado ou expirado")
+    return ReplyResponse(**resultado)
+
+@app.post("/feedback", response_model=FeedbackResponse)
+async def submit_feedback(data: FeedbackRequest):
+    """Registra a categoria correta de um email e atualiza o modelo local, sem reiniciar"""
+    try:
+        resultado = await run_in_threadpool(
+            feedback_service.record,
+            data.sender, data.subject, data.body, data.category, data.predicted_category
+        )
+        return FeedbackResponse(**resultado)
+    except Exception as e:
+        logger.exception("Erro ao aplicar correção")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao aplicar correção: {str(e)}"
+        )
+
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+async def submit_job(
+    file: UploadFile = File(..., description="Arquivo JSONL (sender, subject, body, id opcional) ou mbox"),
+    mode: str = Form(default="classify", description="classify (só categoria) ou full (categoria e resposta)")
+):
+    """Cria um job de classificação em massa; o processamento segue em segundo plano"""
+    if mode not in JOB_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Modo inválido. Use: {', '.join(JOB_MODES)}"
+        )
+    try:
+        job = await run_in_threadpool(job_service.submit, stream=file.file, filename=file.filename, mode=mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    job_service.start()
+    return JobStatus(**job)
+
+@app.get("/jobs", response_model=List[JobStatus])
+async def list_jobs(limit: int = 50):
+    return [JobStatus(**job) for job in await run_in_threadpool(job_service.list, limit)]
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Progresso e vazão (emails/s) do job"""
+    job = await run_in_threadpool(job_service.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return JobStatus(**job)
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str):
+    """Resultados já gravados, em JSONL na ordem do arquivo (pode ser chamado com o job em andamento)"""
+    if await run_in_threadpool(job_service.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return StreamingResponse(
+        job_service.iter_results(job_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{job_id}.jsonl"'}
+    )
+
+@app.delete("/jobs/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    if not await run_in_threadpool(job_service.cancel, job_id):
+        job = await run_in_threadpool(job_service.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job não encontrado")
+        raise HTTPException(status_code=409, detail=f"Job já está '{job['status']}'")
+    return JobStatus(**await run_in_threadpool(job_service.get, job_id))
+
 @app.get("/")
 async def root():
     return {"message": "Email Classifier AI está funcionando!"}
 
 @app.get("/health")
 async def health_check():
-    """Verifica status da API"""
+    """Verifica status da API (não força a inicialização dos serviços)"""
     return {
         "status": "ok", 
         "message": "Email Classifier AI está funcionando",
         "supported_formats": file_service.SUPPORTED_FORMATS,
-        "max_file_size_mb": file_service.MAX_FILE_SIZE / 1024 / 1024
+        "max_file_size_mb": file_service.MAX_FILE_SIZE / 1024 / 1024,
+        "cache": cache_service.stats() if is_initialized(cache_service) else None,
+        "near_duplicates": near_duplicate_index.stats() if is_initialized(near_duplicate_index) else None,
+        "llm": llm_router.stats() if is_initialized(llm_router) else None,
+        "admission": admission_controller.stats() if is_initialized(admission_controller) else None,
+        "local_model": live_local_model.stats() if is_initialized(live_local_model) else None,
+        "gemini": gemini_service.timing_summary() if is_initialized(gemini_service) else None,
+        "gemini_resilience": gemini_service.resilience_stats() if is_initialized(gemini_service) else None
     }
+
+@app.get("/ready")
+async def readiness_check():
+    """Inicializa os serviços e responde 200 quando a API pode atender"""
+    try:
+        await run_in_threadpool(classifier_service.warm_up)
+    except Exception as e:
+        raise HTTPException(
+            status_code=503,
+            detail={"error": str(e), "missing_nltk_resources": missing_resources()}
+        )
+    return {"status": "ready"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métricas no formato texto do Prometheus (latência por etapa, fallbacks, erros do Gemini)"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.delete("/cache")
+async def flush_cache():
+    """Esvazia o cache de resultados e o índice de quase duplicados (memória e disco)"""
+    cache_service.clear()
+    near_duplicate_index.clear()
+    return {"status": "ok", "cache": cache_service.stats(), "near_duplicates": near_duplicate_index.stats()}
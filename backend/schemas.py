@@ -1,11 +1,24 @@
 from pydantic import BaseModel, Field, validator
+from config import settings
+from services.cache_service import CACHE_MODES
+from services.classifier_service import REPLY_MODES
+from services.llm_router import ROUTING_POLICIES
+from services.local_model import LABELS
 from typing import Optional, List
 
+DEGRADED_DESCRIPTION = (
+    "Motivo quando o resultado saiu sem o LLM para cumprir o prazo (deadline, overload ou timeout)"
+)
+
 class MessageRequest(BaseModel):
     """Schema para requisição de classificação via texto"""
     sender: str = Field(..., description="Email do remetente")
     subject: str = Field(..., description="Assunto do email")
     body: str = Field(..., description="Corpo do email")
+    cache: str = Field(default="use", description="Uso do cache: use, bypass ou refresh")
+    reply: str = Field(default="generate", description="Resposta sugerida: generate, none (só classifica) ou deferred")
+    provider: Optional[str] = Field(None, description="Força um provedor de LLM (ex: gemini, offline); padrão: LLM_PROVIDERS")
+    routing: Optional[str] = Field(None, description="Política de roteamento: fallback, cheapest ou hedged; padrão: LLM_ROUTING")
     
     @validator('sender')
     def validate_sender(cls, v):
@@ -13,20 +26,153 @@ class MessageRequest(BaseModel):
             raise ValueError('Email inválido')
         return v
 
+    @validator('cache')
+    def validate_cache(cls, v):
+        if v not in CACHE_MODES:
+            raise ValueError(f"Modo de cache inválido. Use: {', '.join(CACHE_MODES)}")
+        return v
+
+    @validator('reply')
+    def validate_reply(cls, v):
+        if v not in REPLY_MODES:
+            raise ValueError(f"Modo de resposta inválido. Use: {', '.join(REPLY_MODES)}")
+        return v
+
+    @validator('provider')
+    def validate_provider(cls, v):
+        return validate_llm_provider(v)
+
+    @validator('routing')
+    def validate_routing(cls, v):
+        return validate_llm_routing(v)
+
+def validate_llm_provider(v: Optional[str]) -> Optional[str]:
+    if v is not None and v not in settings.llm_providers:
+        raise ValueError(f"Provedor de LLM inválido. Use: {', '.join(settings.llm_providers)}")
+    return v
+
+def validate_llm_routing(v: Optional[str]) -> Optional[str]:
+    if v is not None and v not in ROUTING_POLICIES:
+        raise ValueError(f"Política de roteamento inválida. Use: {', '.join(ROUTING_POLICIES)}")
+    return v
+
+class LLMUsage(BaseModel):
+    """Chamadas e tokens do Gemini gastos pela requisição"""
+    llm_calls: int = Field(0, description="Chamadas ao Gemini (inclui retentativas)")
+    prompt_tokens: int = Field(0, description="Tokens enviados")
+    output_tokens: int = Field(0, description="Tokens gerados")
+
 class MessageResponse(BaseModel):
     """Schema para resposta da classificação"""
     category: str = Field(..., description="Categoria: Produtivo ou Improdutivo")
     confidence: float = Field(..., description="Confiança da classificação (0-1)")
-    suggested_reply: str = Field(..., description="Resposta sugerida")
+    suggested_reply: Optional[str] = Field(None, description="Resposta sugerida (vazia nos modos none e deferred)")
+    reply_id: Optional[str] = Field(None, description="Handle da resposta adiada, para GET /reply/{reply_id}")
     keywords: List[str] = Field(default=[], description="Palavras-chave extraídas")
     processed_text: Optional[str] = Field(None, description="Texto pré-processado")
+    usage: LLMUsage = Field(default_factory=LLMUsage, description="Uso do Gemini nesta requisição")
+    degraded: Optional[str] = Field(None, description=DEGRADED_DESCRIPTION)
+
+class FeedbackRequest(BaseModel):
+    """Schema para a correção de uma classificação por um operador"""
+    sender: str = Field(..., description="Email do remetente")
+    subject: str = Field(..., description="Assunto do email")
+    body: str = Field(..., description="Corpo do email")
+    category: str = Field(..., description="Categoria correta: Produtivo ou Improdutivo")
+    predicted_category: Optional[str] = Field(None, description="Categoria que a API tinha devolvido (registro)")
+
+    @validator('category')
+    def validate_category(cls, v):
+        if v not in LABELS:
+            raise ValueError(f"Categoria inválida. Use: {', '.join(LABELS)}")
+        return v
+
+class FeedbackResponse(BaseModel):
+    """Schema para o resultado de uma correção"""
+    version: int = Field(..., description="Versão do snapshot do modelo local publicada com a correção")
+    applied: int = Field(..., description="Correções do log aplicadas neste snapshot")
+    feedback_records: int = Field(..., description="Total de correções já aprendidas pelo modelo")
+    probability_before: Optional[float] = Field(None, description="P(Produtivo) do email antes da correção (sem modelo: vazio)")
+    probability_after: float = Field(..., description="P(Produtivo) do email no snapshot novo")
+    served_locally: bool = Field(..., description="Se o email agora é resolvido pelo modelo local, sem o LLM")
+
+class ReplyResponse(BaseModel):
+    """Schema para o resgate de uma resposta adiada"""
+    reply_id: str = Field(..., description="Handle recebido na classificação")
+    category: str = Field(..., description="Categoria usada para gerar a resposta")
+    suggested_reply: str = Field(..., description="Resposta sugerida")
+    usage: LLMUsage = Field(default_factory=LLMUsage, description="Uso do Gemini nesta requisição")
 
 class FileUploadResponse(BaseModel):
     """Schema para resposta de upload de arquivo"""
     filename: str = Field(..., description="Nome do arquivo enviado")
     file_type: str = Field(..., description="Tipo do arquivo (.txt ou .pdf)")
     extracted_text_preview: str = Field(..., description="Preview do texto extraído")
+    extraction_time_ms: float = Field(..., description="Tempo de extração do texto (ms)")
+    pages_read: Optional[int] = Field(None, description="Páginas lidas (PDF)")
+    total_pages: Optional[int] = Field(None, description="Total de páginas do arquivo (PDF)")
+    truncated: bool = Field(False, description="Se a extração parou no limite de caracteres")
     category: str = Field(..., description="Categoria: Produtivo ou Improdutivo")
     confidence: float = Field(..., description="Confiança da classificação")
-    suggested_reply: str = Field(..., description="Resposta sugerida")
-    keywords: List[str] = Field(default=[], description="Palavras-chave extraídas")
\ No newline at end of file
+    suggested_reply: Optional[str] = Field(None, description="Resposta sugerida (vazia nos modos none e deferred)")
+    reply_id: Optional[str] = Field(None, description="Handle da resposta adiada, para GET /reply/{reply_id}")
+    keywords: List[str] = Field(default=[], description="Palavras-chave extraídas")
+    usage: LLMUsage = Field(default_factory=LLMUsage, description="Uso do Gemini nesta requisição")
+    degraded: Optional[str] = Field(None, description=DEGRADED_DESCRIPTION)
+
+class BatchClassifyRequest(BaseModel):
+    """Schema para classificação de vários emails de uma vez"""
+    emails: List[MessageRequest] = Field(..., description="Emails a classificar")
+    provider: Optional[str] = Field(None, description="Força um provedor de LLM para o lote todo")
+    routing: Optional[str] = Field(None, description="Política de roteamento do lote: fallback, cheapest ou hedged")
+
+    @validator('emails')
+    def validate_emails(cls, v):
+        if not v:
+            raise ValueError('Lista de emails vazia')
+        if len(v) > settings.BATCH_MAX_EMAILS:
+            raise ValueError(f'Máximo de {settings.BATCH_MAX_EMAILS} emails por requisição')
+        return v
+
+    @validator('provider')
+    def validate_provider(cls, v):
+        return validate_llm_provider(v)
+
+    @validator('routing')
+    def validate_routing(cls, v):
+        return validate_llm_routing(v)
+
+class BatchItemResult(BaseModel):
+    """Resultado de um email dentro do lote"""
+    category: str = Field(..., description="Categoria: Produtivo ou Improdutivo")
+    confidence: float = Field(..., description="Confiança da classificação (0-1)")
+    keywords: List[str] = Field(default=[], description="Palavras-chave extraídas")
+    source: str = Field(..., description="Origem da categoria: gemini, offline, local, cache, near_duplicate, fallback ou noreply")
+    local_ms: float = Field(..., description="Tempo de processamento local do item (ms)")
+    llm_ms: float = Field(..., description="Parcela do tempo da chamada ao Gemini atribuída ao item (ms)")
+    latency_ms: float = Field(..., description="Latência total atribuída ao item (ms)")
+
+class BatchClassifyResponse(BaseModel):
+    """Schema para resposta da classificação em lote"""
+    results: List[BatchItemResult] = Field(..., description="Resultados na mesma ordem da requisição")
+    llm_calls: int = Field(..., description="Chamadas ao Gemini efetivamente feitas")
+    total_time_ms: float = Field(..., description="Tempo total de processamento (ms)")
+    degraded: Optional[str] = Field(None, description=DEGRADED_DESCRIPTION)
+
+class JobStatus(BaseModel):
+    """Estado e vazão de um job de classificação em massa"""
+    id: str = Field(..., description="Identificador do job")
+    filename: str = Field(..., description="Arquivo enviado (.jsonl ou .mbox)")
+    mode: str = Field(..., description="classify (só categoria) ou full (categoria e resposta)")
+    status: str = Field(..., description="queued, running, done, failed ou cancelled")
+    total: int = Field(..., description="Emails no job")
+    done: int = Field(..., description="Emails já processados e gravados")
+    pending: int = Field(..., description="Emails restantes")
+    retries: int = Field(..., description="Emails devolvidos à fila por falha do Gemini")
+    llm_calls: int = Field(..., description="Chamadas ao Gemini feitas pelo job (modo classify)")
+    active_seconds: float = Field(..., description="Tempo somado dos blocos processados (s)")
+    emails_per_sec: float = Field(..., description="Vazão do job em emails por segundo")
+    eta_seconds: Optional[float] = Field(None, description="Estimativa de tempo restante (s)")
+    created_at: float = Field(..., description="Criação (timestamp Unix)")
+    finished_at: Optional[float] = Field(None, description="Conclusão (timestamp Unix)")
+    error: Optional[str] = Field(None, description="Erro que interrompeu o job")
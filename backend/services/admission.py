@@ -0,0 +1,251 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from config import settings
+from services.lazy import LazyService
+from services.logging_setup import get_logger
+from services.metrics import ADMISSION_DECISIONS, ADMISSION_QUEUE_DEPTH, ADMISSION_WAIT_SECONDS
+
+logger = get_logger("admission")
+
+PRIORITY_CLASSES = ("interactive", "bulk")
+
+T = TypeVar("T")
+
+
+class AdmissionRejected(Exception):
+    """Fila cheia para a classe: a requisição foi descartada (HTTP 429)"""
+
+    def __init__(self, priority: str, retry_after: float):
+        super().__init__(f"Fila de admissão '{priority}' cheia")
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Admissão das classificações por prioridade e prazo
+
+    No máximo `max_concurrency` classificações rodam juntas no processo.
+    Interactive (frontend) sempre passa na frente; bulk (lotes, jobs,
+    integrações) ocupa no máximo `bulk_slots` e só começa sem interactive
+    esperando, então um backfill não empurra o p99 da interface.
+
+    Cada requisição traz um prazo. Se pela posição na fila e pelo tempo
+    de serviço observado (média móvel) o prazo não vai ser cumprido, ela
+    é degradada na hora (fallback heurístico, sem LLM) em vez de esperar
+    e estourar; o mesmo vale se o prazo vencer na fila ou durante a
+    execução. Com a fila da classe cheia, bulk é descartado
+    (AdmissionRejected) e interactive é degradado.
+
+    Um controlador por processo: com gunicorn cada worker tem o seu.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        bulk_share: float,
+        queue_limits: Dict[str, int],
+        service_estimate: float = 1.0,
+        alpha: float = 0.2
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.bulk_slots = max(1, int(self.max_concurrency * bulk_share))
+        self.queue_limits = queue_limits
+        self.service_estimate = service_estimate
+        self.alpha = alpha
+        self._active = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {priority: deque() for priority in PRIORITY_CLASSES}
+
+    # ------------------------------------------------------------ slots
+
+    def _can_start(self, priority: str) -> bool:
+        if sum(self._active.values()) >= self.max_concurrency:
+            return False
+        if priority == "bulk":
+            return self._active["bulk"] < self.bulk_slots and not self._waiters["interactive"]
+        return True
+
+    def _estimated_start(self, priority: str) -> float:
+        """Segundos até um slot, pela fila à frente e pelo tempo médio de serviço"""
+        if priority == "interactive":
+            ahead, slots = len(self._waiters["interactive"]), self.max_concurrency
+        else:
+            ahead, slots = len(self._waiters["interactive"]) + len(self._waiters["bulk"]), self.bulk_slots
+        return (ahead // slots + (0 if self._can_start(priority) else 1)) * self.service_estimate
+
+    def _grant(self, priority: str):
+        self._active[priority] += 1
+
+    def _dispatch(self):
+        """Entrega slots livres aos que esperam, interactive primeiro"""
+        for priority in PRIORITY_CLASSES:
+            waiters = self._waiters[priority]
+            while waiters and self._can_start(priority):
+                future = waiters.popleft()
+                ADMISSION_QUEUE_DEPTH.dec(priority=priority)
+                if not future.done():
+                    self._grant(priority)
+                    future.set_result(True)
+
+    def _release(self, priority: str, elapsed: Optional[float]):
+        self._active[priority] -= 1
+        if elapsed is not None:
+            self.service_estimate += self.alpha * (elapsed - self.service_estimate)
+        self._dispatch()
+
+    async def _acquire(self, priority: str, deadline: Optional[float]) -> Optional[str]:
+        """
+        Espera um slot; retorna None quando ganhou ou o motivo da degradação
+        (deadline, overload). Sem prazo (deadline None) espera o quanto for
+        preciso e não tem limite de fila (jobs internos).
+        """
+        if not self._waiters[priority] and self._can_start(priority):
+            self._grant(priority)
+            return None
+        if deadline is not None:
+            if len(self._waiters[priority]) >= self.queue_limits.get(priority, 0):
+                if priority == "bulk":
+                    ADMISSION_DECISIONS.inc(priority=priority, outcome="shed")
+                    raise AdmissionRejected(priority, retry_after=self._estimated_start(priority))
+                return "overload"
+            if time.monotonic() + self._estimated_start(priority) + self.service_estimate > deadline:
+                return "deadline"
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(future)
+        ADMISSION_QUEUE_DEPTH.inc(priority=priority)
+        started = time.monotonic()
+        # Começar depois disso já não deixa tempo para o serviço
+        latest_start = None if deadline is None else deadline - self.service_estimate - started
+        try:
+            await asyncio.wait_for(asyncio.shield(future), latest_start)
+            return None
+        except asyncio.TimeoutError:
+            # O slot pode ter sido entregue no mesmo instante em que o prazo venceu
+            return None if future.done() and not future.cancelled() else "deadline"
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(priority, None)
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+                self._waiters[priority].remove(future)
+                ADMISSION_QUEUE_DEPTH.dec(priority=priority)
+            ADMISSION_WAIT_SECONDS.observe(time.monotonic() - started, priority=priority)
+
+    # --------------------------------------------------------------- uso
+
+    def deadline_for(self, priority: str, deadline_ms: Optional[float] = None) -> float:
+        """Prazo absoluto (time.monotonic) a partir do orçamento em ms ou do padrão da classe"""
+        if deadline_ms is None:
+            seconds = (
+                settings.ADMISSION_INTERACTIVE_DEADLINE_SECONDS if priority == "interactive"
+                else settings.ADMISSION_BULK_DEADLINE_SECONDS
+            )
+        else:
+            seconds = deadline_ms / 1000
+        return time.monotonic() + seconds
+
+    async def run(
+        self,
+        priority: str,
+        deadline: float,
+        work: Callable[[], Awaitable[T]],
+        degrade: Callable[[str], T]
+    ) -> T:
+        """
+        Executa work() num slot; se o prazo não der, devolve degrade(motivo)
+
+        degrade roda numa thread (NLP e léxicos são síncronos) para não
+        travar o event loop justamente quando ele está sobrecarregado.
+        Levanta AdmissionRejected quando a requisição bulk é descartada.
+        """
+        if not settings.ADMISSION_ENABLED:
+            return await work()
+        reason = await self._acquire(priority, deadline)
+        if reason is not None:
+            ADMISSION_DECISIONS.inc(priority=priority, outcome=f"degraded_{reason}")
+            logger.info("Requisição degradada", extra={"priority": priority, "reason": reason})
+            return await asyncio.to_thread(degrade, reason)
+
+        ADMISSION_DECISIONS.inc(priority=priority, outcome="admitted")
+        started = time.monotonic()
+        elapsed = None
+        try:
+            result = await asyncio.wait_for(work(), max(0.0, deadline - started))
+            elapsed = time.monotonic() - started
+            return result
+        except asyncio.TimeoutError:
+            ADMISSION_DECISIONS.inc(priority=priority, outcome="degraded_timeout")
+            logger.info("Prazo estourado durante a classificação", extra={"priority": priority})
+            elapsed = time.monotonic() - started
+        finally:
+            self._release(priority, elapsed)
+        return await asyncio.to_thread(degrade, "timeout")
+
+    @asynccontextmanager
+    async def admit(self, priority: str, deadline: float):
+        """
+        Slot para trabalho sem duração prevista (streams SSE): entra com o
+        motivo da degradação ou None com o slot garantido, que é liberado na
+        saída do bloco, inclusive quando o gerador é fechado ou cancelado.
+        O prazo só decide a espera na fila; depois de admitido não há timeout.
+        """
+        if not settings.ADMISSION_ENABLED:
+            yield None
+            return
+        reason = await self._acquire(priority, deadline)
+        if reason is not None:
+            ADMISSION_DECISIONS.inc(priority=priority, outcome=f"degraded_{reason}")
+            logger.info("Requisição degradada", extra={"priority": priority, "reason": reason})
+            yield reason
+            return
+
+        ADMISSION_DECISIONS.inc(priority=priority, outcome="admitted")
+        started = time.monotonic()
+        elapsed = None
+        try:
+            yield None
+            elapsed = time.monotonic() - started
+        finally:
+            self._release(priority, elapsed)
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "bulk"):
+        """Slot sem prazo nem limite de fila, para trabalho interno (jobs)"""
+        if not settings.ADMISSION_ENABLED:
+            yield
+            return
+        await self._acquire(priority, None)
+        started = time.monotonic()
+        elapsed = None
+        try:
+            yield
+            elapsed = time.monotonic() - started
+        finally:
+            self._release(priority, elapsed)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "bulk_slots": self.bulk_slots,
+            "active": dict(self._active),
+            "queued": {priority: len(waiters) for priority, waiters in self._waiters.items()},
+            "service_estimate_seconds": round(self.service_estimate, 3),
+        }
+
+
+# Instância singleton (construída no primeiro uso)
+admission_controller = LazyService(lambda: AdmissionController(
+    max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+    bulk_share=settings.ADMISSION_BULK_SHARE,
+    queue_limits={
+        "interactive": settings.ADMISSION_INTERACTIVE_QUEUE,
+        "bulk": settings.ADMISSION_BULK_QUEUE,
+    },
+))
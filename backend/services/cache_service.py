@@ -0,0 +1,225 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config import settings
+from services.lazy import LazyService
+
+_SUBJECT_PREFIX = re.compile(r'^\s*((re|res|fw|fwd|enc)\s*:\s*)+', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+CACHE_MODES = ("use", "bypass", "refresh")
+
+
+class ResultCache:
+    """
+    Cache de resultados endereçado por conteúdo
+
+    Nível 1: LRU em memória. Nível 2 (opcional): SQLite em disco, com TTL e
+    limite de tamanho em bytes (remove as entradas menos acessadas primeiro).
+    Os valores precisam ser serializáveis em JSON.
+
+    Leituras não escrevem no disco: o último acesso de cada chave fica
+    pendente em memória e vai para o SQLite junto com a próxima gravação
+    (ou quando passam de max_entries chaves pendentes).
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: int,
+        db_path: Optional[str] = None,
+        max_bytes: int = 0
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "memory_evictions": 0, "disk_evictions": 0}
+
+        self._db = None
+        self._disk_bytes = 0
+        self._touched: Dict[str, float] = {}
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed_at)")
+            self._db.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+            self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    @staticmethod
+    def make_key(namespace: str, sender: str, subject: str, body: str, temperature: float, extra: str = "") -> str:
+        """
+        Gera a chave a partir do conteúdo normalizado do email
+
+        Usa só o domínio do remetente, ignora caixa, espaços repetidos e
+        prefixos de resposta/encaminhamento no assunto. Modelo e versão do
+        prompt entram na chave para que mudanças invalidem o cache.
+        """
+        domain = sender.rsplit('@', 1)[-1].strip().lower()
+        subject_norm = _WHITESPACE.sub(' ', _SUBJECT_PREFIX.sub('', subject)).strip().lower()
+        body_norm = _WHITESPACE.sub(' ', body).strip().lower()
+        parts = [
+            namespace, domain, subject_norm, body_norm,
+            settings.GEMINI_MODEL, settings.PROMPT_VERSION, f"{temperature:.3f}", extra
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, size, expires_at = entry
+                if expires_at >= now:
+                    self._memory.move_to_end(key)
+                    self._touch(key, now)
+                    self._stats["hits"] += 1
+                    return json.loads(value)
+                self._drop_memory(key)
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, size, expires_at FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[2] >= now:
+                    self._touch(key, now)
+                    self._put_memory(key, row[0], row[1], row[2])
+                    self._stats["hits"] += 1
+                    self._stats["disk_hits"] += 1
+                    return json.loads(row[0])
+                if row is not None:
+                    self._delete_disk(key)
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any):
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._put_memory(key, data, size, expires_at)
+            if self._db is not None:
+                self._delete_disk(key)
+                self._db.execute(
+                    "INSERT INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, data, size, expires_at, now)
+                )
+                self._disk_bytes += size
+                self._flush_touched()
+                self._evict_disk()
+                self._db.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._drop_memory(key)
+            if self._db is not None:
+                self._delete_disk(key)
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._touched.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache")
+                self._db.commit()
+                self._disk_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_enabled": self._db is not None,
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def _put_memory(self, key: str, data: str, size: int, expires_at: float):
+        self._drop_memory(key)
+        self._memory[key] = (data, size, expires_at)
+        self._memory_bytes += size
+        while len(self._memory) > self.max_entries:
+            _, (_, old_size, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= old_size
+            self._stats["memory_evictions"] += 1
+
+    def _drop_memory(self, key: str):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[1]
+
+    def _touch(self, key: str, now: float):
+        """Anota o acesso para a próxima gravação em vez de um UPDATE por leitura"""
+        if self._db is None:
+            return
+        self._touched[key] = now
+        if len(self._touched) > self.max_entries:
+            self._flush_touched()
+            self._db.commit()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._db.executemany(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _delete_disk(self, key: str):
+        self._touched.pop(key, None)
+        row = self._db.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._disk_bytes -= row[0]
+
+    def _evict_disk(self):
+        if not self.max_bytes or self._disk_bytes <= self.max_bytes:
+            return
+        self._db.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+        cursor = self._db.execute("SELECT key, size FROM cache ORDER BY accessed_at")
+        victims = []
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        for key, size in cursor:
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM cache WHERE key = ?", victims)
+        self._stats["disk_evictions"] += len(victims)
+        self._disk_bytes = total
+
+
+# Instância singleton (construída no primeiro uso)
+cache_service = LazyService(lambda: ResultCache(
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.CACHE_TTL_SECONDS,
+    db_path=settings.CACHE_DB_PATH or None,
+    max_bytes=settings.CACHE_MAX_BYTES,
+))
+
+# Pedidos de resposta adiada (reply_mode=deferred), resgatados em GET /reply/{id}
+reply_handle_store = LazyService(lambda: ResultCache(
+    max_entries=settings.REPLY_HANDLE_MAX_ENTRIES,
+    ttl_seconds=settings.REPLY_HANDLE_TTL_SECONDS,
+    db_path=settings.REPLY_HANDLE_DB_PATH or None,
+    max_bytes=settings.CACHE_MAX_BYTES,
+))
@@ -1,104 +1,1195 @@
 from config import settings
 from services.nlp_service import nlp_service
-from services.gemini_service import gemini_service
-from typing import Dict, Tuple
-from nltk.sentiment import SentimentIntensityAnalyzer
-import os, nltk, pathlib
+from services.gemini_service import CombinedResponseError, begin_usage
+from services.cache_service import cache_service, reply_handle_store
+from services.keyword_automaton import fallback_lexicon, noreply_lexicon
+from services.llm_provider import LLMProvider
+from services.llm_router import llm_router
+from services.local_model import decide
+from services.near_duplicate import near_duplicate_index
+from services.offline_provider import offline_provider
+from services.prompt_budget import prompt_budget
+from services.lazy import LazyService, initialize
+from services.logging_setup import begin_request, get_logger
+from services.metrics import CLASSIFICATIONS, FALLBACKS, timed
+from services.resilience import GeminiUnavailableError
+from services.single_flight import SingleFlight
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio, time
 from datetime import datetime
 
-_NOREPLY_PATTERNS = ("noreply", "no-reply", "donotreply", "do-not-reply", "automat", "auto-mail")
+logger = get_logger("classifier")
 
-def ensure_nltk_ready():
-    nltk_dir = os.getenv("NLTK_DATA", "/tmp/nltk_data")
-    pathlib.Path(nltk_dir).mkdir(parents=True, exist_ok=True)
-    if nltk_dir not in nltk.data.path:
-        nltk.data.path.append(nltk_dir)
-    for path, pkg in [("sentiment/vader_lexicon","vader_lexicon")]:
-        try:
-            nltk.data.find(path)
-            print(f"✅ NLTK resource {pkg} encontrado")
-        except LookupError:
-            print(f"⬇️ Baixando NLTK resource {pkg}...")
-            nltk.download(pkg, download_dir=nltk_dir)
+_SIGNATURE_MARKERS = ("Atenciosamente", "Abraços", "Cordialmente")
+# Lugar do nome do remetente nas respostas guardadas como template no índice de quase duplicados
+_REPLY_NAME_SLOT = "{remetente}"
+
+# generate: gera a resposta na hora; none: só classifica; deferred: devolve
+# um reply_id e a resposta só é gerada quando alguém pede (GET /reply/{id})
+REPLY_MODES = ("generate", "none", "deferred")
+
+class ReplyStreamCleaner:
+    """
+    Versão incremental de ClassifierService._clean_response
+
+    Segura o final de cada pedaço (pode ser o começo de um marcador de
+    assinatura ou espaço que seria removido) e para de emitir assim que um
+    marcador aparece.
+    """
+
+    _HOLD = max(len(m) for m in _SIGNATURE_MARKERS) - 1
+
+    def __init__(self):
+        self._pending = ""
+        self._parts: List[str] = []
+        self.stopped = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, chunk: str) -> str:
+        """Recebe um pedaço do stream e retorna o que já pode ser enviado"""
+        if self.stopped:
+            return ""
+        self._pending += chunk
+
+        cuts = [i for i in (self._pending.find(m) for m in _SIGNATURE_MARKERS) if i != -1]
+        if cuts:
+            self._pending = self._pending[:min(cuts)]
+            self.stopped = True
+            return ""
+
+        ready = self._pending[:max(0, len(self._pending) - self._HOLD)]
+        # Espaço no fim pode preceder um marcador: só sai junto com o próximo texto
+        ready = ready.rstrip()
+        self._pending = self._pending[len(ready):]
+        return self._emit(ready)
+
+    def finish(self) -> str:
+        """Libera o restante e aplica a pontuação final"""
+        tail = self._emit(self._pending.rstrip())
+        self._pending = ""
+        text = self.text
+        if text and not text.endswith(('.', '!', '?')):
+            self._parts.append('.')
+            tail += '.'
+        return tail
+
+    def _emit(self, text: str) -> str:
+        if not self._parts:
+            text = text.lstrip()
+        if text:
+            self._parts.append(text)
+        return text
 
 class ClassifierService:
     def __init__(self):
-        print("🚀 INICIALIZANDO ClassifierService...")
+        logger.debug("Inicializando ClassifierService")
         self.nlp = nlp_service
-        self.gemini = gemini_service
-        ensure_nltk_ready()
-        self.sentiment = SentimentIntensityAnalyzer()
-        print("✅ ClassifierService PRONTO!")
+        self.llm = llm_router
+        self.offline = offline_provider
+        self.cache = cache_service
+        self.reply_handles = reply_handle_store
+        self.budget = prompt_budget
+        self.near_duplicates = near_duplicate_index
+        self.fallback_lexicon = fallback_lexicon
+        self.noreply_lexicon = noreply_lexicon
+        # O mesmo modelo do provedor offline (os pesos ficam uma vez só na
+        # memória), trocado a quente quando o /feedback publica um snapshot
+        self.local_model = self.offline.local_model
+        # Emails idênticos que chegam juntos dividem a mesma chamada ao LLM
+        self.inflight = {
+            operation: SingleFlight(operation, settings.COALESCE_WAIT_SECONDS)
+            for operation in ("classify", "reply", "combined")
+        }
+        logger.info("ClassifierService pronto")
+
+    def warm_up(self):
+        """Inicializa todas as dependências (usado pelo /ready e pelo EAGER_INIT)"""
+        for service in (
+            self.nlp, self.llm, self.offline, self.cache, self.budget, self.near_duplicates,
+            self.fallback_lexicon, self.noreply_lexicon
+        ):
+            initialize(service)
+        self.offline.sentiment
+
+    def classify_and_respond(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        cache_mode: str = "use",
+        reply_mode: str = "generate",
+        provider: Optional[str] = None,
+        routing: Optional[str] = None
+    ) -> Dict[str, any]:
+        start_time = datetime.now()
+        self._log_request(sender, subject, body)
+        self.llm.select(provider, routing)
+        usage = begin_usage()
+
+        noreply = self._noreply_result(sender)
+        if noreply:
+            noreply["usage"] = usage
+            return noreply
+
+        texto_original, texto_processado, keywords = self._prepare_text(subject, body)
+
+        if self._combined_applies(reply_mode):
+            category, confidence, resposta = self._classify_and_reply_combined(
+                sender, subject, body, texto_original, texto_processado, keywords, cache_mode
+            )
+            return self._build_result(
+                start_time, category, confidence, resposta, keywords, texto_processado, None, usage
+            )
+
+        # CLASSIFICAÇÃO (modelo local → cache → Gemini)
+        category, confidence = self._classify(sender, subject, body, texto_original, texto_processado, cache_mode)
+
+        # RESPOSTA COM GEMINI (só no modo generate)
+        resposta, reply_id = None, None
+        if reply_mode == "generate":
+            resposta = self._respond(category, sender, subject, body, texto_processado, keywords, cache_mode)
+        elif reply_mode == "deferred":
+            resposta, reply_id = self._defer_reply(category, sender, subject, body, keywords, cache_mode)
 
-    def classify_and_respond(self, sender: str, subject: str, body: str) -> Dict[str, any]:
+        return self._build_result(
+            start_time, category, confidence, resposta, keywords, texto_processado, reply_id, usage
+        )
+
+    async def classify_and_respond_async(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        cache_mode: str = "use",
+        reply_mode: str = "generate",
+        provider: Optional[str] = None,
+        routing: Optional[str] = None
+    ) -> Dict[str, any]:
+        """
+        Mesmo fluxo de classify_and_respond, mas aguardando o Gemini sem
+        bloquear o event loop. Cancelar a tarefa cancela a chamada em voo.
+        """
         start_time = datetime.now()
-        print(f"\n{'='*60}")
-        print(f"📧 PROCESSANDO EMAIL")
-        print(f"De: {sender}")
-        print(f"Assunto: {subject}")
-        print(f"Corpo: {body[:100]}...")
-        print(f"{'='*60}")
-
-        # Verificar noreply
-        sender_lower = sender.lower()
-        if any(p in sender_lower for p in _NOREPLY_PATTERNS):
-            print(f"🚫 EMAIL NOREPLY DETECTADO - IGNORANDO")
+        self._log_request(sender, subject, body)
+        self.llm.select(provider, routing)
+        usage = begin_usage()
+
+        noreply = self._noreply_result(sender)
+        if noreply:
+            noreply["usage"] = usage
+            return noreply
+
+        # Pré-processamento, modelo local e caches em disco ficam fora do event loop
+        texto_original, texto_processado, keywords = await asyncio.to_thread(self._prepare_text, subject, body)
+
+        if self._combined_applies(reply_mode):
+            category, confidence, resposta = await self._classify_and_reply_combined_async(
+                sender, subject, body, texto_original, texto_processado, keywords, cache_mode
+            )
+            return self._build_result(
+                start_time, category, confidence, resposta, keywords, texto_processado, None, usage
+            )
+
+        category, confidence = await self._classify_async(sender, subject, body, texto_original, texto_processado, cache_mode)
+
+        resposta, reply_id = None, None
+        if reply_mode == "generate":
+            resposta = await self._respond_async(category, sender, subject, body, texto_processado, keywords, cache_mode)
+        elif reply_mode == "deferred":
+            resposta, reply_id = await asyncio.to_thread(
+                self._defer_reply, category, sender, subject, body, keywords, cache_mode
+            )
+
+        return self._build_result(
+            start_time, category, confidence, resposta, keywords, texto_processado, reply_id, usage
+        )
+
+    def classify_degraded(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        cache_mode: str = "use",
+        reply_mode: str = "generate",
+        provider: Optional[str] = None,
+        routing: Optional[str] = None,
+        reason: str = "deadline"
+    ) -> Dict[str, any]:
+        """
+        Resultado sem chamar o LLM, para quando a admissão não consegue
+        cumprir o prazo (services/admission.py): modelo local, cache ou
+        quase duplicado se houver, senão o fallback heurístico e a resposta
+        padrão. No modo deferred o handle é criado normalmente.
+        """
+        start_time = datetime.now()
+        self._log_request(sender, subject, body)
+        self.llm.select(provider, routing)
+        usage = begin_usage()
+
+        noreply = self._noreply_result(sender)
+        if noreply:
+            noreply["usage"] = usage
+            return noreply
+
+        texto_original, texto_processado, keywords = self._prepare_text(subject, body)
+        known = self._known_category(sender, subject, body, texto_processado, cache_mode)
+        if known is None:
+            CLASSIFICATIONS.inc(source="fallback")
+            known = self._fallback_classify(texto_original)
+        category, confidence = known
+
+        resposta, reply_id = None, None
+        if reply_mode == "generate":
+            sender_name = self._extract_sender_name(sender)
+            resposta = self._cache_lookup(self._reply_cache_key(category, sender_name, sender, subject, body), cache_mode)
+            if resposta is None:
+                resposta = self._fallback_response(category, subject)
+        elif reply_mode == "deferred":
+            resposta, reply_id = self._defer_reply(category, sender, subject, body, keywords, cache_mode)
+
+        result = self._build_result(
+            start_time, category, confidence, resposta, keywords, texto_processado, reply_id, usage
+        )
+        result["degraded"] = reason
+        return result
+
+    async def redeem_reply(self, reply_id: str) -> Optional[Dict[str, any]]:
+        """
+        Gera (ou devolve a já gerada) a resposta de um email classificado no
+        modo deferred. Retorna None se o reply_id não existe ou expirou.
+        """
+        begin_request()
+        usage = begin_usage()
+        handle = self.reply_handles.get(reply_id)
+        if handle is None:
+            return None
+
+        resposta = handle.get("reply")
+        if resposta is None:
+            self.llm.select(handle.get("provider"), handle.get("routing"))
+            category, subject, body = handle["category"], handle["subject"], handle["body"]
+            texto_processado = await asyncio.to_thread(self.nlp.preprocess_text, f"{subject}. {body}")
+            resposta = await self._respond_async(
+                category, handle["sender"], subject, body, texto_processado, handle["keywords"], handle["cache_mode"]
+            )
+            # Fallback e mensagem de erro não ficam presos no handle: a próxima consulta tenta de novo
+            if resposta not in (self._fallback_text(category, subject), self.llm.RESPONSE_ERROR_TEXT):
+                handle["reply"] = resposta
+                self.reply_handles.set(reply_id, handle)
+
+        logger.info("Resposta adiada entregue", extra={"llm_calls": usage["llm_calls"]})
+        return {
+            "reply_id": reply_id,
+            "category": handle["category"],
+            "suggested_reply": resposta,
+            "usage": usage,
+        }
+
+    async def classify_and_stream(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        cache_mode: str = "use",
+        reply_mode: str = "generate",
+        provider: Optional[str] = None,
+        routing: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, any]]]:
+        """
+        Classifica e gera a resposta em streaming
+
+        Produz eventos (nome, dados): "classification" assim que a categoria
+        é conhecida, "reply" com cada pedaço da resposta já limpa e "done"
+        com a resposta completa e o uso do Gemini. Nos modos none e deferred
+        não há stream de resposta: "done" vem logo após a classificação.
+        """
+        self._log_request(sender, subject, body)
+        self.llm.select(provider, routing)
+        usage = begin_usage()
+
+        noreply = self._noreply_result(sender)
+        if noreply:
+            yield "classification", self._classification_event(
+                noreply["category"], noreply["confidence"], noreply["keywords"], noreply["processed_text"]
+            )
+            yield "reply", {"text": noreply["suggested_reply"]}
+            yield "done", self._done_event(noreply["suggested_reply"], False, None, usage)
+            return
+
+        texto_original, texto_processado, keywords = await asyncio.to_thread(self._prepare_text, subject, body)
+        category, confidence = await self._classify_async(
+            sender, subject, body, texto_original, texto_processado, cache_mode
+        )
+        yield "classification", self._classification_event(category, confidence, keywords, texto_processado)
+
+        if reply_mode != "generate":
+            resposta, reply_id = None, None
+            if reply_mode == "deferred":
+                resposta, reply_id = await asyncio.to_thread(
+                    self._defer_reply, category, sender, subject, body, keywords, cache_mode
+                )
+            if resposta:
+                yield "reply", {"text": resposta}
+            yield "done", self._done_event(resposta, False, reply_id, usage)
+            return
+
+        sender_name = self._extract_sender_name(sender)
+        key, cached = await asyncio.to_thread(
+            self._known_reply, category, sender_name, sender, subject, body, texto_processado, cache_mode
+        )
+        if cached is not None:
+            yield "reply", {"text": cached}
+            yield "done", self._done_event(cached, False, None, usage)
+            return
+
+        cleaner = ReplyStreamCleaner()
+        stream = self.llm.stream_response_async(
+            category, sender_name, subject, self._llm_body(body, "reply"), keywords
+        )
+        with timed("gemini_reply"):
+            try:
+                async for chunk in stream:
+                    text = cleaner.feed(chunk)
+                    if text:
+                        yield "reply", {"text": text}
+                    if cleaner.stopped:
+                        logger.debug("Marcador de assinatura encontrado, encerrando o stream")
+                        break
+            except Exception as e:
+                self._log_gemini_error("Gemini stream falhou", e)
+            finally:
+                await stream.aclose()
+
+        tail = cleaner.finish()
+        if tail:
+            yield "reply", {"text": tail}
+
+        resposta = cleaner.text
+        if resposta:
+            await asyncio.to_thread(
+                self._store_and_remember_reply, key, category, sender_name, texto_processado, resposta, cache_mode
+            )
+        else:
+            resposta = self._fallback_response(category, subject)
+            yield "reply", {"text": resposta}
+
+        yield "done", self._done_event(resposta, cleaner.stopped, None, usage)
+
+    def _done_event(
+        self,
+        resposta: Optional[str],
+        stopped_early: bool,
+        reply_id: Optional[str],
+        usage: Dict[str, int]
+    ) -> Dict[str, any]:
+        return {"suggested_reply": resposta, "stopped_early": stopped_early, "reply_id": reply_id, "usage": usage}
+
+    def _classification_event(
+        self,
+        category: str,
+        confidence: float,
+        keywords: List[str],
+        texto_processado: str
+    ) -> Dict[str, any]:
+        return {
+            "category": category,
+            "confidence": confidence,
+            "keywords": keywords,
+            "processed_text": texto_processado[:200],
+        }
+
+    def _classify(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        texto_original: str,
+        texto_processado: str,
+        cache_mode: str
+    ) -> Tuple[str, float]:
+        known = self._known_category(sender, subject, body, texto_processado, cache_mode)
+        if known is not None:
+            return known
+        return self._gemini_classify(sender, subject, body, texto_original, texto_processado, cache_mode)
+
+    def _known_category(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        texto_processado: str,
+        cache_mode: str
+    ) -> Optional[Tuple[str, float]]:
+        """Categoria que sai sem o Gemini (modelo local confiante, cache ou email quase igual), ou None"""
+        local = self._local_classify(texto_processado)
+        if local is not None:
+            CLASSIFICATIONS.inc(source="local")
+            return local
+
+        cached = self._cache_lookup(self._classify_cache_key(sender, subject, body), cache_mode)
+        if cached is not None:
+            CLASSIFICATIONS.inc(source="cache")
+            return cached
+
+        near = self._near_duplicate(texto_processado, cache_mode)
+        if near is not None:
+            CLASSIFICATIONS.inc(source="near_duplicate")
+            return near["category"], near["confidence"]
+        return None
+
+    def _gemini_classify(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        texto_original: str,
+        texto_processado: str,
+        cache_mode: str
+    ) -> Tuple[str, float]:
+        def call() -> Tuple[str, float]:
+            with timed("gemini_classify"):
+                category, confidence = self.llm.classify_email(subject, self._llm_body(body, "classify"))
+            self._store_classification(sender, subject, body, texto_processado, category, confidence, cache_mode)
+            return category, confidence
+
+        try:
+            (category, confidence), coalesced = self._coalesce(
+                "classify", self._flight_key(self._classify_cache_key(sender, subject, body), cache_mode), call
+            )
+            if coalesced:
+                CLASSIFICATIONS.inc(source="coalesced")
+        except Exception as e:
+            category, confidence = self._on_classify_error(e, texto_original)
+        return category, confidence
+
+    async def _classify_async(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        texto_original: str,
+        texto_processado: str,
+        cache_mode: str
+    ) -> Tuple[str, float]:
+        known = await asyncio.to_thread(self._known_category, sender, subject, body, texto_processado, cache_mode)
+        if known is not None:
+            return known
+        return await self._gemini_classify_async(sender, subject, body, texto_original, texto_processado, cache_mode)
+
+    async def _gemini_classify_async(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        texto_original: str,
+        texto_processado: str,
+        cache_mode: str
+    ) -> Tuple[str, float]:
+        async def call() -> Tuple[str, float]:
+            with timed("gemini_classify"):
+                category, confidence = await self.llm.classify_email_async(subject, self._llm_body(body, "classify"))
+            await asyncio.to_thread(
+                self._store_classification, sender, subject, body, texto_processado, category, confidence, cache_mode
+            )
+            return category, confidence
+
+        try:
+            (category, confidence), coalesced = await self._coalesce_async(
+                "classify", self._flight_key(self._classify_cache_key(sender, subject, body), cache_mode), call
+            )
+            if coalesced:
+                CLASSIFICATIONS.inc(source="coalesced")
+        except Exception as e:
+            category, confidence = self._on_classify_error(e, texto_original)
+        return category, confidence
+
+    def _combined_applies(self, reply_mode: str) -> bool:
+        return reply_mode == "generate" and settings.COMBINED_PROMPT
+
+    def _classify_and_reply_combined(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        texto_original: str,
+        texto_processado: str,
+        keywords: List[str],
+        cache_mode: str
+    ) -> Tuple[str, float, str]:
+        """
+        Categoria e resposta numa só chamada ao Gemini (COMBINED_PROMPT)
+
+        Se a categoria já é conhecida (modelo local ou cache) só a resposta
+        vai ao Gemini. Se o JSON combinado vier inválido, volta às duas
+        chamadas separadas; se o Gemini falhar, segue o fallback de sempre.
+        """
+        known = self._known_category(sender, subject, body, texto_processado, cache_mode)
+        if known is None:
+            def call() -> Tuple[str, float, str]:
+                with timed("gemini_combined"):
+                    category, confidence, resposta = self.llm.classify_and_reply(
+                        self._extract_sender_name(sender), subject, self._llm_body(body, "combined"), keywords
+                    )
+                return self._store_combined(
+                    sender, subject, body, texto_processado, category, confidence, resposta, cache_mode
+                )
+
+            try:
+                result, _ = self._coalesce("combined", self._combined_flight_key(sender, subject, body, cache_mode), call)
+                return result
+            except CombinedResponseError as e:
+                logger.warning("Resposta combinada inválida, usando duas chamadas: %s", e)
+                known = self._gemini_classify(sender, subject, body, texto_original, texto_processado, cache_mode)
+            except Exception as e:
+                known = self._on_classify_error(e, texto_original)
+
+        category, confidence = known
+        return category, confidence, self._respond(
+            category, sender, subject, body, texto_processado, keywords, cache_mode
+        )
+
+    async def _classify_and_reply_combined_async(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        texto_original: str,
+        texto_processado: str,
+        keywords: List[str],
+        cache_mode: str
+    ) -> Tuple[str, float, str]:
+        """Versão assíncrona de _classify_and_reply_combined"""
+        known = await asyncio.to_thread(self._known_category, sender, subject, body, texto_processado, cache_mode)
+        if known is None:
+            async def call() -> Tuple[str, float, str]:
+                with timed("gemini_combined"):
+                    category, confidence, resposta = await self.llm.classify_and_reply_async(
+                        self._extract_sender_name(sender), subject, self._llm_body(body, "combined"), keywords
+                    )
+                return await asyncio.to_thread(
+                    self._store_combined,
+                    sender, subject, body, texto_processado, category, confidence, resposta, cache_mode
+                )
+
+            try:
+                result, _ = await self._coalesce_async(
+                    "combined", self._combined_flight_key(sender, subject, body, cache_mode), call
+                )
+                return result
+            except CombinedResponseError as e:
+                logger.warning("Resposta combinada inválida, usando duas chamadas: %s", e)
+                known = await self._gemini_classify_async(sender, subject, body, texto_original, texto_processado, cache_mode)
+            except Exception as e:
+                known = self._on_classify_error(e, texto_original)
+
+        category, confidence = known
+        return category, confidence, await self._respond_async(
+            category, sender, subject, body, texto_processado, keywords, cache_mode
+        )
+
+    def _store_combined(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        texto_processado: str,
+        category: str,
+        confidence: float,
+        resposta: str,
+        cache_mode: str
+    ) -> Tuple[str, float, str]:
+        """Grava categoria e resposta nos mesmos caches do caminho de duas chamadas"""
+        self._store_classification(sender, subject, body, texto_processado, category, confidence, cache_mode)
+        resposta = self._clean_response(resposta)
+        sender_name = self._extract_sender_name(sender)
+        key = self._reply_cache_key(category, sender_name, sender, subject, body)
+        self._store_and_remember_reply(key, category, sender_name, texto_processado, resposta, cache_mode)
+        return category, confidence, resposta
+
+    def _known_reply(
+        self,
+        category: str,
+        sender_name: str,
+        sender: str,
+        subject: str,
+        body: str,
+        texto_processado: str,
+        cache_mode: str
+    ) -> Tuple[str, Optional[str]]:
+        """(chave da resposta no cache, resposta do cache ou de um email quase igual, ou None)"""
+        key = self._reply_cache_key(category, sender_name, sender, subject, body)
+        known = self._cache_lookup(key, cache_mode)
+        if known is None:
+            known = self._near_duplicate_reply(category, sender_name, texto_processado, cache_mode)
+        return key, known
+
+    def _store_and_remember_reply(
+        self,
+        key: str,
+        category: str,
+        sender_name: str,
+        texto_processado: str,
+        resposta: str,
+        cache_mode: str
+    ):
+        self._store_reply(key, resposta, cache_mode)
+        self._remember_reply(category, sender_name, texto_processado, resposta, cache_mode)
+
+    def _respond(
+        self,
+        category: str,
+        sender: str,
+        subject: str,
+        body: str,
+        texto_processado: str,
+        keywords: List[str],
+        cache_mode: str
+    ) -> str:
+        sender_name = self._extract_sender_name(sender)
+        key, known = self._known_reply(category, sender_name, sender, subject, body, texto_processado, cache_mode)
+        if known is not None:
+            return known
+
+        def call() -> str:
+            with timed("gemini_reply"):
+                resposta = self.llm.generate_response(
+                    category, sender_name, subject, self._llm_body(body, "reply"), keywords
+                )
+            resposta = self._clean_response(resposta)
+            self._store_and_remember_reply(key, category, sender_name, texto_processado, resposta, cache_mode)
+            return resposta
+
+        try:
+            resposta, _ = self._coalesce("reply", self._flight_key(key, cache_mode), call)
+        except Exception as e:
+            resposta = self._on_response_error(e, category, subject)
+        return resposta
+
+    async def _respond_async(
+        self,
+        category: str,
+        sender: str,
+        subject: str,
+        body: str,
+        texto_processado: str,
+        keywords: List[str],
+        cache_mode: str
+    ) -> str:
+        sender_name = self._extract_sender_name(sender)
+        key, known = await asyncio.to_thread(
+            self._known_reply, category, sender_name, sender, subject, body, texto_processado, cache_mode
+        )
+        if known is not None:
+            return known
+
+        async def call() -> str:
+            with timed("gemini_reply"):
+                resposta = await self.llm.generate_response_async(
+                    category, sender_name, subject, self._llm_body(body, "reply"), keywords
+                )
+            resposta = self._clean_response(resposta)
+            await asyncio.to_thread(
+                self._store_and_remember_reply, key, category, sender_name, texto_processado, resposta, cache_mode
+            )
+            return resposta
+
+        try:
+            resposta, _ = await self._coalesce_async("reply", self._flight_key(key, cache_mode), call)
+        except Exception as e:
+            resposta = self._on_response_error(e, category, subject)
+        return resposta
+
+    def _llm_body(self, body: str, purpose: str) -> str:
+        """Corpo limpo e dentro do orçamento de tokens de `purpose` (classify, reply ou combined)"""
+        with timed("prompt_budget"):
+            return self.budget.fit(body, purpose)
+
+    def _defer_reply(
+        self,
+        category: str,
+        sender: str,
+        subject: str,
+        body: str,
+        keywords: List[str],
+        cache_mode: str
+    ) -> Tuple[Optional[str], str]:
+        """
+        Guarda o necessário para gerar a resposta depois e retorna
+        (resposta já em cache ou None, reply_id). O reply_id é a própria
+        chave da resposta no cache, então emails iguais compartilham o handle.
+        """
+        sender_name = self._extract_sender_name(sender)
+        key = self._reply_cache_key(category, sender_name, sender, subject, body)
+        cached = self._cache_lookup(key, cache_mode)
+        # A resposta é gerada depois, pelo mesmo provedor/política desta requisição
+        provider, routing = self.llm.selection()
+        self.reply_handles.set(key, {
+            "category": category,
+            "sender": sender,
+            "subject": subject,
+            "body": body,
+            "keywords": keywords,
+            # refresh já descartou a entrada antiga; na geração basta usar o cache
+            "cache_mode": "bypass" if cache_mode == "bypass" else "use",
+            "provider": provider,
+            "routing": routing,
+            "reply": cached,
+        })
+        return cached, key
+
+    def _local_classify(self, texto_processado: str) -> Optional[Tuple[str, float]]:
+        """Resultado do modelo local quando ele está fora da faixa de incerteza"""
+        model = self.local_model.current() if self.local_model is not None else None
+        # Snapshot treinado a partir de pesos zerados (sem modelo base): não dispensa o Gemini
+        if model is None or model.empty_base:
+            return None
+        probability = model.predict_proba(texto_processado.split())
+        local = decide(probability, settings.LOCAL_MODEL_LOW, settings.LOCAL_MODEL_HIGH)
+        logger.debug("Modelo local: p=%.3f, %s", probability, "Gemini dispensado" if local else "incerto")
+        return local
+
+    def _classify_cache_key(self, sender: str, subject: str, body: str) -> str:
+        return self.cache.make_key("classify", sender, subject, body, settings.CLASSIFICATION_TEMPERATURE)
+
+    def _reply_cache_key(self, category: str, sender_name: str, sender: str, subject: str, body: str) -> str:
+        # A resposta depende da categoria e do nome usado na saudação
+        return self.cache.make_key("reply", sender, subject, body, settings.TEMPERATURE, f"{category}|{sender_name}")
+
+    def _combined_flight_key(self, sender: str, subject: str, body: str, cache_mode: str) -> Optional[str]:
+        cache_key = self.cache.make_key(
+            "combined", sender, subject, body, settings.COMBINED_TEMPERATURE, self._extract_sender_name(sender)
+        )
+        return self._flight_key(cache_key, cache_mode)
+
+    def _flight_key(self, cache_key: str, cache_mode: str) -> Optional[str]:
+        """
+        Chave do single-flight: a mesma do cache mais o provedor e a política
+        da requisição. None desliga o agrupamento (COALESCE_ENABLED=false ou
+        cache_mode=bypass, que pede uma chamada própria ao LLM)
+        """
+        if not settings.COALESCE_ENABLED or cache_mode == "bypass":
+            return None
+        provider, routing = self.llm.selection()
+        return f"{cache_key}|{provider or ''}|{routing or ''}"
+
+    def _coalesce(self, operation: str, key: Optional[str], call):
+        """(resultado, coalescida): espera a chamada idêntica em voo ou faz a própria"""
+        if key is None:
+            return call(), False
+        return self.inflight[operation].do(key, call)
+
+    async def _coalesce_async(self, operation: str, key: Optional[str], call):
+        if key is None:
+            return await call(), False
+        return await self.inflight[operation].do_async(key, call)
+
+    def _cache_lookup(self, key: str, cache_mode: str):
+        """
+        Consulta o cache respeitando o modo da requisição:
+        use (padrão), bypass (ignora o cache) ou refresh (descarta a entrada e recalcula)
+        """
+        if not settings.CACHE_ENABLED or cache_mode == "bypass":
+            return None
+        if cache_mode == "refresh":
+            self.cache.delete(key)
+            return None
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug("Cache hit")
+            return tuple(cached) if isinstance(cached, list) else cached
+        return None
+
+    def _cache_store(self, key: str, value, cache_mode: str):
+        if settings.CACHE_ENABLED and cache_mode != "bypass":
+            self.cache.set(key, value)
+
+    def _store_classification(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        texto_processado: str,
+        category: str,
+        confidence: float,
+        cache_mode: str
+    ):
+        """Conta a origem (o provedor que respondeu) e guarda o resultado se o provedor permite cache"""
+        provider = self.llm.answered_by()
+        CLASSIFICATIONS.inc(source=provider.name)
+        if provider.cacheable:
+            self._cache_store(self._classify_cache_key(sender, subject, body), (category, confidence), cache_mode)
+            self._remember_classification(texto_processado, category, confidence, cache_mode)
+
+    def _reply_cacheable(self, resposta: str) -> bool:
+        # Só respostas reais de um provedor que permite cache, nunca a mensagem de erro
+        provider = self.llm.answered_by()
+        return bool(resposta) and resposta != self.llm.RESPONSE_ERROR_TEXT and provider is not None and provider.cacheable
+
+    def _store_reply(self, key: str, resposta: str, cache_mode: str):
+        if self._reply_cacheable(resposta):
+            self._cache_store(key, resposta, cache_mode)
+
+    def _near_duplicate(self, texto_processado: str, cache_mode: str) -> Optional[Dict[str, any]]:
+        """Email já classificado quase igual a este (mesmo template), ou None"""
+        if not settings.NEAR_DUP_ENABLED or cache_mode != "use":
+            return None
+        with timed("near_duplicate"):
+            near = self.near_duplicates.lookup(texto_processado)
+        if near is not None:
+            logger.debug("Email quase igual a um já classificado (similaridade %.3f)", near["similarity"])
+        return near
+
+    def _remember_classification(self, texto_processado: str, category: str, confidence: float, cache_mode: str):
+        if settings.NEAR_DUP_ENABLED and cache_mode != "bypass":
+            self.near_duplicates.add(texto_processado, category, confidence)
+
+    def _near_duplicate_reply(
+        self,
+        category: str,
+        sender_name: str,
+        texto_processado: str,
+        cache_mode: str
+    ) -> Optional[str]:
+        """Resposta de um email quase igual, com o nome deste remetente (NEAR_DUP_REUSE_REPLY)"""
+        if not settings.NEAR_DUP_REUSE_REPLY:
+            return None
+        near = self._near_duplicate(texto_processado, cache_mode)
+        if near is None or near["category"] != category or not near["reply"]:
+            return None
+        self.near_duplicates.count_reply_hit()
+        return near["reply"].replace(_REPLY_NAME_SLOT, sender_name)
+
+    def _remember_reply(
+        self,
+        category: str,
+        sender_name: str,
+        texto_processado: str,
+        resposta: str,
+        cache_mode: str
+    ):
+        if not (settings.NEAR_DUP_ENABLED and settings.NEAR_DUP_REUSE_REPLY) or cache_mode == "bypass":
+            return
+        if not self._reply_cacheable(resposta):
+            return
+        template = resposta.replace(sender_name, _REPLY_NAME_SLOT) if sender_name else resposta
+        self.near_duplicates.set_reply(texto_processado, category, template)
+
+    def classify_batch(
+        self,
+        emails: List[Dict[str, str]],
+        provider: Optional[str] = None,
+        routing: Optional[str] = None
+    ) -> Dict[str, any]:
+        """
+        Classifica vários emails agrupando-os em poucas chamadas ao Gemini
+        
+        Args:
+            emails: lista de dicts com sender, subject e body
+            provider, routing: provedor de LLM e política de roteamento (None = padrão)
+            
+        Returns:
+            dict: results (um por email, na mesma ordem), llm_calls (chamadas de fato
+            ao Gemini, com as retentativas) e total_time_ms
+        """
+        start = time.perf_counter()
+        begin_request()
+        self.llm.select(provider, routing)
+        usage = begin_usage()
+        results, pending = self._prepare_batch(emails)
+        chunks = self._chunk_batch(pending)
+
+        for chunk in chunks:
+            t0 = time.perf_counter()
+            try:
+                with timed("gemini_classify_batch"):
+                    answers = self.llm.classify_batch([(item["subject"], item["body"]) for item in chunk])
+                providers = self.llm.batch_answered_by()
+            except Exception as e:
+                self._log_gemini_error("Gemini falhou no lote", e)
+                answers, providers = [None] * len(chunk), [None] * len(chunk)
+            self._apply_batch_answers(results, chunk, answers, providers, time.perf_counter() - t0)
+
+        return self._batch_summary(results, usage["llm_calls"], start)
+
+    async def classify_batch_async(
+        self,
+        emails: List[Dict[str, str]],
+        provider: Optional[str] = None,
+        routing: Optional[str] = None
+    ) -> Dict[str, any]:
+        """Versão assíncrona de classify_batch: os lotes vão ao Gemini em paralelo"""
+        start = time.perf_counter()
+        begin_request()
+        self.llm.select(provider, routing)
+        usage = begin_usage()
+        results, pending = await asyncio.to_thread(self._prepare_batch, emails)
+        chunks = self._chunk_batch(pending)
+
+        async def run_chunk(chunk):
+            t0 = time.perf_counter()
+            try:
+                with timed("gemini_classify_batch"):
+                    answers = await self.llm.classify_batch_async([(item["subject"], item["body"]) for item in chunk])
+                providers = self.llm.batch_answered_by()
+            except Exception as e:
+                self._log_gemini_error("Gemini falhou no lote", e)
+                answers, providers = [None] * len(chunk), [None] * len(chunk)
+            return answers, providers, time.perf_counter() - t0
+
+        outcomes = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+
+        def apply():
+            for chunk, (answers, providers, elapsed) in zip(chunks, outcomes):
+                self._apply_batch_answers(results, chunk, answers, providers, elapsed)
+
+        await asyncio.to_thread(apply)
+
+        return self._batch_summary(results, usage["llm_calls"], start)
+
+    def classify_batch_degraded(self, emails: List[Dict[str, str]], reason: str = "deadline") -> Dict[str, any]:
+        """Lote sem LLM: o que se resolve localmente (noreply, modelo, cache) e o fallback no resto"""
+        start = time.perf_counter()
+        begin_request()
+        results, pending = self._prepare_batch(emails)
+        if pending:
+            self._apply_batch_answers(results, pending, [None] * len(pending), [None] * len(pending), 0.0)
+        summary = self._batch_summary(results, 0, start)
+        summary["degraded"] = reason
+        return summary
+
+    def _prepare_batch(self, emails: List[Dict[str, str]]) -> Tuple[List[Optional[Dict]], List[Dict]]:
+        """
+        Resolve localmente o que não precisa do Gemini (noreply, modelo local,
+        cache e quase duplicados) e prepara os demais itens. Retorna (results, pending), com
+        None nas posições pendentes.
+        """
+        logger.info("Lote recebido", extra={"emails": len(emails)})
+        results: List[Optional[Dict]] = [None] * len(emails)
+        pending = []
+        max_body_chars = settings.BATCH_MAX_PROMPT_TOKENS * 4
+
+        for index, email in enumerate(emails):
+            t0 = time.perf_counter()
+            subject, body = email["subject"], email["body"]
+
+            if self._is_noreply(email["sender"]):
+                results[index] = self._batch_item(
+                    "Improdutivo", 0.95, [], "noreply", (time.perf_counter() - t0) * 1000, 0.0
+                )
+                continue
+
+            texto_original = f"{subject}. {body}"
+            texto_processado, keywords = self._analyze(texto_original)
+
+            local = self._local_classify(texto_processado)
+            if local is not None:
+                results[index] = self._batch_item(
+                    local[0], local[1], keywords, "local", (time.perf_counter() - t0) * 1000, 0.0
+                )
+                continue
+
+            cache_mode = email.get("cache", "use")
+            cache_key = self._classify_cache_key(email["sender"], subject, body)
+            cached = self._cache_lookup(cache_key, cache_mode)
+            if cached is not None:
+                results[index] = self._batch_item(
+                    cached[0], cached[1], keywords, "cache", (time.perf_counter() - t0) * 1000, 0.0
+                )
+                continue
+
+            near = self._near_duplicate(texto_processado, cache_mode)
+            if near is not None:
+                results[index] = self._batch_item(
+                    near["category"], near["confidence"], keywords, "near_duplicate",
+                    (time.perf_counter() - t0) * 1000, 0.0
+                )
+                continue
+
+            # Um único email nunca pode estourar sozinho o orçamento do prompt
+            body = self._llm_body(body, "classify")[:max_body_chars]
+            pending.append({
+                "index": index,
+                "subject": subject,
+                "body": body,
+                "texto_original": texto_original,
+                "texto_processado": texto_processado,
+                "keywords": keywords,
+                "cache_key": cache_key,
+                "cache_mode": cache_mode,
+                "tokens": self.llm.batch_item_tokens(index + 1, subject, body),
+                "preprocess_ms": (time.perf_counter() - t0) * 1000,
+            })
+
+        return results, pending
+
+    def _chunk_batch(self, pending: List[Dict]) -> List[List[Dict]]:
+        """Agrupa itens respeitando BATCH_MAX_SIZE e BATCH_MAX_PROMPT_TOKENS"""
+        chunks, current, current_tokens = [], [], 0
+        for item in pending:
+            if current and (
+                len(current) >= settings.BATCH_MAX_SIZE
+                or current_tokens + item["tokens"] > settings.BATCH_MAX_PROMPT_TOKENS
+            ):
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(item)
+            current_tokens += item["tokens"]
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _apply_batch_answers(
+        self,
+        results: List[Optional[Dict]],
+        chunk: List[Dict],
+        answers: List[Optional[Tuple[str, float]]],
+        providers: List[Optional[LLMProvider]],
+        llm_seconds: float
+    ):
+        """Preenche os resultados do lote, rateando o tempo da chamada pelo tamanho de cada item"""
+        chunk_tokens = sum(item["tokens"] for item in chunk)
+        for item, answer, provider in zip(chunk, answers, providers):
+            llm_ms = llm_seconds * 1000 * item["tokens"] / chunk_tokens
+            extra_ms = 0.0
+            if answer is None:
+                t0 = time.perf_counter()
+                category, confidence = self._fallback_classify(item["texto_original"])
+                extra_ms = (time.perf_counter() - t0) * 1000
+                source = "fallback"
+            else:
+                category, confidence = answer
+                source = provider.name
+                if provider.cacheable:
+                    self._cache_store(item["cache_key"], answer, item["cache_mode"])
+                    self._remember_classification(item["texto_processado"], category, confidence, item["cache_mode"])
+            results[item["index"]] = self._batch_item(
+                category, confidence, item["keywords"], source, item["preprocess_ms"] + extra_ms, llm_ms
+            )
+
+    def _batch_item(
+        self,
+        category: str,
+        confidence: float,
+        keywords: List[str],
+        source: str,
+        local_ms: float,
+        llm_ms: float
+    ) -> Dict[str, any]:
+        CLASSIFICATIONS.inc(source=source)
+        return {
+            "category": category,
+            "confidence": confidence,
+            "keywords": keywords,
+            "source": source,
+            "local_ms": round(local_ms, 3),
+            "llm_ms": round(llm_ms, 3),
+            "latency_ms": round(local_ms + llm_ms, 3),
+        }
+
+    def _batch_summary(self, results: List[Dict], llm_calls: int, start: float) -> Dict[str, any]:
+        total_ms = (time.perf_counter() - start) * 1000
+        logger.info(
+            "Lote concluído",
+            extra={"emails": len(results), "llm_calls": llm_calls, "elapsed_ms": round(total_ms, 1)}
+        )
+        return {
+            "results": results,
+            "llm_calls": llm_calls,
+            "total_time_ms": round(total_ms, 3),
+        }
+
+    def _log_request(self, sender: str, subject: str, body: str):
+        # Só metadados: o conteúdo do email não vai para os logs
+        begin_request()
+        logger.debug(
+            "Email recebido",
+            extra={
+                "sender_domain": sender.rsplit('@', 1)[-1].lower(),
+                "subject_chars": len(subject),
+                "body_chars": len(body),
+            }
+        )
+
+    def _is_noreply(self, sender: str) -> bool:
+        with timed("noreply"):
+            return self.noreply_lexicon.matches_any(sender)
+
+    def _noreply_result(self, sender: str) -> Optional[Dict[str, any]]:
+        """Retorna o resultado pronto para remetentes noreply, ou None"""
+        if self._is_noreply(sender):
+            CLASSIFICATIONS.inc(source="noreply")
+            logger.info("Remetente noreply, email ignorado")
             return {
                 "category": "Improdutivo",
                 "confidence": 0.95,
                 "suggested_reply": "Este é um email automático, não é necessário responder.",
+                "reply_id": None,
                 "keywords": [],
                 "processed_text": "",
             }
+        return None
 
-        # Processar texto
-        print("🔄 PROCESSANDO TEXTO...")
+    def _prepare_text(self, subject: str, body: str) -> Tuple[str, str, List[str]]:
+        """Retorna (texto_original, texto_processado, keywords)"""
         texto_original = f"{subject}. {body}"
-        texto_processado = self.nlp.preprocess_text(texto_original)
-        keywords = self.nlp.extract_keywords(texto_original, settings.TOP_KEYWORDS)
-        print(f"🔑 Keywords: {keywords}")
+        texto_processado, keywords = self._analyze(texto_original)
+        return texto_original, texto_processado, keywords
 
-        # CLASSIFICAÇÃO COM GEMINI
-        print("🤖 === TENTANDO CLASSIFICAR COM GEMINI ===")
-        try:
-            category, confidence = self.gemini.classify_email(subject, body)
-            print(f"✅ GEMINI SUCESSO: {category} (conf: {confidence})")
-        except Exception as e:
-            print(f"❌ GEMINI FALHOU!")
-            print(f"   Erro: {type(e).__name__}: {str(e)}")
-            print(f"   🔄 Usando fallback...")
-            category, confidence = self._fallback_classify(texto_original)
-            print(f"   ✅ Fallback resultado: {category} (conf: {confidence})")
+    def _analyze(self, texto_original: str) -> Tuple[str, List[str]]:
+        """Mesmo resultado de nlp.analyze, medindo pré-processamento e keywords separadamente"""
+        with timed("preprocess"):
+            tokens = self.nlp.tokenize(texto_original)
+        with timed("keywords"):
+            keywords = self.nlp.top_keywords(tokens, settings.TOP_KEYWORDS)
+        return ' '.join(tokens), keywords
 
-        # RESPOSTA COM GEMINI
-        sender_name = self._extract_sender_name(sender)
-        print(f"👤 Sender name: {sender_name}")
-        print("💬 === TENTANDO GERAR RESPOSTA COM GEMINI ===")
-        try:
-            resposta = self.gemini.generate_response(category, sender_name, subject, body, keywords)
-            resposta = self._clean_response(resposta)
-            print(f"✅ GEMINI RESPOSTA SUCESSO: {len(resposta)} chars")
-        except Exception as e:
-            print(f"❌ GEMINI RESPOSTA FALHOU!")
-            print(f"   Erro: {type(e).__name__}: {str(e)}")
-            print(f"   🔄 Usando resposta fallback...")
-            resposta = self._fallback_response(category, subject)
-            print(f"   ✅ Fallback resposta: {resposta[:50]}...")
+    def _log_gemini_error(self, message: str, e: Exception):
+        # Com o circuito aberto a falha já foi registrada quando ele abriu
+        log = logger.debug if isinstance(e, GeminiUnavailableError) else logger.warning
+        log(message + ": %s: %s", type(e).__name__, e)
+
+    def _on_classify_error(self, e: Exception, texto_original: str) -> Tuple[str, float]:
+        self._log_gemini_error("Gemini falhou na classificação, usando fallback", e)
+        CLASSIFICATIONS.inc(source="fallback")
+        return self._fallback_classify(texto_original)
 
-        # Resultado
+    def _on_response_error(self, e: Exception, category: str, subject: str) -> str:
+        self._log_gemini_error("Gemini falhou na resposta, usando resposta padrão", e)
+        return self._fallback_response(category, subject)
+
+    def _build_result(
+        self,
+        start_time: datetime,
+        category: str,
+        confidence: float,
+        resposta: str,
+        keywords: List[str],
+        texto_processado: str,
+        reply_id: Optional[str] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> Dict[str, any]:
         processing_time = (datetime.now() - start_time).total_seconds()
         result = {
             "category": category,
             "confidence": confidence,
             "suggested_reply": resposta,
+            "reply_id": reply_id,
             "keywords": keywords,
             "processed_text": texto_processado[:200],
+            "usage": usage,
         }
-        
-        print(f"🎯 PROCESSAMENTO CONCLUÍDO em {processing_time:.2f}s")
-        print(f"📊 Resultado: {category} | Confiança: {confidence}")
-        print(f"{'='*60}\n")
-        
+        logger.info(
+            "Email processado",
+            extra={
+                "category": category,
+                "confidence": confidence,
+                "elapsed_ms": round(processing_time * 1000, 1),
+                "llm_calls": usage["llm_calls"] if usage else None,
+            }
+        )
         return result
 
     def _extract_sender_name(self, sender: str) -> str:
@@ -108,48 +1199,18 @@ class ClassifierService:
             return "Colega"
 
     def _fallback_classify(self, text: str) -> Tuple[str, float]:
-        print("🔄 EXECUTANDO FALLBACK CLASSIFICATION...")
-        t = text.lower()
-        produtivo = [
-            "reunião","projeto","prazo","entrega","urgente","aprovação","orçamento",
-            "contrato","proposta","documento","relatório","vaga","entrevista",
-            "solicitação","pendência","ação","tarefa","cliente","processo","suporte",
-            "solicito","confirmação","agendar","discussão","imediato","urgência"
-        ]
-        improdutivo = [
-            "parabéns","feliz","aniversário","natal","ano novo","obrigado",
-            "bom dia","nada","férias","feriado","festa","casamento","abraço","não responder",
-            "email automático","noreply","no-reply","teste"
-        ]
-            
-        p_matches = [k for k in produtivo if k in t]
-        i_matches = [k for k in improdutivo if k in t]
-        p = len(p_matches)
-        i = len(i_matches)
-        
-        print(f"   Produtivo matches ({p}): {p_matches}")
-        print(f"   Improdutivo matches ({i}): {i_matches}")
-        
-        if p > i:
-            conf = min(0.6 + p*0.05, 0.85)
-            print(f"   → PRODUTIVO (score {p})")
-            return "Produtivo", conf
-        if i > p:
-            conf = min(0.6 + i*0.05, 0.85)
-            print(f"   → IMPRODUTIVO (score {i})")
-            return "Improdutivo", conf
-            
-        # Empate: análise de sentimento
-        comp = self.sentiment.polarity_scores(text)["compound"]
-        print(f"   Empate! Sentimento: {comp}")
-        if comp < -0.2:
-            print("   → IMPRODUTIVO (sentimento negativo)")
-            return "Improdutivo", 0.55
-        print("   → PRODUTIVO (padrão)")
-        return "Produtivo", 0.55
+        FALLBACKS.inc(kind="classify")
+        with timed("fallback"):
+            category, confidence = self._fallback_scores(text)
+        logger.debug("Fallback: %s (conf: %s)", category, confidence)
+        return category, confidence
+
+    def _fallback_scores(self, text: str) -> Tuple[str, float]:
+        # As mesmas regras do provedor offline (léxico com pesos + desempate pelo VADER)
+        return self.offline.rule_scores(text)
 
     def _clean_response(self, resposta: str) -> str:
-        for marker in ["Atenciosamente", "Abraços", "Cordialmente"]:
+        for marker in _SIGNATURE_MARKERS:
             resposta = resposta.split(marker)[0]
         resposta = resposta.strip()
         if resposta and not resposta.endswith(('.', '!', '?')):
@@ -157,8 +1218,12 @@ class ClassifierService:
         return resposta
 
     def _fallback_response(self, category: str, subject: str) -> str:
+        FALLBACKS.inc(kind="reply")
+        return self._fallback_text(category, subject)
+
+    def _fallback_text(self, category: str, subject: str) -> str:
         if category == "Improdutivo":
             return "Obrigado pela mensagem! Agradecemos o contato."
         return f"Recebemos sua mensagem sobre '{subject}'. Retornaremos em breve."
 
-classifier_service = ClassifierService()
\ No newline at end of file
+classifier_service = LazyService(ClassifierService)
\ No newline at end of file
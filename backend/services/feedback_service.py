@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: um processo só, a trava de thread basta
+    fcntl = None
+
+from config import settings
+from services.lazy import LazyService
+from services.local_model import (
+    LABELS, LiveLocalModel, LocalModel, SnapshotStore, decide, live_local_model, load_local_model
+)
+from services.logging_setup import get_logger
+from services.metrics import FEEDBACK_CORRECTIONS
+from services.nlp_service import nlp_service
+
+logger = get_logger("feedback")
+
+
+class FeedbackService:
+    """
+    Correções dos operadores viram aprendizado do modelo local
+
+    Cada correção é acrescentada ao log JSONL (FEEDBACK_LOG_PATH), que é a
+    fonte da verdade: o snapshot guarda até que byte do log já aplicou e o
+    próximo treino continua dali. Uma queda entre gravar o log e publicar
+    o snapshot não perde correção, e vários workers podem receber feedback
+    ao mesmo tempo: uma trava de arquivo serializa o treino e cada um parte
+    do último snapshot publicado.
+
+    O treino são passos de SGD da log-loss sobre as features com hashing
+    do LocalModel, repetidos no email corrigido até o modelo ficar
+    confiante no rótulo certo (fora da faixa [LOCAL_MODEL_LOW,
+    LOCAL_MODEL_HIGH]) ou até FEEDBACK_MAX_STEPS: o mesmo email deixa de
+    ir ao LLM e os parecidos herdam os pesos. O bias fica de fora, para
+    que uma sequência de correções num sentido não desloque todos os
+    outros emails. Sem modelo base (LOCAL_MODEL_PATH) os snapshots partem
+    de pesos zerados e ficam marcados (empty_base): o provedor offline não
+    os usa no lugar das regras.
+    """
+
+    def __init__(self, log_path: str, store: SnapshotStore, live: LiveLocalModel):
+        self.log_path = log_path
+        self.store = store
+        self.live = live
+        self.nlp = nlp_service
+        self._lock = threading.Lock()
+        directory = os.path.dirname(log_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def _exclusive(self):
+        """Um treino por vez, entre threads e entre processos"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(f"{self.log_path}.lock", "a") as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def record(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        category: str,
+        predicted: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Grava a correção, treina e publica um snapshot novo
+
+        Este processo passa a servir a versão nova na hora; os demais na
+        próxima checagem do ponteiro (LOCAL_MODEL_RELOAD_SECONDS).
+        """
+        if category not in LABELS:
+            raise ValueError(f"Categoria inválida. Use: {', '.join(LABELS)}")
+        tokens = self.nlp.tokenize(f"{subject}. {body}")
+        served = self.live.current()
+        before = float(served.predict_proba(tokens)) if served is not None else None
+
+        entry = {
+            "at": time.time(),
+            "sender": sender,
+            "subject": subject,
+            "body": body,
+            "category": category,
+            "predicted": predicted,
+        }
+        with self._exclusive():
+            self._append(entry)
+            model, applied, records = self._train()
+        self.live.reload()
+        FEEDBACK_CORRECTIONS.inc(category=category)
+
+        after = float(model.predict_proba(tokens))
+        local = decide(after, settings.LOCAL_MODEL_LOW, settings.LOCAL_MODEL_HIGH)
+        logger.info(
+            "Correção aplicada ao modelo local",
+            extra={"category": category, "predicted": predicted, "version": model.version, "applied": applied}
+        )
+        return {
+            "version": model.version,
+            "applied": applied,
+            "feedback_records": records,
+            "probability_before": round(before, 4) if before is not None else None,
+            "probability_after": round(after, 4),
+            "served_locally": local is not None and local[0] == category,
+        }
+
+    def _append(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with open(self.log_path, "a+b") as handle:
+            if handle.seek(0, os.SEEK_END):
+                handle.seek(-1, os.SEEK_END)
+                # Sobra de uma gravação interrompida: fica numa linha própria, que o treino ignora
+                if handle.read(1) != b"\n":
+                    line = "\n" + line
+            handle.write(line.encode("utf-8"))
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def _base(self) -> Tuple[LocalModel, int, int]:
+        """(cópia gravável do último snapshot ou do modelo base, offset do log já aplicado, correções)"""
+        version = self.store.current_version()
+        if version is not None:
+            model, meta = self.store.load(version)
+            return model.copy(), meta["feedback_offset"], meta["feedback_records"]
+        base = load_local_model()
+        if base is None:
+            base = LocalModel.empty()
+            base.empty_base = True
+        return base.copy(), 0, 0
+
+    def _read_log(self, offset: int) -> Iterator[Tuple[Optional[Dict[str, Any]], int]]:
+        """
+        Correções a partir do byte `offset`, com o offset logo depois de
+        cada uma (None no lugar de uma linha inválida, que só avança o offset)
+        """
+        try:
+            handle = open(self.log_path, "rb")
+        except FileNotFoundError:
+            return
+        with handle:
+            handle.seek(offset)
+            for line in handle:
+                # Linha sem \n é uma gravação interrompida: fica para o próximo treino
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    entry = None
+                if not isinstance(entry, dict) or entry.get("category") not in LABELS:
+                    logger.warning("Linha inválida no log de feedback", extra={"offset": offset})
+                    entry = None
+                yield entry, offset
+
+    def _learn(self, model: LocalModel, entry: Dict[str, Any]):
+        tokens = self.nlp.tokenize(f"{entry.get('subject', '')}. {entry.get('body', '')}")
+        indices, values = model.features(tokens)
+        if not len(indices):
+            return
+        label = LABELS.index(entry["category"])
+        for _ in range(settings.FEEDBACK_MAX_STEPS):
+            local = decide(model.predict_proba(tokens), settings.LOCAL_MODEL_LOW, settings.LOCAL_MODEL_HIGH)
+            if local is not None and local[0] == entry["category"]:
+                break
+            model.sgd_update(indices, values, label, settings.FEEDBACK_LEARNING_RATE, fit_bias=False)
+
+    def _train(self) -> Tuple[LocalModel, int, int]:
+        """Aplica o que falta do log sobre o último snapshot e publica a versão seguinte"""
+        model, offset, records = self._base()
+        parent, applied = model.version, 0
+        for entry, offset in self._read_log(offset):
+            if entry is not None:
+                self._learn(model, entry)
+                applied += 1
+        records += applied
+        model.version = self.store.publish(model, {
+            "parent": parent,
+            "feedback_offset": offset,
+            "feedback_records": records,
+        })
+        return model, applied, records
+
+
+# Instância singleton (construída no primeiro uso)
+feedback_service = LazyService(lambda: FeedbackService(
+    settings.FEEDBACK_LOG_PATH,
+    live_local_model.store,
+    live_local_model,
+))
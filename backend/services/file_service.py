@@ -1,100 +1,236 @@
+import codecs
+import os
+import shutil
+import tempfile
+import time
 import PyPDF2
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, List, Optional
 from io import BytesIO
+from config import settings
+from services.lazy import LazyService
+from services.metrics import STAGE_SECONDS
+
+
+def _extract_pdf_pages(path: str, start: int, end: int) -> List[str]:
+    """Extrai o texto das páginas [start, end) de um PDF em disco (roda no process pool)"""
+    reader = PyPDF2.PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
 
 class FileService:
     """Serviço para extrair texto de arquivos"""
-    
+
     SUPPORTED_FORMATS = ['.txt', '.pdf']
     MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
-    
+    READ_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+
     def extract_text_from_file(
-        self, 
-        file_content: bytes, 
+        self,
+        file_content: bytes,
         filename: str
     ) -> str:
-       
+        """Extrai todo o texto de um arquivo já carregado em memória"""
+        return self.extract_text_from_stream(BytesIO(file_content), filename, char_budget=0)["text"]
+
+    def extract_text_from_stream(
+        self,
+        stream: BinaryIO,
+        filename: str,
+        char_budget: Optional[int] = None
+    ) -> Dict[str, any]:
+        """
+        Extrai texto lendo o arquivo aos poucos, sem carregá-lo inteiro na memória
+
+        Args:
+            stream: arquivo binário posicionável (ex: UploadFile.file, que o
+                Starlette já despeja em disco acima de 1MB)
+            filename: nome original, usado para detectar o formato
+            char_budget: para de ler ao atingir este número de caracteres
+                (None = EXTRACTION_CHAR_BUDGET, 0 = sem limite)
+
+        Returns:
+            dict: text, pages_read, total_pages, truncated, extraction_time_ms
+        """
+        started = time.perf_counter()
+        if char_budget is None:
+            char_budget = settings.EXTRACTION_CHAR_BUDGET
+
         # Valida tamanho
-        if len(file_content) > self.MAX_FILE_SIZE:
+        size = self.stream_size(stream)
+        if size > self.MAX_FILE_SIZE:
             raise ValueError(f"Arquivo muito grande. Tamanho máximo: {self.MAX_FILE_SIZE / 1024 / 1024}MB")
-        
+
         # Determina tipo de arquivo
         file_ext = self._get_file_extension(filename)
-        
+
         if file_ext not in self.SUPPORTED_FORMATS:
             raise ValueError(
                 f"Formato '{file_ext}' não suportado. "
                 f"Formatos aceitos: {', '.join(self.SUPPORTED_FORMATS)}"
             )
-        
+
         # Extrai texto baseado no tipo
         if file_ext == '.txt':
-            return self._extract_from_txt(file_content)
+            result = self._extract_from_txt(stream, char_budget)
         elif file_ext == '.pdf':
-            return self._extract_from_pdf(file_content)
-        
-        raise ValueError(f"Erro ao processar arquivo {filename}")
-    
+            result = self._extract_from_pdf(stream, char_budget)
+        else:
+            raise ValueError(f"Erro ao processar arquivo {filename}")
+
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage="file_extraction")
+        result["extraction_time_ms"] = round(elapsed * 1000, 3)
+        return result
+
+    def stream_size(self, stream: BinaryIO) -> int:
+        """Tamanho do arquivo em bytes, sem lê-lo"""
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(0)
+        return size
+
     def _get_file_extension(self, filename: str) -> str:
         """Retorna extensão do arquivo em lowercase"""
         return '.' + filename.split('.')[-1].lower() if '.' in filename else ''
-    
-    def _extract_from_txt(self, file_content: bytes) -> str:
+
+    def _extract_from_txt(self, stream: BinaryIO, char_budget: int) -> Dict[str, any]:
         """Extrai texto de arquivo TXT"""
-        try:
-            # Tenta decodificar em UTF-8
-            text = file_content.decode('utf-8')
-            
-            if not text.strip():
-                raise ValueError("Arquivo TXT está vazio")
-            
-            return text
-            
-        except UnicodeDecodeError:
-            # Fallback para latin-1
+        # Tenta decodificar em UTF-8, com fallback para latin-1
+        for encoding in ('utf-8', 'latin-1'):
+            stream.seek(0)
             try:
-                text = file_content.decode('latin-1')
-                if not text.strip():
-                    raise ValueError("Arquivo TXT está vazio")
-                return text
-            except:
-                raise ValueError("Não foi possível decodificar o arquivo TXT")
-    
-    def _extract_from_pdf(self, file_content: bytes) -> str:
+                text, truncated = self._decode_stream(stream, encoding, char_budget)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            raise ValueError("Não foi possível decodificar o arquivo TXT")
+
+        if not text.strip():
+            raise ValueError("Arquivo TXT está vazio")
+
+        return {"text": text, "pages_read": None, "total_pages": None, "truncated": truncated}
+
+    def _decode_stream(self, stream: BinaryIO, encoding: str, char_budget: int):
+        """Decodifica em blocos até o orçamento de caracteres; retorna (texto, truncado)"""
+        decoder = codecs.getincrementaldecoder(encoding)()
+        parts, total = [], 0
+        while True:
+            chunk = stream.read(self.READ_CHUNK_SIZE)
+            parts.append(decoder.decode(chunk, final=not chunk))
+            total += len(parts[-1])
+            if not chunk:
+                return ''.join(parts), False
+            if char_budget and total >= char_budget:
+                return ''.join(parts)[:char_budget], True
+
+    def _extract_from_pdf(self, stream: BinaryIO, char_budget: int) -> Dict[str, any]:
         """Extrai texto de arquivo PDF"""
         try:
-            # Cria objeto BytesIO
-            pdf_file = BytesIO(file_content)
-            
-            # Lê PDF
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
+            # Lê PDF (o PyPDF2 carrega os objetos sob demanda a partir do stream)
+            pdf_reader = PyPDF2.PdfReader(stream)
+
             # Valida número de páginas
             num_pages = len(pdf_reader.pages)
             if num_pages == 0:
                 raise ValueError("PDF não contém páginas")
-            
-            # Extrai texto de todas as páginas
-            text_parts = []
-            for page_num in range(num_pages):
-                page = pdf_reader.pages[page_num]
-                page_text = page.extract_text()
-                
-                if page_text:
-                    text_parts.append(page_text)
-            
+
+            # A primeira página dá uma estimativa de quantas serão necessárias
+            first_page = pdf_reader.pages[0].extract_text() or ""
+            if self._should_parallelize(num_pages, len(first_page), char_budget):
+                text_parts, pages_read = self._extract_pdf_parallel(stream, num_pages, char_budget)
+            else:
+                text_parts, pages_read = self._extract_pdf_serial(pdf_reader, num_pages, char_budget, first_page)
+
             # Junta todo o texto
-            full_text = '\n'.join(text_parts)
-            
+            full_text = '\n'.join(part for part in text_parts if part)
+
             if not full_text.strip():
                 raise ValueError("PDF não contém texto extraível (pode ser imagem)")
-            
-            return full_text
-            
+
+            truncated = bool(char_budget) and (len(full_text) > char_budget or pages_read < num_pages)
+            if char_budget:
+                full_text = full_text[:char_budget]
+
+            return {
+                "text": full_text,
+                "pages_read": pages_read,
+                "total_pages": num_pages,
+                "truncated": truncated,
+            }
+
         except PyPDF2.errors.PdfReadError as e:
             raise ValueError(f"Erro ao ler PDF: {str(e)}")
         except Exception as e:
             raise ValueError(f"Erro ao processar PDF: {str(e)}")
 
-# Instância singleton
-file_service = FileService()
\ No newline at end of file
+    def _should_parallelize(self, num_pages: int, first_page_chars: int, char_budget: int) -> bool:
+        if settings.PDF_WORKERS <= 1:
+            return False
+        pages_needed = num_pages
+        if char_budget:
+            pages_needed = min(num_pages, -(-char_budget // max(first_page_chars, 1)))
+        return pages_needed >= settings.PDF_PARALLEL_MIN_PAGES
+
+    def _extract_pdf_serial(self, pdf_reader, num_pages: int, char_budget: int, first_page: str):
+        """Extrai página a página, parando ao atingir o orçamento"""
+        text_parts, total = [], 0
+        for page_num in range(num_pages):
+            page_text = first_page if page_num == 0 else pdf_reader.pages[page_num].extract_text()
+            if page_text:
+                text_parts.append(page_text)
+                total += len(page_text)
+            if char_budget and total >= char_budget:
+                return text_parts, page_num + 1
+        return text_parts, num_pages
+
+    def _extract_pdf_parallel(self, stream: BinaryIO, num_pages: int, char_budget: int):
+        """
+        Extrai faixas de páginas em um process pool, em ondas de PDF_WORKERS
+        tarefas, parando entre ondas se o orçamento de caracteres já foi atingido
+        """
+        pool = self._get_pool()
+        step = settings.PDF_PAGES_PER_TASK
+        text_parts, total, pages_read = [], 0, 0
+
+        with self._spool_to_disk(stream) as path:
+            for wave_start in range(0, num_pages, step * settings.PDF_WORKERS):
+                ranges = [
+                    (start, min(start + step, num_pages))
+                    for start in range(wave_start, min(wave_start + step * settings.PDF_WORKERS, num_pages), step)
+                ]
+                futures = [pool.submit(_extract_pdf_pages, path, start, end) for start, end in ranges]
+                for (start, end), future in zip(ranges, futures):
+                    for page_text in future.result():
+                        text_parts.append(page_text)
+                        total += len(page_text)
+                    pages_read = end
+                if char_budget and total >= char_budget:
+                    break
+
+        return text_parts, pages_read
+
+    @contextmanager
+    def _spool_to_disk(self, stream: BinaryIO):
+        """Copia o stream para um arquivo temporário nomeado (os workers abrem pelo caminho)"""
+        stream.seek(0)
+        handle = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+        try:
+            with handle:
+                shutil.copyfileobj(stream, handle, self.READ_CHUNK_SIZE)
+            yield handle.name
+        finally:
+            os.unlink(handle.name)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=settings.PDF_WORKERS)
+        return self._pool
+
+# Instância singleton (construída no primeiro uso)
+file_service = LazyService(FileService)
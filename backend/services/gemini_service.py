@@ -1,12 +1,48 @@
+import asyncio
+import contextvars
+import json
+import statistics
+import threading
+import time
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from collections import OrderedDict, deque
 from config import settings
-from typing import Tuple
+from services.lazy import LazyService
+from services.llm_provider import LLMProvider
+from services.logging_setup import get_logger
+from services.metrics import GEMINI_RETRIES, GEMINI_SHORT_CIRCUITS, GEMINI_TOKENS, record_gemini_error
+from services.resilience import (
+    CircuitBreaker, GeminiUnavailableError, RetryBudget, TokenBucket, backoff_delay
+)
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-# Configura Gemini
-genai.configure(api_key=settings.GEMINI_API_KEY)
+logger = get_logger("gemini")
 
-class GeminiService:
+
+class CombinedResponseError(ValueError):
+    """A resposta do prompt combinado não é um JSON válido com categoria e resposta"""
+
+# Chamadas e tokens gastos pela requisição em andamento (ver begin_usage)
+_usage = contextvars.ContextVar("gemini_usage", default=None)
+
+# Erros transitórios que valem uma retentativa (cota, indisponibilidade, timeout)
+_RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    asyncio.TimeoutError,
+    TimeoutError,
+    ConnectionError,
+)
+
+class GeminiService(LLMProvider):
     """Serviço de integração com Google Gemini"""
+
+    name = "gemini"
+    cost = 1.0
+    cacheable = True
     
     CLASSIFICATION_INSTRUCTION = """
     
@@ -47,6 +83,35 @@ Responda APENAS com uma destas opções exatas:
 
 Não adicione explicações, apenas a categoria (Produtivo ou Improdutivo)."""
 
+    BATCH_CLASSIFICATION_INSTRUCTION = CLASSIFICATION_INSTRUCTION.split("Responda APENAS")[0] + """Você receberá vários emails numerados.
+
+Responda APENAS com um array JSON contendo uma categoria por email, na mesma ordem da numeração.
+Cada item do array deve ser exatamente "Produtivo" ou "Improdutivo".
+Exemplo para 3 emails: ["Produtivo", "Improdutivo", "Produtivo"]
+
+Não adicione explicações, apenas o array JSON."""
+
+    COMBINED_INSTRUCTION = CLASSIFICATION_INSTRUCTION.split("Responda APENAS")[0] + """Além de classificar, escreva a resposta sugerida ao email em português brasileiro.
+
+Se for PRODUTIVO: resposta formal mas cordial, confirmando o recebimento e
+indicando próximos passos quando relevante.
+Se for IMPRODUTIVO: resposta calorosa, natural e pessoal, em 2-3 frases,
+retribuindo o sentimento do remetente, sem jargões corporativos e sem emojis.
+Em ambos os casos não mencione que você é uma IA e não inclua assinatura.
+
+Responda APENAS com um objeto JSON no formato:
+{"category": "Produtivo" ou "Improdutivo", "confidence": número entre 0 e 1, "reply": "texto da resposta"}"""
+
+    COMBINED_RESPONSE_SCHEMA = {
+        "type": "OBJECT",
+        "properties": {
+            "category": {"type": "STRING", "enum": ["Produtivo", "Improdutivo"]},
+            "confidence": {"type": "NUMBER"},
+            "reply": {"type": "STRING"},
+        },
+        "required": ["category", "confidence", "reply"],
+    }
+
     RESPONSE_INSTRUCTIONS = {
         "Improdutivo": """Você é um assistente de email amigável, mas formal, em português brasileiro.
 
@@ -74,22 +139,66 @@ Regras:
 - Não mencione que você é uma IA"""
     }
     
-    def classify_email(self, subject: str, body: str) -> Tuple[str, float]:
+    def __init__(self):
+        # Limita quantas chamadas ao Gemini ficam em voo ao mesmo tempo no event loop
+        self._semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+        # Modelos construídos uma vez por (modelo, instrução, generation config)
+        self._models: "OrderedDict[tuple, genai.GenerativeModel]" = OrderedDict()
+        self._models_lock = threading.Lock()
+        # Tempos das últimas chamadas (setup, espera na fila, TTFB e total)
+        self._timings = deque(maxlen=settings.GEMINI_TIMINGS_WINDOW)
+        self._limiter = TokenBucket(
+            settings.GEMINI_RATE_LIMIT_RPS,
+            settings.GEMINI_RATE_LIMIT_BURST,
+            settings.GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS
+        )
+        self._retry_budget = RetryBudget(settings.GEMINI_RETRY_BUDGET_TOKENS, settings.GEMINI_RETRY_BUDGET_RATIO)
+        self._breaker = CircuitBreaker(
+            settings.GEMINI_BREAKER_FAILURES,
+            settings.GEMINI_BREAKER_RESET_SECONDS,
+            probe=self._probe
+        )
+        self._configure_transport()
+
+    def _configure_transport(self):
         """
-        Classifica email usando Gemini
-        
-        Returns:
-            tuple: (category, confidence)
+        Configura o cliente do SDK uma única vez por processo
+
+        No gRPC (padrão) o SDK mantém um canal HTTP/2 persistente que
+        multiplexa as chamadas concorrentes. No REST cada cliente do SDK
+        reaproveita as conexões da sua própria sessão HTTP.
         """
-        try:
-            print(f"Chamando Gemini para classificação...")
-            
-            model = genai.GenerativeModel(
-                model_name=settings.GEMINI_MODEL,
-                system_instruction=self.CLASSIFICATION_INSTRUCTION
-            )
-            
-            prompt = f"""Classifique este email:
+        client_options = {"api_endpoint": settings.GEMINI_API_ENDPOINT} if settings.GEMINI_API_ENDPOINT else None
+        genai.configure(
+            api_key=settings.GEMINI_API_KEY,
+            transport=settings.GEMINI_TRANSPORT or None,
+            client_options=client_options
+        )
+
+    def _create_model(self, system_instruction: str, generation_config):
+        """Cria o modelo Gemini com a instrução de sistema e a configuração informadas"""
+        return genai.GenerativeModel(
+            model_name=settings.GEMINI_MODEL,
+            system_instruction=system_instruction,
+            generation_config=generation_config
+        )
+
+    def _get_model(self, system_instruction: str, generation_config):
+        """Retorna o modelo do registro, criando-o na primeira vez"""
+        key = (settings.GEMINI_MODEL, system_instruction, repr(generation_config))
+        with self._models_lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+            model = self._create_model(system_instruction, generation_config)
+            self._models[key] = model
+            while len(self._models) > settings.GEMINI_MODEL_REGISTRY_SIZE:
+                self._models.popitem(last=False)
+            return model
+
+    def _classification_prompt(self, subject: str, body: str) -> str:
+        return f"""Classifique este email:
 
 **Assunto:** {subject}
 
@@ -97,32 +206,520 @@ Regras:
 {body}
 
 **Categoria:**"""
-            
+
+    def _classification_config(self):
+        return genai.types.GenerationConfig(
+            temperature=settings.CLASSIFICATION_TEMPERATURE,
+            max_output_tokens=5,
+        )
+
+    def batch_item_tokens(self, index: int, subject: str, body: str) -> int:
+        return self.estimate_tokens(self._batch_item_prompt(index, subject, body))
+
+    def _batch_item_prompt(self, index: int, subject: str, body: str) -> str:
+        return f"""### Email {index}
+**Assunto:** {subject}
+**Corpo do email:**
+{body}
+"""
+
+    def _batch_classification_prompt(self, items: List[Tuple[str, str]]) -> str:
+        parts = [self._batch_item_prompt(i, subject, body) for i, (subject, body) in enumerate(items, start=1)]
+        return f"Classifique estes {len(items)} emails:\n\n" + "\n".join(parts) + "\n**Categorias (array JSON):**"
+
+    def _batch_classification_config(self, size: int):
+        return genai.types.GenerationConfig(
+            temperature=settings.CLASSIFICATION_TEMPERATURE,
+            max_output_tokens=8 * size + 16,
+            response_mime_type="application/json",
+        )
+
+    def _parse_batch_classification(self, text: str, size: int) -> List[Optional[Tuple[str, float]]]:
+        """
+        Converte o array JSON do Gemini em uma lista de (category, confidence).
+        Itens ausentes ou inválidos viram None para o chamador aplicar o fallback.
+        """
+        raw = text.strip().strip("`")
+        if raw.lower().startswith("json"):
+            raw = raw[4:]
+        try:
+            answers = json.loads(raw)
+        except ValueError:
+            logger.warning("Resposta em lote inválida", extra={"chars": len(text)})
+            return [None] * size
+
+        if not isinstance(answers, list):
+            return [None] * size
+
+        parsed = []
+        for i in range(size):
+            answer = answers[i] if i < len(answers) else None
+            label = answer.strip().lower() if isinstance(answer, str) else ""
+            if label == "produtivo":
+                parsed.append(("Produtivo", 0.90))
+            elif label == "improdutivo":
+                parsed.append(("Improdutivo", 0.90))
+            else:
+                parsed.append(None)
+        return parsed
+
+    def _parse_classification(self, text: str) -> Tuple[str, float]:
+        category_raw = text.strip().lower()
+        logger.debug("Resposta do Gemini: %r", category_raw)
+
+        # Normaliza a resposta
+        if "produtivo" in category_raw and "improdutivo" not in category_raw:
+            return "Produtivo", 0.90
+        elif "improdutivo" in category_raw:
+            return "Improdutivo", 0.90
+        else:
+            # Fallback
+            logger.warning("Resposta inesperada do Gemini, usando categoria padrão")
+            return self.CLASSIFICATION_INSTRUCTION.splitlines()[-2].split(":")[-1].strip(), 0.50
+
+    def _response_prompt(
+        self,
+        category: str,
+        sender_name: str,
+        subject: str,
+        body: str,
+        keywords: list
+    ) -> Tuple[str, str]:
+        """Retorna (system_instruction, prompt) para a geração de resposta"""
+        system_instruction = self.RESPONSE_INSTRUCTIONS.get(category, self.RESPONSE_INSTRUCTIONS["Produtivo"])
+
+        if category == "Improdutivo":
+            prompt = f"""Responda este email social de forma amigável:
+
+**De:** {sender_name}
+**Assunto:** {subject}
+**Mensagem:** {body}
+
+**Palavras-chave identificadas:** {', '.join(keywords)}
+
+Seja caloroso e natural."""
+        else:
+            prompt = f"""Responda este email profissional:
+
+**De:** {sender_name}
+**Assunto:** {subject}
+**Mensagem:** {body}
+
+**Palavras-chave identificadas:** {', '.join(keywords)}
+
+Confirme o recebimento de forma profissional."""
+
+        return system_instruction, prompt
+
+    def _response_config(self):
+        return genai.types.GenerationConfig(
+            temperature=settings.TEMPERATURE,
+            max_output_tokens=settings.MAX_OUTPUT_TOKENS,
+        )
+
+    def _combined_prompt(self, sender_name: str, subject: str, body: str, keywords: list) -> str:
+        return f"""Classifique e responda este email:
+
+**De:** {sender_name}
+**Assunto:** {subject}
+**Mensagem:** {body}
+
+**Palavras-chave identificadas:** {', '.join(keywords)}"""
+
+    def _combined_config(self):
+        return genai.types.GenerationConfig(
+            temperature=settings.COMBINED_TEMPERATURE,
+            max_output_tokens=settings.MAX_OUTPUT_TOKENS + 32,
+            response_mime_type="application/json",
+            response_schema=self.COMBINED_RESPONSE_SCHEMA,
+        )
+
+    def _parse_combined(self, text: str) -> Tuple[str, float, str]:
+        """Valida o JSON do prompt combinado; CombinedResponseError se algo não bater"""
+        raw = text.strip().strip("`")
+        if raw.lower().startswith("json"):
+            raw = raw[4:]
+        try:
+            answer = json.loads(raw)
+        except ValueError:
+            raise CombinedResponseError("JSON inválido")
+        if not isinstance(answer, dict):
+            raise CombinedResponseError("Esperado um objeto JSON")
+
+        label = answer.get("category")
+        label = label.strip().lower() if isinstance(label, str) else ""
+        if label not in ("produtivo", "improdutivo"):
+            raise CombinedResponseError(f"Categoria inválida: {answer.get('category')!r}")
+        reply = answer.get("reply")
+        if not isinstance(reply, str) or not reply.strip():
+            raise CombinedResponseError("Resposta vazia")
+
+        confidence = answer.get("confidence")
+        if isinstance(confidence, bool) or not isinstance(confidence, (int, float)):
+            confidence = 0.90
+        return label.capitalize(), round(min(1.0, max(0.0, float(confidence))), 2), reply.strip()
+
+    def available(self) -> bool:
+        """False enquanto o circuito estiver aberto (pode disparar a sonda de recuperação)"""
+        return self._breaker.allow()
+
+    def _admit(self, kind: str):
+        """Circuito e limite de taxa: GeminiUnavailableError se a chamada não deve sair"""
+        try:
+            self._breaker.check()
+            self._limiter.acquire()
+        except GeminiUnavailableError as e:
+            GEMINI_SHORT_CIRCUITS.inc(operation=kind, reason=e.reason)
+            raise
+
+    async def _admit_async(self, kind: str):
+        try:
+            self._breaker.check()
+            await self._limiter.acquire_async()
+        except GeminiUnavailableError as e:
+            GEMINI_SHORT_CIRCUITS.inc(operation=kind, reason=e.reason)
+            raise
+
+    def _on_call_success(self):
+        self._breaker.on_success()
+        self._retry_budget.on_success()
+
+    def _on_call_failure(self, error: Exception):
+        """
+        Uma falha por chamada lógica (não por tentativa), e só as de servidor
+        ou transporte: um pedido inválido não abre o circuito para todos
+        """
+        if isinstance(error, _RETRYABLE_ERRORS):
+            self._breaker.on_failure()
+
+    def _retry_delay(self, kind: str, error: Exception, attempt: int) -> Optional[float]:
+        """Quanto esperar antes de retentar, ou None para desistir (aí o chamador registra a falha)"""
+        if not isinstance(error, _RETRYABLE_ERRORS):
+            return None
+        self._retry_budget.on_failure()
+        if (
+            attempt >= settings.GEMINI_MAX_RETRIES
+            or self._breaker.state != CircuitBreaker.CLOSED
+            or not self._retry_budget.can_retry()
+        ):
+            return None
+        GEMINI_RETRIES.inc(operation=kind)
+        logger.debug("Retentando chamada ao Gemini: %s: %s", type(error).__name__, error)
+        return backoff_delay(attempt, settings.GEMINI_RETRY_BASE_SECONDS, settings.GEMINI_RETRY_MAX_SECONDS)
+
+    def _generate(self, kind: str, system_instruction: str, generation_config, prompt: str):
+        """Chamada síncrona protegida por circuito, limite de taxa e retentativas"""
+        attempt = 0
+        while True:
+            self._admit(kind)
+            try:
+                response = self._generate_once(kind, system_instruction, generation_config, prompt)
+            except Exception as e:
+                delay = self._retry_delay(kind, e, attempt)
+                if delay is None:
+                    self._on_call_failure(e)
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._on_call_success()
+            return response
+
+    async def _generate_async(self, kind: str, system_instruction: str, generation_config, prompt: str):
+        """Versão assíncrona de _generate (o backoff não bloqueia o event loop)"""
+        attempt = 0
+        while True:
+            await self._admit_async(kind)
+            try:
+                response = await self._generate_once_async(kind, system_instruction, generation_config, prompt)
+            except Exception as e:
+                delay = self._retry_delay(kind, e, attempt)
+                if delay is None:
+                    self._on_call_failure(e)
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._on_call_success()
+            return response
+
+    def _probe(self):
+        """Sonda do circuito: uma classificação mínima, fora do circuito mas dentro da cota"""
+        self._limiter.acquire()
+        self._generate_once(
+            "probe",
+            self.CLASSIFICATION_INSTRUCTION,
+            self._classification_config(),
+            self._classification_prompt("Teste", "Verificação de disponibilidade.")
+        )
+
+    def _generate_once(self, kind: str, system_instruction: str, generation_config, prompt: str):
+        """Uma chamada síncrona, sem streaming: a resposta só é usada completa"""
+        started = time.perf_counter()
+        model = self._get_model(system_instruction, generation_config)
+        sent = time.perf_counter()
+        response = None
+        try:
             response = model.generate_content(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=settings.CLASSIFICATION_TEMPERATURE,
-                    max_output_tokens=5,
+                request_options={"timeout": settings.GEMINI_TIMEOUT_SECONDS}
+            )
+        finally:
+            self._record_usage(kind, prompt, response)
+        self._record_timing(kind, started, sent, sent, None, time.perf_counter())
+        return response
+
+    async def _generate_once_async(self, kind: str, system_instruction: str, generation_config, prompt: str):
+        """
+        Chamada assíncrona ao Gemini limitada pelo semáforo e pelo timeout
+
+        Se a tarefa for cancelada (ex: cliente desconectou), a chamada em voo
+        é cancelada junto e o slot do semáforo é liberado.
+        """
+        started = time.perf_counter()
+        model = self._get_model(system_instruction, generation_config)
+        model_ready = time.perf_counter()
+        async with self._semaphore:
+            sent = time.perf_counter()
+            response = None
+            try:
+                response = await asyncio.wait_for(
+                    model.generate_content_async(prompt),
+                    timeout=settings.GEMINI_TIMEOUT_SECONDS
                 )
+            finally:
+                self._record_usage(kind, prompt, response)
+            self._record_timing(kind, started, model_ready, sent, None, time.perf_counter())
+            return response
+
+    def _record_usage(self, kind: str, prompt: str, response=None, output_text: Optional[str] = None):
+        """
+        Contabiliza uma chamada (mesmo com falha) nos contadores de tokens e
+        no uso da requisição em andamento. Usa o usage_metadata do Gemini
+        e, na falta dele, a estimativa de ~4 caracteres por token.
+        """
+        metadata = getattr(response, "usage_metadata", None)
+        if output_text is None:
+            try:
+                output_text = response.text if response is not None else ""
+            except Exception:
+                output_text = ""
+        prompt_tokens = getattr(metadata, "prompt_token_count", 0) or self.estimate_tokens(prompt)
+        output_tokens = getattr(metadata, "candidates_token_count", 0) or (
+            self.estimate_tokens(output_text) if output_text else 0
+        )
+        GEMINI_TOKENS.inc(prompt_tokens, operation=kind, type="prompt")
+        GEMINI_TOKENS.inc(output_tokens, operation=kind, type="output")
+
+        usage = _usage.get()
+        if usage is not None:
+            usage["llm_calls"] += 1
+            usage["prompt_tokens"] += prompt_tokens
+            usage["output_tokens"] += output_tokens
+
+    def _record_timing(
+        self,
+        kind: str,
+        started: float,
+        model_ready: float,
+        sent: float,
+        first_chunk: Optional[float],
+        finished: float
+    ):
+        """
+        setup = obter o modelo, queue = espera no semáforo, ttfb = até o
+        primeiro chunk (só nas chamadas em streaming; as demais têm só o total)
+        """
+        timing = {
+            "kind": kind,
+            "setup_ms": (model_ready - started) * 1000,
+            "queue_ms": (sent - model_ready) * 1000,
+            "total_ms": (finished - started) * 1000,
+        }
+        if first_chunk is not None:
+            timing["ttfb_ms"] = (first_chunk - sent) * 1000
+        self._timings.append(timing)
+
+    def timing_summary(self) -> Dict[str, any]:
+        """p50/p95 de cada etapa nas últimas GEMINI_TIMINGS_WINDOW chamadas"""
+        timings = list(self._timings)
+        summary = {"calls": len(timings), "models_cached": len(self._models)}
+        if not timings:
+            return summary
+        for field in ("setup_ms", "queue_ms", "ttfb_ms", "total_ms"):
+            values = sorted(t[field] for t in timings if field in t)
+            if not values:
+                continue
+            summary[field] = {
+                "p50": round(statistics.median(values), 3),
+                "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+            }
+        return summary
+
+    def resilience_stats(self) -> Dict[str, any]:
+        """Estado do circuito, do limite de taxa e do orçamento de retentativas"""
+        return {
+            "circuit": self._breaker.stats(),
+            "rate_limit": self._limiter.stats(),
+            "retry_budget": self._retry_budget.stats(),
+        }
+
+    def classify_email(self, subject: str, body: str) -> Tuple[str, float]:
+        """
+        Classifica email usando Gemini
+        
+        Returns:
+            tuple: (category, confidence)
+        """
+        try:
+            logger.debug("Chamando Gemini para classificação")
+
+            response = self._generate(
+                "classify",
+                self.CLASSIFICATION_INSTRUCTION,
+                self._classification_config(),
+                self._classification_prompt(subject, body)
             )
             
-            category_raw = response.text.strip().lower()
-            print(f"Resposta do Gemini: '{category_raw}'")
-            
-            # Normaliza a resposta
-            if "produtivo" in category_raw and "improdutivo" not in category_raw:
-                return "Produtivo", 0.90
-            elif "improdutivo" in category_raw:
-                return "Improdutivo", 0.90
-            else:
-                # Fallback
-                print(f"Resposta inesperada, usando fallback")
-                return self.CLASSIFICATION_INSTRUCTION.splitlines()[-2].split(":")[-1].strip(), 0.50
+            return self._parse_classification(response.text)
                 
+        except GeminiUnavailableError:
+            raise
+        except Exception as e:
+            record_gemini_error("classify", e)
+            raise
+
+    async def classify_email_async(self, subject: str, body: str) -> Tuple[str, float]:
+        """
+        Versão assíncrona de classify_email (não bloqueia o event loop)
+        
+        Returns:
+            tuple: (category, confidence)
+        """
+        try:
+            logger.debug("Chamando Gemini (async) para classificação")
+
+            response = await self._generate_async(
+                "classify",
+                self.CLASSIFICATION_INSTRUCTION,
+                self._classification_config(),
+                self._classification_prompt(subject, body)
+            )
+
+            return self._parse_classification(response.text)
+
+        except GeminiUnavailableError:
+            raise
+        except Exception as e:
+            record_gemini_error("classify", e)
+            raise
+    
+    def classify_batch(self, items: List[Tuple[str, str]]) -> List[Optional[Tuple[str, float]]]:
+        """
+        Classifica vários emails (subject, body) em uma única chamada ao Gemini
+        
+        Returns:
+            list: (category, confidence) por item, ou None se a resposta do item veio inválida
+        """
+        try:
+            logger.debug("Chamando Gemini para classificação em lote", extra={"emails": len(items)})
+
+            response = self._generate(
+                "classify_batch",
+                self.BATCH_CLASSIFICATION_INSTRUCTION,
+                self._batch_classification_config(len(items)),
+                self._batch_classification_prompt(items)
+            )
+
+            return self._parse_batch_classification(response.text, len(items))
+
+        except GeminiUnavailableError:
+            raise
+        except Exception as e:
+            record_gemini_error("classify_batch", e)
+            raise
+
+    async def classify_batch_async(self, items: List[Tuple[str, str]]) -> List[Optional[Tuple[str, float]]]:
+        """Versão assíncrona de classify_batch"""
+        try:
+            logger.debug("Chamando Gemini (async) para classificação em lote", extra={"emails": len(items)})
+
+            response = await self._generate_async(
+                "classify_batch",
+                self.BATCH_CLASSIFICATION_INSTRUCTION,
+                self._batch_classification_config(len(items)),
+                self._batch_classification_prompt(items)
+            )
+
+            return self._parse_batch_classification(response.text, len(items))
+
+        except GeminiUnavailableError:
+            raise
         except Exception as e:
-            print(f"Erro na classificação: {e}")
+            record_gemini_error("classify_batch", e)
             raise
     
+    def classify_and_reply(
+        self,
+        sender_name: str,
+        subject: str,
+        body: str,
+        keywords: list
+    ) -> Tuple[str, float, str]:
+        """
+        Classifica e gera a resposta numa única chamada (JSON com schema)
+
+        Returns:
+            tuple: (category, confidence, reply)
+
+        Raises:
+            CombinedResponseError se a resposta não passar na validação
+            (o chamador volta para as duas chamadas separadas)
+        """
+        try:
+            logger.debug("Chamando Gemini para classificação e resposta combinadas")
+
+            response = self._generate(
+                "combined",
+                self.COMBINED_INSTRUCTION,
+                self._combined_config(),
+                self._combined_prompt(sender_name, subject, body, keywords)
+            )
+
+            return self._parse_combined(response.text)
+
+        except (GeminiUnavailableError, CombinedResponseError):
+            raise
+        except Exception as e:
+            record_gemini_error("combined", e)
+            raise
+
+    async def classify_and_reply_async(
+        self,
+        sender_name: str,
+        subject: str,
+        body: str,
+        keywords: list
+    ) -> Tuple[str, float, str]:
+        """Versão assíncrona de classify_and_reply"""
+        try:
+            logger.debug("Chamando Gemini (async) para classificação e resposta combinadas")
+
+            response = await self._generate_async(
+                "combined",
+                self.COMBINED_INSTRUCTION,
+                self._combined_config(),
+                self._combined_prompt(sender_name, subject, body, keywords)
+            )
+
+            return self._parse_combined(response.text)
+
+        except (GeminiUnavailableError, CombinedResponseError):
+            raise
+        except Exception as e:
+            record_gemini_error("combined", e)
+            raise
+
     def generate_response(
         self, 
         category: str, 
@@ -145,53 +742,125 @@ Regras:
             str: Resposta gerada
         """
         try:
-            print(f"Gerando resposta com Gemini...")    
-            
-            system_instruction = self.RESPONSE_INSTRUCTIONS.get(category, self.RESPONSE_INSTRUCTIONS["Produtivo"])
-            
-            if category == "Improdutivo":
-                prompt = f"""Responda este email social de forma amigável:
+            logger.debug("Gerando resposta com Gemini")
 
-**De:** {sender_name}
-**Assunto:** {subject}
-**Mensagem:** {body}
-
-**Palavras-chave identificadas:** {', '.join(keywords)}
+            system_instruction, prompt = self._response_prompt(category, sender_name, subject, body, keywords)
+            response = self._generate("reply", system_instruction, self._response_config(), prompt)
+            
+            text = response.text.strip() if hasattr(response, "text") else ""
+            logger.debug("Gemini retornou resposta", extra={"chars": len(text)})
+            return text
 
-Seja caloroso e natural."""
-            else:
-                prompt = f"""Responda este email profissional:
+        except GeminiUnavailableError:
+            raise
+        except Exception as e:
+            record_gemini_error("reply", e)
+            logger.warning("Erro ao gerar resposta: %s: %s", type(e).__name__, e)
+            return self.RESPONSE_ERROR_TEXT
 
-**De:** {sender_name}
-**Assunto:** {subject}
-**Mensagem:** {body}
+    async def generate_response_async(
+        self,
+        category: str,
+        sender_name: str,
+        subject: str,
+        body: str,
+        keywords: list
+    ) -> str:
+        """
+        Versão assíncrona de generate_response (mesmos argumentos e retorno)
+        """
+        try:
+            logger.debug("Gerando resposta com Gemini (async)")
 
-**Palavras-chave identificadas:** {', '.join(keywords)}
+            system_instruction, prompt = self._response_prompt(category, sender_name, subject, body, keywords)
+            response = await self._generate_async("reply", system_instruction, self._response_config(), prompt)
 
-Confirme o recebimento de forma profissional."""
-            
-            model = genai.GenerativeModel(
-                model_name=settings.GEMINI_MODEL,
-                system_instruction=system_instruction
-            )
-            
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=settings.TEMPERATURE,
-                    max_output_tokens=settings.MAX_OUTPUT_TOKENS,
-                )
-            )
-            
             text = response.text.strip() if hasattr(response, "text") else ""
-            
-            print(f"Gemini retornou: '{text}'")
-            
+            logger.debug("Gemini retornou resposta", extra={"chars": len(text)})
             return text
-                
+
+        except GeminiUnavailableError:
+            raise
         except Exception as e:
-            print(f"Erro ao gerar resposta: {e}")
-            return "Desculpe, não consegui gerar uma resposta no momento."
+            record_gemini_error("reply", e)
+            logger.warning("Erro ao gerar resposta: %s: %s", type(e).__name__, e)
+            return self.RESPONSE_ERROR_TEXT
+
+    async def stream_response_async(
+        self,
+        category: str,
+        sender_name: str,
+        subject: str,
+        body: str,
+        keywords: list
+    ) -> AsyncIterator[str]:
+        """
+        Gera a resposta em streaming, devolvendo os pedaços de texto conforme chegam
+
+        Fechar o gerador antes do fim (ex: marcador de assinatura encontrado)
+        abandona o stream do Gemini e libera o slot do semáforo. Falhas
+        transitórias antes do primeiro pedaço são retentadas como nas demais
+        chamadas; depois dele não, porque parte da resposta já foi enviada
+        ao cliente. Ao contrário de generate_response, erros são propagados
+        para o chamador.
+        """
+        logger.debug("Gerando resposta com Gemini (stream)")
+        system_instruction, prompt = self._response_prompt(category, sender_name, subject, body, keywords)
+        attempt = 0
+        while True:
+            await self._admit_async("reply_stream")
+            started = time.perf_counter()
+            model = self._get_model(system_instruction, self._response_config())
+            model_ready = time.perf_counter()
+            async with self._semaphore:
+                sent = time.perf_counter()
+                first_chunk = None
+                response = None
+                streamed = []
+                try:
+                    response = await asyncio.wait_for(
+                        model.generate_content_async(prompt, stream=True),
+                        timeout=settings.GEMINI_TIMEOUT_SECONDS
+                    )
+                    chunks = response.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=settings.GEMINI_TIMEOUT_SECONDS)
+                        except StopAsyncIteration:
+                            break
+                        if first_chunk is None:
+                            first_chunk = time.perf_counter()
+                        if chunk.text:
+                            streamed.append(chunk.text)
+                            yield chunk.text
+                    self._on_call_success()
+                    return
+                except GeneratorExit:
+                    # Fechado pelo chamador no meio do stream: o Gemini estava respondendo
+                    self._on_call_success()
+                    raise
+                except Exception as e:
+                    record_gemini_error("reply_stream", e)
+                    delay = None if streamed else self._retry_delay("reply_stream", e, attempt)
+                    if delay is None:
+                        if streamed and isinstance(e, _RETRYABLE_ERRORS):
+                            self._retry_budget.on_failure()
+                        self._on_call_failure(e)
+                        raise
+                finally:
+                    self._record_usage("reply_stream", prompt, response, "".join(streamed))
+                    self._record_timing("reply_stream", started, model_ready, sent, first_chunk, time.perf_counter())
+            await asyncio.sleep(delay)
+            attempt += 1
+
+def begin_usage() -> Dict[str, int]:
+    """
+    Abre a contagem de uso do Gemini da requisição atual e retorna o dict
+    que será preenchido (as tarefas e threads filhas herdam o contexto)
+    """
+    usage = {"llm_calls": 0, "prompt_tokens": 0, "output_tokens": 0}
+    _usage.set(usage)
+    return usage
 
-# Instância singleton
-gemini_service = GeminiService()
\ No newline at end of file
+# Instância singleton (construída no primeiro uso)
+gemini_service = LazyService(GeminiService)
\ No newline at end of file
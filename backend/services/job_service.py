@@ -0,0 +1,526 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: um processo só, que é sempre o executor
+    fcntl = None
+
+from config import settings
+from services.admission import admission_controller
+from services.classifier_service import classifier_service
+from services.lazy import LazyService
+from services.llm_router import llm_router
+from services.logging_setup import get_logger
+from services.mailbox_service import MboxSource, message_record
+
+logger = get_logger("jobs")
+
+JOB_MODES = ("classify", "full")
+JOB_FORMATS = (".jsonl", ".mbox")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    retries INTEGER NOT NULL DEFAULT 0,
+    llm_calls INTEGER NOT NULL DEFAULT 0,
+    active_seconds REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    base_done INTEGER NOT NULL DEFAULT 0,
+    finished_at REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    ref TEXT,
+    sender TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS idx_items_pending ON items(job_id, status, idx);
+"""
+
+
+class AdaptiveRateLimiter:
+    """
+    Limita as requisições ao Gemini por segundo e se adapta a throttling
+
+    Balde de tokens cuja taxa sobe devagar a cada lote bem-sucedido e cai
+    pela metade (com uma pausa) quando o Gemini começa a falhar, como o
+    controle de congestionamento do TCP.
+    """
+
+    def __init__(self, max_rate: float, min_rate: float = 0.2, increase: float = 0.1):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.increase = increase
+        self.rate = max_rate
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(1.0, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._paused_until = time.monotonic() + 1.0 / self.rate
+
+
+class JobService:
+    """
+    Jobs de classificação em massa (backfill de caixas arquivadas)
+
+    O arquivo enviado (JSONL ou mbox) vira itens numa base SQLite. Um pool
+    de workers assíncronos pega blocos de itens pendentes, classifica pelo
+    ClassifierService e grava o resultado de cada bloco numa transação, de
+    modo que um restart retoma do último bloco gravado.
+
+    Modos: "classify" usa a classificação em lote (várias mensagens por
+    chamada ao Gemini; itens que caíram no fallback por erro do Gemini
+    voltam para a fila até JOB_MAX_ATTEMPTS); "full" também gera a
+    resposta sugerida, um email por vez.
+
+    Cada bloco ocupa um slot bulk da admissão (services/admission.py):
+    as requisições interativas passam na frente do backfill.
+
+    Com vários processos servindo a API (gunicorn), todos aceitam jobs,
+    mas só o que segura a trava do executor (arquivo .runner ao lado da
+    base) os processa; os demais ficam de reserva e assumem se ele cair.
+    """
+
+    def __init__(self, db_path: str, workers: int, chunk_size: int, max_rps: float):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.limiter = AdaptiveRateLimiter(max_rps)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner_path = db_path + ".runner"
+        self._runner_lock = None
+        self._is_runner = False
+
+    # ------------------------------------------------------------------ envio
+
+    def submit(self, stream: BinaryIO, filename: str, mode: str = "classify") -> Dict[str, Any]:
+        """Lê o arquivo, grava os itens e devolve o job criado (fila 'queued')"""
+        if mode not in JOB_MODES:
+            raise ValueError(f"Modo inválido. Use: {', '.join(JOB_MODES)}")
+        ext = os.path.splitext(filename.lower())[1]
+        if ext not in JOB_FORMATS:
+            raise ValueError(f"Formato '{ext}' não suportado. Formatos aceitos: {', '.join(JOB_FORMATS)}")
+
+        job_id = os.urandom(8).hex()
+        records = self._iter_jsonl(stream) if ext == ".jsonl" else self._iter_mbox(stream)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, filename, mode, status, created_at) VALUES (?, ?, ?, 'loading', ?)",
+                (job_id, filename, mode, time.time())
+            )
+            self._db.commit()
+        # A leitura do arquivo fica fora da trava: só cada bloco de inserts a segura,
+        # para que consultas, cancelamentos e os workers não esperem o upload inteiro.
+        # Enquanto 'loading', o job é ignorado pelos workers.
+        total = 0
+        try:
+            batch = []
+            for record in records:
+                batch.append((job_id, total, record["ref"], record["sender"], record["subject"], record["body"]))
+                total += 1
+                if len(batch) >= self._INSERT_CHUNK:
+                    self._insert_items(batch)
+                    batch = []
+            if batch:
+                self._insert_items(batch)
+            if total == 0:
+                raise ValueError("Arquivo não contém emails")
+        except BaseException:
+            self._discard(job_id)
+            raise
+        with self._lock:
+            self._db.execute("UPDATE jobs SET status = 'queued', total = ? WHERE id = ?", (total, job_id))
+            self._db.commit()
+
+        logger.info("Job criado", extra={"job_id": job_id, "emails": total, "mode": mode})
+        self._notify()
+        return self.get(job_id)
+
+    _INSERT_ITEM = "INSERT INTO items (job_id, idx, ref, sender, subject, body) VALUES (?, ?, ?, ?, ?, ?)"
+    _INSERT_CHUNK = 1000
+
+    def _insert_items(self, batch: List[tuple]):
+        with self._lock:
+            self._db.executemany(self._INSERT_ITEM, batch)
+            self._db.commit()
+
+    def _discard(self, job_id: str):
+        """Apaga um job que não terminou de carregar (arquivo inválido ou vazio)"""
+        with self._lock:
+            self._db.execute("DELETE FROM items WHERE job_id = ?", (job_id,))
+            self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._db.commit()
+
+    def _iter_jsonl(self, stream: BinaryIO) -> Iterator[Dict[str, str]]:
+        for line_number, raw in enumerate(stream, start=1):
+            line = raw.decode("utf-8").strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                yield self._item(record.get("id"), record["sender"], record.get("subject", ""), record["body"])
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"Linha {line_number} inválida: {e}")
+
+    def _iter_mbox(self, stream: BinaryIO) -> Iterator[Dict[str, str]]:
+        # O leitor de mbox abre pelo caminho; o upload já está num arquivo temporário
+        path = getattr(stream, "name", None)
+        if not isinstance(path, str) or not os.path.exists(path):
+            with self._spool(stream) as spooled:
+                yield from self._iter_mbox_path(spooled)
+        else:
+            yield from self._iter_mbox_path(path)
+
+    def _iter_mbox_path(self, path: str) -> Iterator[Dict[str, str]]:
+        for _, message in MboxSource(path).iter_messages():
+            record = message_record(message)
+            yield self._item(record["ref"], record["sender"], record["subject"], record["body"])
+
+    def _spool(self, stream: BinaryIO):
+        from services.file_service import file_service
+        return file_service._spool_to_disk(stream)
+
+    def _item(self, ref, sender: str, subject: str, body: str) -> Dict[str, str]:
+        budget = settings.EXTRACTION_CHAR_BUDGET
+        return {
+            "ref": str(ref) if ref is not None else None,
+            "sender": sender,
+            "subject": subject,
+            "body": body[:budget] if budget else body,
+        }
+
+    # -------------------------------------------------------------- consulta
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, filename, mode, status, total, done, retries, llm_calls, active_seconds, "
+                "created_at, started_at, base_done, finished_at, error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        (job_id, filename, mode, status, total, done, retries, llm_calls,
+         active_seconds, created_at, started_at, base_done, finished_at, error) = row
+        # Vazão de parede (workers em paralelo), desde que o job começou neste processo
+        wall = (finished_at or time.time()) - started_at if started_at else 0.0
+        rate = (done - base_done) / wall if wall > 0 else 0.0
+        return {
+            "id": job_id,
+            "filename": filename,
+            "mode": mode,
+            "status": status,
+            "total": total,
+            "done": done,
+            "pending": total - done,
+            "retries": retries,
+            "llm_calls": llm_calls,
+            "active_seconds": round(active_seconds, 3),
+            "emails_per_sec": round(rate, 2),
+            "eta_seconds": round((total - done) / rate, 1) if rate and status == "running" else None,
+            "created_at": created_at,
+            "finished_at": finished_at,
+            "error": error,
+        }
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            ids = [row[0] for row in self._db.execute(
+                "SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            )]
+        return [self.get(job_id) for job_id in ids]
+
+    def iter_results(self, job_id: str, page_size: int = 500) -> Iterator[str]:
+        """Resultados prontos em JSONL, em ordem, lidos da base em páginas"""
+        last = -1
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT idx, ref, result FROM items WHERE job_id = ? AND status = 'done' AND idx > ? "
+                    "ORDER BY idx LIMIT ?", (job_id, last, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            for idx, ref, result in rows:
+                yield json.dumps({"index": idx, "id": ref, **json.loads(result)}, ensure_ascii=False) + "\n"
+            last = rows[-1][0]
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status IN ('queued', 'running')", (time.time(), job_id)
+            )
+            self._db.commit()
+        return cursor.rowcount > 0
+
+    def has_unfinished(self) -> bool:
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM jobs WHERE status IN ('queued', 'running') LIMIT 1"
+            ).fetchone() is not None
+
+    # --------------------------------------------------------------- workers
+
+    def start(self):
+        """Sobe os workers no event loop atual (idempotente)"""
+        self._tasks = [task for task in self._tasks if not task.done()]
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._acquire_runner():
+            self._spawn_workers()
+        else:
+            self._tasks = [asyncio.create_task(self._standby())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._runner_lock is not None:
+            self._runner_lock.close()
+            self._runner_lock = None
+        self._is_runner = False
+
+    def _spawn_workers(self):
+        self._tasks += [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        logger.info("Workers de jobs iniciados", extra={"workers": self.workers})
+
+    async def _standby(self):
+        """Outro processo é o executor: tenta a trava de tempos em tempos para assumir se ele cair"""
+        while not await asyncio.to_thread(self._acquire_runner):
+            await asyncio.sleep(settings.JOB_POLL_SECONDS)
+        self._spawn_workers()
+
+    def _acquire_runner(self) -> bool:
+        """Pega a trava do executor (sem bloquear) e, ao pegar, recupera os blocos órfãos"""
+        if self._is_runner:
+            return True
+        if fcntl is not None:
+            handle = open(self._runner_path, "a")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                return False
+            self._runner_lock = handle
+        self._is_runner = True
+        # Blocos que estavam em voo quando o executor anterior caiu voltam para a
+        # fila; a vazão dos jobs retomados passa a ser medida a partir deste processo
+        with self._lock:
+            self._db.execute("UPDATE items SET status = 'pending' WHERE status = 'running'")
+            self._db.execute(
+                "UPDATE jobs SET started_at = NULL, base_done = done WHERE status IN ('queued', 'running')"
+            )
+            self._db.commit()
+        return True
+
+    def _notify(self):
+        # submit roda no threadpool; o Event só pode ser tocado pelo loop dele
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _worker(self, number: int):
+        while True:
+            # Sem provedor disponível (ex: circuito do Gemini aberto) os itens só
+            # cairiam no fallback e gastariam tentativas: espera a sonda fechar o circuito
+            if not llm_router.available():
+                await asyncio.sleep(min(settings.JOB_POLL_SECONDS, settings.GEMINI_BREAKER_RESET_SECONDS))
+                continue
+            claimed = await asyncio.to_thread(self._claim)
+            if claimed is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, mode, items = claimed
+            started = time.perf_counter()
+            try:
+                if mode == "full":
+                    results, llm_calls = await self._run_full(items), None
+                else:
+                    results, llm_calls = await self._run_classify(items)
+            except asyncio.CancelledError:
+                await asyncio.to_thread(self._release, job_id, items)
+                raise
+            except Exception as e:
+                logger.exception("Erro no worker de jobs", extra={"job_id": job_id})
+                await asyncio.to_thread(self._fail, job_id, items, e)
+                continue
+            await asyncio.to_thread(
+                self._checkpoint, job_id, items, results, llm_calls, time.perf_counter() - started
+            )
+
+    async def _run_classify(self, items: List[Dict[str, Any]]):
+        # O bloco cabe num único prompt de lote: uma permissão do limitador
+        await self.limiter.acquire()
+        async with admission_controller.slot("bulk"):
+            summary = await classifier_service.classify_batch_async(
+                [{"sender": i["sender"], "subject": i["subject"], "body": i["body"]} for i in items]
+            )
+        results = summary["results"]
+        throttled = any(
+            result["source"] == "fallback" and item["attempts"] + 1 < settings.JOB_MAX_ATTEMPTS
+            for item, result in zip(items, results)
+        )
+        if throttled:
+            self.limiter.on_throttle()
+            logger.warning("Gemini falhando, reduzindo ritmo", extra={"rate_per_sec": round(self.limiter.rate, 2)})
+        else:
+            self.limiter.on_success()
+        return results, summary["llm_calls"]
+
+    async def _run_full(self, items: List[Dict[str, Any]]):
+        async def run_one(item):
+            await self.limiter.acquire()
+            async with admission_controller.slot("bulk"):
+                return await classifier_service.classify_and_respond_async(item["sender"], item["subject"], item["body"])
+
+        results = await asyncio.gather(*(run_one(item) for item in items))
+        self.limiter.on_success()
+        return [{k: v for k, v in r.items() if k != "processed_text"} for r in results]
+
+    def _claim(self):
+        """Marca como 'running' o próximo bloco pendente do job mais antigo"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, mode FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, mode = row
+            size = self.chunk_size if mode == "classify" else settings.JOB_FULL_CHUNK_SIZE
+            rows = self._db.execute(
+                "SELECT idx, ref, sender, subject, body, attempts FROM items "
+                "WHERE job_id = ? AND status = 'pending' ORDER BY idx LIMIT ?", (job_id, size)
+            ).fetchall()
+            if not rows:
+                self._finish_if_complete(job_id)
+                self._db.commit()
+                return None
+            self._db.executemany(
+                "UPDATE items SET status = 'running' WHERE job_id = ? AND idx = ?",
+                [(job_id, r[0]) for r in rows]
+            )
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?) "
+                "WHERE id = ? AND status IN ('queued', 'running')", (time.time(), job_id)
+            )
+            self._db.commit()
+        items = [
+            {"idx": r[0], "ref": r[1], "sender": r[2], "subject": r[3], "body": r[4], "attempts": r[5]}
+            for r in rows
+        ]
+        return job_id, mode, items
+
+    def _checkpoint(self, job_id: str, items, results, llm_calls: Optional[int], elapsed: float):
+        """Grava o bloco numa transação; fallbacks com tentativas restantes voltam para a fila"""
+        done, retry = [], []
+        for item, result in zip(items, results):
+            if result.get("source") == "fallback" and item["attempts"] + 1 < settings.JOB_MAX_ATTEMPTS:
+                retry.append((job_id, item["idx"]))
+            else:
+                done.append((json.dumps(result, ensure_ascii=False), job_id, item["idx"]))
+        with self._lock:
+            self._db.executemany(
+                "UPDATE items SET status = 'done', result = ?, attempts = attempts + 1 WHERE job_id = ? AND idx = ?",
+                done
+            )
+            self._db.executemany(
+                "UPDATE items SET status = 'pending', attempts = attempts + 1 WHERE job_id = ? AND idx = ?",
+                retry
+            )
+            self._db.execute(
+                "UPDATE jobs SET done = done + ?, retries = retries + ?, llm_calls = llm_calls + ?, "
+                "active_seconds = active_seconds + ? WHERE id = ?",
+                (len(done), len(retry), llm_calls or 0, elapsed, job_id)
+            )
+            self._finish_if_complete(job_id)
+            self._db.commit()
+
+    def _release(self, job_id: str, items):
+        with self._lock:
+            self._db.executemany(
+                "UPDATE items SET status = 'pending' WHERE job_id = ? AND idx = ?",
+                [(job_id, item["idx"]) for item in items]
+            )
+            self._db.commit()
+
+    def _fail(self, job_id: str, items, error: Exception):
+        with self._lock:
+            self._db.executemany(
+                "UPDATE items SET status = 'pending' WHERE job_id = ? AND idx = ?",
+                [(job_id, item["idx"]) for item in items]
+            )
+            self._db.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (f"{type(error).__name__}: {error}", time.time(), job_id)
+            )
+            self._db.commit()
+
+    def _finish_if_complete(self, job_id: str):
+        remaining = self._db.execute(
+            "SELECT 1 FROM items WHERE job_id = ? AND status != 'done' LIMIT 1", (job_id,)
+        ).fetchone()
+        if remaining is None:
+            self._db.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id)
+            )
+
+
+# Instância singleton (construída no primeiro uso)
+job_service = LazyService(lambda: JobService(
+    db_path=settings.JOBS_DB_PATH,
+    workers=settings.JOB_WORKERS,
+    chunk_size=settings.BATCH_MAX_SIZE,
+    max_rps=settings.JOB_MAX_RPS,
+))
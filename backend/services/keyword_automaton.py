@@ -0,0 +1,209 @@
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import deque
+from typing import Dict, List, NamedTuple, Tuple
+
+from config import settings
+from services.lazy import LazyService
+from services.logging_setup import get_logger
+
+logger = get_logger("keyword_automaton")
+
+
+class KeywordMatch(NamedTuple):
+    term: str
+    label: str
+    weight: float
+    start: int
+    end: int
+
+
+# Marcas diacríticas combinantes que sobram da decomposição NFKD
+_COMBINING = re.compile("[\u0300-\u036f]")
+
+
+def fold(text: str) -> str:
+    """Minúsculas e sem acentos (decomposição + regex: as passadas ficam em C)"""
+    return _COMBINING.sub("", unicodedata.normalize("NFKD", text.lower()))
+
+
+class KeywordAutomaton:
+    """
+    Autômato de Aho-Corasick: todos os termos numa única passada pelo texto
+
+    `patterns` mapeia termo → (rótulo, peso). Com `word_boundary` um termo
+    só casa como palavra inteira; termos terminados em "*" casam como
+    prefixo (ex.: "projeto*" pega "projetos"). Com `fold_accents` termos e
+    texto são comparados sem acentos e sem diferença de caixa.
+    """
+
+    def __init__(
+        self,
+        patterns: Dict[str, Tuple[str, float]],
+        word_boundary: bool = True,
+        fold_accents: bool = True
+    ):
+        self.word_boundary = word_boundary
+        self.fold_accents = fold_accents
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Transições completas (goto + links de falha já resolvidos): um dict.get por caractere
+        self._delta: List[Dict[str, int]] = []
+        # Por estado: (termo, rótulo, peso, comprimento, é prefixo)
+        self._out: List[List[Tuple[str, str, float, int, bool]]] = [[]]
+
+        for term, (label, weight) in patterns.items():
+            prefix = term.endswith("*")
+            key = self._normalize(term.rstrip("*"))
+            if key:
+                self._add(key, (term, label, weight, len(key), prefix))
+        self._link()
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def search(self, text: str) -> List[KeywordMatch]:
+        """Todas as ocorrências dos termos no texto (posições no texto normalizado)"""
+        text = self._normalize(text)
+        delta, out = self._delta, self._out
+        boundary = self.word_boundary
+        matches = []
+        state = 0
+        for index, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if not out[state]:
+                continue
+            for term, label, weight, length, prefix in out[state]:
+                start, end = index - length + 1, index + 1
+                if boundary and (
+                    (start > 0 and text[start - 1].isalnum())
+                    or (not prefix and end < len(text) and text[end].isalnum())
+                ):
+                    continue
+                matches.append(KeywordMatch(term, label, weight, start, end))
+        return matches
+
+    def _normalize(self, text: str) -> str:
+        return fold(text) if self.fold_accents else text.lower()
+
+    def _add(self, key: str, output: Tuple[str, str, float, int, bool]):
+        state = 0
+        for ch in key:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(output)
+
+    def _link(self):
+        """
+        Links de falha em largura; cada estado herda as saídas e as
+        transições do seu link (o link está sempre num nível acima)
+        """
+        self._delta = [None] * len(self._goto)
+        self._delta[0] = dict(self._goto[0])
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._delta[state] = {**self._delta[0], **self._goto[state]}
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = candidate if candidate != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+                self._delta[nxt] = {**self._delta[self._fail[nxt]], **self._goto[nxt]}
+
+
+class Lexicon:
+    """
+    Léxico com pesos lido de um arquivo JSON e compilado num KeywordAutomaton
+
+    Formato: {"word_boundary": bool, "fold_accents": bool,
+    "labels": {rótulo: {termo: peso}}}. O arquivo é relido sem reiniciar o
+    processo quando muda no disco (checado no máximo a cada
+    LEXICON_RELOAD_SECONDS); um arquivo inválido mantém o léxico anterior.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self._mtime = os.path.getmtime(path)
+        self.automaton = self._compile()
+        self.reloads = 0
+
+    def search(self, text: str) -> List[KeywordMatch]:
+        return self._current().search(text)
+
+    def scores(self, text: str) -> Dict[str, Tuple[float, List[str]]]:
+        """Por rótulo: (soma dos pesos dos termos distintos encontrados, termos)"""
+        found: Dict[str, Dict[str, float]] = {}
+        for match in self.search(text):
+            found.setdefault(match.label, {})[match.term] = match.weight
+        return {label: (sum(terms.values()), list(terms)) for label, terms in found.items()}
+
+    def matches_any(self, text: str) -> bool:
+        return bool(self.search(text))
+
+    def reload(self) -> bool:
+        """Recompila a partir do arquivo; retorna False (e mantém o atual) se ele for inválido"""
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.path)
+                automaton = self._compile()
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning("Léxico inválido, mantendo o anterior: %s: %s", self.path, e)
+                return False
+            self.automaton, self._mtime = automaton, mtime
+            self.reloads += 1
+        logger.info("Léxico recarregado", extra={"path": self.path, "states": len(automaton)})
+        return True
+
+    def _current(self) -> KeywordAutomaton:
+        interval = settings.LEXICON_RELOAD_SECONDS
+        now = time.monotonic()
+        if interval and now - self._checked_at >= interval:
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                mtime = self._mtime
+            if mtime != self._mtime:
+                # Um arquivo inválido só é tentado de novo na próxima alteração
+                self._mtime = mtime
+                self.reload()
+        return self.automaton
+
+    def _compile(self) -> KeywordAutomaton:
+        with open(self.path, encoding="utf-8") as handle:
+            data = json.load(handle)
+        patterns = {}
+        for label, terms in data["labels"].items():
+            for term, weight in terms.items():
+                patterns[term] = (label, float(weight))
+        return KeywordAutomaton(
+            patterns,
+            word_boundary=data.get("word_boundary", True),
+            fold_accents=data.get("fold_accents", True),
+        )
+
+
+def _lexicon(name: str) -> Lexicon:
+    return Lexicon(os.path.join(settings.LEXICON_DIR, f"{name}.json"))
+
+
+# Instâncias singleton (construídas no primeiro uso)
+fallback_lexicon = LazyService(lambda: _lexicon("fallback"))
+noreply_lexicon = LazyService(lambda: _lexicon("noreply"))
@@ -0,0 +1,50 @@
+import threading
+from typing import Any, Callable
+
+
+class LazyService:
+    """
+    Proxy de singleton que só constrói o serviço no primeiro uso
+
+    Importar o módulo fica barato (sem carregar recursos do NLTK, abrir
+    bancos ou configurar clientes); o custo vai para a primeira requisição
+    ou para o /ready.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _get(self):
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            with object.__getattribute__(self, "_lock"):
+                instance = object.__getattribute__(self, "_instance")
+                if instance is None:
+                    instance = object.__getattribute__(self, "_factory")()
+                    object.__setattr__(self, "_instance", instance)
+        return instance
+
+    def __getattr__(self, name: str):
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._get(), name, value)
+
+    def __repr__(self) -> str:
+        instance = object.__getattribute__(self, "_instance")
+        return f"<LazyService {instance!r}>" if instance is not None else "<LazyService (não inicializado)>"
+
+
+def is_initialized(service: Any) -> bool:
+    """True se o serviço já foi construído (ou não é um LazyService)"""
+    if isinstance(service, LazyService):
+        return object.__getattribute__(service, "_instance") is not None
+    return True
+
+
+def initialize(service: Any):
+    """Força a construção do serviço"""
+    if isinstance(service, LazyService):
+        service._get()
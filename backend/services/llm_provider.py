@@ -0,0 +1,91 @@
+from typing import AsyncIterator, List, Optional, Tuple
+
+
+class ReplyUnavailableError(Exception):
+    """O provedor devolveu a mensagem de erro em vez de uma resposta"""
+
+
+class LLMProvider:
+    """
+    Interface dos provedores de LLM usados pelo classificador
+
+    Cada provedor classifica (um email, um lote ou junto com a resposta) e
+    gera a resposta sugerida, em versões síncrona e assíncrona. As versões
+    assíncronas padrão chamam as síncronas: servem para provedores locais,
+    que não esperam rede. Falhas são propagadas como exceções, exceto em
+    generate_response, que devolve RESPONSE_ERROR_TEXT (o roteador trata
+    esse texto como falha).
+
+    `cost` é o custo relativo de uma chamada (política cheapest) e
+    `cacheable` diz se os resultados podem ir para o cache e para o índice
+    de quase duplicados, que são compartilhados entre provedores.
+    """
+
+    name = "base"
+    cost = 1.0
+    cacheable = True
+
+    RESPONSE_ERROR_TEXT = "Desculpe, não consegui gerar uma resposta no momento."
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Estimativa barata de tokens (~4 caracteres por token)"""
+        return len(text) // 4 + 1
+
+    def batch_item_tokens(self, index: int, subject: str, body: str) -> int:
+        """Tokens que o item ocupa no prompt de lote (usado para montar os lotes)"""
+        return self.estimate_tokens(f"{subject}\n{body}")
+
+    def available(self) -> bool:
+        return True
+
+    def classify_email(self, subject: str, body: str) -> Tuple[str, float]:
+        raise NotImplementedError
+
+    def classify_batch(self, items: List[Tuple[str, str]]) -> List[Optional[Tuple[str, float]]]:
+        raise NotImplementedError
+
+    def classify_and_reply(self, sender_name: str, subject: str, body: str, keywords: list) -> Tuple[str, float, str]:
+        raise NotImplementedError
+
+    def generate_response(self, category: str, sender_name: str, subject: str, body: str, keywords: list) -> str:
+        raise NotImplementedError
+
+    async def classify_email_async(self, subject: str, body: str) -> Tuple[str, float]:
+        return self.classify_email(subject, body)
+
+    async def classify_batch_async(self, items: List[Tuple[str, str]]) -> List[Optional[Tuple[str, float]]]:
+        return self.classify_batch(items)
+
+    async def classify_and_reply_async(
+        self,
+        sender_name: str,
+        subject: str,
+        body: str,
+        keywords: list
+    ) -> Tuple[str, float, str]:
+        return self.classify_and_reply(sender_name, subject, body, keywords)
+
+    async def generate_response_async(
+        self,
+        category: str,
+        sender_name: str,
+        subject: str,
+        body: str,
+        keywords: list
+    ) -> str:
+        return self.generate_response(category, sender_name, subject, body, keywords)
+
+    async def stream_response_async(
+        self,
+        category: str,
+        sender_name: str,
+        subject: str,
+        body: str,
+        keywords: list
+    ) -> AsyncIterator[str]:
+        """Sem streaming nativo: a resposta inteira sai num único pedaço"""
+        text = await self.generate_response_async(category, sender_name, subject, body, keywords)
+        if not text or text == self.RESPONSE_ERROR_TEXT:
+            raise ReplyUnavailableError(self.name)
+        yield text
@@ -0,0 +1,468 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from services.lazy import LazyService
+from services.llm_provider import LLMProvider, ReplyUnavailableError
+from services.logging_setup import get_logger
+from services.metrics import LLM_PROVIDER_CALLS, LLM_PROVIDER_SECONDS
+
+logger = get_logger("llm_router")
+
+# fallback: na ordem de LLM_PROVIDERS, o próximo só se o anterior falhar
+# cheapest: do mais barato ao mais caro, subindo enquanto a confiança da
+#           classificação ficar abaixo de LLM_CASCADE_MIN_CONFIDENCE
+# hedged: dispara o próximo provedor se o primeiro não responder a tempo
+#         e fica com a primeira resposta (só nas chamadas assíncronas)
+ROUTING_POLICIES = ("fallback", "cheapest", "hedged")
+
+# Provedor e política escolhidos pela requisição atual (None = padrão do Settings)
+_selection = contextvars.ContextVar("llm_selection", default=(None, None))
+# Quem respondeu a última chamada da requisição (no lote, um por item)
+_answered_by = contextvars.ContextVar("llm_answered_by", default=None)
+_batch_answered_by = contextvars.ContextVar("llm_batch_answered_by", default=None)
+
+
+class ProviderStats:
+    """
+    Latência e taxa de sucesso recentes de um provedor
+
+    Só entram as chamadas dos últimos `window_seconds`: um provedor
+    rebaixado por falhas volta a ser tentado quando elas saem da janela.
+    """
+
+    MIN_SAMPLES = 20  # abaixo disso a latência observada não é usada
+
+    def __init__(self, window_seconds: float, max_samples: int = 1000):
+        self.window_seconds = window_seconds
+        self._calls = deque(maxlen=max_samples)  # (instante, segundos, ok)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool):
+        with self._lock:
+            self._calls.append((time.monotonic(), seconds, ok))
+
+    def _recent(self) -> List[Tuple[float, float, bool]]:
+        limit = time.monotonic() - self.window_seconds
+        with self._lock:
+            while self._calls and self._calls[0][0] < limit:
+                self._calls.popleft()
+            return list(self._calls)
+
+    def success_rate(self) -> float:
+        calls = self._recent()
+        if not calls:
+            return 1.0
+        return sum(ok for _, _, ok in calls) / len(calls)
+
+    def latency(self, pct: float) -> Optional[float]:
+        """Percentil da latência das chamadas bem-sucedidas (s), ou None sem amostras suficientes"""
+        values = sorted(seconds for _, seconds, ok in self._recent() if ok)
+        if len(values) < self.MIN_SAMPLES:
+            return None
+        return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+    def stats(self) -> Dict[str, object]:
+        calls = self._recent()
+        p50, p95 = self.latency(50), self.latency(95)
+        return {
+            "calls": len(calls),
+            "success_rate": round(self.success_rate(), 4),
+            "p50_ms": round(p50 * 1000, 3) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 3) if p95 is not None else None,
+        }
+
+
+class LLMRouter:
+    """
+    Roteador entre provedores de LLM, com a mesma interface de LLMProvider
+
+    A cadeia de provedores vem de LLM_PROVIDERS e a política de
+    LLM_ROUTING; uma requisição pode forçar um provedor ou trocar a
+    política (select). Provedores indisponíveis (circuito aberto) ou com
+    taxa de sucesso abaixo de LLM_MIN_SUCCESS_RATE vão para o fim da
+    cadeia. answered_by() diz qual provedor respondeu, para o classificador
+    decidir a origem do resultado e se ele pode ir para o cache.
+    """
+
+    RESPONSE_ERROR_TEXT = LLMProvider.RESPONSE_ERROR_TEXT
+
+    def __init__(self, providers: List[LLMProvider], policy: str = "fallback"):
+        if not providers:
+            raise ValueError("Nenhum provedor de LLM configurado")
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"Política de roteamento inválida: {policy!r}")
+        self.providers = {provider.name: provider for provider in providers}
+        self.order = [provider.name for provider in providers]
+        self.policy = policy
+        self._stats = {name: ProviderStats(settings.LLM_STATS_WINDOW_SECONDS) for name in self.order}
+        logger.info("Provedores de LLM: %s (política %s)", ", ".join(self.order), policy)
+
+    def select(self, provider: Optional[str] = None, routing: Optional[str] = None):
+        """Provedor e/ou política da requisição atual (None = padrão do Settings)"""
+        if provider is not None and provider not in self.providers:
+            raise ValueError(f"Provedor de LLM não configurado: {provider!r}")
+        if routing is not None and routing not in ROUTING_POLICIES:
+            raise ValueError(f"Política de roteamento inválida: {routing!r}")
+        _selection.set((provider, routing))
+        _answered_by.set(None)
+
+    def selection(self) -> Tuple[Optional[str], Optional[str]]:
+        """(provedor, política) escolhidos pela requisição atual"""
+        return _selection.get()
+
+    def answered_by(self) -> Optional[LLMProvider]:
+        return _answered_by.get()
+
+    def batch_answered_by(self) -> List[Optional[LLMProvider]]:
+        return _batch_answered_by.get() or []
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        return LLMProvider.estimate_tokens(text)
+
+    def batch_item_tokens(self, index: int, subject: str, body: str) -> int:
+        return self._chain()[0].batch_item_tokens(index, subject, body)
+
+    def available(self) -> bool:
+        """False se nenhum provedor da cadeia pode ser chamado agora"""
+        return any(provider.available() for provider in self._chain())
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "policy": self.policy,
+            "providers": {
+                name: {"cost": self.providers[name].cost, **self._stats[name].stats()} for name in self.order
+            },
+        }
+
+    def _policy(self) -> str:
+        return _selection.get()[1] or self.policy
+
+    def _chain(self) -> List[LLMProvider]:
+        forced, _ = _selection.get()
+        if forced is not None:
+            return [self.providers[forced]]
+        chain = [self.providers[name] for name in self.order]
+        if self._policy() == "cheapest":
+            chain.sort(key=lambda provider: provider.cost)
+        # sort é estável: dentro de cada grupo a ordem da política se mantém
+        chain.sort(key=lambda provider: (
+            not provider.available()
+            or self._stats[provider.name].success_rate() < settings.LLM_MIN_SUCCESS_RATE
+        ))
+        return chain
+
+    def _escalates(self, confidence: float) -> bool:
+        """Na política cheapest, uma classificação pouco confiante sobe para o próximo provedor"""
+        return self._policy() == "cheapest" and confidence < settings.LLM_CASCADE_MIN_CONFIDENCE
+
+    def _record(self, provider: LLMProvider, operation: str, started: float, outcome: str):
+        elapsed = time.perf_counter() - started
+        if outcome != "cancelled":
+            self._stats[provider.name].record(elapsed, outcome != "error")
+        LLM_PROVIDER_CALLS.inc(provider=provider.name, operation=operation, outcome=outcome)
+        LLM_PROVIDER_SECONDS.observe(elapsed, provider=provider.name)
+
+    def _on_error(self, provider: LLMProvider, operation: str, started: float, e: Exception):
+        self._record(provider, operation, started, "error")
+        logger.debug("Provedor %s falhou em %s: %s: %s", provider.name, operation, type(e).__name__, e)
+
+    def _run(self, operation: str, call: Callable, escalates: Optional[Callable] = None):
+        """
+        Percorre a cadeia até um provedor responder. `escalates(resultado)`
+        True faz tentar o próximo, guardando o resultado caso os demais falhem.
+        """
+        chain = self._chain()
+        error, reserve = None, None
+        for position, provider in enumerate(chain):
+            started = time.perf_counter()
+            try:
+                result = call(provider)
+            except Exception as e:
+                self._on_error(provider, operation, started, e)
+                error = e
+                continue
+            if escalates is not None and position < len(chain) - 1 and escalates(result):
+                self._record(provider, operation, started, "escalated")
+                reserve = reserve or (provider, result)
+                continue
+            self._record(provider, operation, started, "ok")
+            _answered_by.set(provider)
+            return result
+        if reserve is not None:
+            _answered_by.set(reserve[0])
+            return reserve[1]
+        raise error
+
+    async def _run_async(self, operation: str, call: Callable, escalates: Optional[Callable] = None):
+        """Versão assíncrona de _run; na política hedged as chamadas se sobrepõem"""
+        chain = self._chain()
+        if self._policy() == "hedged" and len(chain) > 1:
+            return await self._hedged(operation, chain, call)
+        error, reserve = None, None
+        for position, provider in enumerate(chain):
+            started = time.perf_counter()
+            try:
+                result = await call(provider)
+            except Exception as e:
+                self._on_error(provider, operation, started, e)
+                error = e
+                continue
+            if escalates is not None and position < len(chain) - 1 and escalates(result):
+                self._record(provider, operation, started, "escalated")
+                reserve = reserve or (provider, result)
+                continue
+            self._record(provider, operation, started, "ok")
+            _answered_by.set(provider)
+            return result
+        if reserve is not None:
+            _answered_by.set(reserve[0])
+            return reserve[1]
+        raise error
+
+    async def _hedged(self, operation: str, chain: List[LLMProvider], call: Callable):
+        """
+        Dispara o primeiro provedor e, se ele não responder em
+        LLM_HEDGE_DELAY_SECONDS (ou no p95 observado, quando há amostras),
+        dispara o próximo; vale a primeira resposta bem-sucedida e as
+        chamadas que sobrarem são canceladas
+        """
+        delay = self._stats[chain[0].name].latency(95) or settings.LLM_HEDGE_DELAY_SECONDS
+        remaining = list(chain)
+        running: Dict[asyncio.Future, Tuple[LLMProvider, float]] = {}
+        error = None
+
+        def launch():
+            provider = remaining.pop(0)
+            running[asyncio.ensure_future(call(provider))] = (provider, time.perf_counter())
+
+        launch()
+        try:
+            while running:
+                done, _ = await asyncio.wait(
+                    running, timeout=delay if remaining else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    launch()
+                    continue
+                for task in done:
+                    provider, started = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        self._on_error(provider, operation, started, e)
+                        error = e
+                        continue
+                    self._record(provider, operation, started, "ok")
+                    _answered_by.set(provider)
+                    return result
+                # Falhou antes do prazo: não há motivo para esperar pelo próximo
+                if not running and remaining:
+                    launch()
+        finally:
+            for task, (provider, started) in running.items():
+                task.cancel()
+                self._record(provider, operation, started, "cancelled")
+        raise error
+
+    def _batch_escalates(self, answer: Optional[Tuple[str, float]]) -> bool:
+        return answer is None or self._escalates(answer[1])
+
+    def _merge_batch(
+        self,
+        answers: List[Optional[Tuple[str, float]]],
+        providers: List[Optional[LLMProvider]],
+        pending: List[int],
+        partial: List[Optional[Tuple[str, float]]],
+        provider: LLMProvider
+    ) -> List[int]:
+        """Guarda as respostas válidas do provedor e retorna os itens que seguem para o próximo"""
+        still_pending = []
+        for index, answer in zip(pending, partial):
+            if answer is not None:
+                answers[index], providers[index] = answer, provider
+            if self._batch_escalates(answer):
+                still_pending.append(index)
+        return still_pending
+
+    def classify_email(self, subject: str, body: str) -> Tuple[str, float]:
+        return self._run(
+            "classify",
+            lambda provider: provider.classify_email(subject, body),
+            lambda result: self._escalates(result[1])
+        )
+
+    async def classify_email_async(self, subject: str, body: str) -> Tuple[str, float]:
+        return await self._run_async(
+            "classify",
+            lambda provider: provider.classify_email_async(subject, body),
+            lambda result: self._escalates(result[1])
+        )
+
+    def classify_batch(self, items: List[Tuple[str, str]]) -> List[Optional[Tuple[str, float]]]:
+        """
+        Lote pela cadeia: só os itens sem resposta válida (ou pouco
+        confiantes, na política cheapest) seguem para o próximo provedor
+        """
+        answers: List[Optional[Tuple[str, float]]] = [None] * len(items)
+        providers: List[Optional[LLMProvider]] = [None] * len(items)
+        pending, error, answered = list(range(len(items))), None, False
+        for provider in self._chain():
+            started = time.perf_counter()
+            try:
+                partial = provider.classify_batch([items[index] for index in pending])
+            except Exception as e:
+                self._on_error(provider, "classify_batch", started, e)
+                error = e
+                continue
+            self._record(provider, "classify_batch", started, "ok")
+            answered = True
+            pending = self._merge_batch(answers, providers, pending, partial, provider)
+            if not pending:
+                break
+        _batch_answered_by.set(providers)
+        if not answered:
+            raise error
+        return answers
+
+    async def classify_batch_async(self, items: List[Tuple[str, str]]) -> List[Optional[Tuple[str, float]]]:
+        """Versão assíncrona de classify_batch (sem hedge: o lote já divide o custo da espera)"""
+        answers: List[Optional[Tuple[str, float]]] = [None] * len(items)
+        providers: List[Optional[LLMProvider]] = [None] * len(items)
+        pending, error, answered = list(range(len(items))), None, False
+        for provider in self._chain():
+            started = time.perf_counter()
+            try:
+                partial = await provider.classify_batch_async([items[index] for index in pending])
+            except Exception as e:
+                self._on_error(provider, "classify_batch", started, e)
+                error = e
+                continue
+            self._record(provider, "classify_batch", started, "ok")
+            answered = True
+            pending = self._merge_batch(answers, providers, pending, partial, provider)
+            if not pending:
+                break
+        _batch_answered_by.set(providers)
+        if not answered:
+            raise error
+        return answers
+
+    def classify_and_reply(self, sender_name: str, subject: str, body: str, keywords: list) -> Tuple[str, float, str]:
+        return self._run(
+            "combined",
+            lambda provider: provider.classify_and_reply(sender_name, subject, body, keywords),
+            lambda result: self._escalates(result[1])
+        )
+
+    async def classify_and_reply_async(
+        self,
+        sender_name: str,
+        subject: str,
+        body: str,
+        keywords: list
+    ) -> Tuple[str, float, str]:
+        return await self._run_async(
+            "combined",
+            lambda provider: provider.classify_and_reply_async(sender_name, subject, body, keywords),
+            lambda result: self._escalates(result[1])
+        )
+
+    def generate_response(self, category: str, sender_name: str, subject: str, body: str, keywords: list) -> str:
+        def call(provider):
+            return self._checked_reply(provider, provider.generate_response(category, sender_name, subject, body, keywords))
+
+        try:
+            return self._run("reply", call)
+        except ReplyUnavailableError:
+            return self.RESPONSE_ERROR_TEXT
+
+    async def generate_response_async(
+        self,
+        category: str,
+        sender_name: str,
+        subject: str,
+        body: str,
+        keywords: list
+    ) -> str:
+        async def call(provider):
+            return self._checked_reply(
+                provider, await provider.generate_response_async(category, sender_name, subject, body, keywords)
+            )
+
+        try:
+            return await self._run_async("reply", call)
+        except ReplyUnavailableError:
+            return self.RESPONSE_ERROR_TEXT
+
+    @staticmethod
+    def _checked_reply(provider: LLMProvider, text: str) -> str:
+        if not text or text == provider.RESPONSE_ERROR_TEXT:
+            raise ReplyUnavailableError(provider.name)
+        return text
+
+    async def stream_response_async(
+        self,
+        category: str,
+        sender_name: str,
+        subject: str,
+        body: str,
+        keywords: list
+    ) -> AsyncIterator[str]:
+        """
+        Resposta em streaming pelo primeiro provedor da cadeia que responder
+
+        Sem hedge e sem troca depois do primeiro pedaço: o que já saiu não
+        pode ser desfeito. Uma falha antes disso passa para o próximo.
+        """
+        error = None
+        for provider in self._chain():
+            started = time.perf_counter()
+            sent = False
+            stream = provider.stream_response_async(category, sender_name, subject, body, keywords)
+            try:
+                async for chunk in stream:
+                    if not sent:
+                        sent = True
+                        _answered_by.set(provider)
+                    yield chunk
+            except GeneratorExit:
+                # Fechado pelo chamador no meio do stream: o provedor estava respondendo
+                self._record(provider, "reply_stream", started, "ok")
+                raise
+            except Exception as e:
+                self._on_error(provider, "reply_stream", started, e)
+                if sent:
+                    raise
+                error = e
+                continue
+            finally:
+                await stream.aclose()
+            self._record(provider, "reply_stream", started, "ok")
+            _answered_by.set(provider)
+            return
+        raise error
+
+
+def _build_router() -> LLMRouter:
+    # Imports locais: só os provedores configurados são carregados
+    providers = []
+    for name in settings.llm_providers:
+        if name == "gemini":
+            from services.gemini_service import gemini_service
+            providers.append(gemini_service)
+        elif name == "offline":
+            from services.offline_provider import offline_provider
+            providers.append(offline_provider)
+        else:
+            raise ValueError(f"Provedor de LLM desconhecido: {name!r}")
+    return LLMRouter(providers, settings.LLM_ROUTING)
+
+
+# Instância singleton (construída no primeiro uso)
+llm_router = LazyService(_build_router)
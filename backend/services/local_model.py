@@ -0,0 +1,316 @@
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from services.lazy import LazyService
+from services.logging_setup import get_logger
+from services.metrics import LOCAL_MODEL_SWAPS
+
+logger = get_logger("local_model")
+
+LABELS = ("Improdutivo", "Produtivo")
+
+
+class LocalModel:
+    """
+    Classificador local: n-gramas com hashing + regressão logística
+
+    Recebe os tokens já pré-processados pelo NLPService (sem stop words e
+    com stemming) e devolve P(Produtivo). Os pesos ficam num .npz pequeno
+    (um float32 por bucket de hash) ou num snapshot versionado
+    (SnapshotStore), que é mapeado do disco em vez de copiado.
+    """
+
+    def __init__(
+        self,
+        weights: np.ndarray,
+        bias: float,
+        ngram_max: int = 2,
+        version: Optional[int] = None,
+        empty_base: bool = False
+    ):
+        self.weights = weights
+        self.bias = float(bias)
+        self.n_features = weights.shape[0]
+        self.ngram_max = ngram_max
+        # Versão do snapshot de origem (None: .npz do train_local_model.py ou modelo novo)
+        self.version = version
+        # Snapshot que partiu de pesos zerados, sem o train_local_model.py: só
+        # conhece os emails corrigidos e fica em p=0.5 para todo o resto
+        self.empty_base = empty_base
+
+    @classmethod
+    def empty(cls, n_features: int = 2 ** 18, ngram_max: int = 2) -> "LocalModel":
+        return cls(np.zeros(n_features, dtype=np.float32), 0.0, ngram_max)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalModel":
+        with np.load(path) as data:
+            return cls(data["weights"].astype(np.float32), float(data["bias"]), int(data["ngram_max"]))
+
+    def copy(self) -> "LocalModel":
+        """Cópia com pesos graváveis (os de um snapshot são só leitura)"""
+        return LocalModel(
+            np.array(self.weights, dtype=np.float32), self.bias, self.ngram_max, self.version, self.empty_base
+        )
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=np.float32(self.bias),
+            ngram_max=np.int32(self.ngram_max),
+        )
+
+    def features(self, tokens: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Retorna (índices, valores) esparsos, normalizados em L2"""
+        counts: Dict[int, float] = {}
+        for n in range(1, self.ngram_max + 1):
+            for i in range(len(tokens) - n + 1):
+                gram = " ".join(tokens[i:i + n])
+                index = zlib.crc32(gram.encode("utf-8")) % self.n_features
+                counts[index] = counts.get(index, 0.0) + 1.0
+
+        if not counts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        values /= np.sqrt(np.dot(values, values))
+        return indices, values
+
+    def predict_proba(self, tokens: List[str]) -> float:
+        """Probabilidade de o email ser Produtivo"""
+        indices, values = self.features(tokens)
+        score = float(np.dot(self.weights[indices], values)) + self.bias
+        return 1.0 / (1.0 + np.exp(-score))
+
+    def sgd_update(
+        self,
+        indices: np.ndarray,
+        values: np.ndarray,
+        label: int,
+        lr: float,
+        l2: float = 1e-6,
+        fit_bias: bool = True
+    ):
+        """Um passo de SGD da log-loss para um exemplo (label 1 = Produtivo)"""
+        score = float(np.dot(self.weights[indices], values)) + self.bias
+        error = 1.0 / (1.0 + np.exp(-score)) - label
+        self.weights[indices] -= (lr * (error * values + l2 * self.weights[indices])).astype(np.float32)
+        if fit_bias:
+            self.bias -= lr * error
+
+    def fit(self, samples: Iterable[Tuple[List[str], int]], epochs: int = 10, lr: float = 0.5, seed: int = 42):
+        """Treina com SGD embaralhando os exemplos a cada época"""
+        data = [(self.features(tokens), label) for tokens, label in samples]
+        rng = np.random.default_rng(seed)
+        for epoch in range(epochs):
+            step = lr / (1.0 + epoch)
+            for i in rng.permutation(len(data)):
+                (indices, values), label = data[i]
+                if len(indices):
+                    self.sgd_update(indices, values, label, step)
+
+
+def decide(probability: float, low: float, high: float) -> Optional[Tuple[str, float]]:
+    """
+    Aplica a faixa de incerteza: retorna (category, confidence) quando o
+    modelo local está confiante, ou None para delegar ao Gemini
+    """
+    if probability >= high:
+        return "Produtivo", round(probability, 4)
+    if probability <= low:
+        return "Improdutivo", round(1.0 - probability, 4)
+    return None
+
+
+def load_local_model() -> Optional[LocalModel]:
+    """Carrega o modelo configurado em LOCAL_MODEL_PATH, se existir"""
+    path = settings.LOCAL_MODEL_PATH
+    if not path or not os.path.exists(path):
+        logger.info("Modelo local não encontrado em '%s', usando apenas o Gemini", path)
+        return None
+    model = LocalModel.load(path)
+    logger.info("Modelo local carregado de %s (%d features)", path, model.n_features)
+    return model
+
+
+class SnapshotStore:
+    """
+    Versões do modelo local num diretório
+
+    Cada versão é um vNNNNNN.npy com os pesos crus (np.load com mmap: o
+    carregamento não copia nada, e os workers de um mesmo host dividem as
+    páginas pelo cache do sistema) e um vNNNNNN.json com bias, n-gramas e
+    até onde o log de feedback já foi aplicado. O arquivo CURRENT aponta
+    para a versão servida; ele só é trocado (os.replace, atômico) depois
+    que os arquivos da versão estão completos no disco.
+    """
+
+    POINTER = "CURRENT"
+    _NAME = re.compile(r"^v(\d{6})\.json$")
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, version: int, suffix: str) -> str:
+        return os.path.join(self.directory, f"v{version:06d}{suffix}")
+
+    def pointer_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(os.path.join(self.directory, self.POINTER)).st_mtime_ns
+        except OSError:
+            return None
+
+    def current_version(self) -> Optional[int]:
+        try:
+            with open(os.path.join(self.directory, self.POINTER), encoding="utf-8") as handle:
+                return int(handle.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def versions(self) -> List[int]:
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(int(m.group(1)) for m in map(self._NAME.match, names) if m)
+
+    def load(self, version: int) -> Tuple[LocalModel, Dict[str, Any]]:
+        """(modelo com pesos mapeados só para leitura, metadados) da versão"""
+        with open(self._path(version, ".json"), encoding="utf-8") as handle:
+            meta = json.load(handle)
+        weights = np.load(self._path(version, ".npy"), mmap_mode="r")
+        return LocalModel(weights, meta["bias"], meta["ngram_max"], version, meta.get("empty_base", False)), meta
+
+    def _write(self, path: str, write):
+        temp = f"{path}.tmp"
+        with open(temp, "wb") as handle:
+            write(handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp, path)
+
+    def publish(self, model: LocalModel, meta: Dict[str, Any]) -> int:
+        """
+        Grava o modelo como a próxima versão e aponta CURRENT para ela
+
+        Quem publica precisa ser o único escritor do diretório (o
+        FeedbackService segura uma trava de arquivo para isso).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        version = max(self.versions(), default=0) + 1
+        meta = {
+            **meta,
+            "version": version,
+            "bias": model.bias,
+            "ngram_max": model.ngram_max,
+            "n_features": model.n_features,
+            "empty_base": model.empty_base,
+            "created_at": time.time(),
+        }
+        self._write(self._path(version, ".npy"), lambda h: np.save(h, np.asarray(model.weights, dtype=np.float32)))
+        self._write(self._path(version, ".json"), lambda h: h.write(json.dumps(meta).encode("utf-8")))
+        self._write(os.path.join(self.directory, self.POINTER), lambda h: h.write(f"{version}\n".encode("ascii")))
+        self.prune(settings.LOCAL_MODEL_SNAPSHOTS_KEEP)
+        return version
+
+    def prune(self, keep: int):
+        """
+        Apaga as versões mais antigas, mantendo as `keep` últimas e a atual
+
+        Um worker que ainda serve uma versão apagada não é afetado: o
+        mapeamento continua válido até ele trocar de modelo.
+        """
+        current = self.current_version()
+        for version in self.versions()[:-keep] if keep > 0 else []:
+            if version == current:
+                continue
+            for suffix in (".json", ".npy"):
+                try:
+                    os.remove(self._path(version, suffix))
+                except OSError:
+                    pass
+
+
+class LiveLocalModel:
+    """
+    Modelo local servido, trocado a quente quando sai um snapshot novo
+
+    Começa pela versão em CURRENT no SnapshotStore ou, sem snapshots, pelo
+    .npz de LOCAL_MODEL_PATH. O ponteiro é checado no máximo a cada
+    LOCAL_MODEL_RELOAD_SECONDS (como os léxicos); quando muda, o snapshot
+    é carregado e a referência trocada numa atribuição só. O caminho
+    quente (current) não pega lock: quem está no meio de uma predição
+    termina com o modelo anterior. Um snapshot ilegível mantém o atual.
+    """
+
+    def __init__(self, store: SnapshotStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self._mtime = store.pointer_mtime()
+        self.model: Optional[LocalModel] = None
+        self.swaps = 0
+        version = store.current_version()
+        if version is not None:
+            try:
+                self.model, _ = store.load(version)
+                logger.info("Modelo local carregado do snapshot v%d (%d features)", version, self.model.n_features)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Snapshot v%s ilegível, usando LOCAL_MODEL_PATH: %s", version, e)
+        if self.model is None:
+            self.model = load_local_model()
+
+    def current(self) -> Optional[LocalModel]:
+        interval = settings.LOCAL_MODEL_RELOAD_SECONDS
+        now = time.monotonic()
+        if interval and now - self._checked_at >= interval:
+            self._checked_at = now
+            mtime = self.store.pointer_mtime()
+            if mtime is not None and mtime != self._mtime:
+                # Um snapshot inválido só é tentado de novo na próxima troca do ponteiro
+                self._mtime = mtime
+                self.reload()
+        return self.model
+
+    def reload(self) -> bool:
+        """Troca para a versão em CURRENT; retorna False (e mantém o atual) se ela não carregar"""
+        with self._lock:
+            version = self.store.current_version()
+            if version is None or (self.model is not None and self.model.version == version):
+                return False
+            try:
+                model, _ = self.store.load(version)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Snapshot v%s ilegível, mantendo o modelo atual: %s", version, e)
+                return False
+            previous = self.model.version if self.model is not None else None
+            self.model = model
+            self.swaps += 1
+        LOCAL_MODEL_SWAPS.inc()
+        logger.info("Modelo local trocado", extra={"from_version": previous, "to_version": version})
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        model = self.model
+        return {
+            "loaded": model is not None,
+            "version": model.version if model is not None else None,
+            "swaps": self.swaps,
+        }
+
+
+# Instância singleton (construída no primeiro uso)
+live_local_model = LazyService(lambda: LiveLocalModel(SnapshotStore(settings.LOCAL_MODEL_SNAPSHOT_DIR)))
@@ -0,0 +1,97 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+
+from config import settings
+
+# Identificador e decisão de amostragem da requisição em andamento
+_request_id = contextvars.ContextVar("request_id", default=None)
+_sampled = contextvars.ContextVar("log_sampled", default=True)
+
+# Atributos padrão de LogRecord; o resto veio de extra= e vai para o JSON
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _extras(record: logging.LogRecord) -> dict:
+    """Só os campos vindos de extra=, na ordem em que foram passados"""
+    keys = record.__dict__.keys() - _RESERVED
+    if not keys:
+        return {}
+    return {key: value for key, value in record.__dict__.items() if key in keys}
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro, com os campos passados em extra="""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = _request_id.get()
+        if request_id:
+            payload["request_id"] = request_id
+        payload.update(_extras(record))
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Formato legível para desenvolvimento local"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = _extras(record)
+        if extras:
+            line += " " + " ".join(f"{k}={v}" for k, v in extras.items())
+        request_id = _request_id.get()
+        return f"{line} [req={request_id}]" if request_id else line
+
+
+class SampledLogger(logging.LoggerAdapter):
+    """
+    Logger que descarta INFO/DEBUG das requisições não amostradas
+
+    A decisão é tomada uma vez por requisição (begin_request), então os
+    registros de uma requisição aparecem todos ou nenhum, e o descarte
+    acontece antes de o LogRecord ser criado.
+    """
+
+    def isEnabledFor(self, level: int) -> bool:
+        return (level >= logging.WARNING or _sampled.get()) and self.logger.isEnabledFor(level)
+
+    def process(self, msg, kwargs):
+        return msg, kwargs
+
+
+def begin_request() -> str:
+    """Abre o contexto de log de uma requisição e sorteia se ela será amostrada"""
+    request_id = os.urandom(6).hex()
+    _request_id.set(request_id)
+    _sampled.set(settings.LOG_SAMPLE_RATE >= 1.0 or random.random() < settings.LOG_SAMPLE_RATE)
+    return request_id
+
+
+def configure_logging():
+    """Configura o logger raiz do app a partir de LOG_LEVEL, LOG_FORMAT e LOG_SAMPLE_RATE"""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    root = logging.getLogger("email_classifier")
+    root.handlers[:] = [handler]
+    root.setLevel(settings.LOG_LEVEL)
+    root.propagate = False
+    return root
+
+
+def get_logger(name: str) -> SampledLogger:
+    return SampledLogger(logging.getLogger(f"email_classifier.{name}"), {})
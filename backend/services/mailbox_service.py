@@ -0,0 +1,421 @@
+import imaplib
+import os
+import re
+import sqlite3
+import threading
+import time
+from email.header import decode_header, make_header
+from email.message import Message
+from email.parser import BytesFeedParser, BytesParser
+from email.utils import parseaddr
+from html.parser import HTMLParser
+from io import BytesIO
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+from services.lazy import LazyService
+from services.logging_setup import get_logger
+
+logger = get_logger("mailbox_service")
+
+MAILBOX_KINDS = ("mbox", "maildir", "imap")
+MAILBOX_MODES = ("classify", "full")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mailbox_cursors (
+    source TEXT PRIMARY KEY,
+    position TEXT NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+"""
+
+_MBOX_FROM = re.compile(rb"^>+From ")
+_IMAP_UID = re.compile(rb"UID (\d+)")
+
+
+class _HTMLText(HTMLParser):
+    """Texto visível de um HTML: ignora script/style e quebra linha nos blocos"""
+
+    _SKIP = {"script", "style", "head", "title"}
+    _BLOCKS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "table"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skipping += 1
+        elif tag in self._BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in self._BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    parser = _HTMLText()
+    parser.feed(html)
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _header(message: Message, name: str) -> str:
+    value = message.get(name, "")
+    try:
+        return str(make_header(decode_header(value)))
+    except (ValueError, LookupError):
+        return str(value)
+
+
+def _part_text(part: Message) -> str:
+    payload = part.get_payload(decode=True) or b""
+    try:
+        return payload.decode(part.get_content_charset() or "utf-8", errors="replace")
+    except LookupError:
+        return payload.decode("utf-8", errors="replace")
+
+
+def message_record(message: Message) -> Dict[str, Any]:
+    """
+    Remetente, assunto e texto de uma mensagem MIME
+
+    O corpo é a primeira parte text/plain; sem ela, a primeira text/html
+    convertida em texto. Anexos em formatos do FileService (.pdf, .txt)
+    entram depois do corpo, até EXTRACTION_CHAR_BUDGET; anexos acima do
+    limite de tamanho ou ilegíveis são ignorados.
+    """
+    from services.file_service import file_service
+
+    budget = settings.EXTRACTION_CHAR_BUDGET
+    plain = html = None
+    attachments: List[Tuple[str, Message]] = []
+    for part in message.walk():
+        if part.is_multipart():
+            continue
+        filename = part.get_filename()
+        if filename:
+            filename = str(make_header(decode_header(filename)))
+            if file_service._get_file_extension(filename) in file_service.SUPPORTED_FORMATS:
+                attachments.append((filename, part))
+            continue
+        content_type = part.get_content_type()
+        if content_type == "text/plain" and plain is None:
+            plain = _part_text(part)
+        elif content_type == "text/html" and html is None:
+            html = _part_text(part)
+
+    body = plain if plain is not None else html_to_text(html) if html is not None else ""
+    texts = [body] if body else []
+    total = len(body)
+    names = []
+    for filename, part in attachments:
+        if budget and total >= budget:
+            break
+        try:
+            extracted = file_service.extract_text_from_stream(
+                BytesIO(part.get_payload(decode=True) or b""), filename, char_budget=budget - total if budget else 0
+            )
+        except Exception as e:
+            logger.debug("Anexo ignorado: %s (%s)", filename, e)
+            continue
+        names.append(filename)
+        if extracted["text"].strip():
+            texts.append(f"[Anexo: {filename}]\n{extracted['text']}")
+            total += len(extracted["text"])
+
+    text = "\n\n".join(texts)
+    return {
+        "ref": message.get("Message-ID"),
+        "sender": parseaddr(message.get("From", ""))[1] or "desconhecido@desconhecido",
+        "subject": _header(message, "Subject"),
+        "body": text[:budget] if budget else text,
+        "attachments": names,
+    }
+
+
+class MboxSource:
+    """
+    Arquivo mbox lido em streaming a partir de um offset em bytes
+
+    As mensagens são separadas pelas linhas "From " e alimentadas linha a
+    linha num BytesFeedParser, então a memória fica limitada ao tamanho da
+    maior mensagem, não do arquivo. A posição de cada mensagem é o offset
+    onde ela termina; se o arquivo encolher (rotação), recomeça do início.
+    """
+
+    kind = "mbox"
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self.key = f"mbox:{self.path}"
+
+    def iter_messages(self, position: Optional[str] = None) -> Iterator[Tuple[str, Message]]:
+        offset = int(position) if position else 0
+        if offset > os.path.getsize(self.path):
+            logger.warning("mbox menor que a marca d'água, relendo do início", extra={"path": self.path})
+            offset = 0
+
+        with open(self.path, "rb") as handle:
+            handle.seek(offset)
+            parser = None
+            previous_blank = True
+            while True:
+                start = handle.tell()
+                line = handle.readline()
+                if not line:
+                    break
+                if line.startswith(b"From ") and previous_blank:
+                    if parser is not None:
+                        yield str(start), parser.close()
+                    parser = BytesFeedParser()
+                elif parser is not None:
+                    parser.feed(line[1:] if _MBOX_FROM.match(line) else line)
+                previous_blank = line in (b"\n", b"\r\n")
+            if parser is not None:
+                yield str(handle.tell()), parser.close()
+
+
+class MaildirSource:
+    """
+    Diretório Maildir (new/ e cur/), em ordem de (mtime, nome único)
+
+    A posição é "mtime_ns:nome" da última mensagem processada; o nome é a
+    parte antes de ":" (as flags mudam quando o cliente marca como lida).
+    """
+
+    kind = "maildir"
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self.key = f"maildir:{self.path}"
+
+    def iter_messages(self, position: Optional[str] = None) -> Iterator[Tuple[str, Message]]:
+        watermark = (0, "")
+        if position:
+            mtime, name = position.split(":", 1)
+            watermark = (int(mtime), name)
+
+        pending = []
+        for folder in ("new", "cur"):
+            directory = os.path.join(self.path, folder)
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith(".") or not entry.is_file():
+                        continue
+                    key = (entry.stat().st_mtime_ns, entry.name.split(":", 1)[0])
+                    if key > watermark:
+                        pending.append((key, entry.path))
+        pending.sort()
+
+        parser = BytesParser()
+        for (mtime, name), path in pending:
+            try:
+                with open(path, "rb") as handle:
+                    message = parser.parse(handle)
+            except FileNotFoundError:
+                continue  # movida de new/ para cur/ durante a leitura
+            yield f"{mtime}:{name}", message
+
+
+class IMAPSource:
+    """
+    Pasta IMAP lida por UID, em blocos de IMAP_FETCH_SIZE mensagens
+
+    A posição é "UIDVALIDITY:UID"; se o servidor trocar o UIDVALIDITY os
+    UIDs antigos não valem mais e a pasta é relida inteira. A busca usa
+    BODY.PEEK[] para não marcar as mensagens como lidas.
+    """
+
+    kind = "imap"
+
+    def __init__(
+        self,
+        host: str,
+        user: str,
+        password: str,
+        folder: str = "INBOX",
+        port: Optional[int] = None,
+        ssl: bool = True,
+        fetch_size: Optional[int] = None
+    ):
+        self.host = host
+        self.port = port or (993 if ssl else 143)
+        self.user = user
+        self.password = password
+        self.folder = folder
+        self.ssl = ssl
+        self.fetch_size = fetch_size or settings.IMAP_FETCH_SIZE
+        self.key = f"imap:{user}@{host}:{self.port}/{folder}"
+
+    def _connect(self) -> imaplib.IMAP4:
+        factory = imaplib.IMAP4_SSL if self.ssl else imaplib.IMAP4
+        conn = factory(self.host, self.port, timeout=settings.IMAP_TIMEOUT_SECONDS)
+        conn.login(self.user, self.password)
+        return conn
+
+    def iter_messages(self, position: Optional[str] = None) -> Iterator[Tuple[str, Message]]:
+        validity, last_uid = (position.split(":", 1) if position else ("", "0"))
+        conn = self._connect()
+        try:
+            typ, data = conn.select(f'"{self.folder}"', readonly=True)
+            if typ != "OK":
+                raise ValueError(f"Pasta IMAP inválida: {self.folder}")
+            current = (conn.response("UIDVALIDITY")[1] or [b""])[0]
+            current = current.decode() if isinstance(current, bytes) else str(current or "")
+            if validity and validity != current:
+                logger.warning("UIDVALIDITY mudou, relendo a pasta", extra={"source": self.key})
+                last_uid = "0"
+
+            # "N:*" sempre devolve a última mensagem, mesmo com UID < N
+            typ, data = conn.uid("SEARCH", None, f"UID {int(last_uid) + 1}:*")
+            uids = [int(uid) for uid in (data[0] or b"").split() if int(uid) > int(last_uid)]
+
+            parser = BytesParser()
+            for start in range(0, len(uids), self.fetch_size):
+                chunk = uids[start:start + self.fetch_size]
+                typ, data = conn.uid("FETCH", ",".join(map(str, chunk)), "(UID BODY.PEEK[])")
+                fetched = []
+                for item in data:
+                    if isinstance(item, tuple):
+                        match = _IMAP_UID.search(item[0])
+                        if match:
+                            fetched.append((int(match.group(1)), item[1]))
+                for uid, raw in sorted(fetched):
+                    yield f"{current}:{uid}", parser.parsebytes(raw)
+        finally:
+            try:
+                conn.logout()
+            except (imaplib.IMAP4.error, OSError):
+                pass
+
+
+class MailboxService:
+    """
+    Ingestão incremental de caixas de email (mbox, Maildir ou IMAP)
+
+    Guarda por caixa a marca d'água da última mensagem processada (offset
+    no mbox, mtime+nome no Maildir, UID no IMAP) e só lê o que veio depois.
+    O caminho é um pipeline de geradores: fonte → parser MIME → blocos de
+    `batch_size` → ClassifierService → resultados. Só um bloco fica em
+    memória por vez, e a marca d'água avança depois que o bloco inteiro
+    foi entregue; se o consumidor parar no meio, o bloco é reprocessado
+    na próxima execução (pelo menos uma vez, nunca perdido).
+    """
+
+    def __init__(self, db_path: str, batch_size: int):
+        self.batch_size = batch_size
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def open_source(self, kind: str, location: str, **options):
+        """mbox e maildir: caminho; imap: host (options: user, password, folder, port, ssl)"""
+        if kind == "mbox":
+            return MboxSource(location)
+        if kind == "maildir":
+            return MaildirSource(location)
+        if kind == "imap":
+            return IMAPSource(location, **options)
+        raise ValueError(f"Tipo de caixa inválido. Use: {', '.join(MAILBOX_KINDS)}")
+
+    def cursor(self, source) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT position, processed, updated_at FROM mailbox_cursors WHERE source = ?", (source.key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"source": source.key, "position": row[0], "processed": row[1], "updated_at": row[2]}
+
+    def reset(self, source):
+        with self._lock:
+            self._db.execute("DELETE FROM mailbox_cursors WHERE source = ?", (source.key,))
+            self._db.commit()
+
+    def _checkpoint(self, source, position: str, count: int):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO mailbox_cursors (source, position, processed, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(source) DO UPDATE SET position = excluded.position, "
+                "processed = processed + excluded.processed, updated_at = excluded.updated_at",
+                (source.key, position, count, time.time())
+            )
+            self._db.commit()
+
+    def iter_records(self, source, position: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Mensagens depois de `position` já convertidas (message_record + position)"""
+        for message_position, message in source.iter_messages(position):
+            record = message_record(message)
+            record["position"] = message_position
+            yield record
+
+    def ingest(
+        self,
+        source,
+        mode: str = "classify",
+        limit: Optional[int] = None,
+        provider: Optional[str] = None,
+        routing: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Classifica as mensagens novas da caixa, entregando um resultado por mensagem
+
+        Args:
+            source: MboxSource, MaildirSource ou IMAPSource (ver open_source)
+            mode: "classify" (lote, só categoria) ou "full" (com resposta sugerida)
+            limit: máximo de mensagens nesta execução (None = todas as novas)
+            provider, routing: provedor de LLM e política de roteamento (None = padrão)
+        """
+        from services.classifier_service import classifier_service
+
+        if mode not in MAILBOX_MODES:
+            raise ValueError(f"Modo inválido. Use: {', '.join(MAILBOX_MODES)}")
+        cursor = self.cursor(source)
+        records = self.iter_records(source, cursor["position"] if cursor else None)
+        if limit is not None:
+            records = islice(records, limit)
+
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                break
+            if mode == "classify":
+                results = classifier_service.classify_batch(batch, provider=provider, routing=routing)["results"]
+            else:
+                results = [
+                    classifier_service.classify_and_respond(
+                        record["sender"], record["subject"], record["body"], provider=provider, routing=routing
+                    )
+                    for record in batch
+                ]
+            for record, result in zip(batch, results):
+                yield {
+                    "id": record["ref"],
+                    "sender": record["sender"],
+                    "subject": record["subject"],
+                    "attachments": record["attachments"],
+                    **result,
+                }
+            self._checkpoint(source, batch[-1]["position"], len(batch))
+            logger.info("Bloco da caixa processado", extra={"source": source.key, "emails": len(batch)})
+
+
+# Instância singleton (construída no primeiro uso)
+mailbox_service = LazyService(lambda: MailboxService(
+    db_path=settings.MAILBOX_STATE_DB_PATH,
+    batch_size=settings.MAILBOX_BATCH_SIZE,
+))
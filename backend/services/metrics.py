@@ -0,0 +1,265 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# Limites (em segundos) pensados para cobrir desde o pré-processamento
+# (sub-milissegundo) até chamadas lentas ao Gemini
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador monotônico com labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    """Valor que sobe e desce (ex: tamanho de uma fila), com labels"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Histograma cumulativo no formato do Prometheus (buckets, _sum e _count)"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label → [contagem por bucket (não cumulativa; o último é +Inf), soma]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(str(labels[name]) for name in self.labelnames))
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Registro das métricas expostas no /metrics (formato texto do Prometheus)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica '{metric.name}' já registrada")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "email_classifier_stage_seconds",
+    "Duração de cada etapa do processamento de um email",
+    ("stage",),
+)
+CLASSIFICATIONS = registry.counter(
+    "email_classifier_classifications_total",
+    "Classificações por origem do resultado (noreply, local, cache, near_duplicate, coalesced, gemini, offline, fallback)",
+    ("source",),
+)
+FALLBACKS = registry.counter(
+    "email_classifier_fallback_total",
+    "Ativações do fallback heurístico (classify) ou da resposta padrão (reply)",
+    ("kind",),
+)
+PROMPT_BODY_TOKENS = registry.histogram(
+    "email_classifier_prompt_body_tokens",
+    "Tokens estimados do corpo do email antes (original) e depois (budgeted) do orçamento",
+    ("purpose", "stage"),
+    buckets=(50, 100, 200, 400, 800, 1600, 3200, 6400, 12800, 25600),
+)
+GEMINI_ERRORS = registry.counter(
+    "email_classifier_gemini_errors_total",
+    "Erros nas chamadas ao Gemini por operação e tipo de exceção",
+    ("operation", "error"),
+)
+GEMINI_RETRIES = registry.counter(
+    "email_classifier_gemini_retries_total",
+    "Retentativas de chamadas ao Gemini por operação",
+    ("operation",),
+)
+GEMINI_SHORT_CIRCUITS = registry.counter(
+    "email_classifier_gemini_short_circuits_total",
+    "Chamadas ao Gemini evitadas (circuit_open ou rate_limited), direto para o fallback",
+    ("operation", "reason"),
+)
+GEMINI_TOKENS = registry.counter(
+    "email_classifier_gemini_tokens_total",
+    "Tokens enviados (prompt) e gerados (output) nas chamadas ao Gemini, por operação",
+    ("operation", "type"),
+)
+BREAKER_TRANSITIONS = registry.counter(
+    "email_classifier_gemini_breaker_transitions_total",
+    "Mudanças de estado do circuito do Gemini, pelo estado de destino",
+    ("state",),
+)
+
+LLM_PROVIDER_CALLS = registry.counter(
+    "email_classifier_llm_provider_calls_total",
+    "Chamadas do roteador a cada provedor de LLM por operação e resultado (ok, error, escalated, cancelled)",
+    ("provider", "operation", "outcome"),
+)
+LLM_PROVIDER_SECONDS = registry.histogram(
+    "email_classifier_llm_provider_seconds",
+    "Duração das chamadas a cada provedor de LLM",
+    ("provider",),
+)
+
+COALESCED_REQUESTS = registry.counter(
+    "email_classifier_coalesced_requests_total",
+    "Requisições que esperaram uma chamada idêntica já em voo em vez de chamar o LLM (single-flight)",
+    ("operation",),
+)
+
+ADMISSION_QUEUE_DEPTH = registry.gauge(
+    "email_classifier_admission_queue_depth",
+    "Requisições esperando um slot de classificação, por classe de prioridade",
+    ("priority",),
+)
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    "email_classifier_admission_wait_seconds",
+    "Tempo na fila de admissão até ganhar um slot, por classe de prioridade",
+    ("priority",),
+)
+ADMISSION_DECISIONS = registry.counter(
+    "email_classifier_admission_decisions_total",
+    "Decisões da admissão por classe e resultado (admitted, shed, degraded_deadline, degraded_overload, degraded_timeout)",
+    ("priority", "outcome"),
+)
+
+FEEDBACK_CORRECTIONS = registry.counter(
+    "email_classifier_feedback_corrections_total",
+    "Correções de operadores recebidas no /feedback, pela categoria correta",
+    ("category",),
+)
+LOCAL_MODEL_SWAPS = registry.counter(
+    "email_classifier_local_model_swaps_total",
+    "Trocas a quente do modelo local para um snapshot novo (por processo)",
+)
+
+
+@contextmanager
+def timed(stage: str):
+    """Mede o bloco e registra a duração no histograma de etapas"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+
+def record_gemini_error(operation: str, error: BaseException):
+    GEMINI_ERRORS.inc(operation=operation, error=type(error).__name__)
@@ -0,0 +1,277 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+from config import settings
+from services.lazy import LazyService
+from services.logging_setup import get_logger
+
+logger = get_logger("near_duplicate")
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class NearDuplicateIndex:
+    """
+    Índice de emails quase iguais (MinHash + LSH)
+
+    Emails de template (faturas, alertas de senha, convites de reunião)
+    mudam só em nomes, números e datas, então o cache por hash exato não os
+    reconhece. Aqui cada email vira uma assinatura MinHash dos shingles
+    (n-gramas de palavras) dos tokens do NLPService, que já descartam
+    números e emails; o LSH por bandas encontra os candidatos e a
+    similaridade estimada (Jaccard) decide se o resultado é reaproveitado.
+
+    Memória limitada a `max_entries` assinaturas (LRU); com `db_path` as
+    entradas também ficam num SQLite e são recarregadas na inicialização.
+    Um acerto não escreve no disco: o último acesso fica pendente e vai
+    para o SQLite com a próxima gravação (ou quando passam de max_entries
+    entradas pendentes).
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        threshold: float,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 2,
+        min_tokens: int = 8,
+        db_path: Optional[str] = None
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm precisa ser múltiplo de bands")
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_tokens = min_tokens
+
+        # Semente fixa: assinaturas gravadas em disco continuam comparáveis entre reinícios
+        rng = np.random.RandomState(1)
+        self._a = rng.randint(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "misses": 0, "reply_hits": 0, "inserts": 0, "evictions": 0}
+
+        self._db = None
+        self._touched: Dict[str, float] = {}
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS near_duplicates ("
+                "id TEXT PRIMARY KEY, signature BLOB NOT NULL, category TEXT NOT NULL, "
+                "confidence REAL NOT NULL, reply TEXT, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_near_dup_accessed ON near_duplicates(accessed_at)")
+            self._db.commit()
+            self._load()
+
+    def signature(self, texto_processado: str) -> Optional[np.ndarray]:
+        """Assinatura MinHash dos tokens já pré-processados, ou None se o texto é curto demais"""
+        tokens = texto_processado.split()
+        if len(tokens) < self.min_tokens:
+            return None
+        n = self.shingle_size
+        shingles = {" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)}
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        permuted = ((hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def lookup(self, texto_processado: str) -> Optional[Dict[str, Any]]:
+        """
+        Entrada mais parecida acima do limiar: dict com category, confidence,
+        reply (template ou None) e similarity; None se não há nenhuma
+        """
+        signature = self.signature(texto_processado)
+        if signature is None:
+            return None
+        with self._lock:
+            self._stats["lookups"] += 1
+            best_id, best_similarity = None, 0.0
+            for entry_id in self._candidates(signature):
+                similarity = float(np.mean(self._entries[entry_id]["signature"] == signature))
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+
+            if best_id is None or best_similarity < self.threshold:
+                self._stats["misses"] += 1
+                return None
+
+            self._stats["hits"] += 1
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            self._touch(best_id)
+            return {
+                "category": entry["category"],
+                "confidence": entry["confidence"],
+                "reply": entry["reply"],
+                "similarity": round(best_similarity, 4),
+            }
+
+    def add(self, texto_processado: str, category: str, confidence: float):
+        """Registra a classificação de um email (a resposta vem depois, em set_reply)"""
+        signature = self.signature(texto_processado)
+        if signature is None:
+            return
+        entry_id = self._entry_id(signature)
+        with self._lock:
+            previous = self._entries.get(entry_id)
+            # A resposta guardada só vale enquanto a categoria for a mesma
+            reply = previous["reply"] if previous and previous["category"] == category else None
+            self._put(entry_id, signature, category, confidence, reply)
+            self._stats["inserts"] += 1
+            self._save(entry_id)
+
+    def set_reply(self, texto_processado: str, category: str, reply: str):
+        """Guarda o template de resposta na entrada do próprio email, se ela existe com a mesma categoria"""
+        signature = self.signature(texto_processado)
+        if signature is None:
+            return
+        entry_id = self._entry_id(signature)
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None or entry["category"] != category:
+                return
+            entry["reply"] = reply
+            self._save(entry_id)
+
+    def count_reply_hit(self):
+        with self._lock:
+            self._stats["reply_hits"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets = [{} for _ in range(self.bands)]
+            self._touched.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM near_duplicates")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["lookups"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "threshold": self.threshold,
+                "disk_enabled": self._db is not None,
+            }
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        rows = self.rows
+        return [signature[band * rows:(band + 1) * rows].tobytes() for band in range(self.bands)]
+
+    def _candidates(self, signature: np.ndarray) -> Set[str]:
+        candidates: Set[str] = set()
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(buckets.get(key, ()))
+        return candidates
+
+    @staticmethod
+    def _entry_id(signature: np.ndarray) -> str:
+        # Textos com os mesmos shingles caem na mesma entrada
+        return hashlib.sha1(signature.tobytes()).hexdigest()
+
+    def _put(self, entry_id: str, signature: np.ndarray, category: str, confidence: float, reply: Optional[str]):
+        if entry_id in self._entries:
+            self._entries.move_to_end(entry_id)
+        else:
+            for buckets, key in zip(self._buckets, self._band_keys(signature)):
+                buckets.setdefault(key, set()).add(entry_id)
+        self._entries[entry_id] = {
+            "signature": signature, "category": category, "confidence": confidence, "reply": reply
+        }
+        while len(self._entries) > self.max_entries:
+            old_id, old = self._entries.popitem(last=False)
+            self._unindex(old_id, old["signature"])
+            self._stats["evictions"] += 1
+            if self._db is not None:
+                self._touched.pop(old_id, None)
+                self._db.execute("DELETE FROM near_duplicates WHERE id = ?", (old_id,))
+
+    def _unindex(self, entry_id: str, signature: np.ndarray):
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            members = buckets.get(key)
+            if members is not None:
+                members.discard(entry_id)
+                if not members:
+                    del buckets[key]
+
+    def _touch(self, entry_id: str):
+        """Anota o acesso para a próxima gravação em vez de um UPDATE por acerto"""
+        if self._db is None:
+            return
+        self._touched[entry_id] = time.time()
+        if len(self._touched) > self.max_entries:
+            self._flush_touched()
+            self._db.commit()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._db.executemany(
+                "UPDATE near_duplicates SET accessed_at = ? WHERE id = ?",
+                [(accessed_at, entry_id) for entry_id, accessed_at in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _save(self, entry_id: str):
+        if self._db is None:
+            return
+        entry = self._entries[entry_id]
+        self._touched.pop(entry_id, None)
+        self._flush_touched()
+        self._db.execute(
+            "INSERT OR REPLACE INTO near_duplicates (id, signature, category, confidence, reply, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (entry_id, entry["signature"].tobytes(), entry["category"], entry["confidence"], entry["reply"], time.time())
+        )
+        self._db.commit()
+
+    def _load(self):
+        """Recarrega as entradas mais recentes do disco, das mais antigas para as mais novas (ordem do LRU)"""
+        rows = self._db.execute(
+            "SELECT id, signature, category, confidence, reply FROM ("
+            "SELECT * FROM near_duplicates ORDER BY accessed_at DESC LIMIT ?) ORDER BY accessed_at",
+            (self.max_entries,)
+        ).fetchall()
+        for entry_id, blob, category, confidence, reply in rows:
+            signature = np.frombuffer(blob, dtype=np.uint32)
+            # Assinaturas de outra configuração (num_perm) não são comparáveis
+            if signature.shape[0] == self.num_perm:
+                self._put(entry_id, signature.copy(), category, confidence, reply)
+        self._db.execute(
+            "DELETE FROM near_duplicates WHERE id NOT IN ("
+            "SELECT id FROM near_duplicates ORDER BY accessed_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+        self._db.commit()
+        logger.info("Índice de quase duplicados carregado", extra={"entries": len(self._entries)})
+
+
+# Instância singleton (construída no primeiro uso)
+near_duplicate_index = LazyService(lambda: NearDuplicateIndex(
+    max_entries=settings.NEAR_DUP_MAX_ENTRIES,
+    threshold=settings.NEAR_DUP_THRESHOLD,
+    num_perm=settings.NEAR_DUP_NUM_PERM,
+    bands=settings.NEAR_DUP_BANDS,
+    shingle_size=settings.NEAR_DUP_SHINGLE_SIZE,
+    min_tokens=settings.NEAR_DUP_MIN_TOKENS,
+    db_path=settings.NEAR_DUP_DB_PATH or None,
+))
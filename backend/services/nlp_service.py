@@ -1,58 +1,75 @@
 import re
-import nltk
 from nltk.corpus import stopwords
 from nltk.stem import RSLPStemmer
 from collections import Counter
-from typing import List
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+from config import settings
+from services.lazy import LazyService
+from services.nltk_resources import ensure_nltk_resources
 
-# Download de recursos NLTK
-try:
-    nltk.data.find('corpora/stopwords')
-except:
-    nltk.download('stopwords')
-    nltk.download('rslp')
+# Um único padrão para a passada de tokenização: emails e URLs são
+# consumidos e descartados, o grupo 1 captura as palavras
+_TOKEN_PATTERN = re.compile(r'\S+@\S+|http\S+|www\S+|(\w+)')
+_DIGITS = re.compile(r'\d+')
 
 class NLPService:
     """Serviço de processamento de linguagem natural"""
     
     def __init__(self):
-        self.stop_words = set(stopwords.words('portuguese'))
+        ensure_nltk_resources(["stopwords", "rslp"])
+        self.stop_words = frozenset(stopwords.words('portuguese'))
         self.stemmer = RSLPStemmer()
+        # Emails corporativos reutilizam um vocabulário pequeno: memoiza o stemming
+        self._stem = lru_cache(maxsize=settings.STEM_CACHE_SIZE)(self.stemmer.stem)
     
+    def tokenize(self, text: str) -> List[str]:
+        """
+        Pré-processa o texto em uma única passada e retorna os tokens
+
+        Equivale ao pipeline lowercasing → remoção de emails/URLs/números/
+        pontuação → stop words → stemming (RSLP).
+        """
+        stop_words = self.stop_words
+        stem = self._stem
+        tokens = []
+        for match in _TOKEN_PATTERN.finditer(text.lower()):
+            word = match.group(1)
+            if word is None:
+                continue
+            if not word.isalpha():
+                word = _DIGITS.sub('', word)
+                if not word:
+                    continue
+            if word in stop_words:
+                continue
+            tokens.append(stem(word))
+        return tokens
+
     def preprocess_text(self, text: str) -> str:
-       
-        # Lowercasing
-        text = text.lower()
-        
-        # Remove emails e URLs
-        text = re.sub(r'\S+@\S+', '', text)
-        text = re.sub(r'http\S+|www\S+', '', text)
-        
-        # Remove números
-        text = re.sub(r'\d+', '', text)
-        
-        # Remove pontuação
-        text = re.sub(r'[^\w\s]', ' ', text)
-        
-        # Remove espaços extras
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        # Tokenização
-        tokens = text.split()
-        
-        # Remove stop words
-        tokens = [word for word in tokens if word not in self.stop_words]
-        
-        # Stemming
-        tokens = [self.stemmer.stem(word) for word in tokens]
-        
-        return ' '.join(tokens)
+        return ' '.join(self.tokenize(text))
+
+    def preprocess_many(self, texts: Iterable[str]) -> List[str]:
+        """Pré-processa vários textos reaproveitando o cache de stems"""
+        tokenize = self.tokenize
+        return [' '.join(tokenize(text)) for text in texts]
+
+    def analyze(self, text: str, top_n: int = 5) -> Tuple[str, List[str]]:
+        """Retorna (texto pré-processado, palavras-chave) com uma só passada"""
+        tokens = self.tokenize(text)
+        return ' '.join(tokens), self.top_keywords(tokens, top_n)
     
     def extract_keywords(self, text: str, top_n: int = 5) -> List[str]:
         """Extrai as palavras-chave mais importantes do texto"""
-        processed = self.preprocess_text(text)
-        word_freq = Counter(processed.split())
+        return self.top_keywords(self.tokenize(text), top_n)
+
+    def stem_cache_info(self):
+        return self._stem.cache_info()
+
+    def top_keywords(self, tokens: List[str], top_n: int) -> List[str]:
+        """Palavras-chave a partir de tokens já pré-processados"""
+        word_freq = Counter(tokens)
         return [word for word, _ in word_freq.most_common(top_n)]
 
-# Instância singleton
-nlp_service = NLPService()
\ No newline at end of file
+# Instância singleton (construída no primeiro uso)
+nlp_service = LazyService(NLPService)
\ No newline at end of file
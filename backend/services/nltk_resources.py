@@ -0,0 +1,56 @@
+import pathlib
+from typing import Iterable, List
+
+import nltk
+
+from config import settings
+from services.logging_setup import get_logger
+
+logger = get_logger("nltk")
+
+# recurso → caminho dentro do diretório de dados do NLTK
+RESOURCES = {
+    "stopwords": "corpora/stopwords",
+    "rslp": "stemmers/rslp",
+    "vader_lexicon": "sentiment/vader_lexicon",
+}
+
+
+def register_data_dirs():
+    """Coloca o pacote offline (NLTK_BUNDLE_DIR) e o NLTK_DATA no caminho de busca"""
+    for directory in (settings.NLTK_DATA_DIR, settings.NLTK_BUNDLE_DIR):
+        if directory and directory not in nltk.data.path:
+            nltk.data.path.insert(0, directory)
+
+
+def missing_resources(names: Iterable[str] = RESOURCES) -> List[str]:
+    register_data_dirs()
+    missing = []
+    for name in names:
+        try:
+            nltk.data.find(RESOURCES[name])
+        except LookupError:
+            missing.append(name)
+    return missing
+
+
+def ensure_nltk_resources(names: Iterable[str] = RESOURCES):
+    """
+    Garante que os recursos estão disponíveis, lendo primeiro do disco
+
+    Só baixa o que faltar se NLTK_ALLOW_DOWNLOAD estiver ligado; em
+    ambientes sem rede, gere o pacote com bundle_nltk_data.py.
+    """
+    missing = missing_resources(names)
+    if not missing:
+        return
+    if not settings.NLTK_ALLOW_DOWNLOAD:
+        raise RuntimeError(
+            f"Recursos NLTK ausentes: {', '.join(missing)}. "
+            f"Gere o pacote offline com 'python bundle_nltk_data.py' (NLTK_BUNDLE_DIR={settings.NLTK_BUNDLE_DIR})"
+        )
+    pathlib.Path(settings.NLTK_DATA_DIR).mkdir(parents=True, exist_ok=True)
+    for name in missing:
+        logger.info("Baixando recurso NLTK %s", name)
+        if not nltk.download(name, download_dir=settings.NLTK_DATA_DIR, quiet=True):
+            raise RuntimeError(f"Não foi possível baixar o recurso NLTK '{name}'")
@@ -0,0 +1,102 @@
+import threading
+from typing import List, Optional, Tuple
+
+from config import settings
+from services.keyword_automaton import fallback_lexicon
+from services.lazy import LazyService
+from services.llm_provider import LLMProvider
+from services.local_model import LiveLocalModel, decide, live_local_model
+from services.logging_setup import get_logger
+from services.nlp_service import nlp_service
+from services.nltk_resources import ensure_nltk_resources
+
+logger = get_logger("offline_provider")
+
+
+class OfflineProvider(LLMProvider):
+    """
+    Provedor determinístico que roda sem rede e sem chave de API
+
+    Classifica com o modelo local (train_local_model.py, atualizado pelo
+    /feedback) quando ele está fora da faixa de incerteza; sem modelo, com
+    ele incerto ou com um modelo que só conhece as correções (snapshot
+    criado sem modelo base), usa as regras do léxico de fallback com
+    desempate pelo VADER. As respostas saem de templates por categoria.
+    Serve para rodar offline, em CI e em ambientes isolados, e como último
+    elo barato das políticas de roteamento.
+
+    Os resultados não vão para o cache: o cache é compartilhado com o
+    Gemini e uma resposta de template não deve ocupar o lugar da dele.
+    """
+
+    name = "offline"
+    cost = 0.0
+    cacheable = False
+
+    REPLY_TEMPLATES = {
+        "Produtivo": (
+            "Olá, {sender_name}. Recebemos sua mensagem sobre '{subject}' e ela já está em análise. "
+            "Retornaremos em breve com os próximos passos."
+        ),
+        "Improdutivo": "Olá, {sender_name}! Muito obrigado pela mensagem, ficamos felizes com o contato.",
+    }
+
+    def __init__(self, local_model: Optional[LiveLocalModel] = None):
+        self.nlp = nlp_service
+        self.lexicon = fallback_lexicon
+        self.local_model = local_model
+        self._sentiment = None
+        self._sentiment_lock = threading.Lock()
+
+    @property
+    def sentiment(self):
+        """Analisador VADER, carregado só quando as regras precisam desempatar"""
+        if self._sentiment is None:
+            with self._sentiment_lock:
+                if self._sentiment is None:
+                    from nltk.sentiment import SentimentIntensityAnalyzer
+                    ensure_nltk_resources(["vader_lexicon"])
+                    self._sentiment = SentimentIntensityAnalyzer()
+        return self._sentiment
+
+    def rule_scores(self, text: str) -> Tuple[str, float]:
+        """Regras do léxico de fallback: soma dos pesos dos termos distintos de cada rótulo"""
+        scores = self.lexicon.scores(text)
+        p, p_matches = scores.get("Produtivo", (0.0, []))
+        i, i_matches = scores.get("Improdutivo", (0.0, []))
+        logger.debug("Regras: produtivo=%s improdutivo=%s", p_matches, i_matches)
+
+        if p > i:
+            return "Produtivo", min(0.6 + p * 0.05, 0.85)
+        if i > p:
+            return "Improdutivo", min(0.6 + i * 0.05, 0.85)
+
+        # Empate: análise de sentimento
+        comp = self.sentiment.polarity_scores(text)["compound"]
+        if comp < -0.2:
+            return "Improdutivo", 0.55
+        return "Produtivo", 0.55
+
+    def classify_email(self, subject: str, body: str) -> Tuple[str, float]:
+        text = f"{subject}. {body}"
+        model = self.local_model.current() if self.local_model is not None else None
+        if model is None or model.empty_base:
+            return self.rule_scores(text)
+        probability = model.predict_proba(self.nlp.tokenize(text))
+        local = decide(probability, settings.LOCAL_MODEL_LOW, settings.LOCAL_MODEL_HIGH)
+        return local if local is not None else self.rule_scores(text)
+
+    def classify_batch(self, items: List[Tuple[str, str]]) -> List[Optional[Tuple[str, float]]]:
+        return [self.classify_email(subject, body) for subject, body in items]
+
+    def classify_and_reply(self, sender_name: str, subject: str, body: str, keywords: list) -> Tuple[str, float, str]:
+        category, confidence = self.classify_email(subject, body)
+        return category, confidence, self.generate_response(category, sender_name, subject, body, keywords)
+
+    def generate_response(self, category: str, sender_name: str, subject: str, body: str, keywords: list) -> str:
+        template = self.REPLY_TEMPLATES.get(category, self.REPLY_TEMPLATES["Produtivo"])
+        return template.format(sender_name=sender_name or "Colega", subject=subject)
+
+
+# Instância singleton (construída no primeiro uso)
+offline_provider = LazyService(lambda: OfflineProvider(live_local_model))
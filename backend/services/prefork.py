@@ -0,0 +1,47 @@
+import gc
+
+from config import settings
+from services.classifier_service import classifier_service
+from services.keyword_automaton import fallback_lexicon, noreply_lexicon
+from services.lazy import initialize
+from services.logging_setup import get_logger
+from services.nlp_service import nlp_service
+from services.offline_provider import offline_provider
+from services.prompt_budget import prompt_budget
+
+logger = get_logger("prefork")
+
+
+def preload_shared_assets():
+    """
+    Carrega no processo mestre, antes do fork, os recursos só de leitura
+
+    Stop words, stemmer RSLP, léxico do VADER, modelo local e léxicos de
+    palavras-chave ficam nas páginas do mestre e são compartilhados por
+    cópia-na-escrita com os workers. Os pesos do modelo local são um único
+    buffer numpy (ou um snapshot mapeado do disco), que nunca é escrito.
+    O gc.freeze() tira esses objetos das varreduras do coletor, que de
+    outra forma tocaria cada página e forçaria a cópia em todos os workers.
+
+    Gemini (canal gRPC) e as bases SQLite não podem atravessar um fork:
+    continuam sendo criados no primeiro uso, já dentro de cada worker.
+    """
+    for service in (nlp_service, offline_provider, classifier_service, prompt_budget, fallback_lexicon, noreply_lexicon):
+        initialize(service)
+    offline_provider.sentiment
+    gc.collect()
+    gc.freeze()
+    logger.info("Recursos compartilhados carregados antes do fork", extra={"frozen_objects": gc.get_freeze_count()})
+
+
+def after_fork(workers: int):
+    """
+    Ajustes de cada worker logo após o fork
+
+    O limite de taxa do Gemini é por processo: cada worker fica com a sua
+    fração de GEMINI_RATE_LIMIT_RPS, para que o total continue casado com a
+    cota.
+    """
+    if workers > 1 and settings.GEMINI_RATE_LIMIT_RPS:
+        settings.GEMINI_RATE_LIMIT_RPS /= workers
+        settings.GEMINI_RATE_LIMIT_BURST = max(1.0, settings.GEMINI_RATE_LIMIT_BURST / workers)
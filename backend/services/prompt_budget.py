@@ -0,0 +1,156 @@
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import List
+
+from config import settings
+from services.llm_provider import LLMProvider
+from services.lazy import LazyService
+from services.metrics import PROMPT_BODY_TOKENS
+from services.nlp_service import nlp_service
+
+# Início do histórico citado: daqui para baixo é a conversa anterior
+_REPLY_BOUNDARY = re.compile(
+    r'^\s*(-{2,}\s*(original message|mensagem original)\s*-{2,}'
+    r'|(em|on)\b.{0,200}\b(escreveu|wrote)\s*:)\s*$',
+    re.IGNORECASE
+)
+# Linha que abre um encaminhamento: o conteúdo encaminhado é mantido, só os cabeçalhos saem
+_FORWARD_MARKER = re.compile(
+    r'^\s*-{2,}\s*(forwarded message|mensagem encaminhada)\s*-{2,}\s*$|^\s*(begin forwarded message|início da mensagem encaminhada)\s*:\s*$',
+    re.IGNORECASE
+)
+_HEADER_LINE = re.compile(
+    r'^\s*\*?(de|from|enviado|enviada em|enviado em|sent|date|data|para|to|cc|cco|bcc|assunto|subject)\*?\s*:',
+    re.IGNORECASE
+)
+_HEADER_SUBJECT = re.compile(r'^\s*\*?(assunto|subject)\*?\s*:', re.IGNORECASE)
+_HEADER_FROM = re.compile(r'^\s*\*?(de|from)\*?\s*:', re.IGNORECASE)
+_SIGNATURE_START = re.compile(
+    r'^\s*(--\s*|atenciosamente|abraços|abs|att|cordialmente|saudações|best regards|regards)[,.!]?\s*$',
+    re.IGNORECASE
+)
+_MOBILE_FOOTER = re.compile(r'^\s*(enviado do meu|sent from my)\b', re.IGNORECASE)
+_DISCLAIMER = re.compile(
+    r'confidencial|confidential|destinatário|intended recipient|aviso legal|disclaimer|privileged',
+    re.IGNORECASE
+)
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?;])\s+|\n+')
+_GAP = " [...] "
+
+
+class PromptBudget:
+    """
+    Etapa de orçamento do corpo do email antes das chamadas ao Gemini
+
+    Primeiro remove o que é ruído para classificar e responder (histórico
+    citado, cabeçalhos de encaminhamento, assinaturas, avisos legais); se
+    ainda passar do orçamento de tokens, mantém as frases mais informativas
+    (as que concentram os termos mais frequentes do próprio email), sempre
+    com a abertura, na ordem original.
+    """
+
+    def __init__(self):
+        self.nlp = nlp_service
+        # classify e reply do mesmo email limpam o mesmo corpo
+        self.clean = lru_cache(maxsize=256)(self._clean)
+
+    def budget_for(self, purpose: str) -> int:
+        if purpose == "classify":
+            return settings.CLASSIFY_TOKEN_BUDGET
+        if purpose == "reply":
+            return settings.REPLY_TOKEN_BUDGET
+        budgets = (settings.CLASSIFY_TOKEN_BUDGET, settings.REPLY_TOKEN_BUDGET)
+        return 0 if 0 in budgets else max(budgets)
+
+    def fit(self, body: str, purpose: str) -> str:
+        """Corpo pronto para o prompt de `purpose` (classify, reply ou combined)"""
+        budget = self.budget_for(purpose)
+        before = LLMProvider.estimate_tokens(body)
+        text = self.clean(body) if settings.PROMPT_CLEANUP else body
+        if budget and LLMProvider.estimate_tokens(text) > budget:
+            text = self._select(text, budget)
+        PROMPT_BODY_TOKENS.observe(before, purpose=purpose, stage="original")
+        PROMPT_BODY_TOKENS.observe(LLMProvider.estimate_tokens(text), purpose=purpose, stage="budgeted")
+        return text
+
+    def _clean(self, body: str) -> str:
+        lines = body.splitlines()
+        kept: List[str] = []
+        in_headers = in_signature = False
+        for i, line in enumerate(lines):
+            if _FORWARD_MARKER.match(line):
+                in_headers, in_signature = True, False
+                continue
+            if in_headers:
+                if _HEADER_LINE.match(line) or not line.strip():
+                    continue
+                in_headers = False
+            if _REPLY_BOUNDARY.match(line) or self._is_header_block(lines, i):
+                # Histórico citado: só um encaminhamento mais abaixo ainda interessa
+                rest = next((j for j in range(i + 1, len(lines)) if _FORWARD_MARKER.match(lines[j])), None)
+                if rest is None:
+                    break
+                in_signature = True
+                continue
+            if line.lstrip().startswith(">") or _MOBILE_FOOTER.match(line):
+                continue
+            if _SIGNATURE_START.match(line):
+                in_signature = True
+                continue
+            if not in_signature:
+                kept.append(line)
+
+        paragraphs = re.split(r'\n\s*\n', "\n".join(kept))
+        text = "\n\n".join(
+            p.strip() for p in paragraphs
+            if p.strip() and not (len(p) > 100 and _DISCLAIMER.search(p))
+        )
+        # Um email que é só histórico citado continua melhor do que um prompt vazio
+        return text or body.strip()
+
+    @staticmethod
+    def _is_header_block(lines: List[str], i: int) -> bool:
+        """Cabeçalho no estilo Outlook (De:/From: seguido de Assunto:/Subject:) abrindo o histórico"""
+        if not _HEADER_FROM.match(lines[i]):
+            return False
+        return any(_HEADER_SUBJECT.match(line) for line in lines[i + 1:i + 6])
+
+    def _select(self, text: str, budget: int) -> str:
+        sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text) if s and s.strip()]
+        if not sentences:
+            return text[:budget * 4]
+
+        terms = [set(self.nlp.tokenize(sentence)) for sentence in sentences]
+        frequency = Counter(term for sentence_terms in terms for term in sentence_terms)
+        scores = []
+        for index, sentence_terms in enumerate(terms):
+            score = sum(frequency[t] for t in sentence_terms) / (len(sentence_terms) ** 0.5 or 1)
+            # A abertura costuma trazer o pedido; frases sem termos de conteúdo não valem nada
+            if index < 2:
+                score += max(frequency.values(), default=0) * 2
+            scores.append(score if sentence_terms else 0.0)
+
+        chosen, used = set(), 0
+        for index in sorted(range(len(sentences)), key=lambda i: (-scores[i], i)):
+            cost = LLMProvider.estimate_tokens(sentences[index]) + 1
+            if used + cost <= budget:
+                chosen.add(index)
+                used += cost
+
+        if not chosen:
+            return sentences[0][:budget * 4]
+
+        parts, previous = [], -1
+        for index in sorted(chosen):
+            if parts and index != previous + 1:
+                parts.append(_GAP)
+            elif parts:
+                parts.append(" ")
+            parts.append(sentences[index])
+            previous = index
+        return "".join(parts)
+
+
+# Instância singleton (construída no primeiro uso)
+prompt_budget = LazyService(PromptBudget)
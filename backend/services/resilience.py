@@ -0,0 +1,208 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from services.logging_setup import get_logger
+from services.metrics import BREAKER_TRANSITIONS
+
+logger = get_logger("resilience")
+
+
+class GeminiUnavailableError(Exception):
+    """O Gemini não foi chamado (circuito aberto ou cota esgotada); use o fallback"""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class TokenBucket:
+    """
+    Balde de tokens compartilhado por threads e pelo event loop
+
+    `rate` tokens por segundo com capacidade `burst`. Quem não consegue um
+    token em até `max_wait` segundos recebe GeminiUnavailableError em vez de
+    ficar na fila: melhor responder pelo fallback do que estourar a cota.
+    rate <= 0 desliga o limite.
+    """
+
+    def __init__(self, rate: float, burst: float, max_wait: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_wait = max_wait
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Reserva um token e retorna quanto esperar por ele (-1 se passar de max_wait)"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = (1.0 - self._tokens) / self.rate if self._tokens < 1.0 else 0.0
+            if wait > self.max_wait:
+                return -1.0
+            # O token fica negativo: quem chegar depois espera a sua vez
+            self._tokens -= 1.0
+            return wait
+
+    def _denied(self):
+        return GeminiUnavailableError("rate_limited", "Limite de requisições ao Gemini atingido")
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        wait = self._reserve()
+        if wait < 0:
+            raise self._denied()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        if self.rate <= 0:
+            return
+        wait = self._reserve()
+        if wait < 0:
+            raise self._denied()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            tokens = min(self.burst, self._tokens + (time.monotonic() - self._updated) * self.rate)
+        return {"rate_per_sec": self.rate, "burst": self.burst, "tokens": round(tokens, 2)}
+
+
+class RetryBudget:
+    """
+    Orçamento global de retentativas (como o retryThrottling do gRPC)
+
+    Cada falha gasta um token e cada sucesso devolve `ratio` tokens; só se
+    retenta enquanto houver mais da metade do máximo. Numa queda geral o
+    saldo zera rápido e as retentativas param de multiplicar a carga.
+    """
+
+    def __init__(self, max_tokens: float, ratio: float):
+        self.max_tokens = max_tokens
+        self.ratio = ratio
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def on_success(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def on_failure(self):
+        with self._lock:
+            self._tokens = max(0.0, self._tokens - 1.0)
+
+    def can_retry(self) -> bool:
+        with self._lock:
+            return self._tokens > self.max_tokens / 2
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {"tokens": round(self._tokens, 2), "max_tokens": self.max_tokens}
+
+
+class CircuitBreaker:
+    """
+    Disjuntor em volta do Gemini
+
+    closed: chamadas passam; `failure_threshold` falhas seguidas abrem o
+    circuito. open: nenhuma chamada passa (o chamador vai direto ao
+    fallback); depois de `reset_timeout` uma sonda roda em segundo plano e,
+    se der certo, fecha o circuito; se falhar, o circuito continua aberto
+    por mais um período.
+    """
+
+    CLOSED, OPEN, PROBING = "closed", "open", "probing"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, probe: Optional[Callable[[], None]] = None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe = probe
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+        self._opens = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True se a chamada pode ir ao Gemini; com o circuito aberto dispara a sonda quando for a hora"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            # Uma sonda que nunca respondeu (ex: chamada cancelada) não prende o circuito
+            start_probe = (
+                (self.state == self.OPEN and now - self._opened_at >= self.reset_timeout)
+                or (self.state == self.PROBING and now - self._probe_started >= self.reset_timeout)
+            )
+            if start_probe:
+                self._probe_started = now
+                self._set_state(self.PROBING)
+        if start_probe:
+            if self.probe is None:
+                # Sem sonda: a próxima chamada real faz o papel dela
+                return True
+            threading.Thread(target=self._run_probe, name="gemini-breaker-probe", daemon=True).start()
+        return False
+
+    def check(self):
+        if not self.allow():
+            raise GeminiUnavailableError("circuit_open", "Circuito do Gemini aberto")
+
+    def on_success(self):
+        with self._lock:
+            self._failures = 0
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def on_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.PROBING or (self.state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._open()
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._opens += 1
+        self._set_state(self.OPEN)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            log = logger.warning if state == self.OPEN else logger.info
+            log("Circuito do Gemini: %s -> %s", self.state, state, extra={"failures": self._failures})
+            BREAKER_TRANSITIONS.inc(state=state)
+            self.state = state
+
+    def _run_probe(self):
+        try:
+            self.probe()
+        except Exception as e:
+            logger.warning("Sonda do Gemini falhou: %s: %s", type(e).__name__, e)
+            self.on_failure()
+        else:
+            self.on_success()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 2)
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "times_opened": self._opens,
+                "probe_in_seconds": retry_in,
+            }
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Backoff exponencial com jitter total: uniforme em [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0.0, min(cap, base * (2 ** attempt)))
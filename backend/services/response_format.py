@@ -0,0 +1,140 @@
+import gzip
+import json
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import settings
+
+try:
+    import msgpack
+except ImportError:  # formato binário opcional: sem o pacote só há JSON
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # sem o pacote a compressão fica só no gzip
+    zstandard = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_ALIASES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+_zstd = threading.local()
+
+
+class NotAcceptableError(ValueError):
+    """O cliente só aceita formatos que este servidor não tem (HTTP 406)"""
+
+
+def _parse_header(value: str) -> List[Tuple[str, float]]:
+    """Itens de Accept/Accept-Encoding com o peso q, na ordem do cabeçalho"""
+    items = []
+    for part in value.split(","):
+        name, *params = [piece.strip() for piece in part.split(";")]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, raw = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(raw)
+                except ValueError:
+                    q = 0.0
+        items.append((name.lower(), q))
+    return items
+
+
+def media_types() -> List[str]:
+    return [JSON_MEDIA_TYPE] + ([MSGPACK_MEDIA_TYPE] if msgpack is not None else [])
+
+
+def encodings() -> List[str]:
+    """Compressões disponíveis, na ordem de preferência do servidor"""
+    return (["zstd"] if zstandard is not None else []) + ["gzip"]
+
+
+def negotiate_media_type(accept: str) -> str:
+    """
+    JSON ou MessagePack pelo cabeçalho Accept: maior q vence e, no empate,
+    o tipo explícito vence o curinga (*/*). Sem Accept a resposta é JSON.
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+    best, best_rank = None, (0.0, False)
+    for name, q in _parse_header(accept):
+        if name in _MSGPACK_ALIASES:
+            candidate = MSGPACK_MEDIA_TYPE if msgpack is not None else None
+        elif name in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+            candidate = JSON_MEDIA_TYPE
+        else:
+            continue
+        rank = (q, "*" not in name)
+        if candidate and q > 0 and rank > best_rank:
+            best, best_rank = candidate, rank
+    if best is None:
+        raise NotAcceptableError(f"Formatos disponíveis: {', '.join(media_types())}")
+    return best
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """zstd ou gzip pelo Accept-Encoding (maior q vence; empate segue a preferência do servidor)"""
+    weights = dict(_parse_header(accept_encoding or ""))
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in encodings():
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[List[str]]:
+    """Lista de ?fields=a,b validada contra os campos do schema (None = todos)"""
+    if fields is None:
+        return None
+    selected = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in allowed]
+    if unknown or not selected:
+        raise ValueError(f"Campos inválidos: {', '.join(unknown) or '(vazio)'}. Use: {', '.join(allowed)}")
+    return selected
+
+
+def select_fields(payload: Dict, fields: Optional[List[str]]) -> Dict:
+    if fields is None:
+        return payload
+    return {name: payload[name] for name in fields if name in payload}
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL)
+    # ZstdCompressor não é thread-safe: um por thread, reaproveitado
+    compressor = getattr(_zstd, "compressor", None)
+    if compressor is None:
+        compressor = _zstd.compressor = zstandard.ZstdCompressor(level=settings.RESPONSE_ZSTD_LEVEL)
+    return compressor.compress(body)
+
+
+def render(payload: Dict, accept: str = "", accept_encoding: str = "") -> Tuple[bytes, Dict[str, str]]:
+    """
+    Serializa a resposta no formato negociado e comprime quando o cliente
+    aceita e o corpo passa de RESPONSE_COMPRESSION_MIN_BYTES (abaixo disso
+    a compressão custa mais CPU do que economiza de banda).
+
+    Returns:
+        (corpo, cabeçalhos com Content-Type, Vary e Content-Encoding)
+    """
+    media_type = negotiate_media_type(accept)
+    if media_type == MSGPACK_MEDIA_TYPE:
+        body = msgpack.packb(payload, use_bin_type=True)
+    else:
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    headers = {"Content-Type": media_type, "Vary": "Accept, Accept-Encoding"}
+    if len(body) >= settings.RESPONSE_COMPRESSION_MIN_BYTES:
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is not None:
+            body = _compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+    return body, headers
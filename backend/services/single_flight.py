@@ -0,0 +1,110 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from services.metrics import COALESCED_REQUESTS
+
+
+class CoalescedTimeoutError(TimeoutError):
+    """A chamada em voo que a requisição estava esperando não terminou a tempo"""
+
+
+class _LeaderCancelled(Exception):
+    """O dono da chamada foi cancelado (cliente desconectou): quem esperava tenta de novo"""
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Deduplicação de chamadas concorrentes com a mesma chave (single-flight)
+
+    A primeira requisição com uma chave executa a função; as que chegam
+    enquanto ela está em voo esperam e recebem o mesmo resultado, ou a
+    mesma exceção. A chave sai da tabela assim que a chamada termina: não
+    é um cache, só cobre a janela em que o cache ainda não foi preenchido.
+
+    Quem espera desiste depois de `timeout` segundos com
+    CoalescedTimeoutError. Na versão assíncrona, se o dono for cancelado
+    os demais não herdam o cancelamento: um deles assume a chamada.
+    Threads e event loop têm tabelas separadas.
+    """
+
+    def __init__(self, operation: str, timeout: float):
+        self.operation = operation
+        self.timeout = timeout
+        self._calls: Dict[str, _Call] = {}
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Executa fn() ou espera a execução em voo; retorna (resultado, coalescida)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            COALESCED_REQUESTS.inc(operation=self.operation)
+            if not call.done.wait(self.timeout):
+                raise CoalescedTimeoutError(f"{self.operation}: chamada em voo passou de {self.timeout}s")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Versão assíncrona de do(): fn é uma corrotina"""
+        loop = asyncio.get_running_loop()
+        while True:
+            future = self._futures.get(key)
+            if future is None or future.get_loop() is not loop:
+                break
+            COALESCED_REQUESTS.inc(operation=self.operation)
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.timeout), True
+            except asyncio.TimeoutError:
+                raise CoalescedTimeoutError(f"{self.operation}: chamada em voo passou de {self.timeout}s")
+            except _LeaderCancelled:
+                continue
+
+        future = loop.create_future()
+        self._futures[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+            # Marca a exceção como lida: sem ninguém esperando, o asyncio avisaria no log
+            if future.done():
+                future.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._futures)
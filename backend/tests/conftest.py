@@ -0,0 +1,12 @@
+"""
+Testes do backend
+
+Uso (a partir de backend/):
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+# Os módulos do backend são importados como no app (config, services...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
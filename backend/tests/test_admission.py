@@ -0,0 +1,202 @@
+import asyncio
+import time
+
+import pytest
+
+from config import settings
+from services.admission import AdmissionController, AdmissionRejected
+from services.metrics import ADMISSION_DECISIONS, ADMISSION_QUEUE_DEPTH, ADMISSION_WAIT_SECONDS
+
+FAR = 30.0
+
+
+class SlowBackend:
+    """Backend lento simulado: registra a ordem de início e a concorrência por classe"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.started = []
+        self.running = {"interactive": 0, "bulk": 0}
+        self.peak = {"interactive": 0, "bulk": 0}
+
+    def work(self, priority: str, name: str = ""):
+        async def call():
+            self.started.append(name or priority)
+            self.running[priority] += 1
+            self.peak[priority] = max(self.peak[priority], self.running[priority])
+            try:
+                await asyncio.sleep(self.latency)
+            finally:
+                self.running[priority] -= 1
+            return "ok"
+        return call
+
+
+def degrade(reason: str) -> str:
+    return f"degraded:{reason}"
+
+
+def controller(max_concurrency=1, bulk_share=1.0, interactive_queue=8, bulk_queue=8, service_estimate=0.05):
+    return AdmissionController(
+        max_concurrency=max_concurrency,
+        bulk_share=bulk_share,
+        queue_limits={"interactive": interactive_queue, "bulk": bulk_queue},
+        service_estimate=service_estimate,
+    )
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+
+
+def run(admission, backend, priority, name="", deadline=FAR):
+    return admission.run(priority, time.monotonic() + deadline, backend.work(priority, name), degrade)
+
+
+def test_interactive_jumps_ahead_of_queued_bulk():
+    async def scenario():
+        admission, backend = controller(), SlowBackend(0.05)
+        first = asyncio.create_task(run(admission, backend, "bulk", "bulk-1"))
+        await asyncio.sleep(0.01)
+        queued = [asyncio.create_task(run(admission, backend, "bulk", f"bulk-{i}")) for i in (2, 3)]
+        await asyncio.sleep(0.01)
+        interactive = asyncio.create_task(run(admission, backend, "interactive", "interactive"))
+        await asyncio.gather(first, *queued, interactive)
+        return backend.started
+
+    assert asyncio.run(scenario()) == ["bulk-1", "interactive", "bulk-2", "bulk-3"]
+
+
+def test_bulk_share_is_respected():
+    async def scenario():
+        admission, backend = controller(max_concurrency=4, bulk_share=0.5), SlowBackend(0.05)
+        bulk = [asyncio.create_task(run(admission, backend, "bulk")) for _ in range(6)]
+        await asyncio.sleep(0.01)
+        # Com o bulk no teto, o interactive ainda acha slot livre na hora
+        assert admission.stats()["active"] == {"interactive": 0, "bulk": 2}
+        results = await asyncio.gather(*bulk, run(admission, backend, "interactive"))
+        return backend.peak, results
+
+    peak, results = asyncio.run(scenario())
+    assert peak["bulk"] == 2
+    assert peak["interactive"] == 1
+    assert results == ["ok"] * 7
+
+
+def test_unreachable_deadline_degrades_without_waiting():
+    async def scenario():
+        admission, backend = controller(service_estimate=1.0), SlowBackend(0.2)
+        busy = asyncio.create_task(run(admission, backend, "interactive", "busy"))
+        await asyncio.sleep(0.01)
+        started = time.monotonic()
+        result = await run(admission, backend, "interactive", "late", deadline=0.1)
+        elapsed = time.monotonic() - started
+        await busy
+        return result, elapsed, backend.started
+
+    before = ADMISSION_DECISIONS.value(priority="interactive", outcome="degraded_deadline")
+    result, elapsed, started = asyncio.run(scenario())
+    assert result == "degraded:deadline"
+    assert elapsed < 0.1
+    assert started == ["busy"]
+    assert ADMISSION_DECISIONS.value(priority="interactive", outcome="degraded_deadline") == before + 1
+
+
+def test_deadline_expiring_during_work_degrades():
+    async def scenario():
+        admission, backend = controller(service_estimate=0.01), SlowBackend(0.5)
+        result = await run(admission, backend, "interactive", deadline=0.05)
+        return result, admission.stats()["active"]
+
+    result, active = asyncio.run(scenario())
+    assert result == "degraded:timeout"
+    assert active == {"interactive": 0, "bulk": 0}
+
+
+def test_full_bulk_queue_sheds_with_retry_after():
+    async def scenario():
+        admission, backend = controller(bulk_queue=1), SlowBackend(0.1)
+        busy = asyncio.create_task(run(admission, backend, "bulk"))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.create_task(run(admission, backend, "bulk"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await run(admission, backend, "bulk")
+        await asyncio.gather(busy, waiting)
+        return rejected.value
+
+    before = ADMISSION_DECISIONS.value(priority="bulk", outcome="shed")
+    rejected = asyncio.run(scenario())
+    assert rejected.priority == "bulk"
+    assert rejected.retry_after > 0
+    assert ADMISSION_DECISIONS.value(priority="bulk", outcome="shed") == before + 1
+
+
+def test_full_interactive_queue_degrades_instead_of_shedding():
+    async def scenario():
+        admission, backend = controller(interactive_queue=1), SlowBackend(0.1)
+        busy = asyncio.create_task(run(admission, backend, "interactive"))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.create_task(run(admission, backend, "interactive"))
+        await asyncio.sleep(0.01)
+        result = await run(admission, backend, "interactive")
+        await asyncio.gather(busy, waiting)
+        return result
+
+    assert asyncio.run(scenario()) == "degraded:overload"
+
+
+def test_queue_depth_and_wait_metrics():
+    async def scenario():
+        admission, backend = controller(), SlowBackend(0.05)
+        busy = asyncio.create_task(run(admission, backend, "bulk"))
+        await asyncio.sleep(0.01)
+        waiting = [asyncio.create_task(run(admission, backend, "bulk")) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        depth = ADMISSION_QUEUE_DEPTH.value(priority="bulk")
+        await asyncio.gather(busy, *waiting)
+        return depth
+
+    depth_before = ADMISSION_QUEUE_DEPTH.value(priority="bulk")
+    waits_before = ADMISSION_WAIT_SECONDS.count(priority="bulk")
+    admitted_before = ADMISSION_DECISIONS.value(priority="bulk", outcome="admitted")
+    depth = asyncio.run(scenario())
+    assert depth == depth_before + 2
+    assert ADMISSION_QUEUE_DEPTH.value(priority="bulk") == depth_before
+    assert ADMISSION_WAIT_SECONDS.count(priority="bulk") == waits_before + 2
+    assert ADMISSION_DECISIONS.value(priority="bulk", outcome="admitted") == admitted_before + 3
+
+
+def test_stream_slot_is_held_until_the_generator_closes():
+    async def scenario():
+        admission = controller()
+
+        async def stream():
+            async with admission.admit("interactive", time.monotonic() + FAR) as reason:
+                assert reason is None
+                for i in range(10):
+                    yield i
+
+        events = stream()
+        assert await events.__anext__() == 0
+        held = admission.stats()["active"]["interactive"]
+        await events.aclose()  # cliente desconectou no meio do stream
+        return held, admission.stats()["active"]["interactive"]
+
+    assert asyncio.run(scenario()) == (1, 0)
+
+
+def test_stream_admission_degrades_when_the_queue_is_full():
+    async def scenario():
+        admission, backend = controller(interactive_queue=0), SlowBackend(0.1)
+        busy = asyncio.create_task(run(admission, backend, "interactive"))
+        await asyncio.sleep(0.01)
+        async with admission.admit("interactive", time.monotonic() + FAR) as reason:
+            pass
+        await busy
+        return reason, admission.stats()["active"]
+
+    reason, active = asyncio.run(scenario())
+    assert reason == "overload"
+    assert active == {"interactive": 0, "bulk": 0}
@@ -0,0 +1,44 @@
+import time
+
+from services.cache_service import ResultCache
+
+
+def disk_cache(tmp_path, **kwargs):
+    kwargs.setdefault("max_entries", 1)
+    return ResultCache(ttl_seconds=3600, db_path=str(tmp_path / "cache.db"), **kwargs)
+
+
+def test_disk_hit_does_not_write(tmp_path):
+    cache = disk_cache(tmp_path)
+    cache.set("a", {"category": "Produtivo"})
+    cache.set("b", {"category": "Improdutivo"})
+    changes = cache._db.total_changes
+
+    assert cache.get("a") == {"category": "Produtivo"}
+    assert cache.stats()["disk_hits"] == 1
+    assert cache._db.total_changes == changes
+
+
+def test_pending_recency_is_flushed_before_eviction(tmp_path):
+    cache = disk_cache(tmp_path)
+    cache.set("a", "x" * 100)
+    time.sleep(0.01)
+    cache.set("b", "y" * 100)
+    time.sleep(0.01)
+    assert cache.get("a") == "x" * 100  # do disco: "b" passa a ser a menos acessada
+
+    cache.max_bytes = 250
+    cache.set("c", "z" * 100)
+    assert cache.stats()["disk_evictions"] == 1
+    cache._memory.clear()
+    assert cache.get("a") == "x" * 100
+    assert cache.get("b") is None
+
+
+def test_read_only_workload_flushes_when_pending_grows(tmp_path):
+    cache = disk_cache(tmp_path, max_entries=2)
+    for key in "abc":
+        cache.set(key, key)
+    for key in "abc":
+        cache.get(key)
+    assert cache._touched == {}
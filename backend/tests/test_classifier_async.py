@@ -0,0 +1,40 @@
+import asyncio
+import threading
+
+from services.classifier_service import ClassifierService
+
+
+class SimpleTokenizer:
+    def tokenize(self, text):
+        return [word.strip(".,!?").lower() for word in text.split() if len(word) > 2]
+
+    def top_keywords(self, tokens, n):
+        return tokens[:n]
+
+
+def test_async_path_keeps_local_stages_off_the_event_loop(monkeypatch):
+    classifier = ClassifierService()
+    classifier.nlp = SimpleTokenizer()
+    threads = {}
+
+    def record(name):
+        original = getattr(classifier, name)
+
+        def wrapper(*args, **kwargs):
+            threads[name] = threading.get_ident()
+            return original(*args, **kwargs)
+        monkeypatch.setattr(classifier, name, wrapper)
+
+    for name in ("_prepare_text", "_known_category", "_known_reply"):
+        record(name)
+
+    async def scenario():
+        result = await classifier.classify_and_respond_async(
+            "ana@empresa.com", "Reunião do projeto", "Precisamos revisar o prazo da entrega", cache_mode="bypass"
+        )
+        return result, threading.get_ident()
+
+    result, loop_thread = asyncio.run(scenario())
+    assert result["category"] in ("Produtivo", "Improdutivo")
+    assert set(threads) == {"_prepare_text", "_known_category", "_known_reply"}
+    assert loop_thread not in threads.values()
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from config import settings
+from services.classifier_service import ClassifierService
+from services.feedback_service import FeedbackService
+from services.local_model import LiveLocalModel, LocalModel, SnapshotStore
+from services.offline_provider import OfflineProvider
+
+
+class SimpleTokenizer:
+    """Tokenização sem os recursos do NLTK: o que importa aqui é a decisão, não o pré-processamento"""
+
+    def tokenize(self, text):
+        return [word.strip(".,!?").lower() for word in text.split() if len(word) > 2]
+
+    def top_keywords(self, tokens, n):
+        return tokens[:n]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LOCAL_MODEL_PATH", str(tmp_path / "base.npz"))
+    monkeypatch.setattr(settings, "LOCAL_MODEL_RELOAD_SECONDS", 0)
+    return tmp_path
+
+
+def build(workdir):
+    live = LiveLocalModel(SnapshotStore(str(workdir / "snapshots")))
+    feedback = FeedbackService(str(workdir / "feedback.jsonl"), live.store, live)
+    provider = OfflineProvider(live)
+    feedback.nlp = provider.nlp = SimpleTokenizer()
+    return live, feedback, provider
+
+
+def test_correction_without_base_model_keeps_rules_for_other_emails(workdir):
+    live, feedback, provider = build(workdir)
+    result = feedback.record(
+        "ops@empresa.com", "Contrato pendente", "Segue o contrato para assinatura", "Produtivo"
+    )
+    assert result["version"] == 1
+    assert result["served_locally"]
+    assert live.current().empty_base
+
+    subject, body = "Feliz aniversário", "Parabéns pelo seu dia, muito obrigado pela amizade"
+    assert provider.classify_email(subject, body) == provider.rule_scores(f"{subject}. {body}")
+    assert provider.classify_email(subject, body)[0] == "Improdutivo"
+
+
+def test_uncertain_model_falls_back_to_rules(workdir):
+    LocalModel.empty(2 ** 10).save(settings.LOCAL_MODEL_PATH)
+    _, _, provider = build(workdir)
+    subject, body = "Reunião do projeto", "Precisamos agendar a entrega do relatório"
+    assert provider.classify_email(subject, body) == provider.rule_scores(f"{subject}. {body}")
+
+
+def test_confident_model_answers_before_rules(workdir):
+    LocalModel(np.zeros(2 ** 10, dtype=np.float32), bias=-5.0).save(settings.LOCAL_MODEL_PATH)
+    _, _, provider = build(workdir)
+    category, confidence = provider.classify_email("Reunião do projeto", "Precisamos agendar a entrega")
+    assert category == "Improdutivo"
+    assert confidence > settings.LOCAL_MODEL_HIGH
+
+
+def test_snapshots_from_trained_base_are_not_marked_empty(workdir):
+    LocalModel.empty(2 ** 10).save(settings.LOCAL_MODEL_PATH)
+    live, feedback, _ = build(workdir)
+    feedback.record("ops@empresa.com", "Feliz natal", "Boas festas a todos", "Improdutivo")
+    assert live.current().version == 1
+    assert not live.current().empty_base
+
+
+def test_correction_without_base_model_does_not_skip_the_llm(workdir):
+    live, feedback, _ = build(workdir)
+    feedback.record("ops@empresa.com", "Contrato pendente", "Segue o contrato para assinatura", "Produtivo")
+    classifier = ClassifierService()
+    classifier.local_model = live
+    classifier.nlp = SimpleTokenizer()
+
+    assert live.current().empty_base
+    # Outro email (outro remetente) com o texto da correção: o snapshot está confiante nele
+    summary = classifier.classify_batch([{
+        "sender": "ana@empresa.com",
+        "subject": "Contrato pendente",
+        "body": "Segue o contrato para assinatura",
+        "cache": "bypass",
+    }])
+    assert summary["results"][0]["source"] != "local"
@@ -0,0 +1,25 @@
+import pytest
+
+from config import settings
+from services.gemini_service import GeminiService
+from benchmarks.fake_gemini import install_fake_gemini
+
+
+@pytest.mark.parametrize("transport", ["", "grpc", "rest"])
+def test_service_builds_with_each_transport(monkeypatch, transport):
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(settings, "GEMINI_TRANSPORT", transport)
+    service = GeminiService()
+    model = service._get_model(service.CLASSIFICATION_INSTRUCTION, service._classification_config())
+    assert model is service._get_model(service.CLASSIFICATION_INSTRUCTION, service._classification_config())
+
+
+def test_non_streamed_calls_record_total_latency_only():
+    service = GeminiService()
+    install_fake_gemini(service, 0.0)
+    service.classify_email("Reunião do projeto", "Precisamos revisar o prazo da entrega")
+
+    summary = service.timing_summary()
+    assert summary["calls"] == 1
+    assert "total_ms" in summary
+    assert "ttfb_ms" not in summary
@@ -0,0 +1,58 @@
+import io
+import json
+import threading
+
+import pytest
+
+from services.job_service import JobService
+
+
+def jsonl(count: int) -> bytes:
+    lines = [json.dumps({"id": n, "sender": "ana@empresa.com", "body": f"Mensagem {n}"}) for n in range(count)]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    return JobService(str(tmp_path / "jobs.db"), workers=1, chunk_size=10, max_rps=0.0)
+
+
+class SlowUpload(io.BytesIO):
+    """Upload que, no meio da leitura, consulta outro job a partir de outra thread"""
+
+    def __init__(self, data: bytes, service: JobService, other_id: str):
+        super().__init__(data)
+        self.service = service
+        self.other_id = other_id
+        self.lookups = []
+
+    def __iter__(self):
+        for number, line in enumerate(io.BytesIO(self.getvalue())):
+            if number == 5:
+                lookup = threading.Thread(target=lambda: self.lookups.append(self.service.get(self.other_id)))
+                lookup.start()
+                lookup.join(timeout=2.0)
+            yield line
+
+
+def test_submit_does_not_hold_the_lock_while_parsing(jobs, monkeypatch):
+    monkeypatch.setattr(JobService, "_INSERT_CHUNK", 3)
+    other = jobs.submit(io.BytesIO(jsonl(2)), "outro.jsonl")
+
+    upload = SlowUpload(jsonl(10), jobs, other["id"])
+    job = jobs.submit(upload, "caixa.jsonl")
+    # A consulta respondeu durante a leitura, sem esperar o upload terminar
+    assert [lookup["id"] for lookup in upload.lookups] == [other["id"]]
+    assert job["status"] == "queued"
+    assert job["total"] == 10
+
+
+def test_invalid_upload_leaves_no_job_behind(jobs, monkeypatch):
+    monkeypatch.setattr(JobService, "_INSERT_CHUNK", 3)
+    data = jsonl(7) + b"{not json}\n"
+    with pytest.raises(ValueError, match="Linha 8"):
+        jobs.submit(io.BytesIO(data), "caixa.jsonl")
+    with pytest.raises(ValueError, match="não contém"):
+        jobs.submit(io.BytesIO(b"\n"), "vazio.jsonl")
+    assert jobs.list() == []
+    assert jobs._db.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
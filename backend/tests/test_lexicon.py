@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from config import settings
+from services.keyword_automaton import Lexicon
+
+
+@pytest.fixture(scope="module")
+def fallback():
+    return Lexicon(os.path.join(settings.LEXICON_DIR, "fallback.json"))
+
+
+@pytest.mark.parametrize("text", [
+    "Aguardo as aprovações do time",
+    "Temos duas solicitações em aberto",
+    "Confirmações das reuniões de amanhã",
+    "Seguem as discussões e ações da semana",
+    "Duas urgências no cliente",
+])
+def test_plurals_match_productive_terms(fallback, text):
+    assert "Produtivo" in fallback.scores(text)
+
+
+def test_plural_and_singular_count_as_the_same_term(fallback):
+    total, terms = fallback.scores("Reunião marcada; as outras reuniões ficam para depois")["Produtivo"]
+    assert terms == ["reuni*"]
+    assert total == 1.0
+
+
+def test_plurals_match_unproductive_terms(fallback):
+    assert "Improdutivo" in fallback.scores("Convite para os aniversários e casamentos do mês")
+    assert "Produtivo" not in fallback.scores("Convite para os aniversários e casamentos do mês")
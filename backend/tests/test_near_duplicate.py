@@ -0,0 +1,31 @@
+from services.near_duplicate import NearDuplicateIndex
+
+INVOICE = "fatura mensal disponível valor vencimento pagamento boleto conta cliente portal acesso"
+INVOICE_AGAIN = "fatura mensal disponível valor vencimento pagamento boleto conta cliente portal acesso hoje"
+OTHER = "convite reunião equipe projeto sexta sala principal pauta revisão entrega prazo"
+
+
+def index(tmp_path, **kwargs):
+    kwargs.setdefault("max_entries", 16)
+    return NearDuplicateIndex(threshold=0.7, db_path=str(tmp_path / "near.db"), **kwargs)
+
+
+def accessed_at(near, text):
+    entry_id = near._entry_id(near.signature(text))
+    return near._db.execute("SELECT accessed_at FROM near_duplicates WHERE id = ?", (entry_id,)).fetchone()[0]
+
+
+def test_hit_does_not_write_until_the_next_save(tmp_path):
+    near = index(tmp_path)
+    near.add(INVOICE, "Produtivo", 0.9)
+    saved_at = accessed_at(near, INVOICE)
+    changes = near._db.total_changes
+
+    hit = near.lookup(INVOICE_AGAIN)
+    assert hit["category"] == "Produtivo"
+    assert near._db.total_changes == changes
+
+    near.add(OTHER, "Produtivo", 0.8)
+    assert accessed_at(near, INVOICE) > saved_at
+    assert near._touched == {}
+
@@ -0,0 +1,213 @@
+import asyncio
+import time
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from config import settings
+from services.gemini_service import GeminiService
+from services.metrics import BREAKER_TRANSITIONS, GEMINI_RETRIES
+from services.resilience import CircuitBreaker, GeminiUnavailableError
+from benchmarks.fake_gemini import FaultInjector, install_fake_gemini
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """GeminiService falando com o Gemini falso, com as configurações do teste"""
+    defaults = {
+        "GEMINI_RETRY_BASE_SECONDS": 0.0,
+        "GEMINI_MAX_RETRIES": 2,
+        "GEMINI_BREAKER_FAILURES": 1000,
+        "GEMINI_BREAKER_RESET_SECONDS": 15.0,
+        "GEMINI_RATE_LIMIT_RPS": 0.0,
+    }
+
+    def build(faults: FaultInjector, **overrides) -> GeminiService:
+        for name, value in {**defaults, **overrides}.items():
+            monkeypatch.setattr(settings, name, value)
+        service = GeminiService()
+        install_fake_gemini(service, 0.0, faults)
+        return service
+
+    return build
+
+
+def classify(service: GeminiService):
+    return service.classify_email("Reunião do projeto", "Precisamos revisar o prazo da entrega")
+
+
+def wait_for_state(service: GeminiService, state: str, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while service._breaker.state != state and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return service._breaker.state
+
+
+def test_retry_budget_stops_retries_once_exhausted(gemini):
+    faults = FaultInjector(down=True)
+    service = gemini(faults, GEMINI_MAX_RETRIES=100)
+    retries_before = GEMINI_RETRIES.value(operation="classify")
+
+    with pytest.raises(Exception):
+        classify(service)
+    # 10 tokens, só retenta acima de 5: a primeira tentativa e 4 retentativas
+    assert faults.calls == 5
+    assert not service._retry_budget.can_retry()
+
+    for _ in range(3):
+        with pytest.raises(Exception):
+            classify(service)
+    assert faults.calls == 8
+    assert GEMINI_RETRIES.value(operation="classify") == retries_before + 4
+
+
+def test_successes_refill_the_retry_budget(gemini):
+    faults = FaultInjector(down=True)
+    service = gemini(faults, GEMINI_MAX_RETRIES=100)
+    with pytest.raises(Exception):
+        classify(service)
+    faults.down = False
+    for _ in range(20):
+        classify(service)
+    assert service._retry_budget.can_retry()
+
+
+def test_breaker_opens_probes_and_closes(gemini):
+    faults = FaultInjector(down=True)
+    service = gemini(faults, GEMINI_MAX_RETRIES=0, GEMINI_BREAKER_FAILURES=2, GEMINI_BREAKER_RESET_SECONDS=0.1)
+    transitions = {state: BREAKER_TRANSITIONS.value(state=state) for state in ("open", "probing", "closed")}
+
+    for _ in range(2):
+        with pytest.raises(Exception):
+            classify(service)
+    assert service._breaker.state == CircuitBreaker.OPEN
+
+    # Aberto: a chamada nem chega ao Gemini
+    with pytest.raises(GeminiUnavailableError) as short_circuit:
+        classify(service)
+    assert short_circuit.value.reason == "circuit_open"
+    assert faults.calls == 2
+
+    # Sonda falhando mantém o circuito aberto por mais um período
+    time.sleep(0.15)
+    with pytest.raises(GeminiUnavailableError):
+        classify(service)
+    assert wait_for_state(service, CircuitBreaker.OPEN) == CircuitBreaker.OPEN
+    assert faults.calls == 3
+
+    # Gemini de volta: a sonda (meio aberto) fecha o circuito
+    faults.down = False
+    time.sleep(0.15)
+    with pytest.raises(GeminiUnavailableError):
+        classify(service)
+    assert wait_for_state(service, CircuitBreaker.CLOSED) == CircuitBreaker.CLOSED
+    assert classify(service)[0] == "Produtivo"
+
+    assert BREAKER_TRANSITIONS.value(state="open") == transitions["open"] + 2
+    assert BREAKER_TRANSITIONS.value(state="probing") == transitions["probing"] + 2
+    assert BREAKER_TRANSITIONS.value(state="closed") == transitions["closed"] + 1
+
+
+def test_client_errors_do_not_open_the_breaker(gemini):
+    faults = FaultInjector(down=True, error=google_exceptions.InvalidArgument)
+    service = gemini(faults, GEMINI_BREAKER_FAILURES=2)
+    for _ in range(5):
+        with pytest.raises(google_exceptions.InvalidArgument):
+            classify(service)
+    # Sem retentativas e sem abrir o circuito: o erro é do pedido, não do Gemini
+    assert faults.calls == 5
+    assert service._breaker.state == CircuitBreaker.CLOSED
+    assert service._retry_budget.can_retry()
+
+
+def test_retries_of_one_call_count_as_one_breaker_failure(gemini):
+    faults = FaultInjector(down=True)
+    service = gemini(faults, GEMINI_MAX_RETRIES=3, GEMINI_BREAKER_FAILURES=2)
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        classify(service)
+    assert faults.calls == 4
+    assert service._breaker.state == CircuitBreaker.CLOSED
+
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        classify(service)
+    assert service._breaker.state == CircuitBreaker.OPEN
+
+
+class FailFirst(FaultInjector):
+    """As primeiras `failures_before_success` chamadas falham com 503, as demais respondem"""
+
+    def __init__(self, failures_before_success: int):
+        super().__init__()
+        self.failures_before_success = failures_before_success
+
+    def check(self):
+        self.calls += 1
+        if self.calls <= self.failures_before_success:
+            self._fail(self.error)
+
+
+def stream_reply(service: GeminiService) -> str:
+    async def collect():
+        stream = service.stream_response_async("Produtivo", "Ana", "Reunião", "Podemos confirmar amanhã?", [])
+        return "".join([chunk async for chunk in stream])
+    return asyncio.run(collect())
+
+
+def test_stream_retries_transient_errors_before_the_first_chunk(gemini):
+    faults = FailFirst(2)
+    service = gemini(faults, GEMINI_MAX_RETRIES=2, GEMINI_BREAKER_FAILURES=1)
+    retries_before = GEMINI_RETRIES.value(operation="reply_stream")
+    assert stream_reply(service)
+    assert faults.calls == 3
+    assert GEMINI_RETRIES.value(operation="reply_stream") == retries_before + 2
+    assert service._breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stream_gives_up_after_max_retries(gemini):
+    faults = FailFirst(10)
+    service = gemini(faults, GEMINI_MAX_RETRIES=1)
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        stream_reply(service)
+    assert faults.calls == 2
+
+
+def test_token_bucket_throttles_calls(gemini):
+    faults = FaultInjector()
+    service = gemini(
+        faults, GEMINI_RATE_LIMIT_RPS=20.0, GEMINI_RATE_LIMIT_BURST=2, GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS=1.0
+    )
+    started = time.monotonic()
+    for _ in range(6):
+        classify(service)
+    # 2 do burst na hora, as outras 4 a 20/s
+    assert time.monotonic() - started >= 0.18
+    assert faults.calls == 6
+
+
+def test_token_bucket_rejects_beyond_max_wait(gemini):
+    faults = FaultInjector()
+    service = gemini(
+        faults, GEMINI_RATE_LIMIT_RPS=1.0, GEMINI_RATE_LIMIT_BURST=2, GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS=0.05
+    )
+    classify(service)
+    classify(service)
+    with pytest.raises(GeminiUnavailableError) as throttled:
+        classify(service)
+    assert throttled.value.reason == "rate_limited"
+    assert faults.calls == 2
+
+
+def test_breaker_state_in_health(gemini, monkeypatch):
+    import main
+
+    faults = FaultInjector(down=True)
+    service = gemini(faults, GEMINI_MAX_RETRIES=0, GEMINI_BREAKER_FAILURES=1)
+    monkeypatch.setattr(main, "gemini_service", service)
+
+    assert asyncio.run(main.health_check())["gemini_resilience"]["circuit"]["state"] == CircuitBreaker.CLOSED
+    with pytest.raises(Exception):
+        classify(service)
+    health = asyncio.run(main.health_check())
+    assert health["gemini_resilience"]["circuit"]["state"] == CircuitBreaker.OPEN
+    assert health["gemini_resilience"]["circuit"]["times_opened"] == 1
+    assert health["gemini_resilience"]["retry_budget"]["tokens"] < settings.GEMINI_RETRY_BUDGET_TOKENS
@@ -0,0 +1,90 @@
+"""
+Treina o classificador local a partir de emails rotulados em JSONL
+
+Cada linha: {"subject": "...", "body": "...", "category": "Produtivo" | "Improdutivo"}
+
+Uso:
+    python train_local_model.py --data emails.jsonl --output models/local_classifier.npz
+
+Ao final mostra a acurácia no conjunto de teste e, para cada limiar de
+confiança, a fração do tráfego que ainda iria para o Gemini.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from services.nlp_service import nlp_service
+from services.local_model import LABELS, LocalModel
+
+
+def load_samples(path: str):
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            category = record.get("category")
+            if category not in LABELS:
+                raise ValueError(f"Linha {line_number}: categoria inválida '{category}'")
+            text = f"{record.get('subject', '')}. {record.get('body', '')}"
+            tokens = nlp_service.tokenize(text)
+            samples.append((tokens, LABELS.index(category)))
+    return samples
+
+
+def report(model: LocalModel, test, thresholds):
+    started = time.perf_counter()
+    probabilities = np.array([model.predict_proba(tokens) for tokens, _ in test])
+    per_email_ms = (time.perf_counter() - started) * 1000 / max(len(test), 1)
+    labels = np.array([label for _, label in test])
+    predictions = (probabilities >= 0.5).astype(int)
+
+    print(f"\nExemplos de teste: {len(test)}")
+    print(f"Acurácia (sem faixa de incerteza): {np.mean(predictions == labels):.3f}")
+    print(f"Inferência: {per_email_ms:.3f} ms/email (tokens já pré-processados)\n")
+    print(f"{'limiar':>7} {'faixa':>13} {'vai p/ LLM':>11} {'acurácia local':>15}")
+
+    for threshold in thresholds:
+        confident = (probabilities >= threshold) | (probabilities <= 1 - threshold)
+        to_llm = 1 - np.mean(confident)
+        accuracy = np.mean(predictions[confident] == labels[confident]) if confident.any() else float("nan")
+        band = f"[{1 - threshold:.2f}, {threshold:.2f}]"
+        print(f"{threshold:7.2f} {band:>13} {to_llm:10.1%} {accuracy:15.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", required=True, help="arquivo JSONL com emails rotulados")
+    parser.add_argument("--output", default="models/local_classifier.npz")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--lr", type=float, default=0.5)
+    parser.add_argument("--features", type=int, default=2 ** 18, help="número de buckets de hash")
+    parser.add_argument("--test-split", type=float, default=0.2)
+    parser.add_argument("--thresholds", default="0.6,0.7,0.8,0.9,0.95")
+    args = parser.parse_args()
+
+    samples = load_samples(args.data)
+    rng = np.random.default_rng(42)
+    order = rng.permutation(len(samples))
+    n_test = int(len(samples) * args.test_split)
+    test = [samples[i] for i in order[:n_test]]
+    train = [samples[i] for i in order[n_test:]]
+    print(f"Treinando com {len(train)} exemplos ({args.epochs} épocas)...")
+
+    model = LocalModel.empty(args.features)
+    model.fit(train, epochs=args.epochs, lr=args.lr)
+    model.save(args.output)
+    print(f"Modelo salvo em {args.output} ({os.path.getsize(args.output) / 1024:.0f} KB)")
+
+    if test:
+        report(model, test, [float(t) for t in args.thresholds.split(",")])
+
+
+if __name__ == "__main__":
+    main()
@@ -26,7 +26,7 @@ document.getElementById('emailForm').addEventListener('submit', async (e) => {
         body: document.getElementById('body').value
     };
     
-    await classifyEmail(formData, 'text');
+    await classifyEmailStream(formData);
 });
 
 // Form de upload
@@ -84,6 +84,78 @@ async function classifyEmail(data, type) {
     }
 }
 
+// Classificação em streaming (texto): a categoria aparece assim que sai e a
+// resposta sugerida vai sendo preenchida conforme o Gemini gera
+async function classifyEmailStream(data) {
+    const loading = document.getElementById('loading');
+    const resultado = document.getElementById('resultado');
+    
+    loading.style.display = 'block';
+    resultado.style.display = 'none';
+    
+    try {
+        const response = await fetch(`${API_URL}/classify/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(data)
+        });
+        
+        if (!response.ok) {
+            const error = await response.json();
+            throw new Error(error.detail || 'Erro ao processar email');
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            let separator;
+            while ((separator = buffer.indexOf('\n\n')) !== -1) {
+                handleStreamEvent(buffer.slice(0, separator));
+                buffer = buffer.slice(separator + 2);
+            }
+        }
+        
+    } catch (error) {
+        alert(`Erro: ${error.message}`);
+        console.error(error);
+    } finally {
+        loading.style.display = 'none';
+    }
+}
+
+// Trata um evento SSE ("event: nome" + "data: json")
+function handleStreamEvent(raw) {
+    let event = 'message';
+    let data = '';
+    
+    raw.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+    });
+    
+    const payload = data ? JSON.parse(data) : {};
+    const reply = document.getElementById('suggested-reply');
+    
+    if (event === 'classification') {
+        document.getElementById('loading').style.display = 'none';
+        displayResult({ ...payload, suggested_reply: '' }, 'text');
+    } else if (event === 'reply') {
+        reply.textContent += payload.text;
+    } else if (event === 'done') {
+        reply.textContent = payload.suggested_reply;
+    } else if (event === 'error') {
+        throw new Error(payload.detail);
+    }
+}
+
 // Exibe resultado
 function displayResult(data, type) {
     const resultado = document.getElementById('resultado');